@@ -25,5 +25,5 @@ current_active_user = fastapi_users.current_user(active=True)
 # Optional: Dependency for any logged-in user (not necessarily active/verified)
 # current_user = fastapi_users.current_user()
 
-# Optional: Dependency for superuser (if needed)
-# current_superuser = fastapi_users.current_user(active=True, superuser=True) 
\ No newline at end of file
+# Dependency for superuser (admin endpoints)
+current_superuser = fastapi_users.current_user(active=True, superuser=True) 
\ No newline at end of file
@@ -0,0 +1,131 @@
+# /app/api/v1/endpoints/admin.py
+import asyncio
+import json
+import logging
+import os
+import tracemalloc
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi.responses import FileResponse
+
+from app.api.deps import current_superuser
+from app.core import memory, profiling
+from app.core.loop_watchdog import loop_watchdog
+from app.core.config import settings
+from app.core.prefork import process_memory
+from app.models.user import User
+from app.schemas.admin import ProfileSummary, ProfileTokenRead
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _stored_profile(profile_id: str, index: int):
+    paths = profiling.profile_paths(profile_id)
+    if paths is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return paths[index]
+
+
+@router.post("/profiling/token", response_model=ProfileTokenRead)
+async def create_profiling_token(
+    ttl_seconds: int = Query(settings.PROFILE_TOKEN_TTL_SECONDS, ge=60, le=86400),
+    user: User = Depends(current_superuser),
+):
+    """
+    A token that profiles any request carrying it in the profiling header, on
+    every worker, until it expires. The profile id comes back in X-Profile-Id.
+    """
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(status_code=501, detail="Profiling is disabled on this server.")
+    token, expires_at = profiling.issue_token(user.id, ttl_seconds)
+    logger.info(f"Admin {user.id} created a profiling token valid until {expires_at.isoformat()}.")
+    return ProfileTokenRead(token=token, header=settings.PROFILE_HEADER, expires_at=expires_at)
+
+
+@router.get("/profiles", response_model=List[ProfileSummary])
+async def list_profiles(
+    limit: int = Query(50, ge=1, le=500),
+    user: User = Depends(current_superuser),
+):
+    """The newest stored request profiles."""
+    return await asyncio.to_thread(profiling.list_profiles, limit)
+
+
+@router.get("/profiles/{profile_id}.folded")
+async def download_collapsed_stacks(
+    profile_id: str = Path(..., description="Id from the X-Profile-Id response header"),
+    user: User = Depends(current_superuser),
+):
+    """Collapsed stacks for flamegraph.pl, speedscope or inferno."""
+    path = _stored_profile(profile_id, 1)
+    if not await asyncio.to_thread(path.is_file):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/plain", filename=f"profile-{profile_id}.folded")
+
+
+@router.get("/profiles/{profile_id}")
+async def read_profile(
+    profile_id: str = Path(..., description="Id from the X-Profile-Id response header"),
+    user: User = Depends(current_superuser),
+):
+    """Phase breakdown, SQL log and hottest functions of a profiled request."""
+    path = _stored_profile(profile_id, 0)
+    try:
+        text = await asyncio.to_thread(path.read_text, encoding="utf-8")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return json.loads(text)
+
+
+def _require_memory_tracking() -> None:
+    if not memory.memory_tracking_enabled():
+        raise HTTPException(status_code=501, detail="Memory accounting is off (MEMORY_TRACKING_ENABLED).")
+
+
+@router.get("/memory")
+async def read_memory(user: User = Depends(current_superuser)):
+    """Memory of the worker answering: RSS/PSS, traced totals and the snapshots held."""
+    state = {"pid": os.getpid(), "process": process_memory(), "tracing": memory.memory_tracking_enabled()}
+    if state["tracing"]:
+        traced, peak = tracemalloc.get_traced_memory()
+        state.update(traced_bytes=traced, traced_peak_bytes=peak, snapshots=memory.snapshots.summary())
+    return state
+
+
+@router.get("/memory/diff")
+async def read_memory_diff(
+    against: str = Query("baseline", pattern="^(baseline|previous)$"),
+    group_by: str = Query("lineno", pattern=f"^({'|'.join(memory.SNAPSHOT_GROUPS)})$"),
+    limit: int = Query(25, ge=1, le=500),
+    fresh: bool = Query(False, description="Take a snapshot now instead of using the latest periodic one"),
+    user: User = Depends(current_superuser),
+):
+    """
+    Allocation sites that grew the most from the baseline (or previous)
+    snapshot to the latest one, in the worker answering.
+    """
+    _require_memory_tracking()
+    if fresh:
+        await asyncio.to_thread(memory.snapshots.take)
+    report = await asyncio.to_thread(memory.snapshots.diff, against, group_by, limit)
+    if report is None:
+        raise HTTPException(status_code=409, detail="Not enough snapshots yet; retry with fresh=true.")
+    return {"pid": os.getpid(), **report}
+
+
+@router.get("/event-loop")
+async def read_event_loop_stalls(
+    limit: int = Query(20, ge=1, le=settings.LOOP_STALL_HISTORY),
+    user: User = Depends(current_superuser),
+):
+    """The newest event-loop stalls of the worker answering, with the stack that blocked the loop."""
+    if not loop_watchdog.running:
+        raise HTTPException(status_code=501, detail="The event-loop watchdog is off (LOOP_WATCHDOG_ENABLED).")
+    return {
+        "pid": os.getpid(),
+        "threshold_ms": loop_watchdog.threshold * 1000,
+        "stalls": loop_watchdog.recent_stalls(limit),
+    }
@@ -1,12 +1,17 @@
 # Simplified for debugging import issues - Step 9 (Restore 4th Endpoint)
 
-from fastapi import APIRouter, Depends, HTTPException, Query, Path
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Request, Response, WebSocket, WebSocketDisconnect, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+import asyncio
+import json
+import re
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional, Dict, Any
+from typing import Awaitable, Callable, List, Optional, Dict, Any, Tuple
 from uuid import UUID, uuid4
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 from functools import partial
 from multiprocessing.pool import Pool
 from fastapi.concurrency import run_in_threadpool
@@ -28,7 +33,15 @@ from app.schemas.chart import (
     TransitCalculationRequest,
     CalculateSynastryByDataRequest,
     CalculateCompositeByDataRequest,
-    SynastryCompositePersonInput
+    SynastryCompositePersonInput,
+    TransitStreamRequest,
+    CalculateGroupSynastryRequest,
+    GroupSynastryResult,
+    GroupSynastryMember,
+    GroupSynastryPair,
+    CompatibilityRankingRequest,
+    CompatibilityRankingResult,
+    CompatibilityMatch
 )
 from app.crud import chart as crud_chart
 from app.crud.user import get_crud_user
@@ -36,40 +49,75 @@ from app.schemas.user import UserCreate
 from app.db.session import get_async_session
 from app.api.deps import current_active_user
 from app.models.user import User
-from app.services.astrology import NatalChartCalculator, calculate_transits, calculate_synastry, calculate_composite_chart, create_subject_from_input_data
+from app.services.astrology import CHART_SECTIONS, NatalChartCalculator, normalize_sections, calculate_transits, calculate_synastry
 from app.services.geolocation import get_coordinates_for_city
 from fastapi_users.exceptions import UserNotExists
 from fastapi_users.manager import BaseUserManager
 from app.db.user_manager import get_user_manager
 from app.crud.chart import get_crud_chart, CRUDChart
-
-print(">>> Loading charts.py <<<") # Add a debug print
+from app.services.transit_stream import TransitFrameEncoder, LatestRequestSlot
+from app.services.positions import build_position_set, chart_content_hash
+from app.services.executor import run_calculation
+from app.core.timing import log_phases, phase
+from app.core.single_flight import calculation_flights
+from app.core.admission import COST_CHART, COST_HEAVY, COST_LIGHT, COST_PAIR, AdmissionRejected, admission, admission_controller, client_key
+from app.api.v1.endpoints.ephemeris import series_response
+from app.core.http_cache import IMMUTABLE, PAST_INSTANT, REVALIDATE, chart_etag_parts, is_past_instant, make_etag, not_modified, set_cache_headers
+from app.services.pair_cache import pair_result_cache, pair_key, swap_synastry_aspects
+# The numpy engines (synastry_engine, composite_engine, compatibility) are imported
+# by the endpoints that use them, so that `import app.main` does not load numpy
+from app.services.chart_render import (
+    WHEEL_FORMATS, WHEEL_LANGUAGES, WHEEL_THEMES, WheelOptions, WheelSubject,
+    get_or_render_wheel, png_available, wheel_cache_key, wheel_image_cache,
+)
+from app.core.config import settings
 
 router = APIRouter()
-print(">>> charts.py: router defined <<<")
 
 logger = logging.getLogger(__name__)
 
+SECTIONS_QUERY_DESCRIPTION = (
+    f"Comma-separated chart sections to calculate ({', '.join(CHART_SECTIONS)}); "
+    "default all. Sections not requested are not computed and come back null."
+)
+
+
+def _parse_sections(sections: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """`?sections=planets,houses` -> a canonical tuple (None for all sections); 400 for unknown names."""
+    if not sections:
+        return None
+    try:
+        return tuple(sorted(normalize_sections(sections.split(","))))
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
 # --- Calculation Endpoints (No DB interaction, pure calculation) ---
 
-@router.post("/calculate/natal", response_model=NatalChartData)
+@router.post("/calculate/natal", response_model=NatalChartData, dependencies=[admission(COST_CHART)])
 async def calculate_natal_chart_endpoint(
     request: CalculateNatalChartRequest,
+    sections: Optional[str] = Query(None, description=SECTIONS_QUERY_DESCRIPTION),
     db: AsyncSession = Depends(get_async_session),
 ):
     logger.info(f"Calculating natal chart for: {request.name}")
+    selected = _parse_sections(sections)
     try:
         lat, lon = await get_coordinates_for_city(request.city, db)
         if lat is None or lon is None:
             raise HTTPException(status_code=404, detail=f"Coordinates not found for city: {request.city}")
 
-        calculator = NatalChartCalculator(
-            name=request.name,
-            birth_dt=datetime(request.year, request.month, request.day, request.hour, request.minute),
-            city=request.city
+        birth_dt = datetime(request.year, request.month, request.day, request.hour, request.minute)
+
+        async def compute() -> Dict[str, Any]:
+            calculator = NatalChartCalculator(name=request.name, birth_dt=birth_dt, city=request.city, latitude=lat, longitude=lon)
+            return await calculator.calculate_chart(selected)
+
+        # Identical concurrent requests (shared links, double-fired components) share one calculation
+        chart_data = await calculation_flights.do(
+            ("natal", request.name, birth_dt.isoformat(), request.city, lat, lon, selected), compute
         )
-        chart_data = await calculator.calculate_chart()
-        response_data = NatalChartData(**chart_data)
+        with phase("validate"):
+            response_data = NatalChartData(**chart_data)
         logger.info(f"Successfully calculated natal chart for: {request.name}")
         return response_data
 
@@ -77,7 +125,7 @@ async def calculate_natal_chart_endpoint(
         logger.exception(f"Error calculating natal chart for {request.name}: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error calculating chart (could be invalid city or other issue): {str(e)}")
 
-@router.post("/calculate/transits", response_model=TransitChartResponse)
+@router.post("/calculate/transits", response_model=TransitChartResponse, dependencies=[admission(COST_CHART)])
 async def calculate_transits_endpoint(
     request: CalculateTransitsRequest,
     db: AsyncSession = Depends(get_async_session),
@@ -113,7 +161,8 @@ async def calculate_transits_endpoint(
 
         transit_data = await calculate_transits(natal_chart_data=natal_chart_data_for_calc, transit_dt=transit_dt)
 
-        response_data = TransitChartResponse(**transit_data)
+        with phase("validate"):
+            response_data = TransitChartResponse(**transit_data)
         logger.info(f"Successfully calculated transits for: {request.natal_chart_request.name}")
         return response_data
 
@@ -121,7 +170,7 @@ async def calculate_transits_endpoint(
         logger.exception(f"Error calculating transits for {request.natal_chart_request.name}: {e}")
         raise HTTPException(status_code=500, detail=f"Internal server error calculating transits (could be invalid city or other issue): {str(e)}")
 
-@router.post("/", response_model=ChartDisplay, status_code=201)
+@router.post("/", response_model=ChartDisplay, status_code=201, dependencies=[admission(COST_CHART)])
 async def create_chart_endpoint(
     *,
     chart_crud: "CRUDChart" = Depends(get_crud_chart),
@@ -213,22 +262,34 @@ async def read_charts_endpoint(
     return [ChartDisplay.model_validate(chart) for chart in charts]
 
 
-@router.get("/{chart_id}")
+@router.get("/{chart_id}", dependencies=[admission(COST_CHART)])
 async def read_chart_endpoint(
     *,
+    request: Request,
+    response: Response,
     chart_crud: "CRUDChart" = Depends(get_crud_chart),
     chart_id: UUID = Path(..., title="The ID of the chart to get"),
+    sections: Optional[str] = Query(None, description=SECTIONS_QUERY_DESCRIPTION),
     db: AsyncSession = Depends(get_async_session),
 ):
     """
-    Retrieve a specific chart by ID, including calculated astrological details.
+    Retrieve a specific chart by ID, including calculated astrological details
+    (all sections, or those named in `sections`).
+    Supports conditional requests: a matching If-None-Match/If-Modified-Since
+    gets a 304 before any geocoding or ephemeris work.
     """
+    selected = _parse_sections(sections)
     logger.info(f"Requesting chart with ID: {chart_id} - Auth disabled for testing")
     chart = await chart_crud.get(id=chart_id)
     if not chart:
         logger.warning(f"Chart with ID {chart_id} not found in DB.")
         raise HTTPException(status_code=404, detail="Chart not found")
 
+    etag = make_etag("chart", *chart_etag_parts(chart), *(selected or ()))
+    cached_response = not_modified(request, etag, chart.updated_at)
+    if cached_response is not None:
+        return cached_response
+
     # --- ADDED Astrological Calculation ---    
     calculated_astro_data: Dict[str, Any] = {} 
     error_detail = None
@@ -236,8 +297,10 @@ async def read_chart_endpoint(
         if not chart.birth_datetime or not chart.city:
             raise ValueError("Stored chart is missing birth datetime or city for calculation.")
 
-        # Get coordinates
-        lat, lon = await get_coordinates_for_city(chart.city, db)
+        # Get coordinates (stored ones first, geocoding only as a fallback)
+        lat, lon = chart.latitude, chart.longitude
+        if lat is None or lon is None:
+            lat, lon = await get_coordinates_for_city(chart.city, db)
         if lat is None or lon is None:
             raise ValueError(f"Could not retrieve coordinates for city: {chart.city}")
 
@@ -249,8 +312,7 @@ async def read_chart_endpoint(
             latitude=lat, 
             longitude=lon
         )
-        # Perform calculation (call without arguments now)
-        calculated_astro_data = await calculator.calculate_chart()
+        calculated_astro_data = await calculator.calculate_chart(selected)
         logger.info(f"Successfully calculated astrological data for chart ID: {chart_id}")
 
     except Exception as calc_e:
@@ -258,7 +320,8 @@ async def read_chart_endpoint(
         error_detail = f"Could not calculate astrological details: {str(calc_e)}" 
     # --- END Calculation ---
     
-    chart_db_data = ChartDisplay.model_validate(chart).model_dump()
+    with phase("validate"):
+        chart_db_data = ChartDisplay.model_validate(chart).model_dump()
 
     response_data = {
         **chart_db_data, 
@@ -266,6 +329,10 @@ async def read_chart_endpoint(
         "calculation_error": error_detail
     }
 
+    # Don't let caches keep a failed calculation around
+    if error_detail is None:
+        set_cache_headers(response, etag, chart.updated_at)
+
     logger.info(f"Successfully retrieved and processed chart with ID: {chart_id}")
     return response_data
 
@@ -295,7 +362,7 @@ async def delete_chart_endpoint(
     return ChartDisplay.model_validate(deleted_chart)
 
 
-@router.post("/{chart_id}/transits", response_model=TransitChartResponse)
+@router.post("/{chart_id}/transits", response_model=TransitChartResponse, dependencies=[admission(COST_CHART)])
 async def get_chart_transits_endpoint(
     chart_id: UUID,
     request: TransitCalculationRequest,
@@ -325,126 +392,446 @@ async def get_chart_transits_endpoint(
         request.transit_minute
     )
 
-    # 4. Calculate natal chart data using NatalChartCalculator
-    calculator = NatalChartCalculator(
-        name=chart.name,
-        birth_dt=chart.birth_datetime,
-        city=chart.city,
-        latitude=lat,
-        longitude=lon
-    )
-    natal_chart_data = await calculator.calculate_chart()
-
-    # 5. Call calculate_transits in threadpool (sync function)
-    transit_data = await run_in_threadpool(
-        calculate_transits,
-        natal_chart_data,
-        transit_dt,
-        lat,
-        lon,
-        city
-    )
+    # 4. Natal chart + transits, shared with identical in-flight requests
+    transit_data = await _chart_transits(chart, lat, lon, transit_dt)
+    with phase("validate"):
+        return TransitChartResponse(**transit_data)
+
+
+async def _chart_transits(chart: Any, lat: float, lon: float, transit_dt: datetime) -> Dict[str, Any]:
+    """
+    Natal chart plus transits for a stored chart. Concurrent requests for the
+    same chart state and instant share one calculation (the result is read-only).
+    """
+    async def compute() -> Dict[str, Any]:
+        calculator = NatalChartCalculator(
+            name=chart.name,
+            birth_dt=chart.birth_datetime,
+            city=chart.city,
+            latitude=lat,
+            longitude=lon
+        )
+        # Transits only read the natal planets
+        natal_chart_data = await calculator.calculate_chart(("planets",))
+        # calculate_transits is synchronous
+        return await run_in_threadpool(
+            calculate_transits,
+            natal_chart_data,
+            transit_dt,
+            lat,
+            lon,
+            chart.city
+        )
 
-    return TransitChartResponse(**transit_data)
+    key = ("transits", *chart_etag_parts(chart), lat, lon, transit_dt.isoformat())
+    return await calculation_flights.do(key, compute)
 
 
-@router.post("/synastry", response_model=SynastryResult)
-async def calculate_synastry_by_id_endpoint(
-    request: CalculateSynastryByIdRequest,
-    chart_crud: CRUDChart = Depends(get_crud_chart),
-    db: AsyncSession = Depends(get_async_session),
-):
-    # Fetch both charts
-    chart1_db = await chart_crud.get(id=request.chart1_id)
-    chart2_db = await chart_crud.get(id=request.chart2_id)
+# Pair-cache variant of Kerykeion's SynastryAspects results (kept apart from any other engine's)
+SYNASTRY_CACHE_VARIANT = "kerykeion"
+
+
+def _kerykeion_subject(name: str, birth: datetime, city: str, lat: float, lon: float) -> Any:
+    """Kerykeion subject (None if it cannot be built); synchronous, for the calculation pool."""
+    return NatalChartCalculator(name, birth, city, lat, lon).subject
+
 
-    if not chart1_db or not chart2_db:
+async def _kerykeion_synastry(people: List[Tuple[str, datetime, str, float, float]]) -> Dict[str, Any]:
+    """
+    Kerykeion synastry of two (name, birth, city, lat, lon). Both subjects are
+    submitted to the pool together; the builds themselves take swisseph_lock in
+    turn (see app.services.ephemeris).
+    """
+    subjects = await asyncio.gather(*(run_calculation(_kerykeion_subject, *person) for person in people))
+    return await run_calculation(calculate_synastry, subjects[0], subjects[1])
+
+
+async def _pair_synastry(
+    people: List[Tuple[str, datetime, str, float, float]], hash1: str, hash2: str, db: Optional[AsyncSession]
+) -> Dict[str, Any]:
+    """Synastry of person 1 (planet1) to person 2 (planet2), through the pair result cache."""
+    cached = await pair_result_cache.get("synastry", hash1, hash2, variant=SYNASTRY_CACHE_VARIANT, db=db)
+    if cached is not None:
+        result, swapped = cached
+        return {**result, "aspects": swap_synastry_aspects(result["aspects"]) if swapped else result["aspects"]}
+
+    result = await _kerykeion_synastry(people)
+    if result.get("error"):
+        return result # Not cached: a failed build may succeed on retry
+    # Store with the lower-hash chart as chart 1
+    _, _, _, swapped = pair_key("synastry", hash1, hash2)
+    canonical = swap_synastry_aspects(result["aspects"]) if swapped else result["aspects"]
+    await pair_result_cache.put("synastry", hash1, hash2, {**result, "aspects": canonical}, variant=SYNASTRY_CACHE_VARIANT, db=db)
+    return result
+
+
+async def _pair_composite(
+    method: str,
+    name: str,
+    load_positions: Callable[[], Awaitable[List[Dict[str, Any]]]],
+    births: List[datetime],
+    coordinates: List[Tuple[float, float]],
+    hashes: List[str],
+    db: Optional[AsyncSession],
+) -> Dict[str, Any]:
+    """
+    Midpoint or Davison composite, through the pair result cache. Both methods
+    are symmetric in the two charts; only the display name is ordered.
+    `load_positions` is only awaited for a midpoint composite that misses the
+    cache. Raises ValueError if the Davison subject cannot be built.
+    """
+    cached = await pair_result_cache.get("composite", hashes[0], hashes[1], variant=method, db=db)
+    if cached is not None:
+        composite_data = cached[0]
+    else:
+        from app.services.composite_engine import davison_chart, midpoint_composite
+        (lat1, lon1), (lat2, lon2) = coordinates
+        if method == "davison":
+            composite_data = await run_calculation(davison_chart, name, births[0], lat1, lon1, births[1], lat2, lon2)
+        else:
+            positions = await load_positions()
+            composite_data = midpoint_composite(name, positions[0], positions[1], births[0], births[1], lat1, lat2)
+        await pair_result_cache.put("composite", hashes[0], hashes[1], composite_data, variant=method, db=db)
+    return {**composite_data, "info": {**composite_data["info"], "name": name}}
+
+
+async def _load_chart_pair(
+    chart_crud: CRUDChart, chart1_id: UUID, chart2_id: UUID, with_positions: bool = True
+) -> Tuple[List[Any], List[Tuple[float, float]], Optional[List[Dict[str, Any]]]]:
+    """
+    Shared front half of the two-chart endpoints: one batched fetch, both
+    coordinate lookups concurrently, both position sets submitted to the pool
+    together (None with with_positions=False, for callers that may not need them).
+    """
+    with phase("fetch"):
+        charts_by_id = {chart.id: chart for chart in await chart_crud.get_multi_by_ids(ids=[chart1_id, chart2_id])}
+    charts = [charts_by_id.get(chart1_id), charts_by_id.get(chart2_id)]
+    if not charts[0] or not charts[1]:
         raise HTTPException(status_code=404, detail="One or both charts not found")
 
-    subject1 = await chart_crud.get_astrological_subject(chart_db=chart1_db, db=db)
-    subject2 = await chart_crud.get_astrological_subject(chart_db=chart2_db, db=db)
-    
-    if not subject1 or not subject2:
-            raise HTTPException(status_code=500, detail="Failed to create astrological subject for one or both charts.")
+    with phase("geocode"):
+        coordinates = await asyncio.gather(*(chart_crud.get_coordinates(chart) for chart in charts))
+    if any(lat is None or lon is None for lat, lon in coordinates):
+        raise HTTPException(status_code=404, detail="Coordinates not found for the city of one or both charts")
+    positions = await _chart_pair_positions(chart_crud, charts, coordinates) if with_positions else None
+    return charts, coordinates, positions
+
+
+async def _chart_pair_positions(
+    chart_crud: CRUDChart, charts: List[Any], coordinates: List[Tuple[float, float]]
+) -> List[Dict[str, Any]]:
+    """Both charts' position sets (cached, or rebuilt on the calculation pool); 500 if either cannot be built."""
+    with phase("positions"):
+        positions = await chart_crud.get_position_sets(charts, coordinates=coordinates)
+    if not positions[0] or not positions[1]:
+        raise HTTPException(status_code=500, detail="Failed to calculate positions for one or both charts.")
+    return positions
 
-    synastry_data = await calculate_synastry(subject1, subject2)
-    return SynastryResult(**synastry_data)
 
-@router.post("/composite", response_model=CompositeChartResult)
+async def _load_person_pair(
+    people: List[SynastryCompositePersonInput], db: AsyncSession
+) -> Tuple[List[datetime], List[Tuple[float, float]], List[str]]:
+    """
+    The by-data counterpart of _load_chart_pair: birth times, concurrent
+    geocoding and content hashes. No ephemeris work, so the pair cache can be
+    checked before anything is built (see _build_person_positions).
+    """
+    births = [datetime(p.year, p.month, p.day, p.hour, p.minute) for p in people]
+
+    async def coordinates_for(person: SynastryCompositePersonInput) -> Tuple[Optional[float], Optional[float]]:
+        if person.latitude is not None and person.longitude is not None:
+            return person.latitude, person.longitude
+        return await get_coordinates_for_city(person.city, db)
+
+    with phase("geocode"):
+        coordinates = await asyncio.gather(*(coordinates_for(person) for person in people))
+    for person, (lat, lon) in zip(people, coordinates):
+        if lat is None or lon is None:
+            raise HTTPException(status_code=404, detail=f"Coordinates not found for city: {person.city}")
+    hashes = [chart_content_hash(birth, lat, lon) for birth, (lat, lon) in zip(births, coordinates)]
+    return births, coordinates, hashes
+
+
+async def _build_person_positions(
+    people: List[SynastryCompositePersonInput], births: List[datetime], coordinates: List[Tuple[float, float]]
+) -> List[Dict[str, Any]]:
+    """Both people's position sets, built on the calculation pool; 400 if a subject cannot be built."""
+    with phase("positions"):
+        try:
+            positions = await asyncio.gather(*(
+                run_calculation(build_position_set, person.name, birth, person.city, lat, lon)
+                for person, birth, (lat, lon) in zip(people, births, coordinates)
+            ))
+        except ValueError as ve:
+            raise HTTPException(status_code=400, detail=f"Could not create astrological subject from input data: {ve}")
+    return positions
+
+
+@router.post("/synastry", response_model=SynastryResult, dependencies=[admission(COST_PAIR)])
+async def calculate_synastry_by_id_endpoint(
+    request: CalculateSynastryByIdRequest,
+    chart_crud: CRUDChart = Depends(get_crud_chart),
+):
+    """
+    Synastry aspects between two saved charts, from Kerykeion subjects built
+    on the calculation pool. Results are cached per unordered
+    pair, so repeat comparisons (in either order) are lookups that build nothing.
+    """
+    charts, coordinates, _ = await _load_chart_pair(chart_crud, request.chart1_id, request.chart2_id, with_positions=False)
+    people = [(chart.name, chart.birth_datetime, chart.city, lat, lon) for chart, (lat, lon) in zip(charts, coordinates)]
+    with phase("aspects"):
+        synastry = await _pair_synastry(people, charts[0].content_hash, charts[1].content_hash, chart_crud.db)
+    log_phases("synastry")
+
+    return SynastryResult(
+        chart1_name=charts[0].name,
+        chart2_name=charts[1].name,
+        chart1_id=charts[0].id,
+        chart2_id=charts[1].id,
+        aspects=synastry["aspects"],
+        calculation_error=synastry.get("error"),
+    )
+
+@router.post("/composite", response_model=CompositeChartResult, dependencies=[admission(COST_PAIR)])
 async def calculate_composite_by_id_endpoint(
     request: CalculateCompositeByIdRequest,
     chart_crud: CRUDChart = Depends(get_crud_chart),
-    db: AsyncSession = Depends(get_async_session),
 ):
-    # Fetch both charts
-    chart1_db = await chart_crud.get(id=request.chart1_id)
-    chart2_db = await chart_crud.get(id=request.chart2_id)
+    """
+    Composite chart for two saved charts.
 
-    if not chart1_db or not chart2_db:
-        raise HTTPException(status_code=404, detail="One or both charts not found")
+    method="midpoint" works purely from the charts' cached position sets (no
+    ephemeris call); method="davison" casts one chart for the midpoint in time
+    and space.
+    """
+    charts, coordinates, _ = await _load_chart_pair(chart_crud, request.chart1_id, request.chart2_id, with_positions=False)
+    with phase("composite"):
+        try:
+            composite_data = await _pair_composite(
+                request.method,
+                f"{charts[0].name} & {charts[1].name}",
+                partial(_chart_pair_positions, chart_crud, charts, coordinates),
+                [chart.birth_datetime for chart in charts],
+                coordinates,
+                [chart.content_hash for chart in charts],
+                chart_crud.db,
+            )
+        except ValueError as ve:
+            logger.error(f"Composite ({request.method}) calculation failed: {ve}")
+            raise HTTPException(status_code=500, detail=f"Failed to calculate composite chart: {ve}")
+    log_phases(f"composite ({request.method})")
+
+    return CompositeChartResult(
+        chart1_name=charts[0].name,
+        chart2_name=charts[1].name,
+        chart1_id=charts[0].id,
+        chart2_id=charts[1].id,
+        composite_chart_data=composite_data,
+    )
 
-    subject1 = await chart_crud.get_astrological_subject(chart_db=chart1_db, db=db)
-    subject2 = await chart_crud.get_astrological_subject(chart_db=chart2_db, db=db)
+@router.post("/synastry/group", response_model=GroupSynastryResult, dependencies=[admission(COST_HEAVY)])
+async def calculate_group_synastry_endpoint(
+    request: CalculateGroupSynastryRequest,
+    chart_crud: CRUDChart = Depends(get_crud_chart),
+):
+    """
+    All-pairs synastry for a group of saved charts (family/team reports).
 
-    if not subject1 or not subject2:
-            raise HTTPException(status_code=500, detail="Failed to create astrological subject for one or both charts.")
+    Charts are fetched in one query and each chart's cached positions are
+    used (stale ones are rebuilt on the calculation pool); the
+    upper-triangular pair matrix is then computed in a single vectorized pass.
+    Ephemeris work grows with N, not N².
+    """
+    chart_ids = list(dict.fromkeys(request.chart_ids)) # De-duplicate, keep order
+    if len(chart_ids) < 2:
+        raise HTTPException(status_code=400, detail="At least two distinct chart IDs are required.")
+    if len(chart_ids) > settings.GROUP_SYNASTRY_MAX_CHARTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.GROUP_SYNASTRY_MAX_CHARTS} charts can be compared at once.")
+    from app.services.synastry_engine import aspect_weight_vector, group_synastry_matrix
+    try:
+        aspect_weight_vector(request.aspect_weights) # Validate before doing any work
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    charts_by_id = {chart.id: chart for chart in await chart_crud.get_multi_by_ids(ids=chart_ids)}
+    missing = [str(chart_id) for chart_id in chart_ids if chart_id not in charts_by_id]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Charts not found: {', '.join(missing)}")
+    charts = [charts_by_id[chart_id] for chart_id in chart_ids]
+
+    with phase("geocode"):
+        coordinates = await asyncio.gather(*(chart_crud.get_coordinates(chart) for chart in charts))
+    for chart, (lat, lon) in zip(charts, coordinates):
+        if lat is None or lon is None:
+            raise HTTPException(status_code=404, detail=f"Coordinates not found for city of chart {chart.id}")
+
+    with phase("positions"):
+        position_sets = await chart_crud.get_position_sets(charts, coordinates=coordinates)
+    failed = [str(chart.id) for chart, positions in zip(charts, position_sets) if not positions]
+    if failed:
+        raise HTTPException(status_code=500, detail=f"Failed to create astrological subject for charts: {', '.join(failed)}")
+
+    with phase("matrix"):
+        pairs = await run_calculation(group_synastry_matrix, position_sets, request.aspect_weights)
+    log_phases("group synastry")
+
+    return GroupSynastryResult(
+        members=[GroupSynastryMember(chart_id=chart.id, name=chart.name) for chart in charts],
+        pairs=[
+            GroupSynastryPair(
+                chart1_id=charts[pair["index1"]].id,
+                chart2_id=charts[pair["index2"]].id,
+                chart1_name=charts[pair["index1"]].name,
+                chart2_name=charts[pair["index2"]].name,
+                aspects=pair["aspects"],
+                score=pair["score"],
+            )
+            for pair in pairs
+        ],
+    )
 
-    composite_data = await calculate_composite_chart(subject1, subject2)
-    return CompositeChartResult(**composite_data)
+@router.post("/{chart_id}/compatibility", response_model=CompatibilityRankingResult, dependencies=[admission(COST_HEAVY)])
+async def rank_compatibility_endpoint(
+    chart_id: UUID,
+    request: CompatibilityRankingRequest,
+    chart_crud: CRUDChart = Depends(get_crud_chart),
+):
+    """
+    Ranks other charts by synastry compatibility with this one.
+
+    scope="user" compares against the owner's other charts; scope="opt_in"
+    against every chart that opted in. Positions come from the per-chart cache,
+    so no subjects are built for the population, and all candidates are scored
+    in one vectorized pass. Large populations are prefiltered on key-point
+    contacts unless `prefilter` is set explicitly.
+    """
+    chart = await chart_crud.get(id=chart_id)
+    if not chart:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    from app.services.compatibility import CompatibilityPopulation, compatibility_population_cache, rank_compatibility
+    from app.services.synastry_engine import aspect_weight_vector
+    try:
+        aspect_weight_vector(request.aspect_weights) # Validate before doing any work
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+
+    target_positions = await chart_crud.get_position_set(chart)
+    if not target_positions:
+        raise HTTPException(status_code=500, detail="Failed to calculate positions for this chart.")
+
+    if request.scope == "user":
+        # Small population: make sure every chart of the owner has current positions
+        owner_charts = await chart_crud.get_multi_by_owner(
+            user_id=chart.user_id, limit=settings.COMPATIBILITY_USER_SCOPE_LIMIT
+        )
+        others = [other for other in owner_charts if other.id != chart.id]
+        rows = [
+            (other.id, other.name, positions)
+            for other, positions in zip(others, await chart_crud.get_position_sets(others))
+            if positions
+        ]
+        population = CompatibilityPopulation.from_rows(rows)
+    else:
+        population = compatibility_population_cache.get("opt_in")
+        if population is None:
+            rows = await chart_crud.get_position_population(opt_in_only=True)
+            population = await run_in_threadpool(CompatibilityPopulation.from_rows, rows)
+            compatibility_population_cache.put("opt_in", population)
+            logger.info(f"Loaded opt-in compatibility population of {population.size} charts.")
+
+    use_prefilter = request.prefilter
+    if use_prefilter is None:
+        use_prefilter = population.size >= settings.COMPATIBILITY_PREFILTER_THRESHOLD
+
+    ranking = await run_in_threadpool(
+        rank_compatibility,
+        target_positions,
+        population,
+        request.limit,
+        request.aspect_weights,
+        use_prefilter,
+        chart.id,
+    )
 
-@router.post("/calculate/synastry/by-data", response_model=SynastryResult)
+    return CompatibilityRankingResult(
+        chart_id=chart.id,
+        scope=request.scope,
+        population_size=population.size,
+        candidates_scored=ranking["candidates_scored"],
+        prefiltered=use_prefilter,
+        matches=[CompatibilityMatch(**match) for match in ranking["matches"]],
+    )
+
+@router.post("/calculate/synastry/by-data", response_model=SynastryResult, dependencies=[admission(COST_PAIR)])
 async def calculate_synastry_by_data_endpoint(
     request: CalculateSynastryByDataRequest,
     db: AsyncSession = Depends(get_async_session), # db session for geocoding if needed
 ):
-    logger.info(f"Calculating synastry by data for {request.person1.name} and {request.person2.name}")
-    subject1 = await create_subject_from_input_data(request.person1, db)
-    subject2 = await create_subject_from_input_data(request.person2, db)
-
-    if not subject1 or not subject2:
-        # More specific error logging would happen in create_subject_from_input_data
-        raise HTTPException(status_code=400, detail="Could not create astrological subject for one or both persons from input data.")
-
-    try:
-        synastry_data = await calculate_synastry(subject1, subject2)
-        return SynastryResult(**synastry_data)
-    except Exception as e:
-        logger.error(f"Error during synastry (by-data) calculation: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Internal server error calculating synastry by data: {str(e)}")
+    logger.info(f"Calculating synastry by data for {request.person1_data.name} and {request.person2_data.name}")
+    people = [request.person1_data, request.person2_data]
+    births, coordinates, hashes = await _load_person_pair(people, db)
+    subjects = [(p.name, birth, p.city, lat, lon) for p, birth, (lat, lon) in zip(people, births, coordinates)]
+    with phase("aspects"):
+        synastry = await _pair_synastry(subjects, hashes[0], hashes[1], db)
+    log_phases("synastry (by data)")
+
+    return SynastryResult(
+        chart1_name=people[0].name, chart2_name=people[1].name,
+        aspects=synastry["aspects"], calculation_error=synastry.get("error"),
+    )
 
-@router.post("/calculate/composite/by-data", response_model=CompositeChartResult)
+@router.post("/calculate/composite/by-data", response_model=CompositeChartResult, dependencies=[admission(COST_PAIR)])
 async def calculate_composite_by_data_endpoint(
     request: CalculateCompositeByDataRequest,
     db: AsyncSession = Depends(get_async_session), # db session for geocoding if needed
 ):
-    logger.info(f"Calculating composite by data for {request.person1.name} and {request.person2.name}")
-    subject1 = await create_subject_from_input_data(request.person1, db)
-    subject2 = await create_subject_from_input_data(request.person2, db)
-
-    if not subject1 or not subject2:
-        raise HTTPException(status_code=400, detail="Could not create astrological subject for one or both persons from input data.")
+    logger.info(f"Calculating composite by data for {request.person1_data.name} and {request.person2_data.name}")
+    people = [request.person1_data, request.person2_data]
+    births, coordinates, hashes = await _load_person_pair(people, db)
+    with phase("composite"):
+        try:
+            composite_data = await _pair_composite(
+                request.method, f"{people[0].name} & {people[1].name}",
+                partial(_build_person_positions, people, births, coordinates), births, coordinates, hashes, db,
+            )
+        except ValueError as ve:
+            logger.error(f"Composite (by-data, {request.method}) calculation failed: {ve}")
+            raise HTTPException(status_code=500, detail=f"Internal server error calculating composite by data: {ve}")
+    log_phases(f"composite (by data, {request.method})")
 
-    try:
-        composite_data = await calculate_composite_chart(subject1, subject2)
-        return CompositeChartResult(**composite_data)
-    except Exception as e:
-        logger.error(f"Error during composite (by-data) calculation: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Internal server error calculating composite by data: {str(e)}")
+    return CompositeChartResult(
+        chart1_name=people[0].name, chart2_name=people[1].name, composite_chart_data=composite_data
+    )
 
-@router.get("/{chart_id}/transits", response_model=TransitChartResponse)
+@router.get("/{chart_id}/transits", response_model=TransitChartResponse, dependencies=[admission(COST_CHART)])
 async def get_chart_transits_get_endpoint(
     chart_id: UUID,
+    request: Request,
+    response: Response,
     transit_datetime: str = Query(..., description="Transit datetime in ISO format, e.g. 2025-05-14T09:28:00"),
     chart_crud: CRUDChart = Depends(get_crud_chart),
     db: AsyncSession = Depends(get_async_session),
 ):
     """
     Get transits for a chart at a specific datetime (GET version for timeline/slider support).
+    Conditional requests are answered with a 304 before any ephemeris work;
+    past instants may additionally be reused by the browser for a while.
     """
     chart = await chart_crud.get(id=chart_id)
     if not chart:
         raise HTTPException(status_code=404, detail="Chart not found")
 
+    try:
+        transit_dt = datetime.fromisoformat(transit_datetime)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid transit_datetime: {e}")
+
+    etag = make_etag("transits", *chart_etag_parts(chart), transit_dt.isoformat())
+    cache_control = PAST_INSTANT if is_past_instant(transit_dt) else REVALIDATE
+    cached_response = not_modified(request, etag, cache_control=cache_control)
+    if cached_response is not None:
+        return cached_response
+
     lat = chart.latitude
     lon = chart.longitude
     city = chart.city
@@ -453,30 +840,296 @@ async def get_chart_transits_get_endpoint(
         if lat is None or lon is None:
             raise HTTPException(status_code=404, detail="Coordinates not found for chart's city")
 
+    transit_data = await _chart_transits(chart, lat, lon, transit_dt)
+
+    set_cache_headers(response, etag, cache_control=cache_control)
+    with phase("validate"):
+        return TransitChartResponse(**transit_data)
+
+@router.get("/{chart_id}/transits/series", dependencies=[admission(COST_HEAVY)])
+async def get_chart_transit_series_endpoint(
+    chart_id: UUID,
+    request: Request,
+    start: str = Query(..., description="Range start in ISO format (UTC if no offset)"),
+    end: str = Query(..., description="Range end (inclusive) in ISO format"),
+    step_minutes: int = Query(60, ge=1, le=60 * 24 * 30, description="Sampling interval in minutes"),
+    bodies: Optional[str] = Query(None, description="Comma-separated transiting bodies (default: all)"),
+    chart_crud: CRUDChart = Depends(get_crud_chart),
+):
+    """
+    Transiting longitudes and speeds over a range, plus the chart's natal points
+    to measure them against. Same content negotiation as /ephemeris/series
+    (JSON, MessagePack or Arrow IPC).
+    """
+    chart = await chart_crud.get(id=chart_id)
+    if not chart:
+        raise HTTPException(status_code=404, detail="Chart not found")
+
+    positions = await chart_crud.get_position_set(chart)
+    if not positions:
+        raise HTTPException(status_code=500, detail="Could not calculate natal positions for chart")
+    return await series_response(
+        request, start, end, step_minutes, bodies,
+        etag_parts=chart_etag_parts(chart),
+        metadata={"chart_id": str(chart.id), "natal_points": positions.get("points", {})},
+        private=True,
+    )
+
+# --- Chart Wheel Images ---
+
+_WHEEL_FILE_NAME = re.compile(r"^([0-9a-f]{64})\.(svg|png)$")
+
+
+def wheel_options(
+    format: str = Query("svg", description=f"Image format: {', '.join(WHEEL_FORMATS)}"),
+    theme: str = Query("classic", description=f"Wheel theme: {', '.join(WHEEL_THEMES)}"),
+    language: str = Query("EN", description=f"Label language: {', '.join(WHEEL_LANGUAGES)}"),
+    wheel_only: bool = Query(False, description="Only the wheel, without the aspect grid and tables"),
+    width: Optional[int] = Query(None, ge=64, le=settings.WHEEL_PNG_MAX_WIDTH, description="PNG width in pixels"),
+) -> WheelOptions:
     try:
-        transit_dt = datetime.fromisoformat(transit_datetime)
-    except Exception as e:
+        options = WheelOptions(format=format, theme=theme, language=language.upper(), wheel_only=wheel_only, width=width)
+    except ValueError as ve:
+        raise HTTPException(status_code=400, detail=str(ve))
+    if options.format == "png" and not png_available():
+        raise HTTPException(status_code=501, detail="PNG rendering is not available on this server; request format=svg.")
+    return options
+
+
+async def _wheel_subject(chart: Any, db: AsyncSession) -> WheelSubject:
+    lat, lon = chart.latitude, chart.longitude
+    if lat is None or lon is None:
+        lat, lon = await get_coordinates_for_city(chart.city, db)
+        if lat is None or lon is None:
+            raise HTTPException(status_code=404, detail=f"Coordinates not found for chart's city: {chart.city}")
+    return WheelSubject(name=chart.name, birth_dt=chart.birth_datetime, city=chart.city, latitude=lat, longitude=lon)
+
+
+async def _wheel_response(request: Request, kind: str, subjects: List[WheelSubject], options: WheelOptions) -> Response:
+    """
+    The image for a chart-addressed wheel URL. These URLs keep their meaning
+    when a chart is edited, so they revalidate (a 304 costs no rendering); the
+    Content-Location header points at the immutable content-addressed copy.
+    """
+    key = wheel_cache_key(kind, subjects, options)
+    etag = f'"{key}"'
+    cached_response = not_modified(request, etag)
+    if cached_response is not None:
+        return cached_response
+    try:
+        _, image = await get_or_render_wheel(kind, subjects, options, key=key)
+    except ValueError as ve:
+        raise HTTPException(status_code=422, detail=f"Could not render chart wheel: {ve}")
+    response = Response(content=image, media_type=WHEEL_FORMATS[options.format])
+    set_cache_headers(response, etag)
+    response.headers["Content-Location"] = str(
+        request.url_for("get_wheel_image_endpoint", file_name=f"{key}.{options.format}")
+    )
+    return response
+
+
+@router.get("/wheels/{file_name}")
+async def get_wheel_image_endpoint(file_name: str, request: Request):
+    """
+    A rendered wheel by content hash (the Content-Location of the wheel
+    endpoints below). The bytes behind a name never change, so they are served
+    as immutable. Images evicted from the cache are 404 until requested again
+    through their chart URL.
+    """
+    match = _WHEEL_FILE_NAME.match(file_name)
+    if not match:
+        raise HTTPException(status_code=404, detail="Not a wheel image name")
+    key, image_format = match.groups()
+    etag = f'"{key}"'
+    cached_response = not_modified(request, etag, cache_control=IMMUTABLE)
+    if cached_response is not None:
+        return cached_response
+    image = await asyncio.to_thread(wheel_image_cache.get, key, image_format)
+    if image is None:
+        raise HTTPException(status_code=404, detail="Wheel image not in cache; request it through its chart URL")
+    response = Response(content=image, media_type=WHEEL_FORMATS[image_format])
+    set_cache_headers(response, etag, cache_control=IMMUTABLE)
+    return response
+
+
+@router.get("/{chart_id}/wheel", dependencies=[admission(COST_CHART)])
+async def get_natal_wheel_endpoint(
+    chart_id: UUID,
+    request: Request,
+    options: WheelOptions = Depends(wheel_options),
+    chart_crud: CRUDChart = Depends(get_crud_chart),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """The chart's natal wheel as SVG or PNG."""
+    chart = await chart_crud.get(id=chart_id)
+    if not chart:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    return await _wheel_response(request, "natal", [await _wheel_subject(chart, db)], options)
+
+
+@router.get("/{chart_id}/wheel/transit", dependencies=[admission(COST_PAIR)])
+async def get_transit_wheel_endpoint(
+    chart_id: UUID,
+    request: Request,
+    transit_datetime: str = Query(..., description="Transit datetime in ISO format, e.g. 2025-05-14T09:28:00"),
+    options: WheelOptions = Depends(wheel_options),
+    chart_crud: CRUDChart = Depends(get_crud_chart),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Bi-wheel of the chart (inner) and the transits at `transit_datetime` for its location (outer)."""
+    chart = await chart_crud.get(id=chart_id)
+    if not chart:
+        raise HTTPException(status_code=404, detail="Chart not found")
+    try:
+        transit_dt = datetime.fromisoformat(transit_datetime).replace(second=0, microsecond=0)
+    except ValueError as e:
         raise HTTPException(status_code=400, detail=f"Invalid transit_datetime: {e}")
+    if transit_dt.tzinfo is not None:
+        # Same instant as naive UTC; dropping the offset alone would shift it by the offset
+        transit_dt = transit_dt.astimezone(timezone.utc).replace(tzinfo=None)
+    natal = await _wheel_subject(chart, db)
+    transit = WheelSubject(
+        name="Transits", birth_dt=transit_dt, city=natal.city,
+        latitude=natal.latitude, longitude=natal.longitude,
+    )
+    return await _wheel_response(request, "transit", [natal, transit], options)
 
-    calculator = NatalChartCalculator(
+
+@router.get("/{chart_id}/wheel/synastry/{other_chart_id}", dependencies=[admission(COST_PAIR)])
+async def get_synastry_wheel_endpoint(
+    chart_id: UUID,
+    other_chart_id: UUID,
+    request: Request,
+    options: WheelOptions = Depends(wheel_options),
+    chart_crud: CRUDChart = Depends(get_crud_chart),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Synastry bi-wheel: this chart inside, the other chart outside."""
+    with phase("fetch"):
+        charts_by_id = {chart.id: chart for chart in await chart_crud.get_multi_by_ids(ids=[chart_id, other_chart_id])}
+    charts = [charts_by_id.get(chart_id), charts_by_id.get(other_chart_id)]
+    if not charts[0] or not charts[1]:
+        raise HTTPException(status_code=404, detail="One or both charts not found")
+    subjects = [await _wheel_subject(chart, db) for chart in charts]
+    return await _wheel_response(request, "synastry", subjects, options)
+
+
+@router.websocket("/{chart_id}/transits/stream")
+async def stream_chart_transits_endpoint(
+    websocket: WebSocket,
+    chart_id: UUID,
+    chart_crud: CRUDChart = Depends(get_crud_chart),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Stream transits for a chart while the timeline slider is being dragged.
+
+    The natal chart is calculated once per connection. Each client message is a
+    TransitStreamRequest; positions that are superseded before they are picked
+    up are dropped, and every answered position is sent as a delta frame
+    against the previous one (see TransitFrameEncoder).
+    """
+    await websocket.accept()
+
+    chart = await chart_crud.get(id=chart_id)
+    if not chart:
+        await websocket.send_json({"type": "error", "detail": "Chart not found"})
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    lat = chart.latitude
+    lon = chart.longitude
+    city = chart.city
+    if lat is None or lon is None:
+        lat, lon = await get_coordinates_for_city(city, db)
+        if lat is None or lon is None:
+            await websocket.send_json({"type": "error", "detail": "Coordinates not found for chart's city"})
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+    # The subject build is synchronous Kerykeion work; keep it off the event loop
+    calculator = await run_calculation(
+        NatalChartCalculator,
         name=chart.name,
         birth_dt=chart.birth_datetime,
         city=chart.city,
         latitude=lat,
         longitude=lon
     )
-    natal_chart_data = await calculator.calculate_chart()
-
-    transit_data = await run_in_threadpool(
-        calculate_transits,
-        natal_chart_data,
-        transit_dt,
-        lat,
-        lon,
-        city
-    )
+    natal_chart_data = await calculator.calculate_chart(("planets",))
+    if natal_chart_data.get("calculation_error"):
+        await websocket.send_json({"type": "error", "detail": natal_chart_data["calculation_error"]})
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
 
-    return TransitChartResponse(**transit_data)
+    slot = LatestRequestSlot(coalesce_seconds=settings.TRANSIT_STREAM_COALESCE_MS / 1000)
+    encoder = TransitFrameEncoder()
+    send_lock = asyncio.Lock()
+
+    async def receive_requests():
+        try:
+            while True:
+                # A malformed message is answered like an invalid one, without ending the stream
+                text = await websocket.receive_text()
+                try:
+                    slot.put(TransitStreamRequest.model_validate(json.loads(text)))
+                except json.JSONDecodeError as je:
+                    async with send_lock:
+                        await websocket.send_json({"type": "error", "detail": f"Invalid JSON: {je}"})
+                except ValidationError as ve:
+                    async with send_lock:
+                        await websocket.send_json({"type": "error", "detail": jsonable_encoder(ve.errors(include_url=False))})
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f"Transit stream receive error for chart {chart_id}: {e}", exc_info=True)
+        finally:
+            slot.close()
+
+    receiver = asyncio.create_task(receive_requests())
+    client = client_key(websocket)
+    frames_sent = 0
+    try:
+        while True:
+            request = await slot.get()
+            if request is None:
+                break
+            if request.resync:
+                encoder.reset()
+
+            # Each frame is admitted like a small request; a rejected position is
+            # reported and the client simply sends the next one
+            try:
+                async with admission_controller.admit(client, COST_LIGHT):
+                    transit_data = await run_in_threadpool(
+                        calculate_transits,
+                        natal_chart_data,
+                        request.transit_datetime,
+                        lat,
+                        lon,
+                        city
+                    )
+            except AdmissionRejected as e:
+                async with send_lock:
+                    await websocket.send_json({
+                        "type": "error", "request_id": request.request_id,
+                        "detail": e.reason, "retry_after": e.retry_after,
+                    })
+                continue
+            if "error" in transit_data:
+                async with send_lock:
+                    await websocket.send_json({"type": "error", "request_id": request.request_id, "detail": transit_data["error"]})
+                continue
+
+            frame = encoder.encode(transit_data, request_id=request.request_id)
+            async with send_lock:
+                await websocket.send_json(jsonable_encoder(frame))
+            frames_sent += 1
+    except WebSocketDisconnect:
+        pass
+    finally:
+        receiver.cancel()
+        logger.info(f"Transit stream for chart {chart_id} closed: {frames_sent} frames sent, {slot.superseded} positions superseded")
 
 # @router.put("/{chart_id}", response_model=ChartDisplay)
 # async def update_chart_endpoint(...):
@@ -0,0 +1,113 @@
+# /app/api/v1/endpoints/ephemeris.py
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from app.api.deps import current_active_user
+from app.core.admission import COST_HEAVY, admission
+from app.core.columnar import columnar_response, encode_series, negotiate_media_type
+from app.core.config import settings
+from app.core.http_cache import IMMUTABLE, PAST_INSTANT, REVALIDATE, is_past_instant, make_etag, not_modified, set_cache_headers
+from app.models.user import User
+from app.services.ephemeris import EphemerisError, count_instants, ephemeris_series
+from app.services.executor import run_calculation
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Ranges reaching into the future are recomputed at most daily by shared caches
+FUTURE_RANGE_CACHE_CONTROL = "public, max-age=86400"
+
+
+def parse_series_range(start: str, end: str, step_minutes: int, bodies: Optional[str]):
+    """Validates series query parameters. Naive datetimes are taken as UTC."""
+    try:
+        start_dt = datetime.fromisoformat(start)
+        end_dt = datetime.fromisoformat(end)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid start/end datetime: {e}")
+    start_dt = start_dt.replace(tzinfo=timezone.utc) if start_dt.tzinfo is None else start_dt.astimezone(timezone.utc)
+    end_dt = end_dt.replace(tzinfo=timezone.utc) if end_dt.tzinfo is None else end_dt.astimezone(timezone.utc)
+    if end_dt < start_dt:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    step = timedelta(minutes=step_minutes)
+    samples = count_instants(start_dt, end_dt, step)
+    if samples > settings.EPHEMERIS_SERIES_MAX_SAMPLES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Range has {samples} samples; the limit is {settings.EPHEMERIS_SERIES_MAX_SAMPLES}. Use a larger step.",
+        )
+    body_list: Optional[List[str]] = [b.strip() for b in bodies.split(",") if b.strip()] if bodies else None
+    return start_dt, end_dt, step, body_list
+
+
+async def series_response(
+    request: Request,
+    start: str,
+    end: str,
+    step_minutes: int,
+    bodies: Optional[str],
+    etag_parts: tuple = (),
+    metadata: Optional[Dict[str, Any]] = None,
+    private: bool = False,
+) -> Response:
+    """
+    Computes an ephemeris series and encodes it for the negotiated media type.
+    The representation (and therefore the ETag) depends on the Accept header.
+    `private` marks per-user responses (chart data in the metadata).
+    """
+    media_type = negotiate_media_type(request.headers.get("accept"))
+    start_dt, end_dt, step, body_list = parse_series_range(start, end, step_minutes, bodies)
+
+    if private:
+        cache_control = PAST_INSTANT if is_past_instant(end_dt) else REVALIDATE
+    else:
+        cache_control = IMMUTABLE if is_past_instant(end_dt) else FUTURE_RANGE_CACHE_CONTROL
+    etag = make_etag(
+        "ephemeris-series", media_type, start_dt.isoformat(), end_dt.isoformat(), step_minutes,
+        ",".join(body_list or []), *etag_parts,
+    )
+    cached = not_modified(request, etag, cache_control=cache_control)
+    if cached is not None:
+        cached.headers["Vary"] = "Accept"
+        return cached
+
+    try:
+        series = await run_calculation(ephemeris_series, start_dt, end_dt, step, body_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except EphemerisError as e:
+        logger.error(f"Ephemeris series {start_dt.isoformat()}..{end_dt.isoformat()} failed: {e}")
+        raise HTTPException(status_code=500, detail=f"Ephemeris calculation failed: {e}")
+
+    metadata = {
+        "start": start_dt.isoformat(),
+        "end": end_dt.isoformat(),
+        "step_seconds": int(step.total_seconds()),
+        **(metadata or {}),
+    }
+    body = await run_calculation(encode_series, series, media_type, metadata)
+    response = columnar_response(body, media_type)
+    set_cache_headers(response, etag, cache_control=cache_control)
+    return response
+
+
+@router.get("/series", dependencies=[admission(COST_HEAVY)])
+async def get_ephemeris_series(
+    request: Request,
+    start: str = Query(..., description="Range start in ISO format (UTC if no offset), e.g. 2025-01-01T00:00:00"),
+    end: str = Query(..., description="Range end (inclusive) in ISO format"),
+    step_minutes: int = Query(60, ge=1, le=60 * 24 * 30, description="Sampling interval in minutes"),
+    bodies: Optional[str] = Query(None, description="Comma-separated bodies, e.g. Sun,Moon,Mars (default: all)"),
+    current_user: User = Depends(current_active_user),
+):
+    """
+    Geocentric longitudes and speeds for a time range, as columns.
+    JSON by default; send `Accept: application/x-msgpack` or
+    `Accept: application/vnd.apache.arrow.stream` for typed binary arrays.
+    """
+    return await series_response(request, start, end, step_minutes, bodies)
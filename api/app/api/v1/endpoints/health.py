@@ -1,8 +1,28 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core.admission import admission_controller
+from app.core.single_flight import calculation_flights
+from app.services.warmup import warmup_state
 
 router = APIRouter()
 
 @router.get("/health")
 async def read_health():
     """Check the health of the API."""
-    return {"status": "OK"} 
\ No newline at end of file
+    return {"status": "OK"}
+
+
+@router.get("/health/ready")
+async def read_readiness():
+    """Readiness for load balancers: 200 once the worker's warm-up has finished, 503 before."""
+    report = warmup_state.report()
+    if not warmup_state.ready:
+        return JSONResponse(status_code=503, content=report)
+    return report
+
+
+@router.get("/health/admission")
+async def read_admission_stats():
+    """Admission control queue and rejection counters for the calculation endpoints."""
+    return {**admission_controller.stats(), "coalescing": calculation_flights.stats()}
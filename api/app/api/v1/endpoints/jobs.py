@@ -0,0 +1,101 @@
+# /app/api/v1/endpoints/jobs.py
+import logging
+from typing import List
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import current_active_user
+from app.core.config import settings
+from app.db.session import get_async_session
+from app.models.job import Job
+from app.models.user import User
+from app.schemas.job import JobCreate, JobRead, JobResult
+from app.services import job_handlers  # noqa: F401  (registers the handlers)
+from app.services import job_queue
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+async def _get_own_job(job_id: UUID, user: User, db: AsyncSession) -> Job:
+    job = await job_queue.get_job(db, job_id, user_id=user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/kinds", response_model=List[str])
+async def list_job_kinds(user: User = Depends(current_active_user)):
+    """Job kinds that can be submitted through POST /jobs."""
+    return job_queue.registered_kinds(public_only=True)
+
+
+@router.post("", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(
+    request: JobCreate,
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Queues a job; poll GET /jobs/{id} for progress and fetch GET /jobs/{id}/result when it has succeeded."""
+    handler = job_queue.get_handler(request.kind)
+    if handler is None or not handler.public:
+        raise HTTPException(status_code=400, detail=f"Unknown job kind '{request.kind}'. Known: {job_queue.registered_kinds(public_only=True)}")
+    if await job_queue.count_pending(db, user.id) >= settings.JOB_MAX_PENDING_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"At most {settings.JOB_MAX_PENDING_PER_USER} queued or running jobs per user.",
+        )
+    # Only superusers may jump the queue; everyone else can at most lower their own jobs
+    priority = request.priority if user.is_superuser else min(request.priority, 0)
+    return await job_queue.enqueue(db, request.kind, request.payload, user_id=user.id, priority=priority)
+
+
+@router.get("", response_model=List[JobRead])
+async def list_my_jobs(
+    limit: int = Query(50, ge=1, le=200),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """The current user's most recent jobs."""
+    return await job_queue.list_jobs(db, user.id, limit=limit)
+
+
+@router.get("/{job_id}", response_model=JobRead)
+async def read_job_status(
+    job_id: UUID = Path(...),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    return await _get_own_job(job_id, user, db)
+
+
+@router.get("/{job_id}/result", response_model=JobResult)
+async def read_job_result(
+    job_id: UUID = Path(...),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """The job's result; 409 until it has succeeded."""
+    job = await _get_own_job(job_id, user, db)
+    if job.status != job_queue.SUCCEEDED:
+        detail = f"Job is {job.status}"
+        if job.status == job_queue.FAILED and job.error:
+            detail += f": {job.error}"
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+    return JobResult(id=job.id, kind=job.kind, status=job.status, result=job.result or {})
+
+
+@router.post("/{job_id}/cancel", response_model=JobRead)
+async def cancel_job(
+    job_id: UUID = Path(...),
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """Cancels a queued or running job (a running job stops at its next heartbeat or progress report)."""
+    job = await _get_own_job(job_id, user, db)
+    if not await job_queue.cancel(db, job):
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job already {job.status}")
+    return job
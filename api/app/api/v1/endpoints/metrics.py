@@ -0,0 +1,16 @@
+# /app/api/v1/endpoints/metrics.py
+from fastapi import APIRouter
+from fastapi.concurrency import run_in_threadpool
+from starlette.responses import Response
+
+from app.core.metrics import CONTENT_TYPE, read_snapshots, render
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Prometheus scrape target: metrics of every live worker, merged."""
+    # Reads the other workers' snapshot files; keep that off the event loop
+    snapshots = await run_in_threadpool(read_snapshots)
+    return Response(content=render(snapshots), media_type=CONTENT_TYPE)
@@ -0,0 +1,63 @@
+# /app/api/v1/endpoints/reports.py
+import asyncio
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Path, Request, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.deps import current_active_user
+from app.core.config import settings
+from app.core.http_cache import PRIVATE_IMMUTABLE, not_modified, set_cache_headers
+from app.db.session import get_async_session
+from app.models.user import User
+from app.schemas.job import JobRead
+from app.schemas.report import ReportCreate
+from app.services import job_handlers  # noqa: F401  (registers the handlers)
+from app.services import job_queue, reports
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.post("", response_model=JobRead, status_code=status.HTTP_202_ACCEPTED)
+async def request_reports(
+    request: ReportCreate,
+    user: User = Depends(current_active_user),
+    db: AsyncSession = Depends(get_async_session),
+):
+    """
+    Queues a `chart_report` job building a PDF report for each chart. Follow it
+    with GET /jobs/{id}; its result lists the report URLs.
+    """
+    if not reports.reportlab_available():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="PDF reports are not available on this server.")
+    if len(request.chart_ids) > settings.REPORT_BATCH_MAX_CHARTS:
+        raise HTTPException(status_code=400, detail=f"At most {settings.REPORT_BATCH_MAX_CHARTS} charts per request.")
+    if await job_queue.count_pending(db, user.id) >= settings.JOB_MAX_PENDING_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"At most {settings.JOB_MAX_PENDING_PER_USER} queued or running jobs per user.",
+        )
+    payload = {"chart_ids": [str(chart_id) for chart_id in request.chart_ids], "notify": request.notify}
+    return await job_queue.enqueue(db, "chart_report", payload, user_id=user.id)
+
+
+@router.get("/{report_id}.pdf")
+async def download_report(
+    request: Request,
+    report_id: str = Path(..., description="Report id from the chart_report job result"),
+    user: User = Depends(current_active_user),
+):
+    """Streams a stored report. Report ids are content hashes, so a report never changes."""
+    path = reports.report_path(user.id, report_id)
+    if path is None or not await asyncio.to_thread(path.is_file):
+        raise HTTPException(status_code=404, detail="Report not found")
+    etag = f'"{report_id}"'
+    cached_response = not_modified(request, etag, cache_control=PRIVATE_IMMUTABLE)
+    if cached_response is not None:
+        return cached_response
+    response = FileResponse(path, media_type=reports.REPORT_MEDIA_TYPE, filename=f"chart-report-{report_id[:12]}.pdf")
+    set_cache_headers(response, etag, cache_control=PRIVATE_IMMUTABLE)
+    return response
@@ -0,0 +1,276 @@
+# /app/core/admission.py
+"""
+Admission control for calculation endpoints.
+
+Every calculation request holds `cost` units of capacity while it runs: at
+most ADMISSION_GLOBAL_CAPACITY units in total and ADMISSION_USER_CAPACITY
+per client. Requests that do not fit wait in a short queue that is served
+round-robin across clients, so one client's burst cannot push everybody
+else's requests to the back. A full queue, or a wait longer than
+ADMISSION_QUEUE_TIMEOUT_SECONDS, is answered with 429 and a Retry-After
+estimate; bounding the wait is what keeps tail latency bounded under load.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, defaultdict, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict
+
+import jwt
+from fastapi import Depends, HTTPException, status
+from fastapi_users.jwt import decode_jwt
+from starlette.requests import HTTPConnection
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Relative cost of each endpoint type, in capacity units
+COST_LIGHT = 1        # cached reads, one streamed transit frame
+COST_CHART = 2        # one subject build (natal, transits)
+COST_PAIR = 3         # two subject builds (synastry, composite)
+COST_HEAVY = 5        # group synastry, compatibility ranking, long series
+
+AUTH_COOKIE_NAME = "fastapiusersauth"
+# Audience of the access tokens issued by fastapi-users' JWTStrategy (app/core/security.py)
+AUTH_TOKEN_AUDIENCE = ["fastapi-users:auth"]
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class AdmissionTicket:
+    client: str
+    cost: int
+    started: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Waiter:
+    client: str
+    cost: int
+    future: asyncio.Future
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        global_capacity: int,
+        user_capacity: int,
+        max_queue: int,
+        max_queue_per_user: int,
+        queue_timeout: float,
+        enabled: bool = True,
+    ):
+        self.enabled = enabled
+        self.global_capacity = global_capacity
+        self.user_capacity = user_capacity
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.queue_timeout = queue_timeout
+
+        self._in_flight = 0
+        self._in_flight_by_client: Dict[str, int] = defaultdict(int)
+        # Per-client FIFO queues; iteration order is the round-robin order
+        self._queues: "OrderedDict[str, deque[_Waiter]]" = OrderedDict()
+        self._queued = 0
+        # Smoothed time a ticket is held, for Retry-After
+        self._hold_seconds = 0.05
+
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _clamp(self, cost: int) -> int:
+        # A request costlier than a whole quota could never be admitted
+        return max(1, min(cost, self.user_capacity, self.global_capacity))
+
+    def _fits(self, client: str, cost: int) -> bool:
+        return (
+            self._in_flight + cost <= self.global_capacity
+            and self._in_flight_by_client.get(client, 0) + cost <= self.user_capacity
+        )
+
+    def _grant(self, client: str, cost: int) -> AdmissionTicket:
+        self._in_flight += cost
+        self._in_flight_by_client[client] += cost
+        self.admitted += 1
+        return AdmissionTicket(client=client, cost=cost)
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog has probably drained."""
+        backlog = self._queued + 1
+        estimate = self._hold_seconds * backlog / max(1, self.global_capacity)
+        return max(1, min(30, math.ceil(estimate)))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        self.rejected += 1
+        return AdmissionRejected(reason, self.retry_after())
+
+    async def acquire(self, client: str, cost: int) -> AdmissionTicket:
+        """Admits a request or raises AdmissionRejected. Must be paired with release()."""
+        if not self.enabled:
+            return AdmissionTicket(client=client, cost=0)
+        cost = self._clamp(cost)
+        if not self._queued and self._fits(client, cost):
+            return self._grant(client, cost)
+
+        queue = self._queues.get(client)
+        if self._queued >= self.max_queue:
+            raise self._reject("Server is busy")
+        if queue is not None and len(queue) >= self.max_queue_per_user:
+            raise self._reject("Too many concurrent requests")
+
+        waiter = _Waiter(client=client, cost=cost, future=asyncio.get_running_loop().create_future())
+        self._queues.setdefault(client, deque()).append(waiter)
+        self._queued += 1
+        self.queued_total += 1
+        self._dispatch()
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            if self._abandon(waiter):
+                self.timed_out += 1
+                raise self._reject("Timed out waiting for capacity")
+            return waiter.future.result()
+        except asyncio.CancelledError:
+            if not self._abandon(waiter):
+                # Granted while being cancelled; hand the capacity back
+                self.release(waiter.future.result())
+            raise
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Removes a waiter that gave up. Returns False if it was granted meanwhile."""
+        if waiter.future.done():
+            return False
+        waiter.future.cancel()
+        queue = self._queues.get(waiter.client)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            if not queue:
+                del self._queues[waiter.client]
+        return True
+
+    def _dispatch(self) -> None:
+        """
+        Grants queued requests round-robin across clients. A client blocked by
+        its own quota is skipped; a head blocked by global capacity stops the
+        pass so that large requests are not starved by small ones.
+        """
+        progress = True
+        while progress and self._queued:
+            progress = False
+            for client in list(self._queues):
+                queue = self._queues[client]
+                head = queue[0]
+                if self._in_flight + head.cost > self.global_capacity:
+                    return
+                if not self._fits(client, head.cost):
+                    continue
+                queue.popleft()
+                self._queued -= 1
+                if queue:
+                    self._queues.move_to_end(client)
+                else:
+                    del self._queues[client]
+                head.future.set_result(self._grant(client, head.cost))
+                progress = True
+
+    def release(self, ticket: AdmissionTicket) -> None:
+        if not ticket.cost:
+            return
+        self._in_flight -= ticket.cost
+        self._in_flight_by_client[ticket.client] -= ticket.cost
+        if self._in_flight_by_client[ticket.client] <= 0:
+            del self._in_flight_by_client[ticket.client]
+        held = time.monotonic() - ticket.started
+        self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * held
+        self._dispatch()
+
+    @asynccontextmanager
+    async def admit(self, client: str, cost: int) -> AsyncIterator[AdmissionTicket]:
+        ticket = await self.acquire(client, cost)
+        try:
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "global_capacity": self.global_capacity,
+            "user_capacity": self.user_capacity,
+            "in_flight": self._in_flight,
+            "active_clients": len(self._in_flight_by_client),
+            "queued": self._queued,
+            "queued_clients": len(self._queues),
+            "admitted_total": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected_total": self.rejected,
+            "timed_out_total": self.timed_out,
+            "mean_hold_ms": round(self._hold_seconds * 1000, 1),
+        }
+
+
+def client_key(connection: HTTPConnection) -> str:
+    """
+    Identifies the client for quotas without a database lookup: the user id
+    from a valid access token (bearer header or auth cookie), else the client
+    address. Tokens are verified (signature, audience, expiry), so sending
+    made-up tokens does not buy a fresh quota per request.
+    """
+    token = None
+    authorization = connection.headers.get("authorization", "")
+    if authorization.lower().startswith("bearer "):
+        token = authorization[7:].strip()
+    if not token:
+        token = connection.cookies.get(AUTH_COOKIE_NAME)
+    if token:
+        try:
+            user_id = decode_jwt(token, settings.SECRET_KEY.get_secret_value(), AUTH_TOKEN_AUDIENCE).get("sub")
+        except jwt.PyJWTError:
+            user_id = None
+        if user_id:
+            return f"user:{user_id}"
+    host = connection.client.host if connection.client else "unknown"
+    return f"ip:{host}"
+
+
+admission_controller = AdmissionController(
+    global_capacity=settings.ADMISSION_GLOBAL_CAPACITY,
+    user_capacity=settings.ADMISSION_USER_CAPACITY,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    max_queue_per_user=settings.ADMISSION_MAX_QUEUE_PER_USER,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    enabled=settings.ADMISSION_ENABLED,
+)
+
+
+def admission(cost: int):
+    """Route dependency: `dependencies=[admission(COST_PAIR)]`. Holds capacity until the endpoint returns."""
+    async def dependency(connection: HTTPConnection):
+        try:
+            ticket = await admission_controller.acquire(client_key(connection), cost)
+        except AdmissionRejected as e:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=e.reason,
+                headers={"Retry-After": str(e.retry_after)},
+            )
+        try:
+            yield
+        finally:
+            admission_controller.release(ticket)
+
+    return Depends(dependency)
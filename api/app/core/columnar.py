@@ -0,0 +1,183 @@
+# /app/core/columnar.py
+"""
+Content negotiation for columnar series responses.
+
+A series is a dict of numpy arrays (see app/services/ephemeris.py). JSON is
+the default; clients that send a matching Accept header get MessagePack
+(typed arrays as raw little-endian buffers) or an Arrow IPC stream, when the
+optional library is installed.
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+
+from app.core.timing import phase
+
+logger = logging.getLogger(__name__)
+
+_msgpack: Any = None
+_pyarrow: Any = None
+
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/x-msgpack"
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+# Accept values we understand -> canonical media type
+_MEDIA_ALIASES = {
+    "application/json": JSON_MEDIA_TYPE,
+    "application/x-msgpack": MSGPACK_MEDIA_TYPE,
+    "application/msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.msgpack": MSGPACK_MEDIA_TYPE,
+    "application/vnd.apache.arrow.stream": ARROW_MEDIA_TYPE,
+}
+
+COLUMNAR_FORMAT = "columnar-v1"
+
+
+def msgpack_available() -> bool:
+    """Whether msgpack can be imported; loaded on first use."""
+    global _msgpack
+    if _msgpack is None:
+        try:
+            import msgpack
+            _msgpack = msgpack
+        except ImportError:
+            logger.info("msgpack is not available; MessagePack series responses are disabled.")
+            _msgpack = False
+    return bool(_msgpack)
+
+
+def arrow_available() -> bool:
+    """Whether pyarrow can be imported; loaded on first use."""
+    global _pyarrow
+    if _pyarrow is None:
+        try:
+            import pyarrow
+            import pyarrow.ipc # noqa: F401
+            _pyarrow = pyarrow
+        except ImportError:
+            logger.info("pyarrow is not available; Arrow series responses are disabled.")
+            _pyarrow = False
+    return bool(_pyarrow)
+
+
+def available_media_types() -> List[str]:
+    media_types = [JSON_MEDIA_TYPE]
+    if msgpack_available():
+        media_types.append(MSGPACK_MEDIA_TYPE)
+    if arrow_available():
+        media_types.append(ARROW_MEDIA_TYPE)
+    return media_types
+
+
+def _parse_accept(accept: str) -> List[Tuple[str, float]]:
+    entries = []
+    for position, item in enumerate(accept.split(",")):
+        parts = [part.strip() for part in item.split(";")]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        entries.append((parts[0].lower(), quality, position))
+    # Highest q first; ties keep the client's order
+    entries.sort(key=lambda entry: (-entry[1], entry[2]))
+    return [(media_type, quality) for media_type, quality, _ in entries]
+
+
+def negotiate_media_type(accept: Optional[str]) -> str:
+    """
+    Picks the response encoding for an Accept header. Falls back to JSON for
+    wildcards or no header; raises 406 if only unavailable encodings are acceptable.
+    """
+    if not accept:
+        return JSON_MEDIA_TYPE
+    available = available_media_types()
+    for media_type, quality in _parse_accept(accept):
+        if quality <= 0:
+            continue
+        if media_type in ("*/*", "application/*"):
+            return JSON_MEDIA_TYPE
+        canonical = _MEDIA_ALIASES.get(media_type)
+        if canonical in available:
+            return canonical
+    raise HTTPException(status_code=406, detail=f"Supported response types: {', '.join(available)}")
+
+
+def _encode_json(series: Dict[str, Any], metadata: Dict[str, Any]) -> bytes:
+    # Still columnar: one array per body rather than one dict per instant
+    payload = {
+        "format": COLUMNAR_FORMAT,
+        **metadata,
+        "bodies": series["bodies"],
+        "body_ids": series["body_ids"].tolist(),
+        "instants": series["instants"].tolist(),
+        "longitudes": series["longitudes"].T.tolist(),
+        "speeds": series["speeds"].T.tolist(),
+    }
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8")
+
+
+def _encode_msgpack(series: Dict[str, Any], metadata: Dict[str, Any]) -> bytes:
+    if not msgpack_available():
+        raise RuntimeError("msgpack is not available.")
+    import numpy as np
+    # Arrays are body-major (B, N) so each body's column is one contiguous slice
+    payload = {
+        "format": COLUMNAR_FORMAT,
+        **metadata,
+        "bodies": series["bodies"],
+        "body_ids": np.ascontiguousarray(series["body_ids"], dtype="<i2").tobytes(),
+        "instants": np.ascontiguousarray(series["instants"], dtype="<i8").tobytes(),
+        "longitudes": np.ascontiguousarray(series["longitudes"].T, dtype="<f8").tobytes(),
+        "speeds": np.ascontiguousarray(series["speeds"].T, dtype="<f8").tobytes(),
+        "dtypes": {"body_ids": "<i2", "instants": "<i8", "longitudes": "<f8", "speeds": "<f8"},
+        "shape": [len(series["bodies"]), len(series["instants"])],
+    }
+    return _msgpack.packb(payload, use_bin_type=True)
+
+
+def _encode_arrow(series: Dict[str, Any], metadata: Dict[str, Any]) -> bytes:
+    if not arrow_available():
+        raise RuntimeError("pyarrow is not available.")
+    pa = _pyarrow
+    columns = {"instant": pa.array(series["instants"], type=pa.timestamp("s", tz="UTC"))}
+    for col, body in enumerate(series["bodies"]):
+        columns[f"{body}_longitude"] = pa.array(series["longitudes"][:, col])
+        columns[f"{body}_speed"] = pa.array(series["speeds"][:, col])
+    schema_metadata = {
+        "format": COLUMNAR_FORMAT,
+        "body_ids": json.dumps(dict(zip(series["bodies"], series["body_ids"].tolist()))),
+        **{key: json.dumps(value) for key, value in metadata.items()},
+    }
+    table = pa.table(columns).replace_schema_metadata(schema_metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+_ENCODERS = {
+    JSON_MEDIA_TYPE: _encode_json,
+    MSGPACK_MEDIA_TYPE: _encode_msgpack,
+    ARROW_MEDIA_TYPE: _encode_arrow,
+}
+
+
+def encode_series(series: Dict[str, Any], media_type: str, metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """Serializes a series for the negotiated media type. Synchronous and CPU-bound."""
+    with phase("encode"):
+        return _ENCODERS[media_type](series, metadata or {})
+
+
+def columnar_response(body: bytes, media_type: str) -> Response:
+    response = Response(content=body, media_type=media_type)
+    # The same URL has several representations
+    response.headers["Vary"] = "Accept"
+    return response
@@ -67,6 +67,134 @@ class Settings(BaseSettings):
     # Kerykeion settings
     KERYKEION_API_KEY: str | None = None
 
+    # --- Geocoding (Nominatim) ---
+    # Point these at another Nominatim-compatible server, e.g. the load test's stub geocoder
+    NOMINATIM_DOMAIN: str = Field(default="nominatim.openstreetmap.org")
+    NOMINATIM_SCHEME: str = Field(default="https")
+
+    # --- Transit Streaming (WebSocket slider) ---
+    # Slider positions arriving within this window are coalesced into one frame
+    TRANSIT_STREAM_COALESCE_MS: int = Field(default=40)
+
+    # --- Calculation Pool ---
+    # Threads for Kerykeion/swisseph work (see app/services/executor.py)
+    CALCULATION_POOL_WORKERS: int = Field(default=4)
+
+    # --- Group Synastry ---
+    GROUP_SYNASTRY_MAX_CHARTS: int = Field(default=30)
+
+    # --- Compatibility Ranking ---
+    # Populations at least this large go through the key-point prefilter by default
+    COMPATIBILITY_PREFILTER_THRESHOLD: int = Field(default=20000)
+    # How long the opt-in population matrix is reused before being reloaded
+    COMPATIBILITY_POPULATION_TTL_SECONDS: int = Field(default=300)
+    COMPATIBILITY_USER_SCOPE_LIMIT: int = Field(default=1000)
+
+    # --- Pair Result Cache (synastry/composite) ---
+    PAIR_CACHE_MAX_ENTRIES: int = Field(default=5000)
+    # Also keep results in the pair_result table so they survive restarts
+    PAIR_CACHE_PERSISTENT: bool = Field(default=False)
+
+    # --- Admission Control (calculation endpoints) ---
+    ADMISSION_ENABLED: bool = Field(default=True)
+    # Capacity in cost units (a natal chart costs 2, a synastry 3; see app/core/admission.py)
+    ADMISSION_GLOBAL_CAPACITY: int = Field(default=16)
+    ADMISSION_USER_CAPACITY: int = Field(default=6)
+    ADMISSION_MAX_QUEUE: int = Field(default=64)
+    ADMISSION_MAX_QUEUE_PER_USER: int = Field(default=8)
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = Field(default=2.0)
+
+    # --- Phase Timing (Server-Timing header + per-phase histograms) ---
+    # When disabled the middleware is not installed and phase timers are no-ops
+    PHASE_TIMING_ENABLED: bool = Field(default=True)
+    # Phase durations reveal internals; turn the header off to keep only the histograms
+    SERVER_TIMING_HEADER: bool = Field(default=True)
+
+    # --- On-demand Profiling (app/core/profiling.py, /api/v1/admin) ---
+    # A request carrying a valid admin-issued token in PROFILE_HEADER runs under
+    # the sampling profiler; every other request only pays the header lookup
+    PROFILING_ENABLED: bool = Field(default=True)
+    PROFILE_HEADER: str = Field(default="X-Profile-Token")
+    PROFILE_TOKEN_TTL_SECONDS: int = Field(default=3600)
+    PROFILE_SAMPLE_INTERVAL_MS: float = Field(default=2.0)
+    # Sampling stops after this long; the rest of the request still completes
+    PROFILE_MAX_SECONDS: float = Field(default=60.0)
+    # Shared by the workers of a host; the oldest profiles are deleted beyond PROFILE_MAX_STORED
+    PROFILE_STORAGE_DIR: str = Field(default="/tmp/astro-profiles")
+    PROFILE_MAX_STORED: int = Field(default=200)
+
+    # --- Memory Accounting (app/core/memory.py, /api/v1/admin/memory) ---
+    # Opt-in: tracemalloc slows allocation-heavy code (subject builds) noticeably
+    MEMORY_TRACKING_ENABLED: bool = Field(default=False)
+    # Stack depth kept per allocation; deeper is more informative and more expensive
+    MEMORY_TRACEMALLOC_FRAMES: int = Field(default=10)
+    MEMORY_SNAPSHOT_SECONDS: float = Field(default=300.0)
+    # Requests whose traced peak exceeds this are logged with their per-phase breakdown
+    MEMORY_LOG_PEAK_MB: float = Field(default=50.0)
+    # Traced memory growing more than this beyond the baseline snapshot is logged as a warning
+    MEMORY_GROWTH_WARN_MB: float = Field(default=100.0)
+
+    # --- Event-loop Watchdog (app/core/loop_watchdog.py, /api/v1/admin/event-loop) ---
+    # Cheap enough to leave on: one timer wakeup per interval, stacks are only walked during a stall
+    LOOP_WATCHDOG_ENABLED: bool = Field(default=True)
+    LOOP_WATCHDOG_INTERVAL_MS: float = Field(default=100.0)
+    # A heartbeat this much overdue is a stall: the loop thread's stack is captured and logged
+    LOOP_STALL_THRESHOLD_MS: float = Field(default=100.0)
+    LOOP_STALL_STACK_DEPTH: int = Field(default=40)
+    # Finished stalls kept per worker for the admin endpoint
+    LOOP_STALL_HISTORY: int = Field(default=50)
+
+    # --- Metrics (/metrics, Prometheus text format) ---
+    METRICS_ENABLED: bool = Field(default=True)
+    # Shared directory for per-worker snapshots when running several workers;
+    # unset means /metrics reports only the worker that serves it
+    METRICS_MULTIPROC_DIR: Optional[str] = Field(default=None)
+    METRICS_FLUSH_SECONDS: float = Field(default=5.0)
+
+    # --- Warm-up and Readiness (see app/services/warmup.py) ---
+    # /health/ready answers 503 until the warm-up has finished
+    WARMUP_ENABLED: bool = Field(default=True)
+    # Reference charts computed concurrently; match CALCULATION_POOL_WORKERS to warm every pool thread
+    WARMUP_REFERENCE_CHARTS: int = Field(default=4)
+    WARMUP_DATABASE: bool = Field(default=True)
+    WARMUP_TIMEOUT_SECONDS: float = Field(default=30.0)
+
+    # --- Preforked Launcher (app/scripts/serve.py) ---
+    SERVE_WORKERS: int = Field(default=2)
+    # Seconds between per-worker RSS/PSS reports in the launcher log; 0 disables
+    SERVE_MEMORY_REPORT_SECONDS: float = Field(default=60.0)
+
+    # --- Background Jobs (app/services/job_queue.py, app/scripts/job_worker.py) ---
+    JOB_WORKER_CONCURRENCY: int = Field(default=4)
+    JOB_POLL_SECONDS: float = Field(default=1.0)
+    # A running job whose worker has not heartbeated for this long is requeued
+    JOB_LEASE_SECONDS: float = Field(default=60.0)
+    JOB_MAX_ATTEMPTS: int = Field(default=3)
+    # Retry backoff: base * 2^(attempt - 1), capped at an hour
+    JOB_RETRY_BASE_SECONDS: float = Field(default=10.0)
+    JOB_PROGRESS_MIN_INTERVAL_SECONDS: float = Field(default=1.0)
+    JOB_SHUTDOWN_GRACE_SECONDS: float = Field(default=30.0)
+    # Queued + running jobs one user may have at once
+    JOB_MAX_PENDING_PER_USER: int = Field(default=10)
+
+    # --- Chart Wheel Images (app/services/chart_render.py) ---
+    # Shared by the workers of a host; images are named by content hash, so it can be wiped at any time
+    WHEEL_CACHE_DIR: str = Field(default="/tmp/astro-wheels")
+    WHEEL_CACHE_MAX_MB: int = Field(default=512)
+    WHEEL_PNG_MAX_WIDTH: int = Field(default=4096)
+
+    # --- PDF Reports (app/services/reports.py, built by the job worker) ---
+    # Must be shared by the API (which serves the files) and the workers (which write them);
+    # docker-compose.yml mounts the astro_files volume on both and points this (and WHEEL_CACHE_DIR) at it
+    REPORT_STORAGE_DIR: str = Field(default="/tmp/astro-reports")
+    REPORT_BATCH_MAX_CHARTS: int = Field(default=100)
+    # Reports one chart_report job builds at once
+    REPORT_BATCH_CONCURRENCY: int = Field(default=4)
+
+    # --- Ephemeris Series ---
+    # Upper bound on instants per series request (a year of hourly samples is ~8800)
+    EPHEMERIS_SERIES_MAX_SAMPLES: int = Field(default=20000)
+
     # Configure Pydantic Settings to load from .env file
     # Case sensitivity matters for environment variables
     model_config = SettingsConfigDict(env_file=".env", extra="ignore", case_sensitive=True)
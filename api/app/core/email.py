@@ -46,4 +46,25 @@ async def send_verification_email(user: User, token: str):
     print(f"Token to use in verification URL: {token}") # For easier testing
     print("-------------------------------")
 
+async def send_reports_ready_email(user: User, job_id: str, report_urls: list, failed: int = 0):
+    reports_url = f"{settings.FRONTEND_URL}/reports?job={job_id}"
+    links = "\n    ".join(report_urls)
+    failures = f"{failed} chart(s) could not be reported on." if failed else ""
+    email_content = f"""
+    Hello {user.email},
+
+    Your {len(report_urls)} chart report(s) are ready:
+    {links}
+    {failures}
+    You can also find them at {reports_url}
+
+    Thanks,
+    The {settings.PROJECT_NAME} Team
+    """
+    print("---- REPORTS READY EMAIL ----")
+    print(f"To: {user.email}")
+    print(f"Subject: Your chart reports are ready - {settings.PROJECT_NAME}")
+    print(f"Body:\n{email_content}")
+    print("-----------------------------")
+
 # In a real application, replace print with actual email sending logic 
\ No newline at end of file
@@ -0,0 +1,98 @@
+# /app/core/http_cache.py
+"""
+HTTP conditional caching helpers (ETag / Last-Modified / 304).
+
+Endpoints compute a validator from cheap inputs (a chart row, the engine
+version, the query) and call `not_modified()` before doing any heavy work.
+"""
+import hashlib
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+from app.services.positions import ENGINE_VERSION
+
+# Private: responses are per-user. Revalidate every time (cheap with a 304).
+REVALIDATE = "private, no-cache"
+# Results for instants in the past cannot change unless the chart does; let the
+# browser reuse them briefly and revalidate afterwards.
+PAST_INSTANT = "private, max-age=3600, must-revalidate"
+# Chart-independent results for past instants never change.
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Content-addressed per-user files (PDF reports)
+PRIVATE_IMMUTABLE = "private, max-age=31536000, immutable"
+
+# Local transit times are naive; anything older than this is past in every timezone
+_PAST_MARGIN = timedelta(days=1)
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the given parts (always including the engine version)."""
+    payload = "|".join(str(part) for part in (ENGINE_VERSION, *parts))
+    return f'"{hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]}"'
+
+
+def chart_etag_parts(chart: Any) -> tuple:
+    """The inputs that determine everything derived from a chart row."""
+    return (
+        chart.id,
+        chart.content_hash or f"{chart.birth_datetime.isoformat()}|{chart.latitude}|{chart.longitude}|{chart.city}",
+        chart.updated_at.isoformat() if chart.updated_at else "",
+    )
+
+
+def is_past_instant(moment: datetime) -> bool:
+    naive_utc_now = datetime.now(timezone.utc).replace(tzinfo=None)
+    return moment.replace(tzinfo=None) < naive_utc_now - _PAST_MARGIN
+
+
+def _http_date(moment: datetime) -> str:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc) # DB timestamps are naive UTC
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: ignore W/ prefixes
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in candidates
+
+
+def set_cache_headers(
+    response: Response, etag: str, last_modified: Optional[datetime] = None, cache_control: str = REVALIDATE
+) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    if last_modified is not None:
+        response.headers["Last-Modified"] = _http_date(last_modified)
+
+
+def not_modified(
+    request: Request, etag: str, last_modified: Optional[datetime] = None, cache_control: str = REVALIDATE
+) -> Optional[Response]:
+    """
+    Returns a 304 response if the request's validators match, else None.
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110 13.2.2).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    matched = False
+    if if_none_match is not None:
+        matched = _etag_matches(if_none_match, etag)
+    elif last_modified is not None and request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            modified = last_modified if last_modified.tzinfo else last_modified.replace(tzinfo=timezone.utc)
+            # HTTP dates have one-second resolution
+            matched = modified.replace(microsecond=0) <= since
+        except (TypeError, ValueError):
+            matched = False
+
+    if not matched:
+        return None
+    response = Response(status_code=304)
+    set_cache_headers(response, etag, last_modified, cache_control)
+    return response
@@ -0,0 +1,166 @@
+# /app/core/loop_watchdog.py
+"""
+Event-loop watchdog: measures how late the loop runs its callbacks and names
+the code that blocked it.
+
+Two parts per worker process:
+  - a heartbeat coroutine that sleeps LOOP_WATCHDOG_INTERVAL_MS at a time and
+    records how late it woke up (event_loop_lag_seconds histogram),
+  - a monitor thread that notices when the heartbeat is overdue by more than
+    LOOP_STALL_THRESHOLD_MS and captures the event loop thread's stack with
+    sys._current_frames(), while the blocking call is still on it.
+
+Each stall is logged once with its stack, counted by culprit (the innermost
+frame in our own code, e.g. `app.api.v1.endpoints.charts:create_chart`) in
+event_loop_stalls_total / event_loop_blocked_seconds_total, and kept in a
+short history served by GET /api/v1/admin/event-loop.
+
+asyncio's debug mode reports slow callbacks too, but only after they return,
+without their stack, and at a cost that rules it out in production. Here the
+loop pays one timer wakeup per interval and the monitor thread a float
+comparison; stacks are only walked during a stall. A C extension that holds the
+GIL for the whole stall keeps the monitor from running until it returns, so
+the stack is then captured just after the blocking call.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import loop_blocked_seconds, loop_lag_histogram, loop_stalls
+
+logger = logging.getLogger(__name__)
+
+
+def _is_ours(module: str, qualname: str) -> bool:
+    """Application code, minus the ASGI middleware every request passes through."""
+    return (module == "app" or module.startswith("app.")) and module != __name__ and not qualname.endswith("Middleware.__call__")
+
+
+def blocking_site(frame: Any) -> Tuple[str, List[str]]:
+    """
+    (culprit, formatted stack outermost first) of the frame running on the loop
+    thread. The culprit is the innermost frame of our own code, or the innermost
+    frame when none of it is on the stack: `module:qualified name`.
+    """
+    stack, innermost, culprit = [], None, None
+    while frame is not None and len(stack) < settings.LOOP_STALL_STACK_DEPTH:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        qualname = getattr(code, "co_qualname", code.co_name)
+        name = f"{module}:{qualname}"
+        innermost = innermost or name
+        if culprit is None and _is_ours(module, qualname):
+            culprit = name
+        stack.append(f"{code.co_filename}:{frame.f_lineno} in {qualname}")
+        frame = frame.f_back
+    return culprit or innermost or "unknown", stack[::-1]
+
+
+class LoopWatchdog:
+    """Heartbeat on the event loop plus a monitor thread that captures stalls."""
+
+    def __init__(
+        self,
+        interval_ms: float = settings.LOOP_WATCHDOG_INTERVAL_MS,
+        threshold_ms: float = settings.LOOP_STALL_THRESHOLD_MS,
+        history: int = settings.LOOP_STALL_HISTORY,
+    ):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.stalls: Deque[Dict[str, Any]] = deque(maxlen=history)
+        self._last_beat = time.perf_counter()
+        self._loop_thread: Optional[int] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._monitor: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    # Event loop side
+
+    async def _beat(self) -> None:
+        while True:
+            expected = time.perf_counter() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.perf_counter()
+            self._last_beat = now
+            loop_lag_histogram.observe("event_loop", "", max(0.0, now - expected) * 1000)
+
+    def start(self) -> None:
+        """Starts the heartbeat on the running loop and the monitor thread."""
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        self._heartbeat = asyncio.get_running_loop().create_task(self._beat())
+        self._monitor = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._monitor.start()
+        logger.info(
+            f"Event-loop watchdog on: heartbeat every {self.interval * 1000:.0f} ms, "
+            f"stalls over {self.threshold * 1000:.0f} ms are captured."
+        )
+
+    def stop(self) -> None:
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+        self._stop.set()
+        if self._monitor is not None:
+            self._monitor.join()
+            self._monitor = None
+
+    # Monitor thread side
+
+    def _watch(self) -> None:
+        # The heartbeat is due every interval; anything later than that plus the threshold is a stall
+        limit = self.interval + self.threshold
+        poll = min(self.interval, self.threshold) / 2
+        stall: Optional[Dict[str, Any]] = None
+        beat_at_capture = 0.0
+        while not self._stop.wait(poll):
+            last_beat = self._last_beat
+            if stall is not None:
+                if last_beat != beat_at_capture:
+                    self._finish(stall, last_beat - beat_at_capture - self.interval)
+                    stall = None
+                continue
+            if time.perf_counter() - last_beat > limit:
+                stall = self._capture(last_beat)
+                beat_at_capture = last_beat
+
+    def _capture(self, last_beat: float) -> Optional[Dict[str, Any]]:
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return None
+        culprit, stack = blocking_site(frame)
+        del frame
+        blocked_ms = (time.perf_counter() - last_beat - self.interval) * 1000
+        logger.warning(
+            f"Event loop blocked for {blocked_ms:.0f} ms so far in worker {os.getpid()} by {culprit}:\n  "
+            + "\n  ".join(stack)
+        )
+        return {"culprit": culprit, "started_at": time.time() - blocked_ms / 1000, "stack": stack}
+
+    def _finish(self, stall: Dict[str, Any], blocked: float) -> None:
+        stall["blocked_ms"] = round(max(0.0, blocked) * 1000, 1)
+        loop_stalls.inc(stall["culprit"])
+        loop_blocked_seconds.inc(stall["culprit"], amount=max(0.0, blocked))
+        with self._lock:
+            self.stalls.append(stall)
+        logger.info(f"Event loop stall by {stall['culprit']} lasted {stall['blocked_ms']:.0f} ms.")
+
+    def recent_stalls(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """The newest finished stalls first."""
+        with self._lock:
+            return list(reversed(self.stalls))[:limit]
+
+    @property
+    def running(self) -> bool:
+        return self._monitor is not None
+
+
+loop_watchdog = LoopWatchdog()
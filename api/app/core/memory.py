@@ -0,0 +1,244 @@
+# /app/core/memory.py
+"""
+Opt-in memory accounting with tracemalloc (MEMORY_TRACKING_ENABLED).
+
+Per request and per phase (see app/core/timing.py) it records:
+  - retained: traced memory at the end minus at the start; what a leak or a
+    growing cache leaves behind,
+  - peak: the highest traced memory during the scope above its start; what
+    decides OOM kills.
+Both feed per-route histograms on /metrics, and requests peaking above
+MEMORY_LOG_PEAK_MB are logged with their phase breakdown. tracemalloc is
+process-wide, so under concurrent load a scope's numbers include what other
+requests allocated at the same time; replay one request at a time for exact
+figures.
+
+Every MEMORY_SNAPSHOT_SECONDS a tracemalloc snapshot is taken. The first one is
+the baseline; GET /api/v1/admin/memory/diff compares the latest snapshot with
+the baseline or the previous one and lists the allocation sites that grew the
+most. Snapshots and numbers are per worker process.
+
+With the setting off nothing is traced and phase() pays one extra global lookup.
+"""
+import asyncio
+import linecache
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.timing import PhaseHistograms, PhaseRecorder, current_recorder, recording, set_memory_tracker
+
+logger = logging.getLogger(__name__)
+
+MB = 1048576
+# Upper bounds in MB; the last bucket is +Inf
+MEMORY_BUCKETS_MB: List[float] = [0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000]
+SNAPSHOT_GROUPS = ("lineno", "filename", "traceback")
+
+# Allocations of the tracing machinery and of the import system are noise in leak reports
+_SNAPSHOT_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, linecache.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+class _Scope:
+    __slots__ = ("start", "max_seen")
+
+    def __init__(self, start: int):
+        self.start = start
+        self.max_seen = start
+
+
+class MemoryTracker:
+    """
+    Retained and peak traced memory of overlapping scopes.
+
+    tracemalloc has a single peak counter. Before it is reset for a new scope,
+    the peak so far is folded into every open scope, so each one still sees the
+    highest value reached during its own lifetime.
+    """
+
+    def __init__(self):
+        self._scopes: List[_Scope] = []
+        self._lock = threading.Lock()
+
+    def _fold_peak(self) -> int:
+        current, peak = tracemalloc.get_traced_memory()
+        for scope in self._scopes:
+            if peak > scope.max_seen:
+                scope.max_seen = peak
+        return current
+
+    def begin(self) -> _Scope:
+        with self._lock:
+            self._fold_peak()
+            tracemalloc.reset_peak()
+            scope = _Scope(tracemalloc.get_traced_memory()[0])
+            self._scopes.append(scope)
+            return scope
+
+    def end(self, scope: _Scope) -> Tuple[int, int]:
+        """(retained bytes, peak bytes above the start) of a scope from begin()."""
+        with self._lock:
+            current = self._fold_peak()
+            self._scopes.remove(scope)
+        return current - scope.start, max(0, scope.max_seen - scope.start)
+
+
+memory_tracker = MemoryTracker()
+memory_peak_histograms = PhaseHistograms(buckets=MEMORY_BUCKETS_MB)
+memory_retained_histograms = PhaseHistograms(buckets=MEMORY_BUCKETS_MB)
+
+
+def memory_tracking_enabled() -> bool:
+    return settings.MEMORY_TRACKING_ENABLED and tracemalloc.is_tracing()
+
+
+def start_memory_tracking(frames: int = settings.MEMORY_TRACEMALLOC_FRAMES) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    set_memory_tracker(memory_tracker)
+    logger.info(f"Memory accounting on: tracemalloc with {frames} frames per allocation.")
+
+
+def stop_memory_tracking() -> None:
+    set_memory_tracker(None)
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    snapshots.clear()
+
+
+# --- Snapshots ---
+
+class SnapshotStore:
+    """The baseline, previous and latest tracemalloc snapshots of this process."""
+
+    def __init__(self):
+        self.baseline: Optional[Tuple[float, tracemalloc.Snapshot]] = None
+        self.previous: Optional[Tuple[float, tracemalloc.Snapshot]] = None
+        self.latest: Optional[Tuple[float, tracemalloc.Snapshot]] = None
+        self._lock = threading.Lock()
+
+    def take(self) -> tracemalloc.Snapshot:
+        """Takes a snapshot (slow: run it off the event loop). The first one becomes the baseline."""
+        snapshot = tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+        entry = (time.time(), snapshot)
+        with self._lock:
+            if self.baseline is None:
+                self.baseline = entry
+            self.previous, self.latest = self.latest, entry
+        return snapshot
+
+    def clear(self) -> None:
+        with self._lock:
+            self.baseline = self.previous = self.latest = None
+
+    def summary(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = [("baseline", self.baseline), ("previous", self.previous), ("latest", self.latest)]
+        return [{"snapshot": name, "taken_at": entry[0]} for name, entry in entries if entry is not None]
+
+    def diff(self, against: str = "baseline", group_by: str = "lineno", limit: int = 25) -> Optional[Dict[str, Any]]:
+        """Top allocation sites by growth from the `against` snapshot to the latest; None without two snapshots."""
+        if group_by not in SNAPSHOT_GROUPS:
+            raise ValueError(f"Unknown grouping '{group_by}'. Known: {list(SNAPSHOT_GROUPS)}")
+        with self._lock:
+            reference = self.baseline if against == "baseline" else self.previous
+            latest = self.latest
+        if reference is None or latest is None or reference is latest:
+            return None
+        stats = latest[1].compare_to(reference[1], group_by)
+        return {
+            "against": against,
+            "from": reference[0],
+            "to": latest[0],
+            "size_diff_bytes": sum(stat.size_diff for stat in stats),
+            "top": [_stat_entry(stat, group_by) for stat in stats[:limit]],
+        }
+
+
+def _stat_entry(stat: tracemalloc.StatisticDiff, group_by: str) -> Dict[str, Any]:
+    frame = stat.traceback[-1] # Most recent frame: where the allocation happened
+    entry = {
+        "site": frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}",
+        "size_diff_bytes": stat.size_diff,
+        "count_diff": stat.count_diff,
+        "size_bytes": stat.size,
+        "count": stat.count,
+    }
+    if group_by == "traceback":
+        entry["traceback"] = [f"{frame.filename}:{frame.lineno}" for frame in stat.traceback]
+    return entry
+
+
+snapshots = SnapshotStore()
+
+
+async def snapshot_periodically(interval: float = settings.MEMORY_SNAPSHOT_SECONDS) -> None:
+    """Takes a snapshot every `interval` seconds and logs the growth since the previous one."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await asyncio.to_thread(snapshots.take)
+            report = snapshots.diff("previous", limit=3)
+            since_baseline = snapshots.diff("baseline", limit=0)
+        except Exception as e:
+            logger.error(f"Memory snapshot failed: {e}")
+            continue
+        if report is None:
+            continue
+        top = ", ".join(f"{entry['site']} {entry['size_diff_bytes'] / 1024:+.0f} KiB" for entry in report["top"])
+        logger.info(f"Traced memory {report['size_diff_bytes'] / MB:+.1f} MB since the previous snapshot; top growth: {top}")
+        if since_baseline and since_baseline["size_diff_bytes"] > settings.MEMORY_GROWTH_WARN_MB * MB:
+            logger.warning(
+                f"Traced memory grew {since_baseline['size_diff_bytes'] / MB:.0f} MB since the baseline in worker {os.getpid()}; "
+                f"see /api/v1/admin/memory/diff."
+            )
+
+
+# --- Middleware ---
+
+class MemoryAccountingMiddleware:
+    """
+    ASGI middleware: retained and peak traced memory per request and per phase,
+    into memory_peak_histograms / memory_retained_histograms by route.
+    Installed inside PhaseTimingMiddleware so phases land in the same recorder.
+    """
+
+    def __init__(self, app: Any, log_peak_mb: float = settings.MEMORY_LOG_PEAK_MB):
+        self.app = app
+        self.log_peak_bytes = log_peak_mb * MB
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or not tracemalloc.is_tracing():
+            await self.app(scope, receive, send)
+            return
+        recorder = current_recorder() or PhaseRecorder()
+        memory_scope = memory_tracker.begin()
+        try:
+            with recording(recorder):
+                await self.app(scope, receive, send)
+        finally:
+            retained, peak = memory_tracker.end(memory_scope)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            with recorder._lock:
+                phases = dict(recorder.memory)
+            for name, (phase_retained, phase_peak) in phases.items():
+                memory_peak_histograms.observe(name, route, phase_peak / MB)
+                memory_retained_histograms.observe(name, route, max(0, phase_retained) / MB)
+            memory_peak_histograms.observe("total", route, peak / MB)
+            memory_retained_histograms.observe("total", route, max(0, retained) / MB)
+            if peak > self.log_peak_bytes:
+                breakdown = " ".join(f"{name}=+{p / MB:.1f}MB/{r / MB:+.1f}MB" for name, (r, p) in phases.items())
+                logger.warning(
+                    f"{scope['method']} {route} peaked at +{peak / MB:.1f} MB traced, retained {retained / MB:+.1f} MB "
+                    f"(phase=peak/retained: {breakdown})"
+                )
@@ -0,0 +1,380 @@
+# /app/core/metrics.py
+"""
+Prometheus text-format metrics, aggregated across uvicorn workers.
+
+Each worker collects a snapshot of its own state: phase/route histograms from
+app/core/timing.py, cache, single-flight and admission counters, executor
+queue depth, SQLAlchemy pool stats, geocoder stats and event-loop lag. With
+METRICS_MULTIPROC_DIR set, every worker writes its snapshot to
+`metrics-<pid>.json` in that directory, periodically and at shutdown.
+/metrics merges the snapshots of all live workers: counters and histograms
+are summed, gauges are reported per worker with a `pid` label.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.timing import PhaseHistograms, phase_histograms
+
+logger = logging.getLogger(__name__)
+
+PREFIX = "astrotracker"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class LabeledCounter:
+    """Monotonic counter with labels. Thread-safe."""
+
+    def __init__(self, label_names: Tuple[str, ...]):
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self) -> List[Tuple[Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(dict(zip(self.label_names, values)), value) for values, value in items]
+
+
+# Upstream geocoder (Nominatim) calls, recorded by app/services/geolocation.py
+geocoder_latency = PhaseHistograms(buckets=[10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000])
+geocoder_requests = LabeledCounter(("outcome",))
+
+# Event-loop heartbeat lag and stalls by culprit, recorded by app/core/loop_watchdog.py
+loop_lag_histogram = PhaseHistograms(buckets=[1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000])
+loop_stalls = LabeledCounter(("culprit",))
+loop_blocked_seconds = LabeledCounter(("culprit",))
+
+# SQLAlchemy pool events, registered by register_pool_events()
+pool_events = LabeledCounter(("event",))
+
+
+# --- Collection (one process) ---
+
+def _histogram_entries(histograms: PhaseHistograms, label_names: Tuple[str, str], scale: float = 0.001) -> List[Dict[str, Any]]:
+    """`scale` converts the recorded unit to the exported one: milliseconds to seconds by default."""
+    entries = []
+    for key, data in histograms.snapshot().items():
+        entries.append({
+            "labels": dict(zip(label_names, key)),
+            "buckets": [[bound * scale, count] for bound, count in data["buckets"]],
+            "sum": data["sum"] * scale,
+            "count": data["count"],
+        })
+    return entries
+
+
+def _memory_metrics() -> Tuple[Dict[str, Any], List[Tuple[str, str, Dict[str, str], float]]]:
+    """Histograms and gauges of the opt-in memory accounting (app/core/memory.py); empty when it is off."""
+    import tracemalloc
+
+    from app.core.memory import MB, memory_peak_histograms, memory_retained_histograms
+
+    if not tracemalloc.is_tracing():
+        return {}, []
+    traced, peak = tracemalloc.get_traced_memory()
+    histograms = {
+        "memory_peak_bytes": (
+            "Peak traced memory above the start, per request ('total') and phase",
+            _histogram_entries(memory_peak_histograms, ("phase", "route"), scale=MB),
+        ),
+        "memory_retained_bytes": (
+            "Traced memory still allocated at the end, per request ('total') and phase",
+            _histogram_entries(memory_retained_histograms, ("phase", "route"), scale=MB),
+        ),
+    }
+    gauges = [("tracemalloc_traced_bytes", "Memory currently traced by tracemalloc", {}, float(traced))]
+    return histograms, gauges
+
+
+def _executor_gauges() -> List[Tuple[str, str, Dict[str, str], float]]:
+    from app.services import executor
+
+    pool = executor._executor
+    if pool is None:
+        return [("calculation_pool_queue_depth", "Tasks waiting for a calculation thread", {}, 0.0)]
+    return [
+        ("calculation_pool_queue_depth", "Tasks waiting for a calculation thread", {}, float(pool._work_queue.qsize())),
+        ("calculation_pool_threads", "Calculation threads started", {}, float(len(pool._threads))),
+        ("calculation_pool_max_workers", "Calculation pool size", {}, float(pool._max_workers)),
+    ]
+
+
+def _db_pool_gauges() -> List[Tuple[str, str, Dict[str, str], float]]:
+    from app.db.session import get_async_engine
+
+    pool = get_async_engine().pool
+    gauges = []
+    for attr, help_text in (
+        ("size", "Configured pool size"),
+        ("checkedout", "Connections currently checked out"),
+        ("checkedin", "Idle connections in the pool"),
+        ("overflow", "Connections beyond pool size (negative while below size)"),
+    ):
+        method = getattr(pool, attr, None)
+        if callable(method):
+            gauges.append((f"db_pool_{attr}", help_text, {}, float(method())))
+    return gauges
+
+
+def _cache_counters() -> List[Tuple[str, str, List[Tuple[Dict[str, str], float]]]]:
+    from app.core.admission import admission_controller
+    from app.core.single_flight import calculation_flights
+    from app.services.chart_render import wheel_image_cache
+    from app.services.pair_cache import pair_result_cache
+
+    admission = admission_controller.stats()
+    return [
+        ("cache_requests_total", "Cache lookups by cache and result", [
+            ({"cache": "pair_result", "result": "hit"}, float(pair_result_cache.hits)),
+            ({"cache": "pair_result", "result": "miss"}, float(pair_result_cache.misses)),
+            ({"cache": "wheel_image", "result": "hit"}, float(wheel_image_cache.hits)),
+            ({"cache": "wheel_image", "result": "miss"}, float(wheel_image_cache.misses)),
+        ]),
+        ("single_flight_total", "Calculations started vs joined in flight", [
+            ({"result": "started"}, float(calculation_flights.started)),
+            ({"result": "coalesced"}, float(calculation_flights.coalesced)),
+        ]),
+        ("admission_total", "Admission control decisions", [
+            ({"result": "admitted"}, float(admission["admitted_total"])),
+            ({"result": "queued"}, float(admission["queued_total"])),
+            ({"result": "rejected"}, float(admission["rejected_total"])),
+            ({"result": "timed_out"}, float(admission["timed_out_total"])),
+        ]),
+        ("geocoder_requests_total", "Upstream geocoder calls by outcome", [
+            (labels, value) for labels, value in geocoder_requests.samples()
+        ]),
+        ("db_pool_events_total", "SQLAlchemy pool events", [
+            (labels, value) for labels, value in pool_events.samples()
+        ]),
+        ("event_loop_stalls_total", "Event-loop stalls over the threshold by blocking code", [
+            (labels, value) for labels, value in loop_stalls.samples()
+        ]),
+        ("event_loop_blocked_seconds_total", "Time the event loop was blocked in stalls by blocking code", [
+            (labels, value) for labels, value in loop_blocked_seconds.samples()
+        ]),
+    ]
+
+
+def collect_local() -> Dict[str, Any]:
+    """Snapshot of this process's metrics (JSON-serializable)."""
+    from app.core.admission import admission_controller
+    from app.services.pair_cache import pair_result_cache
+
+    request_entries, phase_entries = [], []
+    for entry in _histogram_entries(phase_histograms, ("phase", "route")):
+        if entry["labels"]["phase"] == "total":
+            request_entries.append({**entry, "labels": {"route": entry["labels"]["route"]}})
+        else:
+            phase_entries.append(entry)
+
+    gauges = _executor_gauges()
+    try:
+        gauges += _db_pool_gauges()
+    except Exception as e:
+        logger.warning(f"Could not read DB pool stats: {e}")
+    admission = admission_controller.stats()
+    gauges += [
+        ("pair_cache_entries", "Entries in the in-process pair result cache", {}, float(len(pair_result_cache._entries))),
+        ("admission_in_flight", "Capacity units held by running requests", {}, float(admission["in_flight"])),
+        ("admission_queued", "Requests waiting for admission", {}, float(admission["queued"])),
+    ]
+
+    memory_histograms, memory_gauges = _memory_metrics()
+    gauges += memory_gauges
+
+    return {
+        "pid": os.getpid(),
+        "time": time.time(),
+        "histograms": {
+            "request_duration_seconds": ("Request latency by route", request_entries),
+            "phase_duration_seconds": ("Time per calculation phase by route", phase_entries),
+            "geocoder_duration_seconds": (
+                "Upstream geocoder latency by outcome", _histogram_entries(geocoder_latency, ("provider", "outcome"))
+            ),
+            "event_loop_lag_seconds": (
+                "How late the event loop ran the watchdog heartbeat", _histogram_entries(loop_lag_histogram, ())
+            ),
+            **memory_histograms,
+        },
+        "counters": {name: (help_text, [[labels, value] for labels, value in samples])
+                     for name, help_text, samples in _cache_counters()},
+        "gauges": {name: (help_text, labels, value) for name, help_text, labels, value in gauges},
+    }
+
+
+# --- Multiprocess files ---
+
+def _multiproc_dir() -> Optional[Path]:
+    return Path(settings.METRICS_MULTIPROC_DIR) if settings.METRICS_MULTIPROC_DIR else None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def write_snapshot() -> None:
+    directory = _multiproc_dir()
+    if directory is None:
+        return
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"metrics-{os.getpid()}.json"
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(collect_local()))
+    os.replace(tmp_path, path) # Readers never see a half-written file
+
+
+def read_snapshots() -> List[Dict[str, Any]]:
+    """Snapshots of all live workers (this one collected fresh)."""
+    local = collect_local()
+    directory = _multiproc_dir()
+    if directory is None or not directory.exists():
+        return [local]
+    snapshots = [local]
+    for path in directory.glob("metrics-*.json"):
+        try:
+            pid = int(path.stem.split("-", 1)[1])
+        except ValueError:
+            continue
+        if pid == local["pid"]:
+            continue
+        if not _pid_alive(pid):
+            path.unlink(missing_ok=True)
+            continue
+        try:
+            snapshots.append(json.loads(path.read_text()))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable metrics snapshot {path.name}: {e}")
+    return snapshots
+
+
+async def flush_periodically() -> None:
+    """Background task (started in the lifespan) keeping this worker's snapshot fresh."""
+    while True:
+        try:
+            write_snapshot()
+        except Exception as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+        await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+
+
+# --- Aggregation and exposition ---
+
+def _label_key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    parts = []
+    for name, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{name}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def render(snapshots: Iterable[Dict[str, Any]]) -> str:
+    """Merges worker snapshots into Prometheus text exposition format."""
+    snapshots = list(snapshots)
+    lines: List[str] = []
+
+    histograms: Dict[str, Tuple[str, Dict[Any, Dict[str, Any]]]] = {}
+    counters: Dict[str, Tuple[str, Dict[Any, List[Any]]]] = {}
+    gauges: Dict[str, Tuple[str, List[Tuple[Dict[str, Any], float]]]] = {}
+    for snapshot in snapshots:
+        for name, (help_text, entries) in snapshot["histograms"].items():
+            merged = histograms.setdefault(name, (help_text, {}))[1]
+            for entry in entries:
+                key = _label_key(entry["labels"])
+                current = merged.get(key)
+                if current is None:
+                    merged[key] = {**entry, "buckets": [list(bucket) for bucket in entry["buckets"]]}
+                    continue
+                for bucket, (_, count) in zip(current["buckets"], entry["buckets"]):
+                    bucket[1] += count
+                current["sum"] += entry["sum"]
+                current["count"] += entry["count"]
+        for name, (help_text, samples) in snapshot["counters"].items():
+            merged = counters.setdefault(name, (help_text, {}))[1]
+            for labels, value in samples:
+                key = _label_key(labels)
+                merged[key] = [labels, merged.get(key, [labels, 0.0])[1] + value]
+        for name, (help_text, labels, value) in snapshot["gauges"].items():
+            gauges.setdefault(name, (help_text, []))[1].append(({**labels, "pid": snapshot["pid"]}, value))
+
+    for name, (help_text, merged) in histograms.items():
+        metric = f"{PREFIX}_{name}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for entry in merged.values():
+            for bound, count in entry["buckets"]:
+                labels = {**entry["labels"], "le": _format_value(bound)}
+                lines.append(f"{metric}_bucket{_format_labels(labels)} {_format_value(count)}")
+            lines.append(f"{metric}_sum{_format_labels(entry['labels'])} {_format_value(entry['sum'])}")
+            lines.append(f"{metric}_count{_format_labels(entry['labels'])} {_format_value(entry['count'])}")
+    for name, (help_text, merged) in counters.items():
+        metric = f"{PREFIX}_{name}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        for labels, value in merged.values():
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+    for name, (help_text, samples) in gauges.items():
+        metric = f"{PREFIX}_{name}"
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} gauge"]
+        for labels, value in samples:
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+
+    # Derived: pair cache hit ratio over the whole deployment
+    pair_counts = {
+        labels.get("result"): value
+        for labels, value in counters.get("cache_requests_total", ("", {}))[1].values()
+        if labels.get("cache") == "pair_result"
+    }
+    lookups = pair_counts.get("hit", 0.0) + pair_counts.get("miss", 0.0)
+    metric = f"{PREFIX}_pair_cache_hit_ratio"
+    lines += [f"# HELP {metric} Pair result cache hits / lookups since start", f"# TYPE {metric} gauge"]
+    lines.append(f"{metric} {_format_value(pair_counts.get('hit', 0.0) / lookups if lookups else 0.0)}")
+    lines.append(f"# HELP {PREFIX}_workers Worker processes reporting")
+    lines.append(f"# TYPE {PREFIX}_workers gauge")
+    lines.append(f"{PREFIX}_workers {len(snapshots)}")
+    return "\n".join(lines) + "\n"
+
+
+def register_pool_events() -> None:
+    """Counts connection checkouts, new connections and invalidations on the async engine's pool."""
+    from sqlalchemy import event
+
+    from app.db.session import get_async_engine
+
+    pool = get_async_engine().sync_engine.pool
+    for event_name in ("checkout", "connect", "invalidate"):
+        if not event.contains(pool, event_name, _POOL_LISTENERS[event_name]):
+            event.listen(pool, event_name, _POOL_LISTENERS[event_name])
+
+
+_POOL_LISTENERS = {
+    "checkout": lambda *args: pool_events.inc("checkout"),
+    "connect": lambda *args: pool_events.inc("connect"),
+    "invalidate": lambda *args: pool_events.inc("invalidate"),
+}
@@ -0,0 +1,229 @@
+# /app/core/prefork.py
+"""
+Preforking launcher: load the app and its read-only data once, then fork the
+workers so they share those pages copy-on-write instead of each loading its
+own copy (uvicorn --workers spawns fresh interpreters that share nothing).
+
+The parent preloads Kerykeion, geopy and the rest of the app, opens the
+TimezoneFinder index (read-only mmap, shared by every child) and computes a
+reference chart so first-call state exists before the fork. gc.freeze() then
+moves everything allocated so far out of the collector's reach, so collections
+in the children do not write to (and so copy) the shared pages.
+
+Nothing that is unsafe across fork may exist in the parent: no threads (the
+calculation pool starts in each worker), no event loop, no database
+connections, and no open swisseph files (a forked FILE* shares its offset with
+the parent's and every sibling's). The parent only supervises: it restarts
+workers that die, forwards SIGTERM/SIGINT, and logs memory per worker.
+"""
+import gc
+import logging
+import os
+import signal
+import socket
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared_clean",
+    "Shared_Dirty": "shared_dirty",
+    "Private_Clean": "private_clean",
+    "Private_Dirty": "private_dirty",
+}
+
+
+def process_memory(pid: Optional[int] = None) -> Dict[str, int]:
+    """
+    Memory of a process in bytes from /proc/<pid>/smaps_rollup: rss, pss
+    (shared pages divided among the processes sharing them), shared and
+    private. Falls back to VmRSS only; empty where /proc is not available.
+    """
+    proc = Path("/proc") / (str(pid) if pid else "self")
+    try:
+        lines = (proc / "smaps_rollup").read_text().splitlines()
+    except OSError:
+        try:
+            for line in (proc / "status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    return {"rss": int(line.split()[1]) * 1024}
+        except OSError:
+            pass
+        return {}
+
+    memory: Dict[str, int] = {}
+    for line in lines:
+        key, _, rest = line.partition(":")
+        if key in _SMAPS_FIELDS:
+            memory[_SMAPS_FIELDS[key]] = int(rest.split()[0]) * 1024
+    if "shared_clean" in memory:
+        memory["shared"] = memory.pop("shared_clean") + memory.pop("shared_dirty", 0)
+        memory["private"] = memory.pop("private_clean", 0) + memory.pop("private_dirty", 0)
+    return memory
+
+
+def preload() -> Any:
+    """Imports the app and builds the shared read-only state in the parent. Returns the ASGI app."""
+    started = time.perf_counter()
+    from app.main import app
+    from app.services import astrology, ephemeris
+    from app.services.warmup import _load_libraries, _reference_position_set
+
+    _load_libraries()
+    astrology.timezone_at(51.5074, -0.1278)
+    _reference_position_set(0)
+    if ephemeris._ensure_swisseph():
+        # Close the ephemeris files the preload opened, so forked workers do not share the parent's file handles
+        ephemeris.swe.close()
+
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        f"Preloaded app in {(time.perf_counter() - started) * 1000:.0f} ms; "
+        f"{gc.get_freeze_count()} objects frozen for sharing."
+    )
+    return app
+
+
+def _format_mb(value: Optional[int]) -> str:
+    return f"{value / 1048576:7.1f}" if value is not None else "      -"
+
+
+class PreforkServer:
+    def __init__(
+        self,
+        app: Any,
+        host: str = "0.0.0.0",
+        port: int = 8000,
+        workers: int = 2,
+        memory_report_seconds: float = 60.0,
+        log_level: str = "info",
+        graceful_timeout: float = 30.0,
+    ):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.memory_report_seconds = memory_report_seconds
+        self.log_level = log_level
+        self.graceful_timeout = graceful_timeout
+        self.stop_deadline: Optional[float] = None
+        self.children: Dict[int, int] = {} # pid -> worker slot
+        self.stopping = False
+        self.socket: Optional[socket.socket] = None
+
+    def _bind(self) -> socket.socket:
+        family = socket.AF_INET6 if ":" in self.host else socket.AF_INET
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen(2048)
+        sock.set_inheritable(True)
+        return sock
+
+    def _spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid:
+            self.children[pid] = slot
+            return
+        # --- Worker process ---
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            import uvicorn
+            config = uvicorn.Config(
+                self.app, lifespan="on", log_level=self.log_level, proxy_headers=True, forwarded_allow_ips="*",
+            )
+            uvicorn.Server(config).run(sockets=[self.socket])
+        except BaseException:
+            logger.exception(f"Worker {slot} crashed.")
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+
+    def _stop(self, signum: int, frame: Any) -> None:
+        if not self.stopping:
+            logger.info(f"Received signal {signum}; stopping {len(self.children)} workers.")
+            self.stop_deadline = time.monotonic() + self.graceful_timeout
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.children.clear()
+                return
+            if pid == 0:
+                return
+            slot = self.children.pop(pid, None)
+            if slot is None:
+                continue
+            if not self.stopping:
+                logger.warning(f"Worker {slot} (pid {pid}) exited with status {status}; restarting it.")
+                self._spawn(slot)
+
+    def memory_report(self) -> List[Dict[str, Any]]:
+        rows = [{"role": "parent", "pid": os.getpid(), **process_memory()}]
+        for pid, slot in sorted(self.children.items(), key=lambda item: item[1]):
+            rows.append({"role": f"worker-{slot}", "pid": pid, **process_memory(pid)})
+        return rows
+
+    def log_memory_report(self) -> None:
+        rows = self.memory_report()
+        lines = ["Memory per process (MB):        RSS     PSS  shared private"]
+        for row in rows:
+            lines.append(
+                f"  {row['role']:<10} {row['pid']:>8} {_format_mb(row.get('rss'))} {_format_mb(row.get('pss'))} "
+                f"{_format_mb(row.get('shared'))} {_format_mb(row.get('private'))}"
+            )
+        if all("pss" in row for row in rows):
+            lines.append(
+                f"  total: RSS {sum(row['rss'] for row in rows) / 1048576:.1f} MB, "
+                f"PSS {sum(row['pss'] for row in rows) / 1048576:.1f} MB (actual footprint)"
+            )
+        logger.info("\n".join(lines))
+
+    def run(self) -> None:
+        if self.workers > 1 and settings.METRICS_ENABLED and not settings.METRICS_MULTIPROC_DIR:
+            # So that /metrics on any worker reports all of them
+            settings.METRICS_MULTIPROC_DIR = tempfile.mkdtemp(prefix="astro-metrics-")
+            logger.info(f"Using {settings.METRICS_MULTIPROC_DIR} for multiprocess metrics.")
+
+        self.socket = self._bind()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for slot in range(self.workers):
+            self._spawn(slot)
+        logger.info(f"Serving on {self.host}:{self.port} with {self.workers} preforked workers (parent pid {os.getpid()}).")
+
+        next_report = time.monotonic() + min(10.0, self.memory_report_seconds or 10.0)
+        while self.children:
+            time.sleep(0.5)
+            self._reap()
+            if self.stopping and self.children and time.monotonic() >= self.stop_deadline:
+                logger.warning(f"Workers {sorted(self.children)} did not stop within {self.graceful_timeout}s; killing them.")
+                for pid in list(self.children):
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                self.stop_deadline = float("inf")
+            if self.memory_report_seconds and not self.stopping and time.monotonic() >= next_report:
+                self.log_memory_report()
+                next_report = time.monotonic() + self.memory_report_seconds
+        self.socket.close()
+        logger.info("All workers stopped.")
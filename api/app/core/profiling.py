@@ -0,0 +1,374 @@
+# /app/core/profiling.py
+"""
+On-demand profiling of single requests in production.
+
+An admin gets a short-lived token from POST /api/v1/admin/profiling/token and
+replays the slow request with it in the PROFILE_HEADER header. That request
+(and only that one) then runs with:
+
+  - a sampling profiler: a thread reading the stacks of the event loop thread
+    and of the calculation-pool threads working for the request every
+    PROFILE_SAMPLE_INTERVAL_MS, aggregated as collapsed stacks (the input of
+    flamegraph.pl, speedscope and friends),
+  - its phase breakdown (the request's PhaseRecorder, see app/core/timing.py),
+  - a log of its SQL statements with their durations.
+
+The result is stored under PROFILE_STORAGE_DIR and its id returned in the
+X-Profile-Id response header; GET /api/v1/admin/profiles/{id} serves it.
+
+Requests without the header cost one header lookup in the middleware and one
+ContextVar lookup per calculation-pool job; the SQL listeners are only
+installed by the first profiled request. Samples of the event loop thread
+show whatever coroutine it was running, which under load can belong to
+another request.
+"""
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from app.core.config import settings
+from app.core.timing import PhaseRecorder, current_recorder, recording
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+# SQL statements longer than this are cut in the log
+MAX_STATEMENT_CHARS = 2000
+MAX_LOGGED_QUERIES = 500
+TOP_FUNCTIONS = 25
+
+
+# --- Tokens ---
+
+def _signature(payload: str) -> str:
+    key = settings.SECRET_KEY.get_secret_value().encode("utf-8")
+    return hmac.new(key, f"profile:{payload}".encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def issue_token(admin_id: Any, ttl_seconds: int = settings.PROFILE_TOKEN_TTL_SECONDS) -> Tuple[str, datetime]:
+    """A signed token naming the admin who may profile requests until it expires. Returns (token, expires_at)."""
+    expires = int(time.time()) + ttl_seconds
+    payload = base64.urlsafe_b64encode(f"{admin_id}:{expires}".encode("utf-8")).decode("ascii").rstrip("=")
+    return f"{payload}.{_signature(payload)}", datetime.fromtimestamp(expires, timezone.utc)
+
+
+def verify_token(token: str) -> Optional[str]:
+    """The admin id of a valid, unexpired token; None otherwise. No database access."""
+    payload, _, signature = token.partition(".")
+    if not payload or not hmac.compare_digest(signature, _signature(payload)):
+        return None
+    try:
+        admin_id, _, expires = base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)).decode("utf-8").rpartition(":")
+        if int(expires) < time.time():
+            return None
+    except ValueError:
+        return None
+    return admin_id
+
+
+# --- The profile of one request ---
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("request_profile", default=None)
+
+
+def current_profile() -> Optional["RequestProfile"]:
+    return _current_profile.get()
+
+
+def _frame_name(code: Any) -> str:
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}".replace(";", ",")
+
+
+class RequestProfile:
+    """Samples, SQL log and phases of one profiled request."""
+
+    def __init__(self, method: str, path: str, query: str, admin_id: str, interval_ms: float = settings.PROFILE_SAMPLE_INTERVAL_MS):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.query = query
+        self.admin_id = admin_id
+        self.interval = interval_ms / 1000
+        self.created = datetime.now(timezone.utc)
+        self.recorder = PhaseRecorder()
+        self.status: Optional[int] = None
+        self.duration_ms: Optional[float] = None
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.queries: List[Dict[str, Any]] = []
+        self.query_count = 0
+        self.query_ms = 0.0
+        # thread ident -> label; the event loop thread is always sampled, pool threads while they work for us
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    # Threads
+
+    def add_thread(self, ident: int, label: str) -> None:
+        with self._lock:
+            self._threads[ident] = label
+
+    def remove_thread(self, ident: int) -> None:
+        with self._lock:
+            self._threads.pop(ident, None)
+
+    def wrap(self, func: Callable[..., T]) -> Callable[..., T]:
+        """`func`, sampled while it runs on a pool thread."""
+        def run(*args: Any, **kwargs: Any) -> T:
+            ident = threading.get_ident()
+            self.add_thread(ident, threading.current_thread().name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.remove_thread(ident)
+        return run
+
+    # Sampling
+
+    def start(self) -> None:
+        self.add_thread(threading.get_ident(), "event-loop")
+        self._started = time.perf_counter()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profiler-{self.id[:8]}", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self.duration_ms = (time.perf_counter() - self._started) * 1000
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+
+    def _sample_loop(self) -> None:
+        deadline = time.monotonic() + settings.PROFILE_MAX_SECONDS
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            self.sample()
+
+    def sample(self) -> None:
+        frames = sys._current_frames()
+        with self._lock:
+            threads = list(self._threads.items())
+        for ident, label in threads:
+            frame = frames.get(ident)
+            names = []
+            while frame is not None:
+                names.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            if names:
+                names.append(label)
+                self.stacks[";".join(reversed(names))] += 1
+        self.samples += 1
+
+    # SQL
+
+    def add_query(self, statement: str, elapsed_ms: float, rows: int) -> None:
+        with self._lock:
+            self.query_count += 1
+            self.query_ms += elapsed_ms
+            if len(self.queries) < MAX_LOGGED_QUERIES:
+                self.queries.append({
+                    "offset_ms": round((time.perf_counter() - self._started) * 1000 - elapsed_ms, 3),
+                    "ms": round(elapsed_ms, 3),
+                    "rows": rows,
+                    "statement": statement[:MAX_STATEMENT_CHARS],
+                })
+
+    # Output
+
+    def collapsed(self) -> str:
+        """Collapsed stacks, one `frame;frame;... count` line per distinct stack."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def report(self) -> Dict[str, Any]:
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(";", 1)[-1]] += count
+        with self.recorder._lock:
+            phases = dict(self.recorder.phases)
+        return {
+            "id": self.id,
+            "created": self.created.isoformat(timespec="seconds"),
+            "admin_id": self.admin_id,
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": self.status,
+            "duration_ms": self.duration_ms,
+            "sample_interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "phases": {name: {"ms": round(total, 3), "count": count} for name, (total, count) in phases.items()},
+            "query_count": self.query_count,
+            "query_ms": round(self.query_ms, 3),
+            "queries": self.queries,
+            # Functions on top of the stack most often: where the time went, excluding callees
+            "top_functions": [{"function": name, "samples": count} for name, count in leaves.most_common(TOP_FUNCTIONS)],
+        }
+
+
+def profiled(func: Callable[..., T]) -> Callable[..., T]:
+    """For the calculation pool: `func` sampled if the calling request is being profiled."""
+    profile = _current_profile.get()
+    return func if profile is None else profile.wrap(func)
+
+
+# --- SQL listeners (installed on first use) ---
+
+_sql_listeners_installed = False
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault("profile_query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started = conn.info.get("profile_query_started")
+    if profile is None or not started:
+        return
+    elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+    profile.add_query(statement, elapsed_ms, getattr(cursor, "rowcount", -1))
+
+
+def install_sql_listeners() -> None:
+    global _sql_listeners_installed
+    if _sql_listeners_installed:
+        return
+    from sqlalchemy import event
+
+    from app.db.session import get_async_engine
+
+    sync_engine = get_async_engine().sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    _sql_listeners_installed = True
+
+
+# --- Storage ---
+
+def profile_paths(profile_id: str) -> Optional[Tuple[Path, Path]]:
+    """(report JSON, collapsed stacks) of a stored profile; None for a malformed id."""
+    if not _PROFILE_ID.match(profile_id):
+        return None
+    directory = Path(settings.PROFILE_STORAGE_DIR)
+    return directory / f"{profile_id}.json", directory / f"{profile_id}.folded"
+
+
+def _write_atomic(path: Path, text: str) -> None:
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+            tmp.write(text)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def store_profile(profile: RequestProfile) -> None:
+    report_path, folded_path = profile_paths(profile.id)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    _write_atomic(folded_path, profile.collapsed())
+    _write_atomic(report_path, json.dumps(profile.report(), indent=2))
+    prune_profiles(settings.PROFILE_MAX_STORED)
+
+
+def prune_profiles(keep: int) -> int:
+    """Deletes all but the `keep` newest profiles. Returns how many were deleted."""
+    directory = Path(settings.PROFILE_STORAGE_DIR)
+    reports = sorted(directory.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+    for report in reports[keep:]:
+        report.unlink(missing_ok=True)
+        report.with_suffix(".folded").unlink(missing_ok=True)
+    return max(0, len(reports) - keep)
+
+
+def list_profiles(limit: int = 50) -> List[Dict[str, Any]]:
+    """Summaries of the newest stored profiles."""
+    directory = Path(settings.PROFILE_STORAGE_DIR)
+    summaries = []
+    for path in sorted(directory.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)[:limit]:
+        try:
+            report = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue
+        summaries.append({key: report.get(key) for key in ("id", "created", "method", "path", "status", "duration_ms", "samples", "query_count")})
+    return summaries
+
+
+# --- Middleware ---
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware: profiles requests carrying a valid token in PROFILE_HEADER
+    and passes every other request straight through.
+    """
+
+    def __init__(self, app: Any, header: str = settings.PROFILE_HEADER):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = next((value for name, value in scope["headers"] if name == self.header), None)
+        if token is None:
+            await self.app(scope, receive, send)
+            return
+        admin_id = verify_token(token.decode("latin-1"))
+        if admin_id is None:
+            logger.warning(f"Ignoring an invalid or expired profiling token on {scope['method']} {scope['path']}.")
+            await self.app(scope, receive, send)
+            return
+        await self._profile(scope, receive, send, admin_id)
+
+    async def _profile(self, scope: Dict[str, Any], receive: Any, send: Any, admin_id: str) -> None:
+        install_sql_listeners()
+        profile = RequestProfile(
+            scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), admin_id,
+        )
+        logger.info(f"Profiling {profile.method} {profile.path} for admin {admin_id} as {profile.id}.")
+
+        async def send_with_id(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        # Inside PhaseTimingMiddleware its recorder is reused, so Server-Timing and the profile agree
+        recorder = current_recorder()
+        if recorder is not None:
+            profile.recorder = recorder
+        token = _current_profile.set(profile)
+        profile.start()
+        try:
+            with recording(profile.recorder):
+                await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            _current_profile.reset(token)
+            try:
+                await asyncio.to_thread(store_profile, profile)
+            except OSError as e:
+                logger.error(f"Could not store profile {profile.id}: {e}")
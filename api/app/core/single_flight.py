@@ -0,0 +1,93 @@
+# /app/core/single_flight.py
+"""
+Single-flight coalescing of identical concurrent calculations.
+
+Callers that ask for the same key while a computation for it is in flight
+await that computation instead of starting their own. The result (or the
+exception) is shared by all of them, so results must be treated as
+read-only. Nothing is cached: once the computation finishes, the next
+caller starts a fresh one.
+
+Cancellation: a cancelled caller only stops waiting. The computation keeps
+running for the remaining callers and is cancelled only when every caller
+has gone away. The key is released as soon as that happens, so later callers
+never join a computation that is being cancelled.
+
+Phases: the computation runs in the first caller's context, so its phases
+(subject, positions, ...) go to that caller's recorder. Every other caller
+records its wait as a `coalesced` phase instead.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+from app.core.timing import phase
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str = "calculation"):
+        self.name = name
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: Hashable, compute: Callable[[], Awaitable[T]]) -> T:
+        """Returns compute()'s result, sharing one in-flight computation per key."""
+        flight = self._flights.get(key)
+        joined = flight is not None
+        if not joined:
+            flight = _Flight(asyncio.ensure_future(compute()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda task, key=key, flight=flight: self._finished(key, flight))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.debug(f"{self.name}: joined in-flight computation for {key!r} ({flight.waiters} waiting)")
+
+        flight.waiters += 1
+        try:
+            # Shielded so that one caller's cancellation does not cancel the shared task
+            if not joined:
+                return await asyncio.shield(flight.task)
+            with phase("coalesced"):
+                return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                # Forget the flight now, not when the task finishes unwinding, so a
+                # caller arriving meanwhile starts a fresh computation instead of
+                # joining the cancelled one
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _finished(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Mark the exception as retrieved even if every caller was cancelled
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": self.in_flight(), "started_total": self.started, "coalesced_total": self.coalesced}
+
+
+# Shared by the calculation endpoints; keys are namespaced by calculation kind
+calculation_flights = SingleFlight("calculation")
@@ -0,0 +1,245 @@
+# /app/core/timing.py
+"""
+Lightweight timing: request-scoped phase timers that feed Server-Timing
+headers and per-phase histograms, and can be logged per endpoint with
+log_phases().
+
+Phase timers are recorded into the PhaseRecorder held in a context variable
+set by PhaseTimingMiddleware. With no recorder (middleware disabled, or code
+running outside a request) `phase()` returns a shared no-op context manager,
+so the cost of an instrumented call site is one ContextVar lookup.
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class PhaseRecorder:
+    """Per-request phase totals. Thread-safe: phases also run on the calculation pool."""
+
+    def __init__(self):
+        self.phases: Dict[str, Tuple[float, int]] = {}
+        # phase -> (retained bytes, peak bytes); only filled while memory accounting is on
+        self.memory: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        with self._lock:
+            total, count = self.phases.get(name, (0.0, 0))
+            self.phases[name] = (total + elapsed_ms, count + 1)
+
+    def add_memory(self, name: str, retained: int, peak: int) -> None:
+        """Repeated phases: retained bytes add up, the peak is the highest."""
+        with self._lock:
+            total_retained, max_peak = self.memory.get(name, (0, 0))
+            self.memory[name] = (total_retained + retained, max(max_peak, peak))
+
+    @property
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000.0
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. `db;dur=1.2, subject;dur=8.0;desc="x2", total;dur=12.5`."""
+        with self._lock:
+            items = list(self.phases.items())
+        parts = []
+        for name, (total, count) in items:
+            entry = f"{name};dur={total:.1f}"
+            if count > 1:
+                entry += f';desc="x{count}"'
+            parts.append(entry)
+        parts.append(f"total;dur={self.total_ms:.1f}")
+        return ", ".join(parts)
+
+    def summary(self) -> str:
+        """Log form, e.g. `fetch=1.2ms positions=8.0ms total=12.5ms`."""
+        with self._lock:
+            items = list(self.phases.items())
+        parts = [f"{name}={total:.1f}ms" for name, (total, _) in items]
+        parts.append(f"total={self.total_ms:.1f}ms")
+        return " ".join(parts)
+
+
+_current_recorder: ContextVar[Optional[PhaseRecorder]] = ContextVar("phase_recorder", default=None)
+
+
+class _Phase:
+    __slots__ = ("recorder", "name", "started")
+
+    def __init__(self, recorder: PhaseRecorder, name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.recorder.add(self.name, (time.perf_counter() - self.started) * 1000.0)
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NO_PHASE = _NoPhase()
+
+# app.core.memory.memory_tracker while memory accounting is on (see set_memory_tracker)
+_memory_tracker: Optional[Any] = None
+
+
+class _MemoryPhase(_Phase):
+    __slots__ = ("scope",)
+
+    def __enter__(self) -> None:
+        self.scope = _memory_tracker.begin()
+        super().__enter__()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        super().__exit__(*exc_info)
+        retained, peak = _memory_tracker.end(self.scope)
+        self.recorder.add_memory(self.name, retained, peak)
+
+
+def set_memory_tracker(tracker: Optional[Any]) -> None:
+    """Makes phases also account traced memory (tracker.begin()/end(scope)); None switches it off."""
+    global _memory_tracker
+    _memory_tracker = tracker
+
+
+def phase(name: str):
+    """
+    Times a block as phase `name` of the current request:
+
+        with phase("db"):
+            ...
+
+    Phase names are Server-Timing tokens (no spaces). Repeated phases accumulate.
+    """
+    recorder = _current_recorder.get()
+    if recorder is None:
+        return _NO_PHASE
+    if _memory_tracker is not None:
+        return _MemoryPhase(recorder, name)
+    return _Phase(recorder, name)
+
+
+def current_recorder() -> Optional[PhaseRecorder]:
+    return _current_recorder.get()
+
+
+def log_phases(label: str, level: int = logging.INFO) -> None:
+    """Logs the current request's phase totals so far as `<label> timings: ...` (nothing outside a request)."""
+    recorder = _current_recorder.get()
+    if recorder is not None:
+        logger.log(level, f"{label} timings: {recorder.summary()}")
+
+
+@contextmanager
+def recording(recorder: PhaseRecorder) -> Iterator[PhaseRecorder]:
+    """Makes `recorder` the current phase recorder inside the block (for callers outside the middleware)."""
+    token = _current_recorder.set(recorder)
+    try:
+        yield recorder
+    finally:
+        _current_recorder.reset(token)
+
+
+# Upper bounds in milliseconds; the last bucket is +Inf
+HISTOGRAM_BUCKETS_MS: List[float] = [1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+
+class PhaseHistograms:
+    """
+    Cumulative latency histograms for this process, keyed by (phase, route).
+    The route is the path template, so label cardinality stays bounded.
+    """
+
+    def __init__(self, buckets: List[float] = HISTOGRAM_BUCKETS_MS):
+        self.buckets = list(buckets)
+        self._data: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, route: str, elapsed_ms: float) -> None:
+        index = bisect.bisect_left(self.buckets, elapsed_ms)
+        key = (name, route)
+        with self._lock:
+            data = self._data.get(key)
+            if data is None:
+                data = self._data[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            data["counts"][index] += 1
+            data["sum"] += elapsed_ms
+            data["count"] += 1
+
+    def observe_request(self, recorder: PhaseRecorder, route: str) -> None:
+        with recorder._lock:
+            items = list(recorder.phases.items())
+        for name, (total, _) in items:
+            self.observe(name, route, total)
+        self.observe("total", route, recorder.total_ms)
+
+    def snapshot(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """{(phase, route): {"buckets": [(le_ms, cumulative count), ...], "sum": ms, "count": n}}"""
+        with self._lock:
+            data = {key: {**values, "counts": list(values["counts"])} for key, values in self._data.items()}
+        snapshot = {}
+        for key, values in data.items():
+            cumulative, running = [], 0
+            for bound, count in zip(self.buckets + [float("inf")], values["counts"]):
+                running += count
+                cumulative.append((bound, running))
+            snapshot[key] = {"buckets": cumulative, "sum": values["sum"], "count": values["count"]}
+        return snapshot
+
+    def reset(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+phase_histograms = PhaseHistograms()
+
+
+class PhaseTimingMiddleware:
+    """
+    ASGI middleware: gives each HTTP request a PhaseRecorder, adds the
+    Server-Timing header (if `emit_header`) and feeds phase_histograms.
+    """
+
+    def __init__(self, app: Any, emit_header: bool = True):
+        self.app = app
+        self.emit_header = emit_header
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        recorder = PhaseRecorder()
+        token = _current_recorder.set(recorder)
+
+        async def send_with_timing(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start" and self.emit_header:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", recorder.server_timing().encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_recorder.reset(token)
+            # FastAPI stores the matched route in the scope during routing
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            phase_histograms.observe_request(recorder, route)
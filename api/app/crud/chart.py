@@ -1,26 +1,32 @@
 # /app/crud/chart.py
-from typing import Any, Dict, Optional, Union, List
+from typing import Any, Dict, Optional, Union, List, Tuple
 from uuid import UUID
+import asyncio
 import logging # Import logging
 
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.future import select
 from sqlalchemy import delete, update
 
+from app.core.timing import phase
 from app.db.session import get_async_session
 from app.models.chart import Chart
 from app.schemas.chart import ChartCreate, ChartUpdate
 
-# Import Kerykeion components from the service layer to respect availability checks
-from app.services.astrology import (
-    _AstrologicalSubject, 
-    _KerykeionException, 
-    KERYKEION_AVAILABLE,
-    NatalChartCalculator # For type hinting if needed, or direct use if making a new subject
-)
+# Kerykeion components come from the service layer, which loads them on first use
+from app.services import astrology
+from app.services.astrology import NatalChartCalculator
+from app.services.ephemeris import swisseph_lock
 # Need city to lat/lon conversion if not already on chart_db
 from app.services.geolocation import get_coordinates_for_city
+from app.services.positions import build_position_set, chart_content_hash, is_position_set_current
+from app.services.pair_cache import pair_result_cache
+from app.services.executor import run_calculation
+
+# Fields whose change moves the planets; updating any of them drops the cached positions
+POSITION_INPUT_FIELDS = ("birth_datetime", "city", "latitude", "longitude")
 
 logger = logging.getLogger(__name__) # Get logger for this module
 
@@ -30,25 +36,36 @@ class CRUDChart:
         self.db = db
 
     async def get(self, id: UUID) -> Optional[Chart]:
-        result = await self.db.execute(select(Chart).filter(Chart.id == id))
+        with phase("db"):
+            result = await self.db.execute(select(Chart).filter(Chart.id == id))
         return result.scalars().first()
 
+    async def get_multi_by_ids(self, *, ids: List[UUID]) -> List[Chart]:
+        """Fetch several charts in one WHERE id IN (...) query. Order is not guaranteed."""
+        if not ids:
+            return []
+        with phase("db"):
+            result = await self.db.execute(select(Chart).filter(Chart.id.in_(ids)))
+        return result.scalars().all()
+
     async def get_multi(
         self, *, skip: int = 0, limit: int = 100
     ) -> List[Chart]:
-        result = await self.db.execute(
-            select(Chart)
-            .offset(skip)
-            .limit(limit)
-        )
+        with phase("db"):
+            result = await self.db.execute(
+                select(Chart)
+                .offset(skip)
+                .limit(limit)
+            )
         return result.scalars().all()
 
     async def get_multi_by_owner(
         self, *, user_id: UUID, skip: int = 0, limit: int = 100
     ) -> List[Chart]:
-        result = await self.db.execute(
-            select(Chart).filter(Chart.user_id == user_id).offset(skip).limit(limit)
-        )
+        with phase("db"):
+            result = await self.db.execute(
+                select(Chart).filter(Chart.user_id == user_id).offset(skip).limit(limit)
+            )
         return result.scalars().all()
 
     async def create(self, *, obj_in: ChartCreate, user_id: UUID) -> Chart:
@@ -72,8 +89,9 @@ class CRUDChart:
         
         self.db.add(db_obj)
         try:
-            await self.db.commit()
-            await self.db.refresh(db_obj)
+            with phase("db"):
+                await self.db.commit()
+                await self.db.refresh(db_obj)
             logger.info(f"CRUD Create - Successfully committed chart ID: {db_obj.id}") # DEBUG LOG
             return db_obj
         except Exception as e:
@@ -96,27 +114,129 @@ class CRUDChart:
         if not update_data: # No valid fields to update
              return db_obj # Return original object or None/raise error?
 
-        await self.db.execute(
-            update(Chart).where(Chart.id == db_obj.id).values(**update_data)
-        )
-        await self.db.commit()
-        await self.db.refresh(db_obj) # Refresh the original object
+        if any(field in update_data for field in POSITION_INPUT_FIELDS):
+            update_data["positions"] = None
+            update_data["content_hash"] = None
+            if db_obj.content_hash:
+                await pair_result_cache.invalidate(db_obj.content_hash, db=self.db)
+
+        with phase("db"):
+            await self.db.execute(
+                update(Chart).where(Chart.id == db_obj.id).values(**update_data)
+            )
+            await self.db.commit()
+            await self.db.refresh(db_obj) # Refresh the original object
         return db_obj
 
     async def remove(self, *, id: UUID) -> Optional[Chart]:
         obj = await self.get(id=id)
         if obj:
-            await self.db.execute(delete(Chart).where(Chart.id == id))
-            await self.db.commit()
+            with phase("db"):
+                await self.db.execute(delete(Chart).where(Chart.id == id))
+                await self.db.commit()
             return obj
         return None
 
-    async def get_astrological_subject(self, chart_db: Chart, db: AsyncSession) -> Optional[_AstrologicalSubject]:
+    async def get_position_population(
+        self, *, user_id: Optional[UUID] = None, opt_in_only: bool = False, exclude_id: Optional[UUID] = None
+    ) -> List[Any]:
+        """
+        (id, name, positions) rows for every chart with a cached position set,
+        restricted to one owner and/or to charts that opted in to rankings.
+        """
+        query = select(Chart.id, Chart.name, Chart.positions).filter(Chart.positions.is_not(None))
+        if user_id is not None:
+            query = query.filter(Chart.user_id == user_id)
+        if opt_in_only:
+            query = query.filter(Chart.compatibility_opt_in.is_(True))
+        if exclude_id is not None:
+            query = query.filter(Chart.id != exclude_id)
+        with phase("db"):
+            result = await self.db.execute(query)
+        return result.all()
+
+    async def get_coordinates(self, chart_db: Chart) -> Tuple[Optional[float], Optional[float]]:
+        """Stored coordinates of the chart, falling back to geocoding its city."""
+        if chart_db.latitude is not None and chart_db.longitude is not None:
+            return chart_db.latitude, chart_db.longitude
+        return await get_coordinates_for_city(chart_db.city, self.db)
+
+    async def get_position_set(self, chart_db: Chart) -> Optional[Dict[str, Any]]:
+        """
+        Returns the chart's position set (see app/services/positions.py).
+        Served from the cached column when it matches the chart's current birth
+        data and engine version; otherwise built, stored and returned.
+        """
+        return (await self.get_position_sets([chart_db]))[0]
+
+    async def get_position_sets(
+        self,
+        charts: List[Chart],
+        coordinates: Optional[List[Tuple[Optional[float], Optional[float]]]] = None,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Position sets for several charts at once (None for charts that fail).
+        Missing coordinates are geocoded concurrently, stale position sets are
+        built on the calculation pool (one subject at a time under
+        swisseph_lock) and stored in one commit.
+        """
+        if coordinates is None:
+            coordinates = await asyncio.gather(*(self.get_coordinates(chart_db) for chart_db in charts))
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(charts)
+        stale = []
+        for i, (chart_db, (latitude, longitude)) in enumerate(zip(charts, coordinates)):
+            if latitude is None or longitude is None:
+                logger.error(f"Could not geocode city {chart_db.city} for chart ID {chart_db.id}. Cannot build position set.")
+                continue
+            content_hash = chart_content_hash(chart_db.birth_datetime, latitude, longitude)
+            if is_position_set_current(chart_db.positions, chart_db.content_hash, content_hash):
+                results[i] = chart_db.positions
+            else:
+                stale.append((i, content_hash, latitude, longitude))
+
+        if not stale:
+            return results
+
+        # Wall time of the builds; the per-build phases inside add up separately
+        with phase("positions"):
+            built = await asyncio.gather(
+                *(
+                    run_calculation(build_position_set, charts[i].name, charts[i].birth_datetime, charts[i].city, latitude, longitude)
+                    for i, _, latitude, longitude in stale
+                ),
+                return_exceptions=True,
+            )
+        stored = []
+        for (i, content_hash, _, _), positions in zip(stale, built):
+            if isinstance(positions, ValueError):
+                logger.error(f"Could not build position set for chart ID {charts[i].id}: {positions}")
+                continue
+            if isinstance(positions, BaseException):
+                raise positions
+            results[i] = positions
+            stored.append((charts[i], positions, content_hash))
+            # Filling the cache is not an edit: keep updated_at as it was
+            with phase("db"):
+                await self.db.execute(
+                    update(Chart)
+                    .where(Chart.id == charts[i].id)
+                    .values(positions=positions, content_hash=content_hash, updated_at=Chart.updated_at)
+                )
+        if stored:
+            with phase("db"):
+                await self.db.commit()
+            for chart_db, positions, content_hash in stored:
+                set_committed_value(chart_db, "positions", positions)
+                set_committed_value(chart_db, "content_hash", content_hash)
+        return results
+
+    async def get_astrological_subject(self, chart_db: Chart, db: AsyncSession) -> Optional["astrology.AstrologicalSubject"]:
         """
         Converts a Chart database model object into a Kerykeion AstrologicalSubject instance.
         Uses latitude and longitude from the chart_db if available, otherwise fetches them.
         """
-        if not KERYKEION_AVAILABLE or not _AstrologicalSubject:
+        if not astrology._ensure_kerykeion():
             logger.error("Kerykeion library or AstrologicalSubject is not available. Cannot create subject.")
             return None
 
@@ -153,21 +273,22 @@ class CRUDChart:
             # The Chart model stores naive UTC datetime.
             naive_birth_dt = chart_db.birth_datetime # Assuming it's already naive UTC as per previous CRUD logic
 
-            subject = _AstrologicalSubject(
-                name=chart_db.name,
-                year=naive_birth_dt.year,
-                month=naive_birth_dt.month,
-                day=naive_birth_dt.day,
-                hour=naive_birth_dt.hour,
-                minute=naive_birth_dt.minute,
-                city=chart_db.city,
-                lat=latitude, # Use fetched or existing latitude
-                lon=longitude # Use fetched or existing longitude
-                # nation and sex are optional in Kerykeion
-            )
+            with swisseph_lock:
+                subject = astrology._AstrologicalSubject(
+                    name=chart_db.name,
+                    year=naive_birth_dt.year,
+                    month=naive_birth_dt.month,
+                    day=naive_birth_dt.day,
+                    hour=naive_birth_dt.hour,
+                    minute=naive_birth_dt.minute,
+                    city=chart_db.city,
+                    lat=latitude, # Use fetched or existing latitude
+                    lon=longitude # Use fetched or existing longitude
+                    # nation and sex are optional in Kerykeion
+                )
             logger.info(f"Successfully created AstrologicalSubject for {chart_db.name} (ID: {chart_db.id})")
             return subject
-        except _KerykeionException as ke:
+        except astrology.KERYKEION_ERRORS as ke:
             logger.error(f"KerykeionException creating AstrologicalSubject for {chart_db.name} (ID: {chart_db.id}): {ke}")
             return None
         except Exception as e:
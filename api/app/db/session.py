@@ -1,4 +1,4 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy import create_engine
 from fastapi import Depends
@@ -6,25 +6,47 @@ from fastapi import Depends
 # Need the User model for SQLAlchemyUserDatabase
 from app.models.user import User, OAuthAccount
 from fastapi_users.db import SQLAlchemyUserDatabase
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Optional
 
 from app.core.config import settings
 
 # --- Asynchronous Engine/Session --- 
-async_engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    future=True,
-    pool_pre_ping=True
-)
-
-AsyncSessionLocal = sessionmaker(
-    bind=async_engine,
-    class_=AsyncSession,
-    expire_on_commit=False,
-    autocommit=False,
-    autoflush=False,
-)
+# Created on first use: creating the engine loads the asyncpg dialect, which
+# `import app.main` does not need (see app/scripts/startup_profile.py)
+_async_engine: Optional[AsyncEngine] = None
+_session_factory: Optional[sessionmaker] = None
+
+
+def get_async_engine() -> AsyncEngine:
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            settings.DATABASE_URL,
+            echo=False,
+            future=True,
+            pool_pre_ping=True
+        )
+    return _async_engine
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """A new session on the application engine; used as `async with AsyncSessionLocal() as db`."""
+    global _session_factory
+    if _session_factory is None:
+        _session_factory = sessionmaker(
+            bind=get_async_engine(),
+            class_=AsyncSession,
+            expire_on_commit=False,
+            autocommit=False,
+            autoflush=False,
+        )
+    return _session_factory()
+
+
+async def dispose_async_engine() -> None:
+    """Closes the pool's connections; a no-op if the engine was never created."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
 
 # --- Dependencies --- 
 
@@ -35,5 +57,5 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
 
 # Optional: Function to create tables based on SQLModel metadata 
 # async def create_db_and_tables():
-#     async with async_engine.begin() as conn:
+#     async with get_async_engine().begin() as conn:
 #         await conn.run_sync(Base.metadata.create_all) # Use SQLAlchemy Base here 
\ No newline at end of file
@@ -1,16 +1,23 @@
+import asyncio
 import uuid
 from fastapi import FastAPI, Request, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 from contextlib import asynccontextmanager
-import sentry_sdk
 from starlette.datastructures import URL
 from starlette.responses import HTMLResponse
 # Removed unused imports
 
 from app.core.config import settings
-from app.db.session import async_engine
+from app.core.timing import PhaseTimingMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.loop_watchdog import loop_watchdog
+from app.core.memory import MemoryAccountingMiddleware, snapshot_periodically, start_memory_tracking, stop_memory_tracking
+from app.core.metrics import flush_periodically, register_pool_events, write_snapshot
+from app.db.session import dispose_async_engine
+from app.services.executor import shutdown_calculation_executor
+from app.services.warmup import warm_up_with_timeout, warmup_state, READY
 
 # Import the fastapi_users instance from its new location
 from app.db.user_manager import fastapi_users
@@ -22,6 +29,11 @@ from app.models.user import UserRead, UserCreate, UserUpdate
 # Import API endpoint routers
 from app.api.v1.endpoints import health
 from app.api.v1.endpoints import charts # <<< REVERTED IMPORT STYLE
+from app.api.v1.endpoints import ephemeris
+from app.api.v1.endpoints import metrics
+from app.api.v1.endpoints import jobs
+from app.api.v1.endpoints import reports
+from app.api.v1.endpoints import admin
 
 # Imports for state/error utils and user manager dep
 from fastapi_users.exceptions import UserAlreadyExists
@@ -36,12 +48,16 @@ async def lifespan(app: FastAPI):
     # --- Sentry Initialization ---
     if settings.SENTRY_DSN:
         print(f"Initializing Sentry for project: {settings.PROJECT_NAME}")
+        # Imported here: the SDK and its integrations take ~0.5s to import
+        import sentry_sdk
+        from sentry_sdk.integrations.fastapi import FastApiIntegration
+        from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
         sentry_sdk.init(
             dsn=str(settings.SENTRY_DSN.get_secret_value()),
             traces_sample_rate=1.0,
             integrations=[
-                sentry_sdk.integrations.fastapi.FastAPIIntegration(),
-                sentry_sdk.integrations.sqlalchemy.SqlalchemyIntegration(),
+                FastApiIntegration(),
+                SqlalchemyIntegration(),
             ],
             environment=settings.ENVIRONMENT,
             release=settings.APP_VERSION,
@@ -51,11 +67,44 @@ async def lifespan(app: FastAPI):
         print("Sentry DSN not found, skipping Sentry initialization.")
     # --- End Sentry ---
 
+    metrics_flusher = None
+    if settings.METRICS_ENABLED:
+        register_pool_events()
+        if settings.METRICS_MULTIPROC_DIR:
+            metrics_flusher = asyncio.create_task(flush_periodically())
+
+    if settings.LOOP_WATCHDOG_ENABLED:
+        loop_watchdog.start()
+
+    memory_snapshots = None
+    if settings.MEMORY_TRACKING_ENABLED:
+        start_memory_tracking()
+        memory_snapshots = asyncio.create_task(snapshot_periodically())
+
+    # Warm up in the background: the server starts answering (liveness) at
+    # once, while /health/ready reports 503 until the warm-up has finished
+    warm_up_task = None
+    if settings.WARMUP_ENABLED:
+        warm_up_task = asyncio.create_task(warm_up_with_timeout(warmup_state))
+    else:
+        warmup_state.status = READY
+
     yield
     # Shutdown logic
     print("Shutting down...")
-    await async_engine.dispose()
+    if warm_up_task is not None and not warm_up_task.done():
+        warm_up_task.cancel()
+    if memory_snapshots is not None:
+        memory_snapshots.cancel()
+        stop_memory_tracking()
+    if loop_watchdog.running:
+        loop_watchdog.stop()
+    if metrics_flusher is not None:
+        metrics_flusher.cancel()
+        write_snapshot()
+    await dispose_async_engine()
     print("Database connection pool closed.")
+    shutdown_calculation_executor()
 
 # Create FastAPI app instance
 app = FastAPI(
@@ -67,6 +116,19 @@ app = FastAPI(
 # Add ProxyHeadersMiddleware
 app.add_middleware(ProxyHeadersMiddleware, trusted_hosts=["*"])
 
+# On-demand profiling of requests carrying an admin-issued token (added first:
+# it runs inside the phase timing middleware and shares its recorder)
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, header=settings.PROFILE_HEADER)
+
+# Opt-in tracemalloc accounting per request and phase (also inside phase timing)
+if settings.MEMORY_TRACKING_ENABLED:
+    app.add_middleware(MemoryAccountingMiddleware, log_peak_mb=settings.MEMORY_LOG_PEAK_MB)
+
+# Per-request phase timers (Server-Timing header, per-phase histograms)
+if settings.PHASE_TIMING_ENABLED:
+    app.add_middleware(PhaseTimingMiddleware, emit_header=settings.SERVER_TIMING_HEADER)
+
 # Set all CORS enabled origins
 if settings.BACKEND_CORS_ORIGINS:
     app.add_middleware(
@@ -79,6 +141,8 @@ if settings.BACKEND_CORS_ORIGINS:
 
 # --- API Routers ---
 app.include_router(health.router, prefix="/api/v1", tags=["Health Check"])
+if settings.METRICS_ENABLED:
+    app.include_router(metrics.router, tags=["Metrics"])
 
 # Include FastAPI Users authentication routes (JWT and cookie)
 app.include_router(
@@ -161,6 +225,34 @@ app.include_router(
     tags=["Charts"],
 )
 
+# Ephemeris series (JSON, MessagePack or Arrow by content negotiation)
+app.include_router(
+    ephemeris.router,
+    prefix="/api/v1/ephemeris",
+    tags=["Ephemeris"],
+)
+
+# Background jobs: submission, status/progress and results
+app.include_router(
+    jobs.router,
+    prefix="/api/v1/jobs",
+    tags=["Jobs"],
+)
+
+# PDF chart reports (built by the job worker, downloaded here)
+app.include_router(
+    reports.router,
+    prefix="/api/v1/reports",
+    tags=["Reports"],
+)
+
+# Admin tools: on-demand request profiling, memory accounting
+app.include_router(
+    admin.router,
+    prefix="/api/v1/admin",
+    tags=["Admin"],
+)
+
 # Include FastAPI Users user management routes (e.g., /users/me)
 app.include_router(
     fastapi_users.get_users_router(UserRead, UserUpdate),
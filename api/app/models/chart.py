@@ -1,10 +1,10 @@
 # /app/models/chart.py
-from sqlalchemy import Column, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, String, DateTime, Float, ForeignKey, JSON, Boolean
 from sqlalchemy.dialects.postgresql import UUID as SQLAlchemyUUID
 from sqlalchemy.orm import relationship
 from uuid import uuid4
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Dict, Any
 from uuid import UUID # Need UUID type hint
 
 # Import the Base from the correct location
@@ -22,6 +22,11 @@ class Chart(Base):
     latitude: Optional[float] = Column(Float, nullable=True)
     longitude: Optional[float] = Column(Float, nullable=True)
     user_id: UUID = Column(SQLAlchemyUUID(as_uuid=True), ForeignKey("user.id"), index=True, nullable=False)
+    # Opt-in to appear in compatibility rankings of other users' charts
+    compatibility_opt_in: bool = Column(Boolean, default=False, server_default="false", index=True, nullable=False)
+    # Cached position set (see app/services/positions.py) and the content hash it was computed from
+    positions: Optional[Dict[str, Any]] = Column(JSON, nullable=True)
+    content_hash: Optional[str] = Column(String(64), index=True, nullable=True)
     created_at: datetime = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at: datetime = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
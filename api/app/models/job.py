@@ -0,0 +1,38 @@
+# /app/models/job.py
+from sqlalchemy import Column, String, DateTime, Float, ForeignKey, Integer, JSON, Text, Index
+from sqlalchemy.dialects.postgresql import UUID as SQLAlchemyUUID
+from uuid import uuid4, UUID
+from datetime import datetime
+from typing import Optional, Dict, Any
+
+from app.db.base import Base
+
+class Job(Base):
+    """Durable background job (see app/services/job_queue.py)."""
+    __tablename__ = "job"
+    __table_args__ = (
+        # The claim query: queued jobs that are due, highest priority first
+        Index("ix_job_claim", "status", "priority", "run_after"),
+    )
+
+    id: UUID = Column(SQLAlchemyUUID(as_uuid=True), primary_key=True, default=uuid4)
+    kind: str = Column(String(64), index=True, nullable=False)
+    # queued, running, succeeded, failed, cancelled
+    status: str = Column(String(16), nullable=False, default="queued")
+    user_id: Optional[UUID] = Column(SQLAlchemyUUID(as_uuid=True), ForeignKey("user.id", ondelete="CASCADE"), index=True, nullable=True)
+    payload: Dict[str, Any] = Column(JSON, nullable=False, default=dict)
+    result: Optional[Dict[str, Any]] = Column(JSON, nullable=True)
+    error: Optional[str] = Column(Text, nullable=True)
+    priority: int = Column(Integer, nullable=False, default=0)
+    attempts: int = Column(Integer, nullable=False, default=0)
+    max_attempts: int = Column(Integer, nullable=False, default=3)
+    progress: float = Column(Float, nullable=False, default=0.0)
+    progress_message: Optional[str] = Column(String, nullable=True)
+    # Not claimable before this time (delayed jobs, retry backoff)
+    run_after: datetime = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Worker holding the job and its last heartbeat; a stale heartbeat means the worker died
+    locked_by: Optional[str] = Column(String, nullable=True)
+    locked_at: Optional[datetime] = Column(DateTime, nullable=True)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at: Optional[datetime] = Column(DateTime, nullable=True)
+    finished_at: Optional[datetime] = Column(DateTime, nullable=True)
@@ -0,0 +1,20 @@
+# /app/models/pair_result.py
+from sqlalchemy import Column, String, DateTime, JSON
+from datetime import datetime
+from typing import Dict, Any
+
+from app.db.base import Base
+
+class PairResult(Base):
+    """Persistent tier of the pair result cache (see app/services/pair_cache.py)."""
+    __tablename__ = "pair_result"
+
+    # "<kind>:<variant>:<engine_version>:<low hash>:<high hash>"
+    key: str = Column(String, primary_key=True)
+    hash_low: str = Column(String(64), index=True, nullable=False)
+    hash_high: str = Column(String(64), index=True, nullable=False)
+    kind: str = Column(String(32), nullable=False)
+    engine_version: str = Column(String, nullable=False)
+    # Stored in canonical orientation: the chart with hash_low is chart 1
+    result: Dict[str, Any] = Column(JSON, nullable=False)
+    created_at: datetime = Column(DateTime, default=datetime.utcnow, nullable=False)
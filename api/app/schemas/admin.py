@@ -0,0 +1,23 @@
+# /app/schemas/admin.py
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ProfileTokenRead(BaseModel):
+    """Send `token` in the `header` header to profile a request until `expires_at`."""
+    token: str
+    header: str
+    expires_at: datetime
+
+
+class ProfileSummary(BaseModel):
+    id: str
+    created: str
+    method: str
+    path: str
+    status: Optional[int] = None
+    duration_ms: Optional[float] = None
+    samples: int
+    query_count: int
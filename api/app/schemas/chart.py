@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field, ConfigDict # Import ConfigDict
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, field_validator # Import ConfigDict
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 from uuid import UUID
 from sqlalchemy import Column, String, DateTime, Float, ForeignKey
@@ -50,12 +50,25 @@ class NatalChartInfo(BaseModel):
     kerykeion_sun_sign: Optional[str] = None
     kerykeion_asc_sign: Optional[str] = None
 
+class NatalPlanet(BaseModel):
+    """A planet or point as NatalChartCalculator returns it (the shape the web client reads)."""
+    name: str
+    sign: str
+    sign_symbol: Optional[str] = None
+    longitude: float # 0-360 degrees
+    deg_within_sign: Optional[float] = None
+    is_retrograde: Optional[bool] = False
+    dignity: Optional[str] = None # Only with the "dignities" section
+
 class NatalChartData(BaseModel):
     """Pydantic model for the response of the /natal/calculate endpoint."""
     info: NatalChartInfo
-    planets: Dict[str, CelestialBody]
-    houses: List[HouseCusp]
-    aspects: List[Aspect]
+    # None when the section was not requested (?sections=...)
+    planets: Optional[Dict[str, NatalPlanet]] = None
+    houses: Optional[List[HouseCusp]] = None
+    aspects: Optional[List[Aspect]] = None
+    element_counts: Optional[Dict[str, int]] = None # e.g. {"Fire": 3, "Earth": 2, ...}
+    mode_counts: Optional[Dict[str, int]] = None # e.g. {"Cardinal": 4, "Fixed": 3, ...}
     calculation_error: Optional[str] = None
 # <<< End definition >>>
 
@@ -65,6 +78,7 @@ class ChartBase(BaseModel):
     birth_datetime: datetime
     city: str
     location_name: Optional[str] = None # Optional as it might be derived or detailed
+    compatibility_opt_in: bool = False # Appear in other users' compatibility rankings
 
 # Schema for creating a chart (inherits required fields from Base)
 class ChartCreate(ChartBase):
@@ -82,6 +96,12 @@ class ChartRead(ChartBase):
     # Add model_config here if ChartRead itself needs ORM mode
     model_config = ConfigDict(from_attributes=True) # Pydantic v2 equivalent of orm_mode
 
+    @field_validator("compatibility_opt_in", mode="before")
+    @classmethod
+    def _opt_in_default(cls, value: Optional[bool]) -> bool:
+        # Unflushed Chart objects have no column default applied yet
+        return False if value is None else value
+
 # Add ChartDisplay which is used by CRUD endpoints (can inherit from ChartRead)
 class ChartDisplay(ChartRead):
     """Schema for displaying chart data in API responses (CRUD)."""
@@ -173,6 +193,7 @@ class CalculateSynastryByIdRequest(BaseModel): # Renamed from CalculateSynastryR
 class CalculateCompositeByIdRequest(BaseModel):
     chart1_id: UUID
     chart2_id: UUID
+    method: Literal["midpoint", "davison"] = Field("midpoint", description="'midpoint': composite of natal midpoints; 'davison': chart for the time/space midpoint")
 
 # Reusable input for one person's data for synastry/composite by data
 class SynastryCompositePersonInput(BaseModel):
@@ -195,6 +216,7 @@ class CalculateSynastryByDataRequest(BaseModel):
 class CalculateCompositeByDataRequest(BaseModel):
     person1_data: SynastryCompositePersonInput
     person2_data: SynastryCompositePersonInput
+    method: Literal["midpoint", "davison"] = Field("midpoint", description="'midpoint': composite of natal midpoints; 'davison': chart for the time/space midpoint")
 
 class SynastryAspect(BaseModel):
     planet1: str  # Name of the planet/point in the first chart
@@ -213,6 +235,52 @@ class SynastryResult(BaseModel):
     # chart2_details: Optional[NatalChartData] = None
     calculation_error: Optional[str] = None
 
+# --- Group Synastry Models ---
+
+class CalculateGroupSynastryRequest(BaseModel):
+    """All-pairs synastry for a family/team report."""
+    chart_ids: List[UUID] = Field(..., min_length=2)
+    aspect_weights: Optional[Dict[str, float]] = Field(None, description="Override scoring weight per aspect name, e.g. {\"Square\": -3}")
+
+class GroupSynastryMember(BaseModel):
+    chart_id: UUID
+    name: str
+
+class GroupSynastryPair(BaseModel):
+    chart1_id: UUID
+    chart2_id: UUID
+    chart1_name: str
+    chart2_name: str
+    aspects: List[SynastryAspect] # planet1 belongs to chart1, planet2 to chart2
+    score: float # Weighted compatibility score (positive = harmonious)
+
+class GroupSynastryResult(BaseModel):
+    members: List[GroupSynastryMember]
+    pairs: List[GroupSynastryPair] # Upper triangle of the synastry matrix, in members order
+    calculation_error: Optional[str] = None
+
+# --- Compatibility Ranking Models ---
+
+class CompatibilityRankingRequest(BaseModel):
+    """Rank a population of charts by synastry compatibility with one chart."""
+    scope: Literal["user", "opt_in"] = Field("user", description="'user': the chart owner's saved charts; 'opt_in': all charts that opted in")
+    limit: int = Field(20, ge=1, le=500)
+    aspect_weights: Optional[Dict[str, float]] = None
+    prefilter: Optional[bool] = Field(None, description="Use the approximate key-point prefilter; defaults to on for large populations")
+
+class CompatibilityMatch(BaseModel):
+    chart_id: UUID
+    name: str
+    score: float
+
+class CompatibilityRankingResult(BaseModel):
+    chart_id: UUID
+    scope: str
+    population_size: int
+    candidates_scored: int
+    prefiltered: bool
+    matches: List[CompatibilityMatch] # Best first
+
 # Model for Composite Chart data (similar to NatalChartData)
 class CompositeChartData(BaseModel):
     info: NatalChartInfo # Can store names of the two people or a generic "Composite of X and Y"
@@ -236,6 +304,7 @@ class ChartUpdate(BaseModel):
     birth_datetime: Optional[datetime] = None
     city: Optional[str] = None
     location_name: Optional[str] = None
+    compatibility_opt_in: Optional[bool] = None
     # user_id should generally not be updatable
     user_id: Optional[UUID] = Field(default=None, exclude=True) # Exclude from update payload
 
@@ -245,3 +314,9 @@ class TransitCalculationRequest(BaseModel):
     transit_day: int
     transit_hour: int
     transit_minute: int
+
+class TransitStreamRequest(BaseModel):
+    """Message sent by the client over the transit WebSocket for each slider position."""
+    transit_datetime: datetime
+    request_id: Optional[int] = None # Echoed back on the frame that answers it
+    resync: bool = False # Ask for a full frame instead of a delta
@@ -0,0 +1,35 @@
+# /app/schemas/job.py
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, Dict, Any
+from uuid import UUID
+from datetime import datetime
+
+
+class JobCreate(BaseModel):
+    kind: str = Field(..., description="Job kind; GET /jobs/kinds lists the ones users may submit")
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    priority: int = Field(default=0, ge=-10, le=10, description="Positive values are honoured for superusers only")
+
+
+class JobRead(BaseModel):
+    """Status of a job; the result is served separately by GET /jobs/{id}/result."""
+    id: UUID
+    kind: str
+    status: str
+    progress: float
+    progress_message: Optional[str] = None
+    attempts: int
+    max_attempts: int
+    error: Optional[str] = None
+    run_after: datetime
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
+
+class JobResult(BaseModel):
+    id: UUID
+    kind: str
+    status: str
+    result: Dict[str, Any]
@@ -0,0 +1,11 @@
+# /app/schemas/report.py
+from pydantic import BaseModel, Field
+from typing import List
+from uuid import UUID
+
+
+class ReportCreate(BaseModel):
+    """One chart or a batch; each chart gets its own PDF."""
+    chart_ids: List[UUID] = Field(..., min_length=1)
+    # Email the links when the reports are ready
+    notify: bool = True
@@ -0,0 +1,370 @@
+# /app/scripts/accuracy.py
+"""
+Accuracy of the fast calculation engines against Kerykeion, on random charts.
+
+    python app/scripts/accuracy.py                             # 10000 charts, every engine
+    python app/scripts/accuracy.py --samples 50000 --workers 8
+    python app/scripts/accuracy.py --only ephemeris --check    # exit 1 beyond --tolerance-arcsec
+    python app/scripts/accuracy.py --json > accuracy.json
+
+Birth instants (UTC) and places are drawn from random.Random(--seed) across
+--start-year..--end-year (default: the range of Kerykeion's bundled
+ephemeris) and latitudes up to --max-latitude (Placidus is undefined inside
+the polar circles). For every sample the reference is a Kerykeion
+AstrologicalSubject and its NatalAspects; each engine in ENGINES computes
+what it covers for the same instant and place.
+
+Reported per engine: the angular error per body and house cusp (max, mean,
+p50/p95/p99, in arcseconds) and the aspects on which the two disagree.
+Aspects are matched with the in-tree rule (|separation - angle| <= orb, as in
+synastry_engine) against Kerykeion's own aspect table and active points, so
+a disagreement is a difference in positions or in the matching rule, never in
+configuration. Only pairs of points the engine computes are compared.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.scripts.benchmark import DEFAULT_SEED, environment, percentile
+from app.services.composite_engine import _AXIS_PAIRS
+
+# The bundled asteroid ephemeris (Chiron) covers 1800-2399
+DEFAULT_START_YEAR = 1800
+DEFAULT_END_YEAR = 2399
+DEFAULT_MAX_LATITUDE = 66.0
+DEFAULT_TOLERANCE_ARCSEC = 1.0
+MAX_FAILURE_MESSAGES = 5
+
+
+# --- Samples ---
+
+@dataclass(frozen=True)
+class Sample:
+    index: int
+    moment: datetime # UTC
+    latitude: float
+    longitude: float
+
+
+def random_samples(
+    seed: int, count: int, start_year: int = DEFAULT_START_YEAR, end_year: int = DEFAULT_END_YEAR,
+    max_latitude: float = DEFAULT_MAX_LATITUDE,
+) -> List[Sample]:
+    rng = random.Random(seed)
+    start = datetime(start_year, 1, 1, tzinfo=timezone.utc)
+    minutes = int((datetime(end_year + 1, 1, 1, tzinfo=timezone.utc) - start).total_seconds() // 60)
+    return [
+        Sample(
+            index=i,
+            moment=start + timedelta(minutes=rng.randrange(minutes)),
+            latitude=round(rng.uniform(-max_latitude, max_latitude), 4),
+            longitude=round(rng.uniform(-180.0, 180.0), 4),
+        )
+        for i in range(count)
+    ]
+
+
+# --- Reference ---
+
+def reference_chart(sample: Sample) -> Dict[str, Any]:
+    """
+    Kerykeion's positions, houses and natal aspects for a sample, plus the
+    aspect table and active points it matched them with.
+    """
+    from app.services import astrology
+    from app.services.positions import extract_position_set
+
+    if not astrology._ensure_kerykeion():
+        raise RuntimeError("Kerykeion is not available.")
+    moment = sample.moment
+    subject = astrology.AstrologicalSubject(
+        name=f"Sample {sample.index}", year=moment.year, month=moment.month, day=moment.day,
+        hour=moment.hour, minute=moment.minute, city="Sample", lng=sample.longitude, lat=sample.latitude,
+        tz_str="UTC", online=False,
+    )
+    natal_aspects = astrology.NatalAspects(subject)
+    # all_aspects, not relevant_aspects: the latter only drops wide aspects to the angles afterwards
+    aspects = {
+        frozenset((aspect.p1_name, aspect.p2_name)): aspect.aspect
+        for aspect in natal_aspects.all_aspects
+    }
+    table = [(entry["name"], float(entry["degree"]), float(entry["orb"])) for entry in natal_aspects.aspects_settings]
+    active = [point if isinstance(point, str) else point.get("name") for point in natal_aspects.active_points]
+    return {**extract_position_set(subject), "aspects": aspects, "aspect_table": table, "active_points": active}
+
+
+def angular_error(value: float, reference: float) -> float:
+    """Smallest absolute difference between two longitudes, in degrees."""
+    diff = abs(value - reference) % 360.0
+    return min(diff, 360.0 - diff)
+
+
+def match_aspects(points: Dict[str, float], table: Sequence[Tuple[str, float, float]]) -> Dict[frozenset, str]:
+    """Aspects between every pair of points: the first (name, angle, orb) in `table` the separation is within."""
+    import numpy as np
+    from app.services.synastry_engine import angular_separation
+
+    names = list(points)
+    if len(names) < 2:
+        return {}
+    lons = np.array([points[name] for name in names], dtype=np.float64)
+    separation = angular_separation(lons[:, None], lons[None, :])
+    angles = np.array([angle for _, angle, _ in table], dtype=np.float64)
+    orbs = np.array([orb for _, _, orb in table], dtype=np.float64)
+    within = np.abs(separation[..., None] - angles) <= orbs
+    has_aspect = within.any(axis=-1)
+    first = within.argmax(axis=-1)
+    i_idx, j_idx = np.nonzero(np.triu(has_aspect, k=1))
+    return {
+        frozenset((names[i], names[j])): table[first[i, j]][0]
+        for i, j in zip(i_idx.tolist(), j_idx.tolist())
+    }
+
+
+# --- Engines ---
+
+# name -> function(sample, reference) returning {"points": {...}, "houses": [...]} for what the engine computes
+ENGINES: Dict[str, Callable[[Sample, Dict[str, Any]], Dict[str, Any]]] = {}
+
+
+def engine(name: str):
+    def decorator(func):
+        ENGINES[name] = func
+        return func
+    return decorator
+
+
+@engine("ephemeris")
+def _ephemeris(sample, reference):
+    """Direct swisseph longitudes (app/services/ephemeris.py), as served by the series endpoints."""
+    from app.services.ephemeris import ephemeris_series
+
+    series = ephemeris_series(sample.moment, sample.moment, timedelta(days=1))
+    return {"points": dict(zip(series["bodies"], series["longitudes"][0].tolist()))}
+
+
+@engine("reference_place_houses")
+def _reference_place_houses(sample, reference):
+    """
+    Cusps and Ascendant from the MC and latitude (composite_engine.houses_from_mc,
+    the midpoint composite's method), given Kerykeion's MC.
+    """
+    from app.services.composite_engine import houses_from_mc, mean_obliquity
+
+    cusps, ascendant = houses_from_mc(reference["points"]["Medium_Coeli"], sample.latitude, mean_obliquity(sample.moment))
+    return {"points": {"Ascendant": ascendant}, "houses": cusps}
+
+
+@engine("aspect_matcher")
+def _aspect_matcher(sample, reference):
+    """The in-tree aspect rule on Kerykeion's own positions: isolates matching differences from position errors."""
+    return {"points": dict(reference["points"])}
+
+
+# --- Evaluation ---
+
+def evaluate(sample: Sample, names: Sequence[str]) -> Dict[str, Any]:
+    """Errors and aspect disagreements of each engine on one sample."""
+    try:
+        reference = reference_chart(sample)
+    except Exception as e:
+        return {"sample": sample.index, "reference_error": f"{type(e).__name__}: {e}"}
+
+    results: Dict[str, Any] = {}
+    active = set(reference["active_points"])
+    for name in names:
+        try:
+            computed = ENGINES[name](sample, reference)
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        errors = {
+            body: angular_error(value, reference["points"][body])
+            for body, value in computed.get("points", {}).items()
+            if body in reference["points"]
+        }
+        for cusp, (value, expected) in enumerate(zip(computed.get("houses") or [], reference["houses"]), start=1):
+            errors[f"House_{cusp}"] = angular_error(value, expected)
+
+        compared = {body: value for body, value in computed.get("points", {}).items() if body in active}
+        engine_aspects = match_aspects(compared, reference["aspect_table"])
+        disagreements = []
+        for pair in set(engine_aspects) | set(reference["aspects"]):
+            if not pair <= compared.keys() or pair in _AXIS_PAIRS: # Kerykeion skips the axes too
+                continue
+            expected, found = reference["aspects"].get(pair), engine_aspects.get(pair)
+            if expected != found:
+                first, second = sorted(pair)
+                disagreements.append({
+                    "sample": sample.index,
+                    "moment": sample.moment.isoformat(),
+                    "latitude": sample.latitude,
+                    "longitude": sample.longitude,
+                    "points": [first, second],
+                    "kerykeion": expected,
+                    "engine": found,
+                    "separation": round(angular_error(compared[first], compared[second]), 6),
+                    "kerykeion_separation": round(angular_error(reference["points"][first], reference["points"][second]), 6),
+                })
+        pairs = len(compared) * (len(compared) - 1) // 2 - sum(pair <= compared.keys() for pair in _AXIS_PAIRS)
+        results[name] = {"errors": errors, "aspect_pairs": pairs, "disagreements": disagreements}
+    return {"sample": sample.index, "engines": results}
+
+
+def _evaluate_chunk(chunk: Sequence[Sample], names: Sequence[str]) -> List[Dict[str, Any]]:
+    logging.disable(logging.WARNING) # The services log per subject; millions of lines are not the point
+    return [evaluate(sample, names) for sample in chunk]
+
+
+def _error_stats(errors_deg: List[float]) -> Dict[str, float]:
+    values = sorted(error * 3600.0 for error in errors_deg)
+    return {
+        "count": len(values),
+        "max_arcsec": values[-1],
+        "mean_arcsec": sum(values) / len(values),
+        "p50_arcsec": percentile(values, 50),
+        "p95_arcsec": percentile(values, 95),
+        "p99_arcsec": percentile(values, 99),
+    }
+
+
+def aggregate(evaluations: Sequence[Dict[str, Any]], names: Sequence[str], max_disagreements: int) -> Dict[str, Any]:
+    """Per-engine error statistics per body and the (first `max_disagreements`) disagreeing aspects."""
+    reference_failures = [e for e in evaluations if "reference_error" in e]
+    report: Dict[str, Any] = {}
+    for name in names:
+        per_body: Dict[str, List[float]] = {}
+        disagreements: List[Dict[str, Any]] = []
+        failures: List[str] = []
+        failure_count = aspect_pairs = disagreement_count = 0
+        for evaluation in evaluations:
+            result = evaluation.get("engines", {}).get(name)
+            if result is None:
+                continue
+            if "error" in result:
+                failure_count += 1
+                if len(failures) < MAX_FAILURE_MESSAGES:
+                    failures.append(f"sample {evaluation['sample']}: {result['error']}")
+                continue
+            for body, error in result["errors"].items():
+                per_body.setdefault(body, []).append(error)
+            aspect_pairs += result["aspect_pairs"]
+            disagreement_count += len(result["disagreements"])
+            disagreements.extend(result["disagreements"][:max(0, max_disagreements - len(disagreements))])
+        bodies = {body: _error_stats(errors) for body, errors in per_body.items()}
+        report[name] = {
+            "description": " ".join((ENGINES[name].__doc__ or "").split()),
+            "failures": failure_count,
+            "failure_examples": failures,
+            "max_error_arcsec": max((stats["max_arcsec"] for stats in bodies.values()), default=None),
+            "bodies": bodies,
+            "aspect_pairs": aspect_pairs,
+            "aspect_disagreements": disagreement_count,
+            "disagreements": disagreements,
+        }
+    return {
+        "samples": len(evaluations),
+        "reference_failures": len(reference_failures),
+        "reference_failure_examples": [e["reference_error"] for e in reference_failures[:MAX_FAILURE_MESSAGES]],
+        "engines": report,
+    }
+
+
+def run(samples: Sequence[Sample], names: Sequence[str], workers: int, max_disagreements: int) -> Dict[str, Any]:
+    if workers <= 1:
+        evaluations = _evaluate_chunk(samples, names)
+    else:
+        size = max(1, min(500, len(samples) // (workers * 4) or 1))
+        chunks = [samples[i:i + size] for i in range(0, len(samples), size)]
+        evaluations = []
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for chunk_result in pool.map(_evaluate_chunk, chunks, [names] * len(chunks)):
+                evaluations.extend(chunk_result)
+    return aggregate(evaluations, names, max_disagreements)
+
+
+def failed_engines(report: Dict[str, Any], tolerance_arcsec: float) -> List[str]:
+    """Engines with failures, aspect disagreements or an error beyond the tolerance."""
+    return [
+        name for name, result in report["engines"].items()
+        if result["failures"] or result["aspect_disagreements"]
+        or (result["max_error_arcsec"] or 0.0) > tolerance_arcsec
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=None, help=f"comma-separated subset of: {', '.join(ENGINES)}")
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--start-year", type=int, default=DEFAULT_START_YEAR)
+    parser.add_argument("--end-year", type=int, default=DEFAULT_END_YEAR)
+    parser.add_argument("--max-latitude", type=float, default=DEFAULT_MAX_LATITUDE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes evaluating samples")
+    parser.add_argument("--max-disagreements", type=int, default=50, help="disagreeing aspects listed per engine")
+    parser.add_argument("--tolerance-arcsec", type=float, default=DEFAULT_TOLERANCE_ARCSEC)
+    parser.add_argument("--check", action="store_true", help="exit 1 if an engine fails, disagrees or exceeds the tolerance")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.only.split(",")] if args.only else list(ENGINES)
+    unknown = [name for name in names if name not in ENGINES]
+    if unknown:
+        parser.error(f"unknown engines {unknown}; known: {list(ENGINES)}")
+
+    samples = random_samples(args.seed, args.samples, args.start_year, args.end_year, args.max_latitude)
+    report = {
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+        "seed": args.seed,
+        "range": [args.start_year, args.end_year],
+        "max_latitude": args.max_latitude,
+        "environment": environment(),
+        **run(samples, names, args.workers, args.max_disagreements),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(
+            f"{report['samples']} charts {args.start_year}-{args.end_year}, |lat| <= {args.max_latitude}, seed {args.seed} "
+            f"({report['environment']['engine_version']}); {report['reference_failures']} reference failures"
+        )
+        for name, result in report["engines"].items():
+            print(f"\n{name}: {result['description']}")
+            print(f"  failures {result['failures']}, aspect disagreements {result['aspect_disagreements']} of {result['aspect_pairs']} pairs")
+            if result["bodies"]:
+                print(f"  {'body':<16} {'max':>10} {'mean':>10} {'p50':>10} {'p95':>10} {'p99':>10} (arcsec)")
+            for body, stats in result["bodies"].items():
+                print(
+                    f"  {body:<16} {stats['max_arcsec']:>10.4f} {stats['mean_arcsec']:>10.4f} {stats['p50_arcsec']:>10.4f} "
+                    f"{stats['p95_arcsec']:>10.4f} {stats['p99_arcsec']:>10.4f}"
+                )
+            for entry in result["disagreements"][:10]:
+                print(
+                    f"  sample {entry['sample']} {entry['moment']}: {'-'.join(entry['points'])} "
+                    f"kerykeion={entry['kerykeion']} engine={entry['engine']} at {entry['kerykeion_separation']:.4f} deg"
+                )
+            for failure in result["failure_examples"]:
+                print(f"  FAILED {failure}")
+
+    failed = failed_engines(report, args.tolerance_arcsec)
+    if failed:
+        print(f"Engines not matching Kerykeion within {args.tolerance_arcsec} arcsec: {', '.join(failed)}", file=sys.stderr)
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,353 @@
+# /app/scripts/benchmark.py
+"""
+Microbenchmarks for the astrology service hot paths, on fixed seeded inputs.
+
+    python app/scripts/benchmark.py                      # run all, compare with the baseline
+    python app/scripts/benchmark.py --only natal_subject,timezone_at
+    python app/scripts/benchmark.py --save-baseline      # record the current numbers as the baseline
+    python app/scripts/benchmark.py --check              # exit 1 on a regression
+    python app/scripts/benchmark.py --json
+
+Each benchmark runs its operation on a rotating set of inputs drawn from
+random.Random(--seed), so two runs (and two branches) measure the same work.
+Per-call latencies (best of --rounds; operations faster than 0.2 ms are timed
+in batches) give p50/p90/p99 and throughput. A benchmark regresses when
+its p50 is more than --threshold (default 10%, BENCHMARK_REGRESSION_THRESHOLD)
+above the baseline's; baselines are machine-specific, so record one on the
+machine you compare on before and after a change.
+
+Logging below WARNING is switched off while measuring: the services log on
+every call and formatting those lines would otherwise be part of the numbers.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+DEFAULT_BASELINE = project_root / "benchmarks" / "baseline.json"
+DEFAULT_SEED = 20240501
+DEFAULT_THRESHOLD = float(os.environ.get("BENCHMARK_REGRESSION_THRESHOLD", "0.10"))
+# Operations faster than this are timed in batches
+MIN_SAMPLE_NS = 200_000
+
+
+# --- Seeded inputs ---
+
+@dataclass(frozen=True)
+class BirthInput:
+    name: str
+    birth_dt: datetime
+    city: str
+    latitude: float
+    longitude: float
+
+
+def seeded_inputs(seed: int, count: int) -> List[BirthInput]:
+    """Birth data spread over 1900-2030 and the inhabited latitudes."""
+    rng = random.Random(seed)
+    inputs = []
+    for i in range(count):
+        birth_dt = datetime(1900, 1, 1) + timedelta(minutes=rng.randrange(0, 130 * 365 * 24 * 60))
+        inputs.append(BirthInput(
+            name=f"Bench {i}",
+            birth_dt=birth_dt,
+            city=f"City {i}",
+            latitude=round(rng.uniform(-55.0, 65.0), 4),
+            longitude=round(rng.uniform(-180.0, 180.0), 4),
+        ))
+    return inputs
+
+
+# --- Benchmarks ---
+
+# name -> setup(inputs) returning the operation to time, called with the iteration number
+BENCHMARKS: Dict[str, Callable[[List[BirthInput]], Callable[[int], Any]]] = {}
+
+
+def benchmark(name: str):
+    def decorator(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return decorator
+
+
+def _calculator(birth: BirthInput):
+    from app.services.astrology import NatalChartCalculator
+    return NatalChartCalculator(birth.name, birth.birth_dt, birth.city, birth.latitude, birth.longitude)
+
+
+@benchmark("natal_subject")
+def _natal_subject(inputs):
+    """NatalChartCalculator construction: timezone lookup plus the Kerykeion subject."""
+    return lambda i: _calculator(inputs[i % len(inputs)])
+
+
+def _calculate_chart_setup(inputs, sections):
+    calculators = [_calculator(birth) for birth in inputs]
+    loop = asyncio.new_event_loop()
+
+    def run(i):
+        calculator = calculators[i % len(calculators)]
+        calculator._sections = {} # Sections are memoized per instance; measure the work, not the memo
+        return loop.run_until_complete(calculator.calculate_chart(sections))
+    return run
+
+
+@benchmark("calculate_chart")
+def _calculate_chart(inputs):
+    """calculate_chart with every section on prebuilt subjects."""
+    return _calculate_chart_setup(inputs, None)
+
+
+@benchmark("calculate_chart_planets")
+def _calculate_chart_planets(inputs):
+    """calculate_chart(("planets",)), the transit callers' selection."""
+    return _calculate_chart_setup(inputs, ("planets",))
+
+
+@benchmark("calculate_transits")
+def _calculate_transits(inputs):
+    from app.services.astrology import calculate_transits
+    loop = asyncio.new_event_loop()
+    natal = [loop.run_until_complete(_calculator(birth).calculate_chart(("planets",))) for birth in inputs]
+    loop.close()
+    transit_dt = datetime(2024, 3, 20, 12, 0)
+
+    def run(i):
+        birth = inputs[i % len(inputs)]
+        return calculate_transits(natal[i % len(natal)], transit_dt + timedelta(days=i % 365), birth.latitude, birth.longitude)
+    return run
+
+
+def _subject_pairs(inputs):
+    subjects = [_calculator(birth).subject for birth in inputs]
+    return [(subjects[i], subjects[(i + 1) % len(subjects)]) for i in range(len(subjects))]
+
+
+@benchmark("calculate_synastry")
+def _calculate_synastry(inputs):
+    from app.services.astrology import calculate_synastry
+    pairs = _subject_pairs(inputs)
+    return lambda i: calculate_synastry(*pairs[i % len(pairs)])
+
+
+@benchmark("calculate_composite_chart")
+def _calculate_composite_chart(inputs):
+    from app.services.astrology import calculate_composite_chart
+    pairs = _subject_pairs(inputs)
+    return lambda i: calculate_composite_chart(*pairs[i % len(pairs)])
+
+
+@benchmark("timezone_at")
+def _timezone_at(inputs):
+    from app.services.astrology import timezone_at
+    return lambda i: timezone_at(inputs[i % len(inputs)].latitude, inputs[i % len(inputs)].longitude)
+
+
+@benchmark("natal_aspects")
+def _natal_aspects(inputs):
+    """Kerykeion's aspect matching within one chart (the aspects section)."""
+    from app.services import astrology
+    subjects = [_calculator(birth).subject for birth in inputs]
+    return lambda i: astrology.NatalAspects(subjects[i % len(subjects)]).relevant_aspects
+
+
+@benchmark("cross_aspects")
+def _cross_aspects(inputs):
+    """Vectorized aspect matching between two charts (synastry engine)."""
+    from app.services.positions import extract_position_set
+    from app.services.synastry_engine import aspects_from_orbs, cross_aspect_orbs, longitude_matrix
+    lons = longitude_matrix([extract_position_set(_calculator(birth).subject) for birth in inputs])
+    return lambda i: aspects_from_orbs(cross_aspect_orbs(lons[i % len(lons)], lons[(i + 1) % len(lons)]))
+
+
+# --- Measurement ---
+
+def percentile(sorted_values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100) of already sorted values."""
+    if not sorted_values:
+        return float("nan")
+    rank = (len(sorted_values) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(latencies_ns: Sequence[float]) -> Dict[str, float]:
+    """Latency percentiles in milliseconds and throughput in calls per second."""
+    values = sorted(value / 1e6 for value in latencies_ns)
+    total_seconds = sum(latencies_ns) / 1e9
+    return {
+        "iterations": len(values),
+        "mean_ms": sum(values) / len(values),
+        "min_ms": values[0],
+        "p50_ms": percentile(values, 50),
+        "p90_ms": percentile(values, 90),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1],
+        "ops_per_second": len(values) / total_seconds if total_seconds else float("inf"),
+    }
+
+
+def _calibrate(operation: Callable[[int], Any], min_sample_ns: int) -> int:
+    """Calls per timed sample, so that sub-microsecond timer noise does not swamp very fast operations."""
+    calls, started = 0, time.perf_counter_ns()
+    while time.perf_counter_ns() - started < min_sample_ns:
+        operation(calls)
+        calls += 1
+    return max(1, calls)
+
+
+def run_benchmark(name: str, inputs: List[BirthInput], iterations: int, warmup: int, rounds: int = 3) -> Dict[str, float]:
+    """
+    Times `iterations` samples per round and keeps the round with the lowest
+    p50 (best-of-rounds filters out noise from other processes).
+    """
+    operation = BENCHMARKS[name](inputs)
+    for i in range(warmup):
+        operation(i)
+    batch = _calibrate(operation, MIN_SAMPLE_NS)
+    best: Optional[Dict[str, float]] = None
+    for _ in range(rounds):
+        latencies: List[float] = []
+        gc.collect()
+        gc.disable() # As timeit does: a collection landing in one sample is noise, not the operation's cost
+        try:
+            for i in range(iterations):
+                started = time.perf_counter_ns()
+                for j in range(batch):
+                    operation(i * batch + j)
+                latencies.append((time.perf_counter_ns() - started) / batch)
+        finally:
+            gc.enable()
+        result = summarize(latencies)
+        if best is None or result["p50_ms"] < best["p50_ms"]:
+            best = result
+    return {**best, "batch": batch, "rounds": rounds}
+
+
+def environment() -> Dict[str, Any]:
+    from app.services.positions import ENGINE_VERSION
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "engine_version": ENGINE_VERSION,
+    }
+
+
+def run_all(names: Sequence[str], seed: int, iterations: int, warmup: int, input_count: int, rounds: int = 3) -> Dict[str, Any]:
+    from app.services import astrology
+    if not astrology._ensure_kerykeion():
+        raise RuntimeError("Kerykeion is not available; nothing to benchmark.")
+    inputs = seeded_inputs(seed, input_count)
+    previous_disable = logging.root.manager.disable
+    logging.disable(logging.INFO)
+    try:
+        results = {name: run_benchmark(name, inputs, iterations, warmup, rounds) for name in names}
+    finally:
+        logging.disable(previous_disable)
+    return {
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+        "seed": seed,
+        "inputs": input_count,
+        "iterations": iterations,
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> Dict[str, Dict[str, Any]]:
+    """Per benchmark in both runs: p50 change against the baseline and whether it is a regression."""
+    comparison = {}
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before.get("p50_ms"):
+            continue
+        change = result["p50_ms"] / before["p50_ms"] - 1
+        comparison[name] = {
+            "baseline_p50_ms": before["p50_ms"],
+            "p50_ms": result["p50_ms"],
+            "change": change,
+            "regression": change > threshold,
+        }
+    return comparison
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=None, help=f"comma-separated subset of: {', '.join(BENCHMARKS)}")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--rounds", type=int, default=3, help="rounds of --iterations to take the best p50 of")
+    parser.add_argument("--inputs", type=int, default=16, help="seeded birth inputs the benchmarks rotate through")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="p50 slowdown counted as a regression (0.10 = 10%%)")
+    parser.add_argument("--check", action="store_true", help="exit 1 if any benchmark regressed")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.only.split(",")] if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks {unknown}; known: {list(BENCHMARKS)}")
+
+    current = run_all(names, args.seed, args.iterations, args.warmup, args.inputs, args.rounds)
+    baseline = None if args.save_baseline else load_baseline(args.baseline)
+    comparison = compare(current, baseline, args.threshold) if baseline else {}
+    if baseline and baseline.get("seed") != args.seed:
+        print(f"WARNING: baseline seed {baseline.get('seed')} differs from {args.seed}; inputs are not comparable.", file=sys.stderr)
+
+    if args.json:
+        print(json.dumps({**current, "comparison": comparison}, indent=2))
+    else:
+        print(f"{len(names)} benchmarks, best of {args.rounds} x {args.iterations} iterations, seed {args.seed} ({current['environment']['engine_version']})")
+        print(f"{'benchmark':<26} {'ops/s':>9} {'mean':>8} {'p50':>8} {'p90':>8} {'p99':>8} (ms)  vs baseline p50")
+        for name, result in current["results"].items():
+            line = (
+                f"{name:<26} {result['ops_per_second']:>9.1f} {result['mean_ms']:>8.3f} {result['p50_ms']:>8.3f} "
+                f"{result['p90_ms']:>8.3f} {result['p99_ms']:>8.3f}"
+            )
+            if name in comparison:
+                entry = comparison[name]
+                line += f"       {entry['change']:+7.1%}" + ("  REGRESSION" if entry["regression"] else "")
+            print(line)
+
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps(current, indent=2) + "\n")
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+
+    regressions = [name for name, entry in comparison.items() if entry["regression"]]
+    if regressions:
+        print(f"Regressions over {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+        if args.check:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+# /app/scripts/job_worker.py
+"""
+Runs a background job worker (see app/services/job_worker.py).
+
+    python app/scripts/job_worker.py                          # every registered kind
+    python app/scripts/job_worker.py --concurrency 2 --kinds recompute_positions
+
+Run as many as needed; they share the queue in Postgres. SIGTERM/SIGINT stop
+claiming, let running jobs finish for JOB_SHUTDOWN_GRACE_SECONDS and return
+the rest to the queue.
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path to allow importing 'app'
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.core.config import settings
+from app.db.session import dispose_async_engine
+from app.services import job_handlers  # noqa: F401  (registers the handlers)
+from app.services.executor import shutdown_calculation_executor
+from app.services.job_worker import JobWorker
+
+
+async def run(args: argparse.Namespace) -> None:
+    worker = JobWorker(concurrency=args.concurrency, poll_seconds=args.poll, kinds=args.kinds)
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await dispose_async_engine()
+        shutdown_calculation_executor()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=settings.JOB_WORKER_CONCURRENCY)
+    parser.add_argument("--poll", type=float, default=settings.JOB_POLL_SECONDS, help="seconds between polls when idle")
+    parser.add_argument("--kinds", nargs="*", default=None, help="job kinds to run (default: all registered)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(name)s %(levelname)s %(message)s")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,466 @@
+# /app/scripts/load_test.py
+"""
+End-to-end load test of the API with local stand-ins for everything external.
+
+    python app/scripts/load_test.py --postgres-container --users 16 --duration 60
+    python app/scripts/load_test.py --workers 4 --output result.json   # local Postgres from POSTGRES_* settings
+    python app/scripts/load_test.py --target http://127.0.0.1:8000      # a server that is already running
+    python app/scripts/load_test.py --mix natal=1,transit_burst=1       # only some of the workload
+
+Unless --target is given the harness:
+  1. optionally starts a disposable Postgres container (--postgres-container,
+     needs docker) and runs the migrations against it,
+  2. starts a stub Nominatim server in-process (deterministic coordinates per
+     city, --geocoder-latency-ms of simulated latency),
+  3. boots app.main:app with app/scripts/serve.py (--workers preforked
+     workers) pointed at both, and waits for /health/ready.
+
+Virtual users then replay a seeded mix of chart CRUD, natal calculations,
+transit slider bursts and synastry for --duration seconds (closed loop, with
+optional --think-ms between actions). The result is JSON with p50/p95/p99,
+throughput and error rate per endpoint plus totals. --max-error-rate makes the
+exit code fail a capacity or regression run.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import random
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.scripts.benchmark import percentile
+
+API = "/api/v1"
+
+# action -> relative weight; transit_burst is several requests (a slider drag)
+DEFAULT_MIX = {
+    "create_chart": 0.10,
+    "read_chart": 0.20,
+    "list_charts": 0.05,
+    "natal": 0.20,
+    "transit_burst": 0.15,
+    "synastry": 0.15,
+    "composite": 0.05,
+    "delete_chart": 0.02,
+}
+TRANSIT_BURST_STEPS = 8
+
+# Known places; any other name gets coordinates derived from its hash
+CITIES = {
+    "London": (51.5074, -0.1278), "New York": (40.7128, -74.0060), "Sydney": (-33.8688, 151.2093),
+    "Tokyo": (35.6762, 139.6503), "Sao Paulo": (-23.5505, -46.6333), "Mumbai": (19.0760, 72.8777),
+    "Cairo": (30.0444, 31.2357), "Reykjavik": (64.1466, -21.9426), "Lima": (-12.0464, -77.0428),
+    "Nairobi": (-1.2921, 36.8219),
+}
+
+
+# --- Stub geocoder ---
+
+def stub_coordinates(city: str) -> Tuple[float, float]:
+    if city in CITIES:
+        return CITIES[city]
+    digest = hashlib.sha256(city.encode("utf-8")).digest()
+    return (
+        round(-55 + int.from_bytes(digest[:4], "big") / 2**32 * 120, 4),
+        round(-180 + int.from_bytes(digest[4:8], "big") / 2**32 * 360, 4),
+    )
+
+
+class StubGeocoder:
+    """A Nominatim /search endpoint answering from CITIES, on a background thread."""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                city = (parse_qs(url.query).get("q") or [""])[0]
+                stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if url.path.rstrip("/") != "/search" or not city:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                lat, lon = stub_coordinates(city)
+                body = json.dumps([{
+                    "place_id": 1, "lat": str(lat), "lon": str(lon), "display_name": city,
+                    "boundingbox": [str(lat - 0.1), str(lat + 0.1), str(lon - 0.1), str(lon + 0.1)],
+                }]).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stub-geocoder", daemon=True)
+
+    @property
+    def address(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"{host}:{port}"
+
+    def __enter__(self) -> "StubGeocoder":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# --- Disposable Postgres and the server under test ---
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def postgres_container(image: str = "postgres:15-alpine") -> Iterator[Dict[str, str]]:
+    """A throwaway Postgres in docker; yields the POSTGRES_* environment for the app."""
+    password, database = "loadtest", "loadtest"
+    container = subprocess.run(
+        ["docker", "run", "-d", "--rm", "-p", "127.0.0.1::5432",
+         "-e", f"POSTGRES_PASSWORD={password}", "-e", f"POSTGRES_DB={database}", image],
+        check=True, capture_output=True, text=True,
+    ).stdout.strip()
+    try:
+        port = subprocess.run(
+            ["docker", "port", container, "5432/tcp"], check=True, capture_output=True, text=True,
+        ).stdout.strip().splitlines()[0].rsplit(":", 1)[1]
+        deadline = time.monotonic() + 60
+        while subprocess.run(
+            ["docker", "exec", container, "pg_isready", "-U", "postgres", "-d", database, "-h", "127.0.0.1"],
+            capture_output=True,
+        ).returncode != 0:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Postgres container did not become ready within 60s")
+            time.sleep(0.5)
+        yield {
+            "POSTGRES_SERVER": "127.0.0.1", "POSTGRES_PORT": port, "POSTGRES_USER": "postgres",
+            "POSTGRES_PASSWORD": password, "POSTGRES_DB": database,
+        }
+    finally:
+        subprocess.run(["docker", "stop", container], capture_output=True)
+
+
+def migrate(env: Dict[str, str]) -> None:
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=project_root, env={**os.environ, **env}, check=True, capture_output=True,
+    )
+
+
+@contextmanager
+def app_server(env: Dict[str, str], workers: int, log_path: Path, ready_timeout: float = 120.0) -> Iterator[str]:
+    """Boots the app with the preforking launcher; yields its base URL once /health/ready answers 200."""
+    import httpx
+
+    port = _free_port()
+    with open(log_path, "w") as log:
+        process = subprocess.Popen(
+            [sys.executable, "app/scripts/serve.py", "--host", "127.0.0.1", "--port", str(port),
+             "--workers", str(workers), "--memory-report", "0", "--log-level", "warning"],
+            cwd=project_root, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT,
+        )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + ready_timeout
+        while True:
+            if process.poll() is not None:
+                raise RuntimeError(f"Server exited with status {process.returncode}; see {log_path}")
+            try:
+                if httpx.get(f"{base_url}{API}/health/ready", timeout=2).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Server not ready within {ready_timeout}s; see {log_path}")
+            time.sleep(0.5)
+        yield base_url
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# --- Workload ---
+
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    def add(self, endpoint: str, seconds: float, status: str, error: bool) -> None:
+        if not self.recording:
+            return
+        self.samples[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+        if error:
+            self.errors[endpoint] += 1
+
+
+def _stats(latencies: List[float], errors: int, statuses: Dict[str, int], duration: float) -> Dict[str, Any]:
+    values = sorted(seconds * 1000 for seconds in latencies)
+    count = len(values)
+    return {
+        "requests": count,
+        "errors": errors,
+        "error_rate": errors / count if count else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+        "throughput_rps": count / duration if duration else 0.0,
+        "mean_ms": sum(values) / count if count else None,
+        "p50_ms": percentile(values, 50) if count else None,
+        "p95_ms": percentile(values, 95) if count else None,
+        "p99_ms": percentile(values, 99) if count else None,
+        "max_ms": values[-1] if count else None,
+    }
+
+
+class VirtualUser:
+    def __init__(self, index: int, client: Any, recorder: Recorder, chart_ids: List[str], seed: int, mix: Dict[str, float]):
+        self.client = client
+        self.recorder = recorder
+        self.chart_ids = chart_ids
+        self.rng = random.Random(seed * 1000 + index)
+        self.actions = list(mix)
+        self.weights = [mix[action] for action in self.actions]
+
+    async def request(self, endpoint: str, method: str, url: str, **kwargs) -> Optional[Any]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception as e:
+            self.recorder.add(endpoint, time.perf_counter() - started, type(e).__name__, True)
+            return None
+        self.recorder.add(endpoint, time.perf_counter() - started, str(response.status_code), response.status_code >= 400)
+        return response
+
+    def birth(self) -> Dict[str, Any]:
+        moment = datetime(1940, 1, 1) + timedelta(minutes=self.rng.randrange(0, 80 * 365 * 24 * 60))
+        return {"name": f"Load {self.rng.randrange(10**6)}", "moment": moment, "city": self.rng.choice(list(CITIES))}
+
+    def some_chart(self) -> Optional[str]:
+        return self.rng.choice(self.chart_ids) if self.chart_ids else None
+
+    async def create_chart(self) -> None:
+        birth = self.birth()
+        body = {"name": birth["name"], "birth_datetime": birth["moment"].isoformat(), "city": birth["city"]}
+        if self.rng.random() < 0.5: # The other half is geocoded
+            body["latitude"], body["longitude"] = CITIES[birth["city"]]
+        response = await self.request("POST /charts/", "POST", f"{API}/charts/", json=body)
+        if response is not None and response.status_code == 201:
+            self.chart_ids.append(response.json()["id"])
+
+    async def read_chart(self) -> None:
+        chart_id = self.some_chart()
+        if chart_id:
+            await self.request("GET /charts/{id}", "GET", f"{API}/charts/{chart_id}")
+
+    async def list_charts(self) -> None:
+        await self.request("GET /charts/", "GET", f"{API}/charts/", params={"limit": 20})
+
+    async def natal(self) -> None:
+        birth = self.birth()
+        moment = birth["moment"]
+        body = {
+            "name": birth["name"], "city": birth["city"], "year": moment.year, "month": moment.month,
+            "day": moment.day, "hour": moment.hour, "minute": moment.minute,
+        }
+        await self.request("POST /charts/calculate/natal", "POST", f"{API}/charts/calculate/natal", json=body)
+
+    async def transit_burst(self) -> None:
+        chart_id = self.some_chart()
+        if not chart_id:
+            return
+        start = datetime(2024, 1, 1) + timedelta(days=self.rng.randrange(0, 365))
+        for step in range(TRANSIT_BURST_STEPS): # A slider drag: consecutive requests, no think time
+            moment = (start + timedelta(hours=6 * step)).isoformat()
+            await self.request(
+                "GET /charts/{id}/transits", "GET", f"{API}/charts/{chart_id}/transits", params={"transit_datetime": moment},
+            )
+
+    async def synastry(self) -> None:
+        if len(self.chart_ids) >= 2:
+            first, second = self.rng.sample(self.chart_ids, 2)
+            await self.request("POST /charts/synastry", "POST", f"{API}/charts/synastry", json={"chart1_id": first, "chart2_id": second})
+
+    async def composite(self) -> None:
+        if len(self.chart_ids) >= 2:
+            first, second = self.rng.sample(self.chart_ids, 2)
+            await self.request("POST /charts/composite", "POST", f"{API}/charts/composite", json={"chart1_id": first, "chart2_id": second})
+
+    async def delete_chart(self) -> None:
+        if len(self.chart_ids) > 10: # Keep enough charts around for the other actions
+            chart_id = self.chart_ids.pop(self.rng.randrange(len(self.chart_ids)))
+            await self.request("DELETE /charts/{id}", "DELETE", f"{API}/charts/{chart_id}")
+
+    async def run(self, deadline: float, think: float) -> None:
+        while time.monotonic() < deadline:
+            action = self.rng.choices(self.actions, self.weights)[0]
+            await getattr(self, action)()
+            if think:
+                await asyncio.sleep(self.rng.expovariate(1 / think))
+
+
+async def run_load(
+    base_url: str, users: int, duration: float, warmup: float, think_ms: float,
+    seed: int, mix: Dict[str, float], seed_charts: int, timeout: float,
+) -> Dict[str, Any]:
+    import httpx
+
+    recorder = Recorder()
+    chart_ids: List[str] = []
+    limits = httpx.Limits(max_connections=users, max_keepalive_connections=users)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        seeder = VirtualUser(-1, client, recorder, chart_ids, seed, mix)
+        for _ in range(seed_charts): # Not recorded: targets for reads, transits and synastry
+            await seeder.create_chart()
+
+        vus = [VirtualUser(i, client, recorder, chart_ids, seed, mix) for i in range(users)]
+        started = time.monotonic()
+        tasks = [asyncio.create_task(vu.run(started + warmup + duration, think_ms / 1000)) for vu in vus]
+        await asyncio.sleep(warmup)
+        recorder.recording = True
+        measured_from = time.monotonic()
+        await asyncio.gather(*tasks)
+        measured = time.monotonic() - measured_from
+
+    endpoints = {
+        endpoint: _stats(recorder.samples[endpoint], recorder.errors[endpoint], recorder.statuses[endpoint], measured)
+        for endpoint in sorted(recorder.samples)
+    }
+    all_samples = [sample for samples in recorder.samples.values() for sample in samples]
+    all_statuses: Dict[str, int] = defaultdict(int)
+    for statuses in recorder.statuses.values():
+        for status, count in statuses.items():
+            all_statuses[status] += count
+    return {
+        "duration_s": measured,
+        "totals": _stats(all_samples, sum(recorder.errors.values()), all_statuses, measured),
+        "endpoints": endpoints,
+    }
+
+
+def parse_mix(value: Optional[str]) -> Dict[str, float]:
+    if not value:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown action '{name}'. Known: {list(DEFAULT_MIX)}")
+        mix[name] = float(weight) if weight else DEFAULT_MIX[name]
+    return mix
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", default=None, help="base URL of a running server (skips booting one)")
+    parser.add_argument("--postgres-container", action="store_true", help="run against a disposable Postgres in docker")
+    parser.add_argument("--workers", type=int, default=2, help="preforked workers of the booted server")
+    parser.add_argument("--users", type=int, default=8, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="seconds of load before measuring")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a user's actions")
+    parser.add_argument("--mix", default=None, help=f"action=weight,... (default {DEFAULT_MIX})")
+    parser.add_argument("--seed", type=int, default=20240501)
+    parser.add_argument("--seed-charts", type=int, default=20, help="charts created before the run")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout (seconds)")
+    parser.add_argument("--geocoder-latency-ms", type=float, default=50.0, help="simulated geocoder latency")
+    parser.add_argument("--server-log", type=Path, default=Path("load_test_server.log"))
+    parser.add_argument("--output", type=Path, default=None, help="write the JSON result here instead of stdout")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="exit 1 if the overall error rate is higher")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    def load(base_url: str) -> Dict[str, Any]:
+        return asyncio.run(run_load(
+            base_url, args.users, args.duration, args.warmup, args.think_ms, args.seed, mix, args.seed_charts, args.timeout,
+        ))
+
+    geocoder_requests = None
+    if args.target:
+        result = load(args.target.rstrip("/"))
+    else:
+        with StubGeocoder(args.geocoder_latency_ms) as geocoder:
+            env = {"NOMINATIM_DOMAIN": geocoder.address, "NOMINATIM_SCHEME": "http"}
+            if args.postgres_container:
+                with postgres_container() as database_env:
+                    env.update(database_env)
+                    migrate(env)
+                    with app_server(env, args.workers, args.server_log) as base_url:
+                        result = load(base_url)
+            else:
+                with app_server(env, args.workers, args.server_log) as base_url:
+                    result = load(base_url)
+            geocoder_requests = geocoder.requests
+
+    output = {
+        "config": {
+            "target": args.target, "workers": None if args.target else args.workers, "users": args.users,
+            "duration_s": args.duration, "warmup_s": args.warmup, "think_ms": args.think_ms, "mix": mix,
+            "seed": args.seed, "geocoder_latency_ms": None if args.target else args.geocoder_latency_ms,
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "created": datetime.utcnow().isoformat(timespec="seconds"),
+        **result,
+        "geocoder_requests": geocoder_requests,
+    }
+    text = json.dumps(output, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    else:
+        print(text)
+
+    totals = result["totals"]
+    print(
+        f"{totals['requests']} requests in {result['duration_s']:.1f}s: {totals['throughput_rps']:.1f} req/s, "
+        f"p50 {totals['p50_ms'] or 0:.1f} ms, p95 {totals['p95_ms'] or 0:.1f} ms, p99 {totals['p99_ms'] or 0:.1f} ms, "
+        f"error rate {totals['error_rate']:.2%}",
+        file=sys.stderr,
+    )
+    if args.max_error_rate is not None and totals["error_rate"] > args.max_error_rate:
+        print(f"Error rate over {args.max_error_rate:.2%}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+# /app/scripts/serve.py
+"""
+Multi-worker launcher with copy-on-write sharing (see app/core/prefork.py).
+
+    python app/scripts/serve.py --workers 4 --port 8000
+
+Use this instead of `uvicorn --workers N`: the app and its read-only data are
+loaded once in the parent and shared by the forked workers, and the parent
+logs RSS/PSS per worker every --memory-report seconds. PSS is the figure to
+size nodes by; RSS counts shared pages once per worker.
+"""
+import argparse
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path to allow importing 'app'
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from app.core.config import settings
+from app.core.prefork import PreforkServer, preload
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.environ.get("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=settings.SERVE_WORKERS)
+    parser.add_argument("--memory-report", type=float, default=settings.SERVE_MEMORY_REPORT_SECONDS,
+                        help="seconds between per-worker memory reports (0 disables)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(process)d %(name)s %(levelname)s %(message)s")
+    app = preload()
+    PreforkServer(
+        app,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        memory_report_seconds=args.memory_report,
+        log_level=args.log_level,
+    ).run()
+
+
+if __name__ == "__main__":
+    main()
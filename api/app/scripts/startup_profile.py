@@ -0,0 +1,121 @@
+# /app/scripts/startup_profile.py
+"""
+Startup profile: how long `import app.main` takes and which modules it spends
+that time in, from `python -X importtime` in a fresh interpreter.
+
+    python app/scripts/startup_profile.py               # top 25 by cumulative time
+    python app/scripts/startup_profile.py --json        # machine-readable
+    python app/scripts/startup_profile.py --budget 1.0  # exit 1 if over budget
+
+Kerykeion, swisseph, numpy, timezonefinder, geopy, sentry_sdk, the database
+driver and the optional encoders (cairosvg, msgpack, pyarrow) are loaded on
+first use or by the warm-up, never at import; DEFERRED_MODULES lists them and
+the report flags any that are imported anyway.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+PROJECT_ROOT = Path(__file__).parent.parent.parent
+
+# Heavy libraries that must not be imported by `import app.main`
+DEFERRED_MODULES = ("kerykeion", "timezonefinder", "geopy", "sentry_sdk", "cairosvg", "msgpack", "pyarrow", "numpy", "swisseph", "asyncpg")
+# `import app.main` measures 1.0-1.2s (best of 3), about 0.8s of which is FastAPI, SQLAlchemy and
+# fastapi-users themselves; the default leaves headroom for noisy runners
+DEFAULT_BUDGET_SECONDS = float(os.environ.get("STARTUP_IMPORT_BUDGET_SECONDS", "1.5"))
+
+_MEASURE = """
+import sys, time, json
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "deferred_loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PROJECT_ROOT), env.get("PYTHONPATH")]))
+    return subprocess.run(
+        [sys.executable, *args], cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def measure_import(module: str = "app.main", runs: int = 3) -> Dict[str, Any]:
+    """Best-of-`runs` wall time of importing `module` in a fresh interpreter, and which deferred modules it loaded."""
+    results = []
+    for _ in range(runs):
+        output = _run(["-c", _MEASURE.format(module=module, deferred=DEFERRED_MODULES)]).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    best = min(results, key=lambda result: result["seconds"])
+    return {"module": module, "seconds": best["seconds"], "deferred_loaded": best["deferred_loaded"]}
+
+
+def import_profile(module: str = "app.main") -> List[Dict[str, Any]]:
+    """Per-module self and cumulative import time (microseconds) from -X importtime."""
+    stderr = _run(["-X", "importtime", "-c", f"import {module}"]).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        name = fields[2].rstrip()
+        rows.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip())) // 2,
+            "self_us": int(fields[0]),
+            "cumulative_us": int(fields[1]),
+        })
+    return rows
+
+
+def report(module: str, top: int, runs: int) -> Dict[str, Any]:
+    measured = measure_import(module, runs)
+    rows = import_profile(module)
+    by_cumulative = sorted(rows, key=lambda row: row["cumulative_us"], reverse=True)
+    by_self = sorted(rows, key=lambda row: row["self_us"], reverse=True)
+    return {
+        **measured,
+        "modules_imported": len(rows),
+        "top_cumulative": by_cumulative[:top],
+        "top_self": by_self[:top],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--runs", type=int, default=3, help="import timings to take the best of")
+    parser.add_argument("--budget", type=float, default=None, help="fail if the import takes longer (seconds)")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    result = report(args.module, args.top, args.runs)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"import {result['module']}: {result['seconds'] * 1000:.0f} ms (best of {args.runs}), {result['modules_imported']} modules")
+        print("\nTop modules by cumulative import time (-X importtime, ms):")
+        for row in result["top_cumulative"]:
+            print(f"  {row['cumulative_us'] / 1000:8.1f}  {row['self_us'] / 1000:7.1f}  {row['module']}")
+        print("\nTop modules by self time (ms):")
+        for row in result["top_self"]:
+            print(f"  {row['self_us'] / 1000:8.1f}  {row['module']}")
+        if result["deferred_loaded"]:
+            print(f"\nWARNING: deferred modules imported at startup: {result['deferred_loaded']}")
+
+    if args.budget is not None and result["seconds"] > args.budget:
+        print(f"Startup import took {result['seconds']:.2f}s, over the {args.budget:.2f}s budget.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
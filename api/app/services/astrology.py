@@ -1,8 +1,9 @@
 # /app/services/astrology.py
+import importlib.util
 import logging
-import sys
+import threading
 from datetime import datetime
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, FrozenSet, Iterable, Optional, List
 import uuid
 
 # Import AsyncSession for type hinting
@@ -15,95 +16,132 @@ from app.schemas.chart import (
     CompositeChartResult, SynastryCompositePersonInput 
 )
 
+from app.core.timing import phase
+from app.services.ephemeris import swisseph_lock
+
 logger = logging.getLogger(__name__)
 
-# Import timezonefinder
-try:
-    from timezonefinder import TimezoneFinder
-    TIMEZONEFINDER_AVAILABLE = True
-except ImportError:
-    TIMEZONEFINDER_AVAILABLE = False
-    print("CRITICAL ERROR: timezonefinder library not found. Timezone lookup will fail.")
-    # Dummy class for type hinting
-    class TimezoneFinder:
-        def timezone_at(self, *args, **kwargs) -> Optional[str]: return None
-
-# --- Kerykeion Base Components Import ---
-KERYKEION_AVAILABLE = False
-_AstrologicalSubject = None
-_KerykeionException = None
-_SynastryAspects = None # ADDED for Synastry
-_CompositeSubjectFactory = None # ADDED for Composite
-try:
-    from kerykeion import AstrologicalSubject as LibAstrologicalSubject, KerykeionException as LibKerykeionException
-    # --- ADDED SynastryAspects and CompositeSubjectFactory imports ---
-    from kerykeion import SynastryAspects as LibSynastryAspects
-    from kerykeion import CompositeSubjectFactory as LibCompositeSubjectFactory
-
-    _AstrologicalSubject = LibAstrologicalSubject
-    _KerykeionException = LibKerykeionException
-    _SynastryAspects = LibSynastryAspects # Store imported class
-    _CompositeSubjectFactory = LibCompositeSubjectFactory # Store imported class
-    KERYKEION_AVAILABLE = True
-    logger.info("Successfully imported Kerykeion base components (AstrologicalSubject, KerykeionException, SynastryAspects, CompositeSubjectFactory).")
-except ImportError as e:
-    KERYKEION_AVAILABLE = False
-    logger.error(f"CRITICAL ERROR: Kerykeion components could not be imported: {e}. Real calculations will fail.", exc_info=True)
-    print(f"CRITICAL ERROR: Kerykeion components could not be imported: {e}. Real calculations will fail.")
-    print(f"Current sys.path: {sys.path}")
-    class AstrologicalSubject: # Dummy for type hinting if base import fails
-        def __init__(self, *args, **kwargs): pass
-    class KerykeionException(Exception): # Dummy for type hinting if base import fails
-        pass
-    # --- UPDATED DUMMY CLASSES ---
-    class SynastryAspects: # Dummy for SynastryAspects
-        def __init__(self, subject1, subject2, *args, **kwargs): pass
-        def get_relevant_aspects(self) -> List[Any]: return []
-        aspects_list: List[Any] = [] # Add if used directly
-
-    class CompositeSubjectFactory: # Dummy for CompositeSubjectFactory
-        def __init__(self, subject1, subject2, *args, **kwargs): pass
-        def get_midpoint_composite_subject_model(self) -> Optional[AstrologicalSubject]: return None
-
-    _AstrologicalSubject = AstrologicalSubject
-    _KerykeionException = KerykeionException
-    _SynastryAspects = SynastryAspects
-    _CompositeSubjectFactory = CompositeSubjectFactory
-
-# Make them available under the original names for the rest of the module
-AstrologicalSubject = _AstrologicalSubject
-KerykeionException = _KerykeionException
-# --- EXPOSE NEW CLASSES --- 
-SynastryAspects = _SynastryAspects
-CompositeSubjectFactory = _CompositeSubjectFactory
-
-# --- Kerykeion NatalAspects Import ---
-KERYKEION_NATAL_ASPECTS_AVAILABLE = False
-_NatalAspects = None
-try:
-    from kerykeion import NatalAspects as LibNatalAspects
-    _NatalAspects = LibNatalAspects
-    KERYKEION_NATAL_ASPECTS_AVAILABLE = True
-    logger.info("Successfully imported NatalAspects from Kerykeion.")
-except ImportError:
-    KERYKEION_NATAL_ASPECTS_AVAILABLE = False
-    logger.warning("Could not import NatalAspects from Kerykeion. Aspect calculations might be limited or unavailable.")
-    class NatalAspects: # Dummy for type hinting if NatalAspects import fails
-        def __init__(self, *args, **kwargs): pass
-    _NatalAspects = NatalAspects
-
-# Make it available under the original name for the rest of the module
-NatalAspects = _NatalAspects
-
-# --- Log top-level kerykeion contents --- 
-try:
-    import kerykeion
-    logger.info(f"--- Top-level dir(kerykeion) ---")
-    logger.info(sorted(dir(kerykeion)))
-    logger.info(f"--------------------------------")
-except Exception as ke_dir_e:
-    logger.error(f"Error inspecting kerykeion module: {ke_dir_e}")
-# --- End log ---
+# Heavy libraries (Kerykeion pulls in requests-cache, pydantic models and more;
+# TimezoneFinder loads its index) are imported on first use, or by the warm-up,
+# so that importing this module stays cheap. Availability is decided up front
+# from the installed packages without importing them.
+KERYKEION_AVAILABLE = importlib.util.find_spec("kerykeion") is not None
+TIMEZONEFINDER_AVAILABLE = importlib.util.find_spec("timezonefinder") is not None
+# Confirmed (or cleared) when Kerykeion is actually loaded
+KERYKEION_NATAL_ASPECTS_AVAILABLE = KERYKEION_AVAILABLE
+
+if not KERYKEION_AVAILABLE:
+    logger.error("CRITICAL ERROR: Kerykeion is not installed. Real calculations will fail.")
+if not TIMEZONEFINDER_AVAILABLE:
+    logger.error("CRITICAL ERROR: timezonefinder library not found. Timezone lookup will fail.")
+
+
+# Placeholders until the real classes are loaded, so annotations and
+# isinstance checks work before loading.
+class _AstrologicalSubjectNotLoaded:
+    def __init__(self, *args, **kwargs):
+        raise RuntimeError("Kerykeion is not loaded; call _ensure_kerykeion() first.")
+
+class _KerykeionExceptionNotLoaded(Exception):
+    pass
+
+class _SynastryAspectsNotLoaded(_AstrologicalSubjectNotLoaded):
+    pass
+
+class _CompositeSubjectFactoryNotLoaded(_AstrologicalSubjectNotLoaded):
+    pass
+
+class _NatalAspectsNotLoaded(_AstrologicalSubjectNotLoaded):
+    pass
+
+class _TimezoneFinderNotLoaded:
+    def timezone_at(self, *args, **kwargs) -> Optional[str]: return None
+
+_KERYKEION_PLACEHOLDERS = {
+    "AstrologicalSubject": _AstrologicalSubjectNotLoaded,
+    "KerykeionException": _KerykeionExceptionNotLoaded,
+    "SynastryAspects": _SynastryAspectsNotLoaded,
+    "CompositeSubjectFactory": _CompositeSubjectFactoryNotLoaded,
+    "NatalAspects": _NatalAspectsNotLoaded,
+}
+
+# Public names and the underscore aliases other modules import
+AstrologicalSubject = _AstrologicalSubject = _AstrologicalSubjectNotLoaded
+KerykeionException = _KerykeionException = _KerykeionExceptionNotLoaded
+SynastryAspects = _SynastryAspects = _SynastryAspectsNotLoaded
+CompositeSubjectFactory = _CompositeSubjectFactory = _CompositeSubjectFactoryNotLoaded
+NatalAspects = _NatalAspects = _NatalAspectsNotLoaded
+TimezoneFinder = _TimezoneFinderNotLoaded
+# What `except` clauses catch: the placeholder plus, once loaded, Kerykeion's own
+KERYKEION_ERRORS: tuple = (_KerykeionExceptionNotLoaded,)
+
+_kerykeion_classes: Optional[Dict[str, Any]] = None
+_lazy_import_lock = threading.Lock()
+
+
+def _ensure_kerykeion() -> bool:
+    """
+    Imports Kerykeion on first use and binds its classes to this module (once;
+    later calls only check the flag). Returns False if Kerykeion cannot be used.
+    """
+    global _kerykeion_classes, KERYKEION_AVAILABLE, KERYKEION_NATAL_ASPECTS_AVAILABLE, KERYKEION_ERRORS
+    if not KERYKEION_AVAILABLE:
+        return False
+    if _kerykeion_classes is None:
+        with _lazy_import_lock:
+            if _kerykeion_classes is None:
+                try:
+                    import kerykeion
+                except ImportError as e:
+                    KERYKEION_AVAILABLE = False
+                    logger.error(f"CRITICAL ERROR: Kerykeion components could not be imported: {e}. Real calculations will fail.", exc_info=True)
+                    return False
+                classes = {name: getattr(kerykeion, name, None) for name in _KERYKEION_PLACEHOLDERS}
+                if classes["NatalAspects"] is None:
+                    KERYKEION_NATAL_ASPECTS_AVAILABLE = False
+                    logger.warning("Could not import NatalAspects from Kerykeion. Aspect calculations might be limited or unavailable.")
+                loaded = {name: cls for name, cls in classes.items() if cls is not None}
+                if "KerykeionException" in loaded:
+                    KERYKEION_ERRORS = (loaded["KerykeionException"], _KerykeionExceptionNotLoaded)
+                module_globals = globals()
+                for name, cls in loaded.items():
+                    module_globals[name] = module_globals["_" + name] = cls
+                # Set last: other threads skip the lock once this is not None
+                _kerykeion_classes = loaded
+                logger.info(f"Loaded Kerykeion components: {sorted(_kerykeion_classes)}")
+    return True
+
+
+def _ensure_timezonefinder() -> None:
+    """Imports TimezoneFinder on first use."""
+    global TimezoneFinder, TIMEZONEFINDER_AVAILABLE
+    if TimezoneFinder is not _TimezoneFinderNotLoaded or not TIMEZONEFINDER_AVAILABLE:
+        return
+    try:
+        from timezonefinder import TimezoneFinder as LibTimezoneFinder
+    except ImportError as e:
+        TIMEZONEFINDER_AVAILABLE = False
+        logger.error(f"CRITICAL ERROR: timezonefinder could not be imported: {e}. Timezone lookup will fail.")
+        return
+    TimezoneFinder = LibTimezoneFinder
+
+
+# Building a TimezoneFinder loads its polygon index (~10ms), so one instance is
+# shared. Lookups are not thread-safe (shared file handles), hence the lock.
+_timezone_finder: Optional[Any] = None
+_timezone_finder_cls: Optional[type] = None
+_timezone_finder_lock = threading.Lock()
+
+def timezone_at(latitude: float, longitude: float) -> Optional[str]:
+    """IANA timezone name for a location using the shared TimezoneFinder."""
+    global _timezone_finder, _timezone_finder_cls
+    with phase("timezone"), _timezone_finder_lock:
+        _ensure_timezonefinder()
+        if _timezone_finder is None or _timezone_finder_cls is not TimezoneFinder:
+            _timezone_finder = TimezoneFinder()
+            _timezone_finder_cls = TimezoneFinder
+        return _timezone_finder.timezone_at(lng=longitude, lat=latitude)
+
 
 # Define mappings for data extraction
 # (Adjust keys based on actual kerykeion object properties)
@@ -124,12 +162,64 @@ PLANET_MAP = {
     "descendant": "Descendant",          # Already consistent
     "imum_coeli": "IC",                  # Already consistent?
 }
+# Aspect name -> (exact angle, maximum orb) used for transit and synastry aspect matching
+ASPECT_DEGREES_ORBS = {
+    "Conjunction": (0, 8.0), "Sextile": (60, 5.0), "Square": (90, 7.0),
+    "Trine": (120, 7.0), "Opposition": (180, 8.0), "Quincunx": (150, 3.0),
+    "SemiSextile": (30, 2.0), "SemiSquare": (45, 2.0), "Sesquiquadrate": (135, 2.0)
+}
 SIGN_SYMBOLS = ['''♈''','''♉''','''♊''','''♋''','''♌''','''♍''','''♎''','''♏''','''♐''','''♑''','''♒''','''♓''']
 SIGN_FULL_NAMES = [
     "Aries", "Taurus", "Gemini", "Cancer", "Leo", "Virgo",
     "Libra", "Scorpio", "Sagittarius", "Capricorn", "Aquarius", "Pisces"
 ]
 
+# --- Chart sections (NatalChartCalculator.calculate_chart(sections=...)) ---
+# "dignities" adds a "dignity" field to each planet entry; counts and dignities are derived from planets
+CHART_SECTIONS = ("planets", "houses", "aspects", "element_counts", "mode_counts", "dignities")
+
+def normalize_sections(sections: Optional[Iterable[str]]) -> FrozenSet[str]:
+    """Validated section names; None (or empty) means every section. Raises ValueError for unknown names."""
+    if not sections:
+        return frozenset(CHART_SECTIONS)
+    requested = frozenset(section.strip() for section in sections if section and section.strip())
+    unknown = requested - set(CHART_SECTIONS) - {"info"}
+    if unknown:
+        raise ValueError(f"Unknown chart sections: {sorted(unknown)}. Known: {list(CHART_SECTIONS)}")
+    return requested - {"info"}
+
+ELEMENT_MAP = {
+    "Aries": "Fire", "Leo": "Fire", "Sagittarius": "Fire",
+    "Taurus": "Earth", "Virgo": "Earth", "Capricorn": "Earth",
+    "Gemini": "Air", "Libra": "Air", "Aquarius": "Air",
+    "Cancer": "Water", "Scorpio": "Water", "Pisces": "Water"
+}
+MODE_MAP = {
+    "Aries": "Cardinal", "Cancer": "Cardinal", "Libra": "Cardinal", "Capricorn": "Cardinal",
+    "Taurus": "Fixed", "Leo": "Fixed", "Scorpio": "Fixed", "Aquarius": "Fixed",
+    "Gemini": "Mutable", "Virgo": "Mutable", "Sagittarius": "Mutable", "Pisces": "Mutable"
+}
+# Dignity tables (simplified for main planets)
+RULERSHIP = {
+    "Aries": "Mars", "Taurus": "Venus", "Gemini": "Mercury", "Cancer": "Moon",
+    "Leo": "Sun", "Virgo": "Mercury", "Libra": "Venus", "Scorpio": "Mars",
+    "Sagittarius": "Jupiter", "Capricorn": "Saturn", "Aquarius": "Saturn", "Pisces": "Jupiter"
+}
+EXALTATION = {
+    "Aries": "Sun", "Taurus": "Moon", "Cancer": "Jupiter", "Virgo": "Mercury",
+    "Libra": "Saturn", "Capricorn": "Mars", "Pisces": "Venus"
+}
+DETRIMENT = {
+    "Aries": "Venus", "Taurus": "Mars", "Gemini": "Jupiter", "Cancer": "Saturn",
+    "Leo": "Saturn", "Virgo": "Neptune", "Libra": "Mars", "Scorpio": "Venus",
+    "Sagittarius": "Mercury", "Capricorn": "Moon", "Aquarius": "Sun", "Pisces": "Mercury"
+}
+FALL = {
+    "Aries": "Saturn", "Taurus": "Uranus", "Gemini": "South Node", "Cancer": "Mars",
+    "Leo": "Pluto", "Virgo": "Venus", "Libra": "Sun", "Scorpio": "Moon",
+    "Sagittarius": "North Node", "Capricorn": "Jupiter", "Aquarius": "Neptune", "Pisces": "Mercury"
+}
+
 class NatalChartCalculator:
     """Calculates natal chart data using the Kerykeion library."""
 
@@ -146,8 +236,9 @@ class NatalChartCalculator:
         self.longitude = longitude
         self.subject: Optional[AstrologicalSubject] = None
         self.calculation_error: Optional[str] = None
+        self._sections: Dict[str, Any] = {}
 
-        if not KERYKEION_AVAILABLE:
+        if not _ensure_kerykeion():
             self.calculation_error = "Kerykeion library is not installed or importable."
             logger.critical(self.calculation_error)
             return # Cannot proceed without the library
@@ -161,8 +252,7 @@ class NatalChartCalculator:
         tz_str: Optional[str] = None
         if TIMEZONEFINDER_AVAILABLE and self.latitude is not None and self.longitude is not None:
             try:
-                tf = TimezoneFinder() # Initialize
-                tz_str = tf.timezone_at(lng=self.longitude, lat=self.latitude)
+                tz_str = timezone_at(self.latitude, self.longitude)
                 if tz_str:
                     logger.info(f"Determined timezone for ({self.latitude}, {self.longitude}) as: {tz_str}")
                 else:
@@ -176,20 +266,21 @@ class NatalChartCalculator:
 
         try:
             # Instantiate the real AstrologicalSubject
-            self.subject = AstrologicalSubject(
-                name=self.name,
-                year=self.birth_dt.year,
-                month=self.birth_dt.month,
-                day=self.birth_dt.day,
-                hour=self.birth_dt.hour,
-                minute=self.birth_dt.minute,
-                city=self.city,
-                lng=self.longitude,
-                lat=self.latitude,
-                tz_str=tz_str # Pass determined timezone string
-            )
+            with phase("subject"), swisseph_lock:
+                self.subject = AstrologicalSubject(
+                    name=self.name,
+                    year=self.birth_dt.year,
+                    month=self.birth_dt.month,
+                    day=self.birth_dt.day,
+                    hour=self.birth_dt.hour,
+                    minute=self.birth_dt.minute,
+                    city=self.city,
+                    lng=self.longitude,
+                    lat=self.latitude,
+                    tz_str=tz_str # Pass determined timezone string
+                )
             logger.info(f"Initialized Kerykeion AstrologicalSubject for {self.name} at {self.city} ({self.latitude}, {self.longitude}) with tz_str='{tz_str}'")
-        except KerykeionException as ke:
+        except KERYKEION_ERRORS as ke:
             logger.error(f"Kerykeion error initializing subject for {self.name}: {ke}", exc_info=True)
             self.subject = None
             self.calculation_error = f"Kerykeion Initialization Error: {ke}"
@@ -198,8 +289,16 @@ class NatalChartCalculator:
             self.subject = None
             self.calculation_error = f"Unexpected Error during Kerykeion setup: {e}"
 
-    async def calculate_chart(self) -> Dict[str, Any]:
-        """Extracts natal chart details from the AstrologicalSubject instance."""
+    async def calculate_chart(self, sections: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Extracts natal chart details from the AstrologicalSubject instance.
+
+        `sections` limits the result to the named CHART_SECTIONS (plus "info"
+        and "calculation_error", always present); None means all of them.
+        Sections are evaluated lazily, so e.g. ("planets",) never computes
+        aspects. Raises ValueError for unknown section names.
+        """
+        requested = normalize_sections(sections)
         if self.calculation_error:
              # Return minimal info if initialization failed
              return { "info": {"name": self.name}, "planets": [], "houses": [], "aspects": [], "calculation_error": self.calculation_error }
@@ -207,313 +306,262 @@ class NatalChartCalculator:
              # Should not happen if error handling above is correct, but safeguard
              return { "info": {"name": self.name}, "planets": [], "houses": [], "aspects": [], "calculation_error": "Internal Error: Subject not initialized." }
 
-        logger.info(f"Calculating chart details for {self.name} using Kerykeion.")
+        logger.info(f"Calculating chart sections {sorted(requested)} for {self.name} using Kerykeion.")
         try:
-            # --- Add dir(self.subject) for debugging v4 --- 
-            logger.info(f"--- Inspecting Initialized AstrologicalSubject (v4) ---")
-            try:
-                # Use logger.warning for higher visibility
-                logger.warning(f"Attributes/Methods: {sorted(dir(self.subject))}") 
-            except Exception as dir_e:
-                 logger.error(f"Error getting dir(self.subject): {dir_e}")
-            logger.info(f"-----------------------------------------------------")
-            # --- End Debugging ---
-
-            # Extract Planet Data (Using direct attribute access for v4)
-            planets_data: Dict[str, Dict[str, Any]] = {} # Initialize as dict
-            # List of planet attribute names expected in Kerykeion v4 AstrologicalSubject
-            planet_attr_names = [
-                'sun', 'moon', 'mercury', 'venus', 'mars', 
-                'jupiter', 'saturn', 'uranus', 'neptune', 'pluto',
-                # Add others if needed (e.g., 'mean_node', 'true_node', 'chiron')
-                'mean_node', 'true_node', 'mean_south_node', 'true_south_node',
-                'chiron', 'mean_lilith',
-                'ascendant', 'medium_coeli', 'descendant', 'imum_coeli' # From AstrologicalSubject
-            ]
-            for attr_name in planet_attr_names:
-                if hasattr(self.subject, attr_name):
-                    planet_obj = getattr(self.subject, attr_name)
-                    # Check if it's a KerykeionPointModel or similar object (not just dict)
-                    if planet_obj and hasattr(planet_obj, 'abs_pos'): # Check for a known attribute
-                        display_name = PLANET_MAP.get(attr_name, attr_name.capitalize())
-                        # Access attributes directly
-                        sign_num = getattr(planet_obj, 'sign_num', -1)
-                        # sign = getattr(planet_obj, 'sign', 'Unknown') # Old way, gave abbreviation
-                        abs_pos = getattr(planet_obj, 'abs_pos', None)
-                        position = getattr(planet_obj, 'position', None)
-                        retrograde = getattr(planet_obj, 'retrograde', False)
-                        
-                        # Get full sign name from sign_num
-                        full_sign_name = SIGN_FULL_NAMES[sign_num] if sign_num >= 0 and sign_num < len(SIGN_FULL_NAMES) else 'Unknown'
-                        
-                        if abs_pos is not None:
-                            planet_name_key = display_name # Use the display name (e.g., "Sun") as the key
-                            planets_data[planet_name_key] = { # Assign to dict using key
-                                 "name": display_name,
-                                 "sign": full_sign_name, # Use full sign name
-                                 "sign_symbol": SIGN_SYMBOLS[sign_num] if sign_num >= 0 and sign_num < len(SIGN_SYMBOLS) else '?',
-                                 "longitude": abs_pos, 
-                                 "deg_within_sign": position, 
-                                 "is_retrograde": retrograde, 
-                            }
-                        else:
-                             logger.warning(f"Planet object '{attr_name}' missing 'abs_pos'. Type: {type(planet_obj)}")
-                    else:
-                         logger.warning(f"Attribute '{attr_name}' found but is not a valid KerykeionPointModel or similar (lacks 'abs_pos'). Type: {type(planet_obj)}")
-                else:
-                    logger.warning(f"Planet attribute '{attr_name}' not found in AstrologicalSubject.")
-
-            # Extract House Cusps (Using direct attribute access for v4)
-            houses_data = []
-            house_attr_names = [
-                'first_house', 'second_house', 'third_house', 'fourth_house',
-                'fifth_house', 'sixth_house', 'seventh_house', 'eighth_house',
-                'ninth_house', 'tenth_house', 'eleventh_house', 'twelfth_house'
-            ]
-            for i, attr_name in enumerate(house_attr_names):
-                 if hasattr(self.subject, attr_name):
-                    house_obj = getattr(self.subject, attr_name)
-                    # Check if it's a KerykeionPointModel or similar object
-                    if house_obj and hasattr(house_obj, 'abs_pos'): # Check for a known attribute
-                        # Access attributes directly
-                        abs_pos = getattr(house_obj, 'abs_pos', None)
-                        # sign = getattr(house_obj, 'sign', 'Unknown') # Old way
-                        sign_num = getattr(house_obj, 'sign_num', None)
-                        position = getattr(house_obj, 'position', None)
-
-                        # Get full sign name for houses as well
-                        full_house_sign_name = SIGN_FULL_NAMES[sign_num] if sign_num is not None and sign_num >= 0 and sign_num < len(SIGN_FULL_NAMES) else 'Unknown'
-                        
-                        if abs_pos is not None:
-                            houses_data.append({
-                                "cusp": i + 1,
-                                "sign": full_house_sign_name, # Use full sign name
-                                "sign_num": sign_num,
-                                "position": position,
-                                "absolute_position": abs_pos
-                            })
-                        else:
-                            logger.warning(f"House attribute '{attr_name}' object missing 'abs_pos'. Type: {type(house_obj)}")
-                    else:
-                         logger.warning(f"Attribute '{attr_name}' found but is not a valid KerykeionPointModel or similar (lacks 'abs_pos'). Type: {type(house_obj)}")
-                 else:
-                     logger.warning(f"House attribute '{attr_name}' not found in AstrologicalSubject.")
-
-            # Extract Aspects - Placeholder until dir() output is reviewed
-            aspects_data = []
-            try:
-                logger.info("Attempting to calculate aspects (Kerykeion v4)...")
-                # --- Try using NatalAspects class if available --- 
-                if KERYKEION_NATAL_ASPECTS_AVAILABLE:
-                    logger.info("NatalAspects class is available. Attempting instantiation.")
-                    try:
-                        natal_aspect_calculator = NatalAspects(self.subject)
-                        # --- Log dir(natal_aspect_calculator) for debugging v4 aspects ---
-                        logger.info(f"--- Inspecting NatalAspects instance (v4) ---")
-                        try:
-                            logger.warning(f"Attributes/Methods of NatalAspects instance: {sorted(dir(natal_aspect_calculator))}")
-                        except Exception as dir_na_e:
-                            logger.error(f"Error getting dir(natal_aspect_calculator): {dir_na_e}")
-                        logger.info(f"--------------------------------------------------")
-                        # --- End Debugging ---
-
-                        # logger.info("Checking for 'relevant_aspects' attribute...") # Removed debug log
-                        # Access the relevant_aspects attribute
-                        raw_aspects = []
-                        if hasattr(natal_aspect_calculator, 'relevant_aspects'):
-                            # logger.info("'relevant_aspects' attribute FOUND. Attempting to access it.") # Removed debug log
-                            try:
-                                raw_aspects = natal_aspect_calculator.relevant_aspects
-                                # --- Removed print to stderr --- 
-                                
-                                # --- Removed granular logger.info steps --- 
-
-                            except Exception as e_access:
-                                # Keep error logging for access issues
-                                logger.error(f"ASTROLOGY_PY_DEBUG: ERROR during assignment or initial logging of 'relevant_aspects': {e_access}", exc_info=True)
-                                aspects_data = [] # Ensure aspects_data is empty on error
-                            else:
-                                # This block only executes if accessing raw_aspects succeeded
-                                if isinstance(raw_aspects, list):
-                                    # logger.info(f"Retrieved {len(raw_aspects)} aspects via NatalAspects.relevant_aspects property.") # Removed debug log
-                                    if raw_aspects:
-                                        aspects_data = []
-                                        for aspect_detail in raw_aspects:
-                                            # Check if aspect_detail is an instance of Kerykeion's AspectModel or similar
-                                            if hasattr(aspect_detail, 'p1_name') and hasattr(aspect_detail, 'p2_name') and hasattr(aspect_detail, 'aspect') and hasattr(aspect_detail, 'orbit'):
-                                                p1_name = getattr(aspect_detail, 'p1_name', 'Unknown Planet 1')
-                                                p2_name = getattr(aspect_detail, 'p2_name', 'Unknown Planet 2')
-                                                aspect_name = getattr(aspect_detail, 'aspect', 'Unknown Aspect')
-                                                orb = getattr(aspect_detail, 'orbit', 0.0)
-                                                
-                                                # Placeholder for aspect_degrees and aspect_type until we confirm their source in AspectModel
-                                                aspect_degrees = getattr(aspect_detail, 'aspect_degrees', 0.0) # Assuming it might exist
-                                                aspect_type_val = getattr(aspect_detail, 'aid', None) # Assuming 'aid' might exist for type
-                                                if aspect_type_val is None:
-                                                    aspect_type_val = getattr(aspect_detail, 'aspect_type', 0) # Alternative common name
-
-                                                aspect_info = {
-                                                    "p1_name": p1_name,
-                                                    "p2_name": p2_name,
-                                                    "aspect_name": aspect_name,
-                                                    "orb": orb,
-                                                    "aspect_degrees": aspect_degrees
-                                                }
-                                                logger.debug(f"Aspect: {aspect_name} between {p1_name} and {p2_name} with orb {orb}")
-                                                aspects_data.append(aspect_info)
-                                            else:
-                                                # Keep warning for unexpected data structure
-                                                logger.warning(f"Skipping aspect_detail due to missing expected attributes. Type: {type(aspect_detail)}, Value: {str(aspect_detail)[:200]}")
-                                        # logger.info(f"Processed {len(aspects_data)} aspects into desired format.") # Removed debug log
-                                    else:
-                                        pass # No aspects found, aspects_data remains []
-                                        # logger.info("NatalAspects.relevant_aspects was empty.") # Removed debug log
-                                else:
-                                    # Keep warning for non-list data
-                                    logger.warning(f"NatalAspects.relevant_aspects is not a list (type: {type(raw_aspects)}), after successful access. Aspects will be empty.")
-                        elif hasattr(natal_aspect_calculator, 'all_aspects'):
-                            # logger.info("'relevant_aspects' attribute NOT FOUND. Checking for 'all_aspects'...") # Removed debug log
-                            # Similar processing for all_aspects can be added here if needed, 
-                            # ensuring to handle its structure correctly.
-                            logger.warning("'all_aspects' found, but processing logic is not fully implemented here yet. Aspects will be empty.")
-                            aspects_data = [] # Placeholder
-                        else:
-                            logger.warning("Neither 'relevant_aspects' nor 'all_aspects' found.")
-                    except Exception as na_inst_e:
-                         logger.error(f"Error instantiating or using NatalAspects: {na_inst_e}", exc_info=True)
-                else:
-                    logger.warning("NatalAspects class not imported. Cannot calculate aspects this way.")
-                    logger.warning("Aspect calculation logic needs update based on AstrologicalSubject v4 inspection (dir output). Aspects will be empty.")
-
-            except KerykeionException as ke_aspect:
-                logger.error(f"Kerykeion error calculating aspects for {self.name}: {ke_aspect}", exc_info=True)
-            except Exception as e_aspect:
-                logger.error(f"Unexpected error calculating aspects for {self.name}: {e_aspect}", exc_info=True)
-                # Keep aspects_data empty
-            # --- End Aspect Calculation ---
-            
-            # Populate Sun Sign and Ascendant Sign for info block
-            k_sun_sign = "Unknown"
-            k_asc_sign = "Unknown"
-            if hasattr(self.subject, 'sun') and isinstance(self.subject.sun, dict):
-                k_sun_sign = self.subject.sun.get('sign', "Unknown")
-            if hasattr(self.subject, 'first_house') and isinstance(self.subject.first_house, dict):
-                k_asc_sign = self.subject.first_house.get('sign', "Unknown")
-            
-            # Ensure houses_data uses the correct fields as per HouseInfo Pydantic model
-            # cusp: int # House number (1-12)
-            # sign: str
-            # sign_num: Optional[int] = None
-            # position: Optional[float] = None # Degree of the cusp within the sign
-            # absolute_position: Optional[float] = None # Absolute longitude of the cusp
-
-            # --- Removed old house extraction logic --- 
-            # Primary and more reliable way to get house data
-            # houses_data = [] # Re-initialize to ensure it's clean before population
-            # if hasattr(self.subject, 'houses_list') and isinstance(self.subject.houses_list, list) and len(self.subject.houses_list) == 12:
-            #     for house_dict in self.subject.houses_list:
-            #         try:
-            #             houses_data.append({
-            #                 "cusp": int(house_dict.get("name")), # HouseInfo field name, from "name" in AstrologicalSubject
-            #                 "sign": house_dict.get("sign"),
-            #                 "sign_num": house_dict.get("sign_num"),
-            #                 "position": house_dict.get("position"), # Degree within sign
-            #                 "absolute_position": house_dict.get("abs_pos") # Absolute longitude from "abs_pos"
-            #             })
-            #         except (ValueError, TypeError) as e:
-            #             logger.error(f"Error processing house data for house '{house_dict.get('name')}': {e} - data: {house_dict}")
-            # else:
-            #     logger.warning(f"Could not retrieve complete house cusp data for {self.name} from Kerykeion AstrologicalSubject.houses_list. Houses will be empty or incomplete. self.subject.houses_list available: {hasattr(self.subject, 'houses_list')}")
-            #     # Optionally, you could try the _houses_list approach here as a fallback if desired,
-            #     # but it was proving unreliable. For now, prefer empty if standard fails.
-
-            # --- Element and Mode Calculation ---
-            ELEMENT_MAP = {
-                "Aries": "Fire", "Leo": "Fire", "Sagittarius": "Fire",
-                "Taurus": "Earth", "Virgo": "Earth", "Capricorn": "Earth",
-                "Gemini": "Air", "Libra": "Air", "Aquarius": "Air",
-                "Cancer": "Water", "Scorpio": "Water", "Pisces": "Water"
-            }
-            MODE_MAP = {
-                "Aries": "Cardinal", "Cancer": "Cardinal", "Libra": "Cardinal", "Capricorn": "Cardinal",
-                "Taurus": "Fixed", "Leo": "Fixed", "Scorpio": "Fixed", "Aquarius": "Fixed",
-                "Gemini": "Mutable", "Virgo": "Mutable", "Sagittarius": "Mutable", "Pisces": "Mutable"
-            }
-            element_counts = {"Fire": 0, "Earth": 0, "Air": 0, "Water": 0}
-            mode_counts = {"Cardinal": 0, "Fixed": 0, "Mutable": 0}
-            for planet in planets_data.values():
-                sign = planet.get("sign")
-                element = ELEMENT_MAP.get(sign)
-                mode = MODE_MAP.get(sign)
-                if element:
-                    element_counts[element] += 1
-                if mode:
-                    mode_counts[mode] += 1
-
-            # --- Planetary Dignity Calculation ---
-            # Dignity tables (simplified for main planets)
-            RULERSHIP = {
-                "Aries": "Mars", "Taurus": "Venus", "Gemini": "Mercury", "Cancer": "Moon",
-                "Leo": "Sun", "Virgo": "Mercury", "Libra": "Venus", "Scorpio": "Mars",
-                "Sagittarius": "Jupiter", "Capricorn": "Saturn", "Aquarius": "Saturn", "Pisces": "Jupiter"
-            }
-            EXALTATION = {
-                "Aries": "Sun", "Taurus": "Moon", "Cancer": "Jupiter", "Virgo": "Mercury",
-                "Libra": "Saturn", "Capricorn": "Mars", "Pisces": "Venus"
-            }
-            DETRIMENT = {
-                "Aries": "Venus", "Taurus": "Mars", "Gemini": "Jupiter", "Cancer": "Saturn",
-                "Leo": "Saturn", "Virgo": "Neptune", "Libra": "Mars", "Scorpio": "Venus",
-                "Sagittarius": "Mercury", "Capricorn": "Moon", "Aquarius": "Sun", "Pisces": "Mercury"
-            }
-            FALL = {
-                "Aries": "Saturn", "Taurus": "Uranus", "Gemini": "South Node", "Cancer": "Mars",
-                "Leo": "Pluto", "Virgo": "Venus", "Libra": "Sun", "Scorpio": "Moon",
-                "Sagittarius": "North Node", "Capricorn": "Jupiter", "Aquarius": "Neptune", "Pisces": "Mercury"
-            }
-            for planet in planets_data.values():
-                sign = planet.get("sign")
-                name = planet.get("name")
-                dignity = "Peregrine"
-                if name and sign:
-                    if RULERSHIP.get(sign) == name:
-                        dignity = "Rulership"
-                    elif EXALTATION.get(sign) == name:
-                        dignity = "Exaltation"
-                    elif DETRIMENT.get(sign) == name:
-                        dignity = "Detriment"
-                    elif FALL.get(sign) == name:
-                        dignity = "Fall"
-                planet["dignity"] = dignity
-
-            result = {
-                "info": {
-                    "name": self.name,
-                    "birth_datetime": self.birth_dt.isoformat(),
-                    "location": self.city,
-                    "latitude": self.latitude,
-                    "longitude": self.longitude,
-                    "kerykeion_sun_sign": k_sun_sign,
-                    "kerykeion_asc_sign": k_asc_sign,
-                    "kerykeion_version": getattr(self.subject, 'kerykeion_version', 'unknown')
-                },
-                "planets": planets_data,
-                "houses": houses_data, # Now populated correctly and matching HouseInfo
-                "aspects": aspects_data, # Populated with calculated aspects now
-                "calculation_error": None, # Success (unless specific aspect error occurred)
-                "element_counts": element_counts,
-                "mode_counts": mode_counts,
-            }
-            logger.info(f"Successfully calculated chart details for {self.name}. Aspects found: {len(aspects_data)}")
+            result: Dict[str, Any] = {"info": self._info()}
+            for section in CHART_SECTIONS:
+                if section in requested and section != "dignities":
+                    result[section] = self._section(section)
+            if "dignities" in requested:
+                # Dignities are fields of the planet entries rather than a section of their own
+                self._section("dignities")
+                result["planets"] = self._section("planets")
+            result["calculation_error"] = None # Success (unless specific aspect error occurred)
+            if "aspects" in requested:
+                logger.info(f"Successfully calculated chart details for {self.name}. Aspects found: {len(result['aspects'])}")
             return result
 
-        except KerykeionException as ke:
+        except KERYKEION_ERRORS as ke:
             logger.error(f"Kerykeion error calculating chart details for {self.name}: {ke}", exc_info=True)
             return { "info": {"name": self.name}, "planets": [], "houses": [], "aspects": [], "calculation_error": f"Kerykeion Calculation Error: {ke}" }
         except Exception as e:
             logger.error(f"Unexpected error calculating chart details for {self.name}: {e}", exc_info=True)
             return { "info": {"name": self.name}, "planets": [], "houses": [], "aspects": [], "calculation_error": f"Unexpected Error during calculation: {e}" }
 
+    def _section(self, name: str) -> Any:
+        """Computes a section on first use and memoizes it (sections depend on each other, e.g. counts on planets)."""
+        if name not in self._sections:
+            self._sections[name] = getattr(self, f"_calculate_{name}")()
+        return self._sections[name]
+
+    def _info(self) -> Dict[str, Any]:
+        # Populate Sun Sign and Ascendant Sign for info block
+        k_sun_sign = "Unknown"
+        k_asc_sign = "Unknown"
+        if hasattr(self.subject, 'sun') and isinstance(self.subject.sun, dict):
+            k_sun_sign = self.subject.sun.get('sign', "Unknown")
+        if hasattr(self.subject, 'first_house') and isinstance(self.subject.first_house, dict):
+            k_asc_sign = self.subject.first_house.get('sign', "Unknown")
+        return {
+            "name": self.name,
+            "birth_datetime": self.birth_dt.isoformat(),
+            "location": self.city,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "kerykeion_sun_sign": k_sun_sign,
+            "kerykeion_asc_sign": k_asc_sign,
+            "kerykeion_version": getattr(self.subject, 'kerykeion_version', 'unknown')
+        }
+
+    def _calculate_planets(self) -> Dict[str, Dict[str, Any]]:
+        # Extract Planet Data (Using direct attribute access for v4)
+        planets_data: Dict[str, Dict[str, Any]] = {} # Initialize as dict
+        # List of planet attribute names expected in Kerykeion v4 AstrologicalSubject
+        planet_attr_names = [
+            'sun', 'moon', 'mercury', 'venus', 'mars', 
+            'jupiter', 'saturn', 'uranus', 'neptune', 'pluto',
+            # Add others if needed (e.g., 'mean_node', 'true_node', 'chiron')
+            'mean_node', 'true_node', 'mean_south_node', 'true_south_node',
+            'chiron', 'mean_lilith',
+            'ascendant', 'medium_coeli', 'descendant', 'imum_coeli' # From AstrologicalSubject
+        ]
+        for attr_name in planet_attr_names:
+            if hasattr(self.subject, attr_name):
+                planet_obj = getattr(self.subject, attr_name)
+                # Check if it's a KerykeionPointModel or similar object (not just dict)
+                if planet_obj and hasattr(planet_obj, 'abs_pos'): # Check for a known attribute
+                    display_name = PLANET_MAP.get(attr_name, attr_name.capitalize())
+                    # Access attributes directly
+                    sign_num = getattr(planet_obj, 'sign_num', -1)
+                    # sign = getattr(planet_obj, 'sign', 'Unknown') # Old way, gave abbreviation
+                    abs_pos = getattr(planet_obj, 'abs_pos', None)
+                    position = getattr(planet_obj, 'position', None)
+                    retrograde = getattr(planet_obj, 'retrograde', False)
+                    
+                    # Get full sign name from sign_num
+                    full_sign_name = SIGN_FULL_NAMES[sign_num] if sign_num >= 0 and sign_num < len(SIGN_FULL_NAMES) else 'Unknown'
+                    
+                    if abs_pos is not None:
+                        planet_name_key = display_name # Use the display name (e.g., "Sun") as the key
+                        planets_data[planet_name_key] = { # Assign to dict using key
+                             "name": display_name,
+                             "sign": full_sign_name, # Use full sign name
+                             "sign_symbol": SIGN_SYMBOLS[sign_num] if sign_num >= 0 and sign_num < len(SIGN_SYMBOLS) else '?',
+                             "longitude": abs_pos, 
+                             "deg_within_sign": position, 
+                             "is_retrograde": retrograde, 
+                        }
+                    else:
+                         logger.warning(f"Planet object '{attr_name}' missing 'abs_pos'. Type: {type(planet_obj)}")
+                else:
+                     logger.warning(f"Attribute '{attr_name}' found but is not a valid KerykeionPointModel or similar (lacks 'abs_pos'). Type: {type(planet_obj)}")
+            else:
+                logger.warning(f"Planet attribute '{attr_name}' not found in AstrologicalSubject.")
+        return planets_data
+
+    def _calculate_houses(self) -> List[Dict[str, Any]]:
+        # Extract House Cusps (Using direct attribute access for v4)
+        houses_data = []
+        house_attr_names = [
+            'first_house', 'second_house', 'third_house', 'fourth_house',
+            'fifth_house', 'sixth_house', 'seventh_house', 'eighth_house',
+            'ninth_house', 'tenth_house', 'eleventh_house', 'twelfth_house'
+        ]
+        for i, attr_name in enumerate(house_attr_names):
+             if hasattr(self.subject, attr_name):
+                house_obj = getattr(self.subject, attr_name)
+                # Check if it's a KerykeionPointModel or similar object
+                if house_obj and hasattr(house_obj, 'abs_pos'): # Check for a known attribute
+                    # Access attributes directly
+                    abs_pos = getattr(house_obj, 'abs_pos', None)
+                    # sign = getattr(house_obj, 'sign', 'Unknown') # Old way
+                    sign_num = getattr(house_obj, 'sign_num', None)
+                    position = getattr(house_obj, 'position', None)
+
+                    # Get full sign name for houses as well
+                    full_house_sign_name = SIGN_FULL_NAMES[sign_num] if sign_num is not None and sign_num >= 0 and sign_num < len(SIGN_FULL_NAMES) else 'Unknown'
+                    
+                    if abs_pos is not None:
+                        houses_data.append({
+                            "cusp": i + 1,
+                            "sign": full_house_sign_name, # Use full sign name
+                            "sign_num": sign_num,
+                            "position": position,
+                            "absolute_position": abs_pos
+                        })
+                    else:
+                        logger.warning(f"House attribute '{attr_name}' object missing 'abs_pos'. Type: {type(house_obj)}")
+                else:
+                     logger.warning(f"Attribute '{attr_name}' found but is not a valid KerykeionPointModel or similar (lacks 'abs_pos'). Type: {type(house_obj)}")
+             else:
+                 logger.warning(f"House attribute '{attr_name}' not found in AstrologicalSubject.")
+        return houses_data
+
+    def _calculate_aspects(self) -> List[Dict[str, Any]]:
+        # Extract Aspects
+        aspects_data = []
+        try:
+            logger.info("Attempting to calculate aspects (Kerykeion v4)...")
+            # --- Try using NatalAspects class if available --- 
+            if KERYKEION_NATAL_ASPECTS_AVAILABLE:
+                logger.info("NatalAspects class is available. Attempting instantiation.")
+                try:
+                    with phase("aspects"):
+                        natal_aspect_calculator = NatalAspects(self.subject)
+                        # relevant_aspects is a cached property; evaluate it here so the phase covers the work
+                        getattr(natal_aspect_calculator, 'relevant_aspects', None)
+                    # logger.info("Checking for 'relevant_aspects' attribute...") # Removed debug log
+                    # Access the relevant_aspects attribute
+                    raw_aspects = []
+                    if hasattr(natal_aspect_calculator, 'relevant_aspects'):
+                        # logger.info("'relevant_aspects' attribute FOUND. Attempting to access it.") # Removed debug log
+                        try:
+                            raw_aspects = natal_aspect_calculator.relevant_aspects
+                            # --- Removed print to stderr --- 
+                            
+                            # --- Removed granular logger.info steps --- 
+
+                        except Exception as e_access:
+                            # Keep error logging for access issues
+                            logger.error(f"ASTROLOGY_PY_DEBUG: ERROR during assignment or initial logging of 'relevant_aspects': {e_access}", exc_info=True)
+                            aspects_data = [] # Ensure aspects_data is empty on error
+                        else:
+                            # This block only executes if accessing raw_aspects succeeded
+                            if isinstance(raw_aspects, list):
+                                # logger.info(f"Retrieved {len(raw_aspects)} aspects via NatalAspects.relevant_aspects property.") # Removed debug log
+                                if raw_aspects:
+                                    aspects_data = []
+                                    for aspect_detail in raw_aspects:
+                                        # Check if aspect_detail is an instance of Kerykeion's AspectModel or similar
+                                        if hasattr(aspect_detail, 'p1_name') and hasattr(aspect_detail, 'p2_name') and hasattr(aspect_detail, 'aspect') and hasattr(aspect_detail, 'orbit'):
+                                            p1_name = getattr(aspect_detail, 'p1_name', 'Unknown Planet 1')
+                                            p2_name = getattr(aspect_detail, 'p2_name', 'Unknown Planet 2')
+                                            aspect_name = getattr(aspect_detail, 'aspect', 'Unknown Aspect')
+                                            orb = getattr(aspect_detail, 'orbit', 0.0)
+                                            
+                                            # Placeholder for aspect_degrees and aspect_type until we confirm their source in AspectModel
+                                            aspect_degrees = getattr(aspect_detail, 'aspect_degrees', 0.0) # Assuming it might exist
+                                            aspect_type_val = getattr(aspect_detail, 'aid', None) # Assuming 'aid' might exist for type
+                                            if aspect_type_val is None:
+                                                aspect_type_val = getattr(aspect_detail, 'aspect_type', 0) # Alternative common name
+
+                                            aspect_info = {
+                                                "p1_name": p1_name,
+                                                "p2_name": p2_name,
+                                                "aspect_name": aspect_name,
+                                                "orb": orb,
+                                                "aspect_degrees": aspect_degrees
+                                            }
+                                            logger.debug(f"Aspect: {aspect_name} between {p1_name} and {p2_name} with orb {orb}")
+                                            aspects_data.append(aspect_info)
+                                        else:
+                                            # Keep warning for unexpected data structure
+                                            logger.warning(f"Skipping aspect_detail due to missing expected attributes. Type: {type(aspect_detail)}, Value: {str(aspect_detail)[:200]}")
+                                    # logger.info(f"Processed {len(aspects_data)} aspects into desired format.") # Removed debug log
+                                else:
+                                    pass # No aspects found, aspects_data remains []
+                                    # logger.info("NatalAspects.relevant_aspects was empty.") # Removed debug log
+                            else:
+                                # Keep warning for non-list data
+                                logger.warning(f"NatalAspects.relevant_aspects is not a list (type: {type(raw_aspects)}), after successful access. Aspects will be empty.")
+                    elif hasattr(natal_aspect_calculator, 'all_aspects'):
+                        # logger.info("'relevant_aspects' attribute NOT FOUND. Checking for 'all_aspects'...") # Removed debug log
+                        # Similar processing for all_aspects can be added here if needed, 
+                        # ensuring to handle its structure correctly.
+                        logger.warning("'all_aspects' found, but processing logic is not fully implemented here yet. Aspects will be empty.")
+                        aspects_data = [] # Placeholder
+                    else:
+                        logger.warning("Neither 'relevant_aspects' nor 'all_aspects' found.")
+                except Exception as na_inst_e:
+                     logger.error(f"Error instantiating or using NatalAspects: {na_inst_e}", exc_info=True)
+            else:
+                logger.warning("NatalAspects class not imported. Cannot calculate aspects this way.")
+                logger.warning("Aspect calculation logic needs update based on AstrologicalSubject v4 inspection (dir output). Aspects will be empty.")
+
+        except KERYKEION_ERRORS as ke_aspect:
+            logger.error(f"Kerykeion error calculating aspects for {self.name}: {ke_aspect}", exc_info=True)
+        except Exception as e_aspect:
+            logger.error(f"Unexpected error calculating aspects for {self.name}: {e_aspect}", exc_info=True)
+            # Keep aspects_data empty
+        # --- End Aspect Calculation ---
+        return aspects_data
+
+    def _calculate_element_counts(self) -> Dict[str, int]:
+        element_counts = {"Fire": 0, "Earth": 0, "Air": 0, "Water": 0}
+        for planet in self._section("planets").values():
+            element = ELEMENT_MAP.get(planet.get("sign"))
+            if element:
+                element_counts[element] += 1
+        return element_counts
+
+    def _calculate_mode_counts(self) -> Dict[str, int]:
+        mode_counts = {"Cardinal": 0, "Fixed": 0, "Mutable": 0}
+        for planet in self._section("planets").values():
+            mode = MODE_MAP.get(planet.get("sign"))
+            if mode:
+                mode_counts[mode] += 1
+        return mode_counts
+
+    def _calculate_dignities(self) -> Dict[str, str]:
+        """Sets each planet entry's "dignity" and returns them by planet."""
+        dignities = {}
+        for key, planet in self._section("planets").items():
+            sign = planet.get("sign")
+            name = planet.get("name")
+            dignity = "Peregrine"
+            if name and sign:
+                if RULERSHIP.get(sign) == name:
+                    dignity = "Rulership"
+                elif EXALTATION.get(sign) == name:
+                    dignity = "Exaltation"
+                elif DETRIMENT.get(sign) == name:
+                    dignity = "Detriment"
+                elif FALL.get(sign) == name:
+                    dignity = "Fall"
+            planet["dignity"] = dignity
+            dignities[key] = dignity
+        return dignities
+
 # --- Transit Calculation (Sync function, called via run_in_threadpool) ---
 def calculate_transits(
     natal_chart_data: Dict[str, Any], # Contains natal planets, houses, location info
@@ -525,7 +573,7 @@ def calculate_transits(
     """
     Calculates transiting planet positions for a given datetime and aspects to natal planets.
     """
-    if not KERYKEION_AVAILABLE:
+    if not _ensure_kerykeion():
         return {"error": "Kerykeion library not available."}
 
     logger.info(f"Calculating transits for date: {transit_dt}")
@@ -554,8 +602,7 @@ def calculate_transits(
     tz_str_transit: Optional[str] = None
     if TIMEZONEFINDER_AVAILABLE and calc_lat is not None and calc_lon is not None:
         try:
-            tf = TimezoneFinder()
-            tz_str_transit = tf.timezone_at(lng=calc_lon, lat=calc_lat)
+            tz_str_transit = timezone_at(calc_lat, calc_lon)
             logger.info(f"Transit timezone for ({calc_lat}, {calc_lon}): {tz_str_transit}")
         except Exception as tz_e:
             logger.error(f"Error using timezonefinder for transit: {tz_e}")
@@ -565,20 +612,21 @@ def calculate_transits(
     # --- End Timezone Determination ---
 
     try:
-        transit_subject = AstrologicalSubject(
-            name="Transit",
-            year=transit_dt.year,
-            month=transit_dt.month,
-            day=transit_dt.day,
-            hour=transit_dt.hour,
-            minute=transit_dt.minute,
-            city=calc_city,
-            lng=calc_lon,
-            lat=calc_lat,
-            tz_str=tz_str_transit
-        )
+        with phase("subject"), swisseph_lock:
+            transit_subject = AstrologicalSubject(
+                name="Transit",
+                year=transit_dt.year,
+                month=transit_dt.month,
+                day=transit_dt.day,
+                hour=transit_dt.hour,
+                minute=transit_dt.minute,
+                city=calc_city,
+                lng=calc_lon,
+                lat=calc_lat,
+                tz_str=tz_str_transit
+            )
         logger.info(f"Initialized Kerykeion AstrologicalSubject for Transit at {calc_city} ({calc_lat}, {calc_lon}) for {transit_dt}")
-    except KerykeionException as ke:
+    except KERYKEION_ERRORS as ke:
         logger.error(f"Kerykeion error initializing transit subject: {ke}", exc_info=True)
         return {"error": f"Kerykeion Initialization Error for transit: {ke}"}
     except Exception as e:
@@ -649,42 +697,38 @@ def calculate_transits(
 
     # Calculate Aspects between Transiting Planets and Natal Planets
     transit_aspects = []
-    ASPECT_DEGREES_ORBS = {
-        "Conjunction": (0, 8.0), "Sextile": (60, 5.0), "Square": (90, 7.0),
-        "Trine": (120, 7.0), "Opposition": (180, 8.0), "Quincunx": (150, 3.0),
-        "SemiSextile": (30, 2.0), "SemiSquare": (45, 2.0), "Sesquiquadrate": (135, 2.0)
-    }
 
-    for tp_name, tp_data in transiting_planets_data.items():
-        for np_name, np_data in natal_planets_input.items(): # Iterate over natal_planets_input
-            # tp_name and np_name are keys like "Sun", "Moon"
-            # tp_data and np_data are dicts like {"name": "Sun", "longitude": ..., ...}
+    with phase("aspects"):
+        for tp_name, tp_data in transiting_planets_data.items():
+            for np_name, np_data in natal_planets_input.items(): # Iterate over natal_planets_input
+                # tp_name and np_name are keys like "Sun", "Moon"
+                # tp_data and np_data are dicts like {"name": "Sun", "longitude": ..., ...}
             
-            # Skip aspecting a transiting planet to its own natal position if names match and it's not meaningful
-            # (e.g. Transiting Sun to Natal Sun - always a conjunction, but maybe not desired in a typical transit list)
-            # For now, we allow all, as aspects like Sun conjunct natal Sun (Solar Return) are significant.
+                # Skip aspecting a transiting planet to its own natal position if names match and it's not meaningful
+                # (e.g. Transiting Sun to Natal Sun - always a conjunction, but maybe not desired in a typical transit list)
+                # For now, we allow all, as aspects like Sun conjunct natal Sun (Solar Return) are significant.
             
-            tp_lon = tp_data.get("longitude")
-            np_lon = np_data.get("longitude")
+                tp_lon = tp_data.get("longitude")
+                np_lon = np_data.get("longitude")
 
-            # Only proceed if both are real numbers
-            if not (isinstance(tp_lon, (int, float)) and isinstance(np_lon, (int, float))):
-                logger.debug(f"Skipping aspect calc for {tp_name} to {np_name} due to non-numeric longitude (tp_lon={tp_lon}, np_lon={np_lon}).")
-                continue
+                # Only proceed if both are real numbers
+                if not (isinstance(tp_lon, (int, float)) and isinstance(np_lon, (int, float))):
+                    logger.debug(f"Skipping aspect calc for {tp_name} to {np_name} due to non-numeric longitude (tp_lon={tp_lon}, np_lon={np_lon}).")
+                    continue
 
-            angle_diff = abs(tp_lon - np_lon)
-            if angle_diff > 180:
-                angle_diff = 360 - angle_diff
+                angle_diff = abs(tp_lon - np_lon)
+                if angle_diff > 180:
+                    angle_diff = 360 - angle_diff
             
-            for aspect_name, (degrees, orb_limit) in ASPECT_DEGREES_ORBS.items():
-                orb = abs(angle_diff - degrees)
-                if orb <= orb_limit:
-                    transit_aspects.append({
-                        "transiting_planet": tp_name, # Name of the transiting planet
-                        "aspect_name": aspect_name,
-                        "natal_planet": np_name,   # Name of the natal planet
-                        "orb": round(orb, 2)
-                    })
+                for aspect_name, (degrees, orb_limit) in ASPECT_DEGREES_ORBS.items():
+                    orb = abs(angle_diff - degrees)
+                    if orb <= orb_limit:
+                        transit_aspects.append({
+                            "transiting_planet": tp_name, # Name of the transiting planet
+                            "aspect_name": aspect_name,
+                            "natal_planet": np_name,   # Name of the natal planet
+                            "orb": round(orb, 2)
+                        })
     
     logger.info(f"Calculated {len(transit_aspects)} aspects between transiting and natal planets.")
 
@@ -709,7 +753,7 @@ async def create_subject_from_input_data(person_input: SynastryCompositePersonIn
     Creates a Kerykeion AstrologicalSubject from SynastryCompositePersonInput data.
     Fetches coordinates if not provided.
     """
-    if not KERYKEION_AVAILABLE or not _AstrologicalSubject:
+    if not _ensure_kerykeion() or not _AstrologicalSubject:
         logger.error("Kerykeion library or AstrologicalSubject is not available. Cannot create subject from input data.")
         return None
 
@@ -741,20 +785,21 @@ async def create_subject_from_input_data(person_input: SynastryCompositePersonIn
             return None
     
     try:
-        subject = _AstrologicalSubject(
-            name=name,
-            year=birth_dt_naive.year,
-            month=birth_dt_naive.month,
-            day=birth_dt_naive.day,
-            hour=birth_dt_naive.hour,
-            minute=birth_dt_naive.minute,
-            city=city,
-            lat=latitude,
-            lon=longitude
-        )
+        with swisseph_lock:
+            subject = _AstrologicalSubject(
+                name=name,
+                year=birth_dt_naive.year,
+                month=birth_dt_naive.month,
+                day=birth_dt_naive.day,
+                hour=birth_dt_naive.hour,
+                minute=birth_dt_naive.minute,
+                city=city,
+                lat=latitude,
+                lon=longitude
+            )
         logger.info(f"Successfully created AstrologicalSubject for {name} from input data.")
         return subject
-    except _KerykeionException as ke:
+    except KERYKEION_ERRORS as ke:
         logger.error(f"KerykeionException creating AstrologicalSubject for {name} from input data: {ke}")
         return None
     except Exception as e:
@@ -769,7 +814,7 @@ def calculate_synastry(
     Calculates synastry aspects between two AstrologicalSubject instances using Kerykeion.
     Returns a dictionary with aspects or an error.
     """
-    if not KERYKEION_AVAILABLE or not _SynastryAspects:
+    if not _ensure_kerykeion() or not _SynastryAspects:
         return {"aspects": [], "error": "Kerykeion library or SynastryAspects not available."}
 
     if not subject1 or not subject2:
@@ -783,7 +828,13 @@ def calculate_synastry(
         synastry_instance = SynastryAspects(subject1, subject2)
         
         processed_aspects = []
-        aspect_list_to_process = getattr(synastry_instance, 'aspects_list', [])
+        aspect_list_to_process = getattr(synastry_instance, 'aspects_list', None)
+        if aspect_list_to_process is None:
+            # Kerykeion 4.x has no aspects_list: its AspectModel entries are in relevant_aspects
+            aspect_list_to_process = [
+                (aspect.p1_name, aspect.p2_name, aspect.aspect, aspect.orbit, aspect.aspect_degrees)
+                for aspect in getattr(synastry_instance, 'relevant_aspects', [])
+            ]
         if not isinstance(aspect_list_to_process, list):
             logger.warning(f"SynastryAspects.aspects_list is not a list (type: {type(aspect_list_to_process)}). Defaulting to empty aspects.")
             aspect_list_to_process = []
@@ -805,7 +856,7 @@ def calculate_synastry(
         
         return {"aspects": processed_aspects, "error": None}
 
-    except _KerykeionException as ke:
+    except KERYKEION_ERRORS as ke:
         logger.error(f"Kerykeion error during synastry calculation: {ke}", exc_info=True)
         return {"aspects": [], "error": f"Kerykeion Synastry Error: {ke}"}
     except Exception as e:
@@ -821,7 +872,7 @@ def calculate_composite_chart(
     Calculates a composite chart from two AstrologicalSubject instances using Kerykeion.
     Returns a dictionary with composite planets or an error.
     """
-    if not KERYKEION_AVAILABLE or not _CompositeSubjectFactory:
+    if not _ensure_kerykeion() or not _CompositeSubjectFactory:
         return {"composite_planets": [], "error": "Kerykeion library or CompositeSubjectFactory not available."}
 
     if not subject1 or not subject2:
@@ -873,7 +924,7 @@ def calculate_composite_chart(
 
         return {"composite_planets": processed_planets, "error": None}
 
-    except _KerykeionException as ke:
+    except KERYKEION_ERRORS as ke:
         logger.error(f"Kerykeion error during composite chart calculation: {ke}", exc_info=True)
         return {"composite_planets": [], "error": f"Kerykeion CompositeSubjectFactory Error: {ke}"}
     except Exception as e:
@@ -0,0 +1,264 @@
+# /app/services/chart_render.py
+"""
+Server-side chart wheels (SVG, and PNG when cairosvg is installed) drawn with
+Kerykeion's KerykeionChartSVG: natal wheels, transit bi-wheels and synastry
+bi-wheels.
+
+Rendering costs a subject build per chart plus the SVG template work, and the
+same wheels are requested over and over (every share, export and page view),
+so images are cached on disk under a key hashing everything that shows in the
+picture: the charts' names, places and content hashes, the render options, the
+engine version and WHEEL_RENDER_VERSION. A key therefore always names the same
+bytes, which is what lets /charts/wheels/{key}.{format} be served as
+immutable. The directory is shared by every worker on the host; files are
+written atomically and the least recently used ones are pruned beyond
+WHEEL_CACHE_MAX_MB.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.single_flight import calculation_flights
+from app.core.timing import phase
+from app.services import astrology
+from app.services.executor import run_calculation
+from app.services.positions import ENGINE_VERSION, chart_content_hash
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendering itself changes (template, options handling) so old images are not served
+WHEEL_RENDER_VERSION = 1
+
+# kind -> KerykeionChartSVG chart_type; bi-wheels take a second subject
+WHEEL_KINDS = {"natal": "Natal", "transit": "Transit", "synastry": "Synastry"}
+WHEEL_FORMATS = {"svg": "image/svg+xml", "png": "image/png"}
+WHEEL_THEMES = ("classic", "light", "dark", "dark-high-contrast")
+WHEEL_LANGUAGES = ("EN", "FR", "PT", "IT", "CN", "ES", "RU", "TR", "DE", "HI")
+
+_cairosvg: Any = None
+
+
+def png_available() -> bool:
+    """Whether cairosvg (the optional `render` extra) can be imported; loaded on first use."""
+    global _cairosvg
+    if _cairosvg is None:
+        try:
+            import cairosvg
+            _cairosvg = cairosvg
+        except (ImportError, OSError) as e: # OSError: the package is there but libcairo is not
+            logger.warning(f"cairosvg is not available, PNG wheels are disabled: {e}")
+            _cairosvg = False
+    return bool(_cairosvg)
+
+
+@dataclass(frozen=True)
+class WheelSubject:
+    name: str
+    birth_dt: datetime
+    city: str
+    latitude: float
+    longitude: float
+
+    def key_part(self) -> str:
+        # Name and city are drawn on the wheel, so unlike chart_content_hash they are part of the key
+        return f"{self.name}|{self.city}|{chart_content_hash(self.birth_dt, self.latitude, self.longitude)}"
+
+
+@dataclass(frozen=True)
+class WheelOptions:
+    format: str = "svg"
+    theme: str = "classic"
+    language: str = "EN"
+    # Just the wheel, without the aspect grid and data tables
+    wheel_only: bool = False
+    # PNG width in pixels (None: the SVG's own size)
+    width: Optional[int] = None
+    # Resolve the CSS custom properties into plain colours, for SVG consumers without CSS support
+    inline_css: bool = False
+
+    def __post_init__(self):
+        if self.format not in WHEEL_FORMATS:
+            raise ValueError(f"Unknown wheel format '{self.format}'. Known: {list(WHEEL_FORMATS)}")
+        if self.theme not in WHEEL_THEMES:
+            raise ValueError(f"Unknown wheel theme '{self.theme}'. Known: {list(WHEEL_THEMES)}")
+        if self.language not in WHEEL_LANGUAGES:
+            raise ValueError(f"Unknown wheel language '{self.language}'. Known: {list(WHEEL_LANGUAGES)}")
+
+    def key_part(self) -> str:
+        width = self.width if self.format == "png" else None
+        return f"{self.format}|{self.theme}|{self.language}|{int(self.wheel_only)}|{width}|{int(self.inline_css)}"
+
+
+def wheel_cache_key(kind: str, subjects: Sequence[WheelSubject], options: WheelOptions) -> str:
+    """Content hash naming one rendered image."""
+    if kind not in WHEEL_KINDS:
+        raise ValueError(f"Unknown wheel kind '{kind}'. Known: {list(WHEEL_KINDS)}")
+    payload = "||".join([
+        f"wheel-{WHEEL_RENDER_VERSION}", ENGINE_VERSION, kind, options.key_part(),
+        *(subject.key_part() for subject in subjects),
+    ])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _build_subject(subject: WheelSubject) -> Any:
+    calculator = astrology.NatalChartCalculator(
+        name=subject.name,
+        birth_dt=subject.birth_dt,
+        city=subject.city,
+        latitude=subject.latitude,
+        longitude=subject.longitude,
+    )
+    if calculator.calculation_error or not calculator.subject:
+        raise ValueError(calculator.calculation_error or f"Could not build astrological subject for {subject.name}")
+    return calculator.subject
+
+
+def render_wheel(kind: str, subjects: Sequence[WheelSubject], options: WheelOptions) -> bytes:
+    """
+    Renders one wheel. Synchronous and CPU-bound: run it on the calculation pool.
+    Raises ValueError for bad input and RuntimeError when a library is missing.
+    """
+    expected = 2 if kind in ("transit", "synastry") else 1
+    if kind not in WHEEL_KINDS or len(subjects) != expected:
+        raise ValueError(f"A {kind} wheel takes {expected} subject(s), got {len(subjects)}.")
+    if options.format == "png" and not png_available():
+        raise RuntimeError("PNG rendering needs cairosvg (install the `render` extra).")
+    if not astrology._ensure_kerykeion():
+        raise RuntimeError("Kerykeion is not available.")
+    from kerykeion import KerykeionChartSVG
+
+    with phase("subject"):
+        built = [_build_subject(subject) for subject in subjects]
+    with phase("render"):
+        chart = KerykeionChartSVG(
+            built[0],
+            chart_type=WHEEL_KINDS[kind],
+            second_obj=built[1] if len(built) > 1 else None,
+            new_output_directory=tempfile.gettempdir(), # Never written to: we only use the *Template methods
+            theme=options.theme,
+            chart_language=options.language,
+        )
+        # cairosvg does not understand CSS custom properties, so PNGs always get them inlined
+        inline_css = options.inline_css or options.format == "png"
+        if options.wheel_only:
+            svg = chart.makeWheelOnlyTemplate(remove_css_variables=inline_css)
+        else:
+            svg = chart.makeTemplate(remove_css_variables=inline_css)
+        if options.format == "svg":
+            return svg.encode("utf-8")
+        return _cairosvg.svg2png(bytestring=svg.encode("utf-8"), output_width=options.width)
+
+
+class WheelImageCache:
+    """Rendered images on disk, one file per key, shared by the workers of a host."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._size: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key: str, image_format: str) -> Path:
+        return self.directory / key[:2] / f"{key}.{image_format}"
+
+    def get(self, key: str, image_format: str) -> Optional[bytes]:
+        path = self.path(key, image_format)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            os.utime(path) # Recency for pruning
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, image_format: str, data: bytes) -> None:
+        path = self.path(key, image_format)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent readers (other workers) never see a partial file
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        if self._size is None:
+            self._size = self._scan_size()
+        else:
+            self._size += len(data)
+        if self.max_bytes and self._size > self.max_bytes:
+            self.prune()
+
+    def _files(self):
+        return [p for p in self.directory.glob("*/*") if p.suffix in (".svg", ".png")]
+
+    def _scan_size(self) -> int:
+        total = 0
+        for file in self._files():
+            try:
+                total += file.stat().st_size
+            except OSError:
+                pass
+        return total
+
+    def prune(self) -> int:
+        """Deletes least recently used images until the cache is at 90% of its budget. Returns how many."""
+        entries = []
+        for file in self._files():
+            try:
+                stat = file.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, file))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        removed = 0
+        for _, size, file in entries:
+            if total <= target:
+                break
+            file.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+        self._size = total
+        if removed:
+            logger.info(f"Pruned {removed} wheel images; cache now {total / 1048576:.1f} MB.")
+        return removed
+
+
+async def get_or_render_wheel(
+    kind: str, subjects: Sequence[WheelSubject], options: WheelOptions, key: Optional[str] = None
+) -> Tuple[str, bytes]:
+    """Returns (key, image bytes), from the disk cache or rendered on the calculation pool."""
+    key = key or wheel_cache_key(kind, subjects, options)
+    data = await asyncio.to_thread(wheel_image_cache.get, key, options.format)
+    if data is not None:
+        return key, data
+
+    async def render() -> bytes:
+        image = await run_calculation(render_wheel, kind, subjects, options)
+        try:
+            await asyncio.to_thread(wheel_image_cache.put, key, options.format, image)
+        except OSError as e:
+            logger.warning(f"Could not store wheel image {key}: {e}")
+        return image
+
+    # The same wheel requested concurrently (a shared link going around) is rendered once
+    return key, await calculation_flights.do(("wheel", key), render)
+
+
+# Per process, but the directory is shared by every worker on the host
+wheel_image_cache = WheelImageCache(settings.WHEEL_CACHE_DIR, settings.WHEEL_CACHE_MAX_MB * 1048576)
@@ -0,0 +1,108 @@
+# /app/services/compatibility.py
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.positions import ENGINE_VERSION
+from app.services.synastry_engine import KeyPointIndex, longitude_matrix, rank_population
+
+logger = logging.getLogger(__name__)
+
+
+class CompatibilityPopulation:
+    """A stacked longitude matrix for a set of charts, plus its (lazily built) prefilter index."""
+
+    def __init__(self, chart_ids: List[UUID], names: List[str], matrix: np.ndarray):
+        self.chart_ids = chart_ids
+        self.names = names
+        self.matrix = matrix
+        self.built_at = time.monotonic()
+        self._index: Optional[KeyPointIndex] = None
+        self._index_lock = threading.Lock()
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Tuple[UUID, str, Dict[str, Any]]]) -> "CompatibilityPopulation":
+        """Builds a population from (id, name, positions) rows, skipping stale position sets."""
+        current = [row for row in rows if row[2] and row[2].get("engine_version") == ENGINE_VERSION]
+        if len(current) < len(rows):
+            logger.info(f"Skipped {len(rows) - len(current)} charts with stale or missing cached positions.")
+        return cls(
+            chart_ids=[row[0] for row in current],
+            names=[row[1] for row in current],
+            matrix=longitude_matrix([row[2] for row in current]),
+        )
+
+    @property
+    def size(self) -> int:
+        return len(self.chart_ids)
+
+    @property
+    def index(self) -> KeyPointIndex:
+        with self._index_lock:
+            if self._index is None:
+                self._index = KeyPointIndex(self.matrix)
+            return self._index
+
+
+class PopulationCache:
+    """In-process cache of large populations (e.g. all opt-in charts), refreshed after a TTL."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, CompatibilityPopulation] = {}
+
+    def get(self, key: str) -> Optional[CompatibilityPopulation]:
+        population = self._entries.get(key)
+        if population is None or time.monotonic() - population.built_at > self.ttl_seconds:
+            return None
+        return population
+
+    def put(self, key: str, population: CompatibilityPopulation) -> None:
+        self._entries[key] = population
+
+    def invalidate(self, key: Optional[str] = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+# Opt-in population matrix, shared by all compatibility requests in this process
+compatibility_population_cache = PopulationCache(ttl_seconds=settings.COMPATIBILITY_POPULATION_TTL_SECONDS)
+
+
+def rank_compatibility(
+    target_positions: Dict[str, Any],
+    population: CompatibilityPopulation,
+    limit: int,
+    weights: Optional[Dict[str, float]] = None,
+    prefilter: bool = False,
+    exclude_id: Optional[UUID] = None,
+) -> Dict[str, Any]:
+    """
+    Scores the target chart against the whole population in one batch and
+    returns the best `limit` matches (never including `exclude_id`).
+    """
+    if population.size == 0:
+        return {"matches": [], "candidates_scored": 0}
+
+    target_lons = longitude_matrix([target_positions])[0]
+    # Ask for one extra row in case the target chart itself is in the population
+    ranking = rank_population(
+        target_lons,
+        population.matrix,
+        limit + 1,
+        weights=weights,
+        index=population.index if prefilter else None,
+    )
+    matches = [
+        {"chart_id": population.chart_ids[row], "name": population.names[row], "score": score}
+        for row, score in zip(ranking["rows"], ranking["scores"])
+        if population.chart_ids[row] != exclude_id
+    ]
+    return {"matches": matches[:limit], "candidates_scored": ranking["candidates_scored"]}
@@ -0,0 +1,253 @@
+# /app/services/composite_engine.py
+"""
+Composite charts computed from position sets (see app/services/positions.py).
+
+Midpoint composite: every point is the near midpoint of the two natal points.
+Houses are derived from the midpoint MC at the midpoint latitude (reference
+place method), so no ephemeris call is needed at all.
+
+Davison: a real chart cast for the midpoint in time (UTC) and space, which
+costs exactly one subject build.
+"""
+import logging
+import math
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services import astrology
+from app.services.astrology import ASPECT_DEGREES_ORBS, NatalChartCalculator, PLANET_MAP, SIGN_FULL_NAMES
+from app.services.positions import extract_position_set
+from app.services.synastry_engine import ASPECT_NAMES, cross_aspect_orbs, longitude_matrix
+
+try:
+    import swisseph as swe
+    SWISSEPH_AVAILABLE = True
+except ImportError:
+    swe = None
+    SWISSEPH_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Placidus, the house system Kerykeion uses by default; Porphyry is the
+# fallback for latitudes where Placidus is undefined
+HOUSE_SYSTEM = b'P'
+FALLBACK_HOUSE_SYSTEM = b'O'
+
+ANGLE_POINTS = ("Ascendant", "Medium_Coeli", "Descendant", "IC")
+
+# Points that are by definition opposite each other; their "aspect" is noise
+_AXIS_PAIRS = {
+    frozenset(("Ascendant", "Descendant")), frozenset(("Medium_Coeli", "IC")),
+    frozenset(("Mean_Node", "Mean_South_Node")), frozenset(("True_Node", "True_South_Node")),
+}
+
+
+def midpoint(lon1: float, lon2: float) -> float:
+    """Midpoint on the shorter arc between two longitudes."""
+    diff = (lon2 - lon1) % 360.0
+    if diff > 180.0:
+        diff -= 360.0
+    return (lon1 + diff / 2.0) % 360.0
+
+
+def mean_obliquity(moment: datetime) -> float:
+    """Mean obliquity of the ecliptic (IAU 1976 polynomial), in degrees."""
+    j2000 = datetime(2000, 1, 1, 12, 0)
+    centuries = (moment.replace(tzinfo=None) - j2000).total_seconds() / (86400.0 * 36525.0)
+    arcsec = 84381.448 - 46.8150 * centuries - 0.00059 * centuries ** 2 + 0.001813 * centuries ** 3
+    return arcsec / 3600.0
+
+
+def houses_from_mc(mc_longitude: float, latitude: float, obliquity: float) -> Tuple[List[float], float]:
+    """
+    House cusps and Ascendant for a given MC at a given latitude.
+    Converts the MC to its right ascension (ARMC) and lets swisseph do the
+    pure spherical trigonometry; no planetary ephemeris is read.
+    """
+    if not SWISSEPH_AVAILABLE:
+        raise ValueError("swisseph is not available for house calculation.")
+    mc = math.radians(mc_longitude)
+    eps = math.radians(obliquity)
+    armc = math.degrees(math.atan2(math.sin(mc) * math.cos(eps), math.cos(mc))) % 360.0
+    try:
+        cusps, ascmc = swe.houses_armc(armc, latitude, obliquity, HOUSE_SYSTEM)
+    except swe.Error:
+        cusps, ascmc = swe.houses_armc(armc, latitude, obliquity, FALLBACK_HOUSE_SYSTEM)
+    return [float(cusp) for cusp in cusps[:12]], float(ascmc[0])
+
+
+def house_of(longitude: float, cusps: Sequence[float]) -> int:
+    """1-based house containing a longitude."""
+    for i in range(12):
+        start, end = cusps[i], cusps[(i + 1) % 12]
+        if (longitude - start) % 360.0 < (end - start) % 360.0:
+            return i + 1
+    return 12
+
+
+def _sign_fields(longitude: float) -> Dict[str, Any]:
+    sign_num = int(longitude // 30) % 12
+    return {"sign": SIGN_FULL_NAMES[sign_num], "sign_num": sign_num, "position": round(longitude % 30, 4)}
+
+
+def _internal_aspects(points: Dict[str, float]) -> List[Dict[str, Any]]:
+    names = list(points)
+    lons = longitude_matrix([{"points": points}], names)[0]
+    orbs = cross_aspect_orbs(lons, lons)
+    aspects = []
+    for i, j, k in zip(*np.nonzero(np.isfinite(orbs))):
+        if i >= j or frozenset((names[i], names[j])) in _AXIS_PAIRS:
+            continue
+        aspect_name = ASPECT_NAMES[k]
+        aspects.append({
+            "p1_name": names[i],
+            "p2_name": names[j],
+            "aspect_name": aspect_name,
+            "orb": round(float(orbs[i, j, k]), 2),
+            "aspect_degrees": int(ASPECT_DEGREES_ORBS[aspect_name][0]),
+        })
+    aspects.sort(key=lambda aspect: aspect["orb"])
+    return aspects
+
+
+def format_composite_chart(
+    name: str,
+    moment: datetime,
+    location: str,
+    points: Dict[str, float],
+    cusps: Sequence[float],
+    retrograde: Optional[Dict[str, bool]] = None,
+) -> Dict[str, Any]:
+    """Shapes points and cusps as CompositeChartData."""
+    retrograde = retrograde or {}
+    planets = {
+        point: {
+            "name": point,
+            **_sign_fields(lon),
+            "absolute_position": round(lon, 4),
+            "house": str(house_of(lon, cusps)) if cusps else "",
+            "retrograde": retrograde.get(point, False),
+        }
+        for point, lon in points.items()
+    }
+    houses = [
+        {"cusp": i + 1, **_sign_fields(cusp), "absolute_position": round(cusp, 4)}
+        for i, cusp in enumerate(cusps)
+    ]
+    return {
+        "info": {
+            "name": name,
+            "birth_datetime": moment.isoformat(),
+            "location": location,
+            "kerykeion_sun_sign": planets.get("Sun", {}).get("sign"),
+            "kerykeion_asc_sign": planets.get("Ascendant", {}).get("sign"),
+        },
+        "planets": planets,
+        "houses": houses,
+        "aspects": _internal_aspects(points),
+        "calculation_error": None,
+    }
+
+
+def midpoint_composite(
+    name: str,
+    positions1: Dict[str, Any],
+    positions2: Dict[str, Any],
+    birth1: datetime,
+    birth2: datetime,
+    latitude1: float,
+    latitude2: float,
+) -> Dict[str, Any]:
+    """
+    Midpoint composite from two position sets. The angles are re-derived from
+    the midpoint MC rather than averaged, so the houses stay consistent.
+    """
+    points1, points2 = positions1.get("points", {}), positions2.get("points", {})
+    points = {
+        point: midpoint(points1[point], points2[point])
+        for point in points1
+        if point in points2 and point not in ANGLE_POINTS
+    }
+
+    birth1, birth2 = birth1.replace(tzinfo=None), birth2.replace(tzinfo=None)
+    mid_moment = birth1 + (birth2 - birth1) / 2
+    cusps: List[float] = []
+    if "Medium_Coeli" in points1 and "Medium_Coeli" in points2:
+        mc = midpoint(points1["Medium_Coeli"], points2["Medium_Coeli"])
+        cusps, ascendant = houses_from_mc(mc, (latitude1 + latitude2) / 2.0, mean_obliquity(mid_moment))
+        points.update({
+            "Ascendant": ascendant,
+            "Medium_Coeli": mc,
+            "Descendant": (ascendant + 180.0) % 360.0,
+            "IC": (mc + 180.0) % 360.0,
+        })
+
+    return format_composite_chart(name, mid_moment, "Composite (midpoints)", points, cusps)
+
+
+def _to_utc(local_dt: datetime, latitude: float, longitude: float) -> datetime:
+    """Interprets a naive birth time as local time at the birth place."""
+    if local_dt.tzinfo is not None:
+        return local_dt.astimezone(timezone.utc)
+    tz_name = _timezone_name(latitude, longitude)
+    if tz_name is None:
+        logger.warning(f"No timezone for ({latitude}, {longitude}); treating birth time as UTC.")
+        return local_dt.replace(tzinfo=timezone.utc)
+    return local_dt.replace(tzinfo=ZoneInfo(tz_name)).astimezone(timezone.utc)
+
+
+def _timezone_name(latitude: float, longitude: float) -> Optional[str]:
+    if not astrology.TIMEZONEFINDER_AVAILABLE:
+        return None
+    return astrology.timezone_at(latitude, longitude)
+
+
+def davison_moment_and_place(
+    birth1: datetime, latitude1: float, longitude1: float,
+    birth2: datetime, latitude2: float, longitude2: float,
+) -> Tuple[datetime, float, float]:
+    """Midpoint in UTC time and in space, returned as naive local time at the midpoint place."""
+    utc1 = _to_utc(birth1, latitude1, longitude1)
+    utc2 = _to_utc(birth2, latitude2, longitude2)
+    mid_utc = utc1 + (utc2 - utc1) / 2
+    latitude = (latitude1 + latitude2) / 2.0
+    longitude = midpoint(longitude1 % 360.0, longitude2 % 360.0)
+    if longitude > 180.0:
+        longitude -= 360.0
+
+    tz_name = _timezone_name(latitude, longitude)
+    local = mid_utc.astimezone(ZoneInfo(tz_name)) if tz_name else mid_utc
+    return local.replace(tzinfo=None), latitude, longitude
+
+
+def davison_chart(
+    name: str,
+    birth1: datetime, latitude1: float, longitude1: float,
+    birth2: datetime, latitude2: float, longitude2: float,
+) -> Dict[str, Any]:
+    """
+    Davison relationship chart: one subject cast for the time and space midpoint.
+    Synchronous (one Kerykeion build), so run it off the event loop.
+    Raises ValueError if the subject could not be built.
+    """
+    moment, latitude, longitude = davison_moment_and_place(
+        birth1, latitude1, longitude1, birth2, latitude2, longitude2
+    )
+    calculator = NatalChartCalculator(
+        name=name, birth_dt=moment, city="Davison midpoint", latitude=latitude, longitude=longitude
+    )
+    if calculator.calculation_error or not calculator.subject:
+        raise ValueError(calculator.calculation_error or "Could not build the Davison subject")
+
+    positions = extract_position_set(calculator.subject)
+    retrograde = {
+        display_name: bool(getattr(getattr(calculator.subject, attr_name, None), "retrograde", False))
+        for attr_name, display_name in PLANET_MAP.items()
+    }
+    return format_composite_chart(
+        name, moment, f"Davison ({latitude:.4f}, {longitude:.4f})",
+        positions["points"], positions["houses"], retrograde,
+    )
@@ -0,0 +1,165 @@
+# /app/services/ephemeris.py
+"""
+Raw ephemeris series straight from swisseph, for timelines and range views.
+
+Building an AstrologicalSubject per instant costs milliseconds; a series only
+needs longitudes and speeds, so it calls swe.calc_ut directly and fills numpy
+arrays (instants x bodies).
+
+The Swiss Ephemeris is not thread-safe: its state (ephemeris path, open
+ephemeris files, topocentric position, sidereal mode and its caches of recent
+positions) is global to the process. Kerykeion sets the ephemeris path at the
+start of every subject, plus the topocentric position or sidereal mode when a
+subject asks for them; it never closes swisseph. Every swisseph user therefore
+holds swisseph_lock for a self-contained unit of work: a subject build, or one
+body of a series.
+
+Kerykeion changes that state inside AstrologicalSubject's constructor, so the
+lock cannot be narrowed to the state-setting calls: it serializes every subject
+build in the process. Builds submitted to the calculation pool together (the
+two charts of a pair, stale position sets) overlap only in the work outside
+the lock, such as timezone lookups; the builds themselves run one at a time.
+Parallel builds need separate processes (the prefork workers).
+
+swisseph and numpy are imported on first use (see _ensure_swisseph), so that
+`import app.main` loads neither.
+"""
+import importlib.util
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+from app.core.timing import phase
+
+SWISSEPH_AVAILABLE = importlib.util.find_spec("swisseph") is not None
+
+# Bound by _ensure_swisseph()
+swe: Any = None
+np: Any = None
+
+logger = logging.getLogger(__name__)
+
+# Display name (as in PLANET_MAP) -> swisseph body number
+SERIES_BODIES: Dict[str, int] = {
+    "Sun": 0, "Moon": 1, "Mercury": 2, "Venus": 3, "Mars": 4,
+    "Jupiter": 5, "Saturn": 6, "Uranus": 7, "Neptune": 8, "Pluto": 9,
+    "Mean_Node": 10, "True_Node": 11, "Mean_Lilith": 12, "Chiron": 15,
+}
+
+_ephe_path: Optional[str] = None
+
+# Held by Kerykeion subject builds (app/services/astrology.py, app/crud/chart.py) and by series
+swisseph_lock = threading.RLock()
+
+
+class EphemerisError(Exception):
+    """swisseph failed to compute a position (e.g. an ephemeris file is missing)."""
+
+
+def _ensure_swisseph() -> bool:
+    """Imports swisseph and numpy on first use and binds them to this module. Returns False if swisseph is missing."""
+    global swe, np, SWISSEPH_AVAILABLE
+    if swe is None and SWISSEPH_AVAILABLE:
+        try:
+            import numpy
+            import swisseph
+        except ImportError as e:
+            logger.error(f"swisseph could not be imported: {e}")
+            SWISSEPH_AVAILABLE = False
+            return False
+        np, swe = numpy, swisseph
+    return SWISSEPH_AVAILABLE
+
+
+def _ensure_ephe_path() -> None:
+    """
+    Use Kerykeion's bundled ephemeris files (needed for Chiron), as its subjects do.
+    Called under swisseph_lock before every series body: a series may run before
+    any subject has set the path, and setting it is cheap.
+    """
+    global _ephe_path
+    if _ephe_path is None:
+        try:
+            import kerykeion
+            _ephe_path = str(Path(kerykeion.__file__).parent / "sweph")
+        except ImportError:
+            logger.warning("Kerykeion not available; swisseph will use its built-in Moshier ephemeris.")
+            _ephe_path = ""
+    if _ephe_path:
+        swe.set_ephe_path(_ephe_path)
+
+
+def _julian_day(moment: datetime) -> float:
+    return swe.julday(
+        moment.year, moment.month, moment.day,
+        moment.hour + moment.minute / 60.0 + (moment.second + moment.microsecond / 1e6) / 3600.0,
+    )
+
+
+def _as_utc(moment: datetime) -> datetime:
+    """Naive datetimes are taken as UTC."""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment.astimezone(timezone.utc)
+
+
+def count_instants(start: datetime, end: datetime, step: timedelta) -> int:
+    return int((_as_utc(end) - _as_utc(start)) // step) + 1
+
+
+def ephemeris_series(
+    start: datetime,
+    end: datetime,
+    step: timedelta,
+    bodies: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Geocentric tropical longitudes and daily speeds from `start` to `end`
+    (inclusive, UTC) every `step`.
+
+    Returns {"instants": int64 unix seconds (N,), "bodies": [names],
+    "body_ids": int16 (B,), "longitudes": float64 (N, B), "speeds": float64 (N, B)}.
+    Raises ValueError for unknown bodies or an empty range, EphemerisError if
+    swisseph fails.
+    """
+    if not _ensure_swisseph():
+        raise ValueError("swisseph is not available.")
+    bodies = list(bodies) if bodies else list(SERIES_BODIES)
+    unknown = [body for body in bodies if body not in SERIES_BODIES]
+    if unknown:
+        raise ValueError(f"Unknown bodies: {unknown}. Known: {list(SERIES_BODIES)}")
+    if _as_utc(end) < _as_utc(start) or step <= timedelta(0):
+        raise ValueError("The range must have end >= start and a positive step.")
+
+    start_utc, end_utc = _as_utc(start), _as_utc(end)
+    n_instants = count_instants(start_utc, end_utc, step)
+    step_seconds = step.total_seconds()
+    julian_days = (_julian_day(start_utc) + np.arange(n_instants) * (step_seconds / 86400.0)).tolist()
+
+    longitudes = np.empty((n_instants, len(bodies)), dtype=np.float64)
+    speeds = np.empty((n_instants, len(bodies)), dtype=np.float64)
+    flags = swe.FLG_SWIEPH | swe.FLG_SPEED
+    calc_ut = swe.calc_ut
+    with phase("ephemeris"):
+        for col, body in enumerate(bodies):
+            body_id = SERIES_BODIES[body]
+            # One body at a time, so subject builds on other threads wait at most one column
+            with swisseph_lock:
+                _ensure_ephe_path()
+                try:
+                    for row, jd in enumerate(julian_days):
+                        position = calc_ut(jd, body_id, flags)[0]
+                        longitudes[row, col] = position[0]
+                        speeds[row, col] = position[3]
+                except swe.Error as e:
+                    raise EphemerisError(f"swisseph could not compute {body}: {e}") from e
+
+    start_epoch = int(start_utc.timestamp())
+    return {
+        "instants": start_epoch + (np.arange(n_instants) * step_seconds).astype(np.int64),
+        "bodies": bodies,
+        "body_ids": np.array([SERIES_BODIES[body] for body in bodies], dtype=np.int16),
+        "longitudes": longitudes,
+        "speeds": speeds,
+    }
+
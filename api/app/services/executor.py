@@ -0,0 +1,53 @@
+# /app/services/executor.py
+"""
+Shared pool for synchronous calculation work (Kerykeion subject builds,
+swisseph calls). Keeping it separate from Starlette's default threadpool
+means heavy calculations cannot starve ordinary sync dependencies, and its
+size is tunable with CALCULATION_POOL_WORKERS.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from app.core.config import settings
+from app.core.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_calculation_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.CALCULATION_POOL_WORKERS,
+            thread_name_prefix="calculation",
+        )
+        logger.info(f"Started calculation pool with {settings.CALCULATION_POOL_WORKERS} workers.")
+    return _executor
+
+
+async def run_calculation(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Runs a synchronous calculation on the calculation pool and awaits its result.
+    The caller's context (e.g. the request's phase recorder) is carried into the worker thread,
+    and the worker is sampled while it runs if the request is being profiled.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_calculation_executor(), functools.partial(context.run, profiled(func), *args, **kwargs)
+    )
+
+
+def shutdown_calculation_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,15 +1,36 @@
 # /app/services/geolocation.py
 import logging
+import time
 from typing import Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable, GeocoderServiceError
+import threading
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.metrics import geocoder_latency, geocoder_requests
+from app.core.timing import phase
 
 logger = logging.getLogger(__name__)
 
-# Initialize the geolocator with a custom user agent
-# IMPORTANT: Replace with your actual app name/version and contact info
-geolocator = Nominatim(user_agent="AstroTrackerApp/0.1 (akamalov@gmail.com)")
+# geopy is imported with the first lookup (or the warm-up), not at startup
+_geolocator = None
+_geolocator_lock = threading.Lock()
+
+def _get_geolocator():
+    """The shared Nominatim geolocator, created on first use."""
+    global _geolocator
+    if _geolocator is None:
+        with _geolocator_lock:
+            if _geolocator is None:
+                from geopy.geocoders import Nominatim
+                # Initialize the geolocator with a custom user agent
+                # IMPORTANT: Replace with your actual app name/version and contact info
+                _geolocator = Nominatim(
+                    user_agent="AstroTrackerApp/0.1 (akamalov@gmail.com)",
+                    domain=settings.NOMINATIM_DOMAIN,
+                    scheme=settings.NOMINATIM_SCHEME,
+                )
+    return _geolocator
 
 async def get_coordinates_for_city(city: str, db: AsyncSession) -> Tuple[Optional[float], Optional[float]]:
     """
@@ -26,28 +47,42 @@ async def get_coordinates_for_city(city: str, db: AsyncSession) -> Tuple[Optiona
         logger.warning("Attempted to geocode an empty or whitespace-only city name.")
         return (None, None)
 
+    geolocator = _get_geolocator()
+    from geopy.exc import GeocoderTimedOut, GeocoderUnavailable, GeocoderServiceError
+
     logger.info(f"Attempting to geocode city: '{city}' using Nominatim.")
+    started = time.perf_counter()
+    outcome = "error"
     try:
-        # geopy's geocode method is synchronous.
-        # For high-concurrency production apps, consider running in a thread pool executor.
-        location = geolocator.geocode(city, timeout=10) # 10 second timeout
+        # geopy's geocode method is synchronous; run it in the threadpool so
+        # concurrent lookups (e.g. both people of a synastry request) overlap
+        with phase("geocode"):
+            location = await run_in_threadpool(geolocator.geocode, city, timeout=10) # 10 second timeout
         
         if location and location.latitude is not None and location.longitude is not None:
+            outcome = "ok"
             logger.info(f"Successfully geocoded '{city}': ({location.latitude}, {location.longitude})")
             return (location.latitude, location.longitude)
         else:
+            outcome = "not_found"
             logger.warning(f"Could not geocode city: '{city}'. No location found or coordinates missing.")
             return (None, None)
             
     except GeocoderTimedOut:
+        outcome = "timeout"
         logger.error(f"Geocoding service (Nominatim) timed out for city: '{city}'")
         return (None, None)
     except GeocoderUnavailable:
+        outcome = "unavailable"
         logger.error(f"Geocoding service (Nominatim) unavailable for city: '{city}'")
         return (None, None)
     except GeocoderServiceError as e:
+        outcome = "service_error"
         logger.error(f"Geocoding service (Nominatim) error for city: '{city}': {e}")
         return (None, None)
     except Exception as e:
         logger.error(f"An unexpected error occurred during geocoding for city '{city}': {e}", exc_info=True)
-        return (None, None) 
+        return (None, None)
+    finally:
+        geocoder_latency.observe("nominatim", outcome, (time.perf_counter() - started) * 1000.0)
+        geocoder_requests.inc(outcome)
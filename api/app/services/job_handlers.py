@@ -0,0 +1,135 @@
+# /app/services/job_handlers.py
+"""
+Handlers for the job kinds this application runs in the background (see
+app/services/job_queue.py). Importing this module registers them; both the
+API (to accept submissions) and the worker (to run them) import it.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.email import send_reports_ready_email
+from app.crud.chart import CRUDChart
+from app.db.session import AsyncSessionLocal
+from app.models.chart import Chart
+from app.models.user import User
+from app.services import reports
+from app.services.chart_render import WheelSubject
+from app.services.geolocation import get_coordinates_for_city
+from app.services.job_queue import JobContext, JobError, job_handler
+
+logger = logging.getLogger(__name__)
+
+# Charts whose position sets are built concurrently in one step
+RECOMPUTE_BATCH_SIZE = 8
+RECOMPUTE_MAX_CHARTS = 1000
+
+
+@job_handler("recompute_positions", public=True, concurrency=2)
+async def recompute_positions(ctx: JobContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Rebuilds stale cached position sets for the user's charts (all of them,
+    or payload["chart_ids"]), e.g. after an engine upgrade.
+    """
+    if ctx.user_id is None:
+        raise JobError("recompute_positions needs a user.")
+    async with AsyncSessionLocal() as db:
+        crud = CRUDChart(db)
+        if payload.get("chart_ids"):
+            try:
+                ids = [UUID(str(chart_id)) for chart_id in payload["chart_ids"]]
+            except ValueError as e:
+                raise JobError(f"Invalid chart id: {e}")
+            charts = [chart for chart in await crud.get_multi_by_ids(ids=ids) if chart.user_id == ctx.user_id]
+        else:
+            charts = await crud.get_multi_by_owner(user_id=ctx.user_id, limit=RECOMPUTE_MAX_CHARTS)
+
+        failed: List[str] = []
+        for start in range(0, len(charts), RECOMPUTE_BATCH_SIZE):
+            batch = charts[start:start + RECOMPUTE_BATCH_SIZE]
+            positions = await crud.get_position_sets(batch)
+            failed += [str(chart.id) for chart, position_set in zip(batch, positions) if position_set is None]
+            done = start + len(batch)
+            await ctx.progress(done / len(charts), f"{done}/{len(charts)} charts")
+
+    return {"charts": len(charts), "failed": failed}
+
+
+def _chart_ids(payload: Dict[str, Any], limit: int) -> List[UUID]:
+    raw = payload.get("chart_ids") or ([payload["chart_id"]] if payload.get("chart_id") else [])
+    try:
+        ids = list(dict.fromkeys(UUID(str(chart_id)) for chart_id in raw))
+    except ValueError as e:
+        raise JobError(f"Invalid chart id: {e}")
+    if not ids or len(ids) > limit:
+        raise JobError(f"Give between 1 and {limit} chart ids.")
+    return ids
+
+
+@job_handler("chart_report", public=True, concurrency=2, timeout=1800)
+async def chart_report(ctx: JobContext, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Builds PDF reports for payload["chart_ids"] (or payload["chart_id"]): one
+    chart, or a batch built REPORT_BATCH_CONCURRENCY at a time. Emails the
+    links when done unless payload["notify"] is false.
+    """
+    if ctx.user_id is None:
+        raise JobError("chart_report needs a user.")
+    if not reports.reportlab_available():
+        raise JobError("PDF reports are not available: reportlab is not installed on the worker.")
+    ids = _chart_ids(payload, settings.REPORT_BATCH_MAX_CHARTS)
+
+    failed: List[Dict[str, str]] = []
+    subjects: List[Tuple[Chart, WheelSubject]] = []
+    async with AsyncSessionLocal() as db:
+        charts = {chart.id: chart for chart in await CRUDChart(db).get_multi_by_ids(ids=ids) if chart.user_id == ctx.user_id}
+        for chart_id in ids:
+            chart = charts.get(chart_id)
+            if chart is None:
+                failed.append({"chart_id": str(chart_id), "error": "Chart not found"})
+                continue
+            lat, lon = chart.latitude, chart.longitude
+            if lat is None or lon is None:
+                lat, lon = await get_coordinates_for_city(chart.city, db)
+            if lat is None or lon is None:
+                failed.append({"chart_id": str(chart_id), "error": f"Coordinates not found for {chart.city}"})
+                continue
+            subjects.append((chart, WheelSubject(chart.name, chart.birth_datetime, chart.city, lat, lon)))
+
+    semaphore = asyncio.Semaphore(settings.REPORT_BATCH_CONCURRENCY)
+
+    async def build(chart: Chart, subject: WheelSubject) -> Tuple[Chart, Optional[Dict[str, Any]], Optional[str]]:
+        async with semaphore:
+            try:
+                return chart, await reports.generate_chart_report(ctx.user_id, subject), None
+            except ValueError as e:
+                return chart, None, str(e)
+
+    built: List[Dict[str, Any]] = []
+    tasks = [asyncio.ensure_future(build(chart, subject)) for chart, subject in subjects]
+    try:
+        for done, finished in enumerate(asyncio.as_completed(tasks), 1):
+            chart, entry, error = await finished
+            if entry is None:
+                failed.append({"chart_id": str(chart.id), "error": error})
+            else:
+                url = f"{settings.API_V1_STR}/reports/{entry['report_id']}.pdf"
+                built.append({"chart_id": str(chart.id), "name": chart.name, "url": url, **entry})
+            await ctx.progress(done / len(tasks), f"{done}/{len(tasks)} reports")
+    finally:
+        for task in tasks: # Cancelled job or worker shutdown: stop the rest of the batch
+            task.cancel()
+
+    if not built:
+        raise JobError(f"No report could be built: {failed[0]['error'] if failed else 'no charts'}")
+    if payload.get("notify", True):
+        try:
+            async with AsyncSessionLocal() as db:
+                user = await db.get(User, ctx.user_id)
+            if user is not None:
+                await send_reports_ready_email(user, str(ctx.job_id), [report["url"] for report in built], failed=len(failed))
+        except Exception as e:
+            logger.warning(f"Could not send the report notification for job {ctx.job_id}: {e}")
+    return {"reports": built, "failed": failed}
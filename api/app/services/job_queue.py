@@ -0,0 +1,325 @@
+# /app/services/job_queue.py
+"""
+Durable job queue on the application's Postgres database.
+
+Jobs are rows in the `job` table. Workers (app/services/job_worker.py) claim
+due jobs with UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED), so
+any number of workers can poll the same table without blocking each other
+or running a job twice. A running job carries its worker's id and a
+heartbeat (locked_at); a job whose heartbeat is older than JOB_LEASE_SECONDS
+belonged to a worker that died and is put back in the queue.
+
+Handlers are registered per job kind with @job_handler. A handler raising
+JobError fails the job at once; any other exception is retried with
+exponential backoff until max_attempts is reached.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import and_, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.job import Job
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+PENDING_STATUSES = (QUEUED, RUNNING)
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+MAX_RETRY_DELAY_SECONDS = 3600
+
+
+class JobError(Exception):
+    """A permanent failure: the job is failed without further attempts."""
+
+
+class JobCancelled(Exception):
+    """The job was cancelled, or reclaimed from this worker, while running."""
+
+
+@dataclass
+class JobHandler:
+    kind: str
+    func: Callable[["JobContext", Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+    max_attempts: int
+    # Jobs of this kind one worker runs at once (None: only the worker's limit applies)
+    concurrency: Optional[int] = None
+    timeout: Optional[float] = None
+    # Users may submit it through POST /jobs
+    public: bool = False
+
+
+_handlers: Dict[str, JobHandler] = {}
+
+
+def job_handler(
+    kind: str,
+    *,
+    max_attempts: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    timeout: Optional[float] = None,
+    public: bool = False,
+):
+    """Registers `async def handler(ctx, payload) -> result dict` for a job kind."""
+    def decorator(func):
+        _handlers[kind] = JobHandler(
+            kind=kind,
+            func=func,
+            max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+            concurrency=concurrency,
+            timeout=timeout,
+            public=public,
+        )
+        return func
+    return decorator
+
+
+def get_handler(kind: str) -> Optional[JobHandler]:
+    return _handlers.get(kind)
+
+
+def registered_kinds(public_only: bool = False) -> List[str]:
+    return sorted(kind for kind, handler in _handlers.items() if handler.public or not public_only)
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """Backoff before the next attempt, after `attempts` failed ones."""
+    seconds = settings.JOB_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1))
+    return timedelta(seconds=min(seconds, MAX_RETRY_DELAY_SECONDS))
+
+
+# --- Producer side ---
+
+async def enqueue(
+    db: AsyncSession,
+    kind: str,
+    payload: Optional[Dict[str, Any]] = None,
+    *,
+    user_id: Optional[UUID] = None,
+    priority: int = 0,
+    max_attempts: Optional[int] = None,
+    delay_seconds: float = 0,
+) -> Job:
+    """Adds a job and commits. Raises ValueError for an unregistered kind."""
+    handler = get_handler(kind)
+    if handler is None:
+        raise ValueError(f"Unknown job kind '{kind}'. Known: {registered_kinds()}")
+    job = Job(
+        kind=kind,
+        status=QUEUED,
+        user_id=user_id,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts or handler.max_attempts,
+        run_after=datetime.utcnow() + timedelta(seconds=delay_seconds),
+    )
+    db.add(job)
+    await db.commit()
+    logger.info(f"Enqueued job {job.id} ({kind}).")
+    return job
+
+
+async def get_job(db: AsyncSession, job_id: UUID, user_id: Optional[UUID] = None) -> Optional[Job]:
+    query = select(Job).where(Job.id == job_id)
+    if user_id is not None:
+        query = query.where(Job.user_id == user_id)
+    return (await db.execute(query)).scalars().first()
+
+
+async def list_jobs(db: AsyncSession, user_id: UUID, limit: int = 50) -> List[Job]:
+    result = await db.execute(
+        select(Job).where(Job.user_id == user_id).order_by(Job.created_at.desc()).limit(limit)
+    )
+    return result.scalars().all()
+
+
+async def count_pending(db: AsyncSession, user_id: UUID) -> int:
+    result = await db.execute(
+        select(func.count()).select_from(Job).where(Job.user_id == user_id, Job.status.in_(PENDING_STATUSES))
+    )
+    return result.scalar_one()
+
+
+async def cancel(db: AsyncSession, job: Job) -> bool:
+    """
+    Cancels a queued or running job. A running job's worker notices at its
+    next heartbeat or progress report. Returns False if it had already finished.
+    """
+    result = await db.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status.in_(PENDING_STATUSES))
+        .values(status=CANCELLED, finished_at=datetime.utcnow(), locked_by=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    await db.refresh(job)
+    return result.rowcount == 1
+
+
+# --- Worker side ---
+
+async def claim(db: AsyncSession, worker_id: str, kinds: Sequence[str], limit: int) -> List[Job]:
+    """Marks up to `limit` due jobs of the given kinds as running by this worker and returns them."""
+    if limit <= 0 or not kinds:
+        return []
+    now = datetime.utcnow()
+    due = (
+        select(Job.id)
+        .where(Job.status == QUEUED, Job.run_after <= now, Job.kind.in_(kinds))
+        .order_by(Job.priority.desc(), Job.run_after, Job.created_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(Job)
+        .where(Job.id.in_(due))
+        .values(
+            status=RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=Job.attempts + 1,
+            started_at=func.coalesce(Job.started_at, now),
+        )
+        .returning(Job)
+        .execution_options(synchronize_session=False)
+    )
+    jobs = result.scalars().all()
+    await db.commit()
+    return jobs
+
+
+def _owned(job_id: UUID, worker_id: str):
+    return and_(Job.id == job_id, Job.status == RUNNING, Job.locked_by == worker_id)
+
+
+async def heartbeat(db: AsyncSession, worker_id: str, job_ids: Sequence[UUID]) -> List[UUID]:
+    """Renews the lease on running jobs. Returns the ids this worker no longer holds (cancelled or reclaimed)."""
+    if not job_ids:
+        return []
+    result = await db.execute(
+        update(Job)
+        .where(Job.id.in_(job_ids), Job.status == RUNNING, Job.locked_by == worker_id)
+        .values(locked_at=datetime.utcnow())
+        .returning(Job.id)
+        .execution_options(synchronize_session=False)
+    )
+    held = set(result.scalars().all())
+    await db.commit()
+    return [job_id for job_id in job_ids if job_id not in held]
+
+
+async def report_progress(db: AsyncSession, worker_id: str, job_id: UUID, progress: float, message: Optional[str]) -> bool:
+    """Stores progress (0..1) and renews the lease. False if the job is no longer this worker's."""
+    result = await db.execute(
+        update(Job)
+        .where(_owned(job_id, worker_id))
+        .values(progress=min(1.0, max(0.0, progress)), progress_message=message, locked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+async def complete(db: AsyncSession, worker_id: str, job: Job, result: Optional[Dict[str, Any]]) -> bool:
+    outcome = await db.execute(
+        update(Job)
+        .where(_owned(job.id, worker_id))
+        .values(
+            status=SUCCEEDED, result=result or {}, error=None, progress=1.0,
+            finished_at=datetime.utcnow(), locked_by=None,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return outcome.rowcount == 1
+
+
+async def fail(db: AsyncSession, worker_id: str, job: Job, error: str, retry: bool = True) -> str:
+    """Records a failed attempt. Returns the new status: queued (retry later) or failed."""
+    now = datetime.utcnow()
+    if retry and job.attempts < job.max_attempts:
+        values = dict(status=QUEUED, run_after=now + retry_delay(job.attempts), locked_by=None, locked_at=None)
+    else:
+        values = dict(status=FAILED, finished_at=now, locked_by=None)
+    outcome = await db.execute(
+        update(Job)
+        .where(_owned(job.id, worker_id))
+        .values(error=error[:4000], **values)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return values["status"] if outcome.rowcount == 1 else CANCELLED
+
+
+async def release(db: AsyncSession, worker_id: str, job_ids: Sequence[UUID]) -> None:
+    """Puts jobs interrupted by a worker shutdown back in the queue without using up an attempt."""
+    if not job_ids:
+        return
+    await db.execute(
+        update(Job)
+        .where(Job.id.in_(job_ids), Job.status == RUNNING, Job.locked_by == worker_id)
+        .values(status=QUEUED, attempts=Job.attempts - 1, locked_by=None, locked_at=None, run_after=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def requeue_stale(db: AsyncSession, lease_seconds: float) -> int:
+    """Recovers jobs whose worker stopped heartbeating. Returns how many were requeued or failed."""
+    now = datetime.utcnow()
+    stale = and_(Job.status == RUNNING, Job.locked_at < now - timedelta(seconds=lease_seconds))
+    requeued = await db.execute(
+        update(Job)
+        .where(stale, Job.attempts < Job.max_attempts)
+        .values(status=QUEUED, run_after=now, locked_by=None, locked_at=None, error="Worker lost; retrying")
+        .execution_options(synchronize_session=False)
+    )
+    failed = await db.execute(
+        update(Job)
+        .where(stale, Job.attempts >= Job.max_attempts)
+        .values(status=FAILED, finished_at=now, locked_by=None, error="Worker lost on the last attempt")
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    count = requeued.rowcount + failed.rowcount
+    if count:
+        logger.warning(f"Recovered {count} jobs from lost workers ({requeued.rowcount} requeued, {failed.rowcount} failed).")
+    return count
+
+
+class JobContext:
+    """Passed to handlers: the job's identity plus progress reporting."""
+
+    def __init__(self, job: Job, worker_id: str):
+        self.job_id: UUID = job.id
+        self.kind: str = job.kind
+        self.user_id: Optional[UUID] = job.user_id
+        self.attempt: int = job.attempts
+        self.worker_id = worker_id
+        self._last_report = 0.0
+
+    async def progress(self, fraction: float, message: Optional[str] = None, force: bool = False) -> None:
+        """
+        Reports progress (0..1). Writes are throttled to one per
+        JOB_PROGRESS_MIN_INTERVAL_SECONDS. Raises JobCancelled if the job was
+        cancelled meanwhile, so handlers stop at their next report.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_report < settings.JOB_PROGRESS_MIN_INTERVAL_SECONDS:
+            return
+        self._last_report = now
+        async with AsyncSessionLocal() as db:
+            if not await report_progress(db, self.worker_id, self.job_id, fraction, message):
+                raise JobCancelled(f"Job {self.job_id} is no longer held by this worker.")
@@ -0,0 +1,167 @@
+# /app/services/job_worker.py
+"""
+Job worker: polls the job table, runs claimed jobs concurrently and keeps
+their leases alive. Started by app/scripts/job_worker.py; several worker
+processes (on one or many hosts) can share the same queue.
+
+Concurrency is bounded per worker (JOB_WORKER_CONCURRENCY) and per job kind
+(the handler's `concurrency`). On shutdown the worker stops claiming, gives
+running jobs JOB_SHUTDOWN_GRACE_SECONDS to finish and puts the rest back in
+the queue.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Dict, List, Optional, Sequence
+from uuid import UUID
+
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.models.job import Job
+from app.services import job_queue
+from app.services.job_queue import JobCancelled, JobContext, JobError
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    def __init__(
+        self,
+        concurrency: int = settings.JOB_WORKER_CONCURRENCY,
+        poll_seconds: float = settings.JOB_POLL_SECONDS,
+        lease_seconds: float = settings.JOB_LEASE_SECONDS,
+        kinds: Optional[Sequence[str]] = None,
+    ):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.kinds = list(kinds) if kinds else job_queue.registered_kinds()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._running: Dict[UUID, asyncio.Task] = {}
+        self._running_kinds: Dict[UUID, str] = {}
+        self._stopping = asyncio.Event()
+        self._slot_freed = asyncio.Event()
+        self.completed = 0
+        self.failed = 0
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _free_slots(self, kind: str, free: int) -> int:
+        handler = job_queue.get_handler(kind)
+        if handler is None or handler.concurrency is None:
+            return free
+        busy = sum(1 for running_kind in self._running_kinds.values() if running_kind == kind)
+        return min(free, handler.concurrency - busy)
+
+    async def _claim(self) -> List[Job]:
+        free = self.concurrency - len(self._running)
+        if free <= 0:
+            return []
+        claimed: List[Job] = []
+        unlimited = []
+        async with AsyncSessionLocal() as db:
+            for kind in self.kinds:
+                handler = job_queue.get_handler(kind)
+                if handler is not None and handler.concurrency is not None:
+                    claimed += await job_queue.claim(db, self.worker_id, [kind], self._free_slots(kind, free - len(claimed)))
+                else:
+                    unlimited.append(kind)
+            claimed += await job_queue.claim(db, self.worker_id, unlimited, free - len(claimed))
+        return claimed
+
+    async def _execute(self, job: Job) -> None:
+        handler = job_queue.get_handler(job.kind)
+        started = time.perf_counter()
+        status = None
+        try:
+            if handler is None:
+                raise JobError(f"No handler registered for job kind '{job.kind}'.")
+            context = JobContext(job, self.worker_id)
+            result = await asyncio.wait_for(handler.func(context, dict(job.payload or {})), timeout=handler.timeout)
+            async with AsyncSessionLocal() as db:
+                status = job_queue.SUCCEEDED if await job_queue.complete(db, self.worker_id, job, result) else job_queue.CANCELLED
+        except JobCancelled:
+            status = job_queue.CANCELLED
+        except asyncio.CancelledError:
+            if self._stopping.is_set():
+                raise # Shutdown: _shutdown() puts the job back in the queue
+            status = job_queue.CANCELLED # Cancelled through the API, noticed at a heartbeat
+        except Exception as e:
+            permanent = isinstance(e, JobError)
+            error = str(e) if permanent else f"{type(e).__name__}: {e}"
+            if isinstance(e, asyncio.TimeoutError):
+                error = f"Timed out after {handler.timeout}s"
+            logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts}/{job.max_attempts} failed: {error}", exc_info=not permanent)
+            async with AsyncSessionLocal() as db:
+                status = await job_queue.fail(db, self.worker_id, job, error, retry=not permanent)
+        finally:
+            if status == job_queue.SUCCEEDED:
+                self.completed += 1
+            elif status == job_queue.FAILED:
+                self.failed += 1
+            if status is not None:
+                logger.info(f"Job {job.id} ({job.kind}) {status} after {(time.perf_counter() - started) * 1000:.0f} ms.")
+            self._running.pop(job.id, None)
+            self._running_kinds.pop(job.id, None)
+            self._slot_freed.set()
+
+    def _start(self, job: Job) -> None:
+        self._running_kinds[job.id] = job.kind
+        self._running[job.id] = asyncio.create_task(self._execute(job), name=f"job-{job.id}")
+
+    async def _heartbeat(self) -> None:
+        async with AsyncSessionLocal() as db:
+            lost = await job_queue.heartbeat(db, self.worker_id, list(self._running))
+        for job_id in lost:
+            task = self._running.get(job_id)
+            if task is not None:
+                logger.info(f"Job {job_id} was cancelled or reclaimed; stopping it.")
+                task.cancel()
+
+    async def run(self) -> None:
+        logger.info(f"Job worker {self.worker_id} started: kinds={self.kinds}, concurrency={self.concurrency}.")
+        last_heartbeat = last_recovery = 0.0
+        while not self._stopping.is_set():
+            now = time.monotonic()
+            try:
+                if now - last_recovery >= self.lease_seconds / 2:
+                    async with AsyncSessionLocal() as db:
+                        await job_queue.requeue_stale(db, self.lease_seconds)
+                    last_recovery = now
+                if self._running and now - last_heartbeat >= self.lease_seconds / 3:
+                    await self._heartbeat()
+                    last_heartbeat = now
+                jobs = await self._claim()
+            except Exception as e:
+                logger.error(f"Job worker {self.worker_id} could not reach the queue: {e}")
+                jobs = []
+            for job in jobs:
+                self._start(job)
+            if jobs and len(self._running) < self.concurrency:
+                continue # There may be more due jobs; claim again right away
+
+            self._slot_freed.clear()
+            stop = asyncio.ensure_future(self._stopping.wait())
+            freed = asyncio.ensure_future(self._slot_freed.wait())
+            await asyncio.wait({stop, freed}, timeout=self.poll_seconds, return_when=asyncio.FIRST_COMPLETED)
+            stop.cancel()
+            freed.cancel()
+        await self._shutdown()
+
+    async def _shutdown(self) -> None:
+        if self._running:
+            logger.info(f"Waiting up to {settings.JOB_SHUTDOWN_GRACE_SECONDS}s for {len(self._running)} running jobs.")
+            await asyncio.wait(list(self._running.values()), timeout=settings.JOB_SHUTDOWN_GRACE_SECONDS)
+        interrupted = list(self._running)
+        for task in list(self._running.values()):
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+        if interrupted:
+            async with AsyncSessionLocal() as db:
+                await job_queue.release(db, self.worker_id, interrupted)
+            logger.info(f"Returned {len(interrupted)} interrupted jobs to the queue.")
+        logger.info(f"Job worker {self.worker_id} stopped ({self.completed} succeeded, {self.failed} failed).")
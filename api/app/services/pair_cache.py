@@ -0,0 +1,139 @@
+# /app/services/pair_cache.py
+"""
+Result cache for two-chart computations (synastry, composite).
+
+Entries are keyed by the unordered pair of chart content hashes plus the
+engine version, so (A, B) and (B, A) share one entry. Results are stored in
+canonical orientation (the chart with the lower hash is chart 1); readers
+asking for the reversed pair get `swapped=True` and re-orient the result.
+
+A bounded in-process LRU sits in front of an optional persistent tier (the
+pair_result table), enabled with PAIR_CACHE_PERSISTENT.
+"""
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, or_
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.pair_result import PairResult
+from app.services.positions import ENGINE_VERSION
+
+logger = logging.getLogger(__name__)
+
+
+def pair_key(kind: str, hash1: str, hash2: str, variant: str = "") -> Tuple[str, str, str, bool]:
+    """Returns (key, low hash, high hash, swapped) for an unordered pair of content hashes."""
+    swapped = hash1 > hash2
+    low, high = (hash2, hash1) if swapped else (hash1, hash2)
+    return f"{kind}:{variant}:{ENGINE_VERSION}:{low}:{high}", low, high, swapped
+
+
+def swap_synastry_aspects(aspects: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Re-orients synastry aspects for the reversed pair (planet1 <-> planet2)."""
+    return [{**aspect, "planet1": aspect["planet2"], "planet2": aspect["planet1"]} for aspect in aspects]
+
+
+class PairResultCache:
+    def __init__(self, max_entries: int, persistent: bool = False):
+        self.max_entries = max_entries
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._keys_by_hash: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, low: str, high: str, result: Dict[str, Any]) -> None:
+        self._entries[key] = result
+        self._entries.move_to_end(key)
+        self._keys_by_hash.setdefault(low, set()).add(key)
+        self._keys_by_hash.setdefault(high, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            old_key, _ = self._entries.popitem(last=False)
+            self._forget_key(old_key)
+
+    def _forget_key(self, key: str) -> None:
+        _, _, _, low, high = key.rsplit(":", 4)
+        for content_hash in (low, high):
+            keys = self._keys_by_hash.get(content_hash)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_hash[content_hash]
+
+    async def get(
+        self, kind: str, hash1: str, hash2: str, variant: str = "", db: Optional[AsyncSession] = None
+    ) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """Returns (canonical result, swapped) or None."""
+        key, low, high, swapped = pair_key(kind, hash1, hash2, variant)
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result, swapped
+
+        if self.persistent and db is not None:
+            try:
+                row = (await db.execute(select(PairResult.result).where(PairResult.key == key))).scalar_one_or_none()
+            except Exception as e:
+                logger.warning(f"Pair cache persistent lookup failed: {e}")
+                row = None
+            if row is not None:
+                self._remember(key, low, high, row)
+                self.hits += 1
+                return row, swapped
+
+        self.misses += 1
+        return None
+
+    async def put(
+        self, kind: str, hash1: str, hash2: str, result: Dict[str, Any],
+        variant: str = "", db: Optional[AsyncSession] = None,
+    ) -> None:
+        """Stores a result computed for (hash1, hash2); it must already be in canonical orientation."""
+        key, low, high, _ = pair_key(kind, hash1, hash2, variant)
+        self._remember(key, low, high, result)
+
+        if self.persistent and db is not None:
+            try:
+                await db.execute(
+                    insert(PairResult)
+                    .values(key=key, hash_low=low, hash_high=high, kind=kind, engine_version=ENGINE_VERSION, result=result)
+                    .on_conflict_do_nothing(index_elements=["key"])
+                )
+                await db.commit()
+            except Exception as e:
+                await db.rollback()
+                logger.warning(f"Pair cache persistent write failed: {e}")
+
+    async def invalidate(self, content_hash: str, db: Optional[AsyncSession] = None) -> int:
+        """
+        Drops every entry involving a chart content hash. Does not commit the
+        persistent delete; callers run it inside their own transaction.
+        """
+        keys = self._keys_by_hash.pop(content_hash, set())
+        for key in list(keys):
+            self._entries.pop(key, None)
+            self._forget_key(key)
+
+        if self.persistent and db is not None:
+            await db.execute(
+                delete(PairResult).where(or_(PairResult.hash_low == content_hash, PairResult.hash_high == content_hash))
+            )
+        if keys:
+            logger.info(f"Invalidated {len(keys)} cached pair results for content hash {content_hash[:12]}.")
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_hash.clear()
+
+
+pair_result_cache = PairResultCache(
+    max_entries=settings.PAIR_CACHE_MAX_ENTRIES,
+    persistent=settings.PAIR_CACHE_PERSISTENT,
+)
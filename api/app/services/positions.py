@@ -0,0 +1,89 @@
+# /app/services/positions.py
+import hashlib
+import logging
+from datetime import datetime
+from importlib import metadata
+from typing import Any, Dict, List, Optional
+
+from app.services.astrology import NatalChartCalculator, PLANET_MAP
+
+logger = logging.getLogger(__name__)
+
+# Bump when the position set layout or the way it is calculated changes
+POSITION_SET_VERSION = 1
+
+try:
+    _KERYKEION_VERSION = metadata.version("kerykeion")
+except metadata.PackageNotFoundError:
+    _KERYKEION_VERSION = "unavailable"
+
+# Identifies the calculation engine; cached results from another engine are stale
+ENGINE_VERSION = f"{POSITION_SET_VERSION}-kerykeion-{_KERYKEION_VERSION}"
+
+HOUSE_ATTR_NAMES = [
+    'first_house', 'second_house', 'third_house', 'fourth_house',
+    'fifth_house', 'sixth_house', 'seventh_house', 'eighth_house',
+    'ninth_house', 'tenth_house', 'eleventh_house', 'twelfth_house'
+]
+
+
+def extract_position_set(subject: Any) -> Dict[str, Any]:
+    """
+    Pulls the bare longitudes out of an AstrologicalSubject.
+
+    A position set is the minimal input for pair calculations:
+    {"points": {"Sun": 123.4, ...}, "houses": [cusp1, ..., cusp12]}
+    """
+    points: Dict[str, float] = {}
+    for attr_name, display_name in PLANET_MAP.items():
+        point = getattr(subject, attr_name, None)
+        abs_pos = getattr(point, 'abs_pos', None)
+        if isinstance(abs_pos, (int, float)):
+            points[display_name] = float(abs_pos)
+
+    houses: List[float] = []
+    for attr_name in HOUSE_ATTR_NAMES:
+        house = getattr(subject, attr_name, None)
+        abs_pos = getattr(house, 'abs_pos', None)
+        if isinstance(abs_pos, (int, float)):
+            houses.append(float(abs_pos))
+
+    return {"points": points, "houses": houses if len(houses) == 12 else [], "engine_version": ENGINE_VERSION}
+
+
+def chart_content_hash(birth_datetime: datetime, latitude: float, longitude: float) -> str:
+    """
+    Hash of the inputs that determine a chart's positions. Name and city label
+    are deliberately excluded: renaming a chart does not move its planets.
+    """
+    payload = f"{birth_datetime.replace(tzinfo=None).isoformat()}|{latitude:.6f}|{longitude:.6f}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def is_position_set_current(positions: Optional[Dict[str, Any]], stored_hash: Optional[str], content_hash: str) -> bool:
+    """True if a cached position set was computed from the same inputs by the current engine."""
+    return bool(positions) and stored_hash == content_hash and positions.get("engine_version") == ENGINE_VERSION
+
+
+def build_position_set(
+    name: str,
+    birth_dt: datetime,
+    city: str,
+    latitude: Optional[float],
+    longitude: Optional[float],
+) -> Dict[str, Any]:
+    """
+    Builds the subject for one chart and returns its position set.
+    Synchronous (Kerykeion does the ephemeris work), so run it off the event loop.
+    Raises ValueError if the subject could not be built.
+    """
+    calculator = NatalChartCalculator(
+        name=name,
+        birth_dt=birth_dt,
+        city=city,
+        latitude=latitude,
+        longitude=longitude
+    )
+    if calculator.calculation_error or not calculator.subject:
+        raise ValueError(calculator.calculation_error or f"Could not build astrological subject for {name}")
+    return extract_position_set(calculator.subject)
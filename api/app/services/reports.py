@@ -0,0 +1,284 @@
+# /app/services/reports.py
+"""
+PDF chart reports: birth data, the natal wheel, planet/house/aspect tables
+and interpretation text, laid out with reportlab.
+
+Reports are generated by the job worker (the `chart_report` job kind in
+app/services/job_handlers.py), never in an API process. They reuse what is
+already cached: the wheel comes from the wheel image cache
+(app/services/chart_render.py) and a report whose inputs have not changed is
+not rebuilt at all, since reports are stored under a content hash of those
+inputs. Files are written straight into REPORT_STORAGE_DIR/<user id>/ (under a
+temporary name, renamed when complete) and served from there by
+GET /reports/{report_id}.pdf.
+
+reportlab is optional (the `reports` extra); svglib, also optional, converts
+the SVG wheel into vector drawing operations. Without svglib the report is
+built without the wheel.
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.services import astrology
+from app.services.chart_render import WheelOptions, WheelSubject, get_or_render_wheel, wheel_cache_key
+from app.services.executor import run_calculation
+from app.services.positions import ENGINE_VERSION
+
+logger = logging.getLogger(__name__)
+
+# Bump when the layout or the texts change so stored reports are rebuilt
+REPORT_VERSION = 1
+REPORT_MEDIA_TYPE = "application/pdf"
+
+# The wheel as embedded in reports: no tables (the report has its own), plain colours for svglib
+REPORT_WHEEL_OPTIONS = WheelOptions(format="svg", wheel_only=True, inline_css=True)
+
+_REPORT_ID = re.compile(r"^[0-9a-f]{64}$")
+
+_reportlab: Any = None
+_svglib: Any = None
+
+
+def reportlab_available() -> bool:
+    """Whether reportlab (the optional `reports` extra) can be imported; loaded on first use."""
+    global _reportlab
+    if _reportlab is None:
+        try:
+            import reportlab # noqa: F401
+            _reportlab = True
+        except ImportError as e:
+            logger.warning(f"reportlab is not available, PDF reports are disabled: {e}")
+            _reportlab = False
+    return _reportlab
+
+
+def _svg_to_drawing(svg: bytes) -> Any:
+    """A reportlab Drawing of the SVG, or None when svglib is missing or cannot parse it."""
+    global _svglib
+    if _svglib is None:
+        try:
+            from svglib import svglib
+            _svglib = svglib
+        except ImportError:
+            logger.warning("svglib is not available; PDF reports are built without the chart wheel.")
+            _svglib = False
+    if not _svglib:
+        return None
+    try:
+        return _svglib.svg2rlg(io.BytesIO(svg))
+    except Exception as e:
+        logger.warning(f"Could not convert the chart wheel for the report: {e}")
+        return None
+
+
+# --- Interpretation texts ---
+
+SIGN_KEYWORDS = {
+    "Aries": "initiative, courage and a direct, pioneering drive",
+    "Taurus": "steadiness, patience and a need for comfort and security",
+    "Gemini": "curiosity, quick thinking and a love of conversation",
+    "Cancer": "sensitivity, loyalty and a strong protective instinct",
+    "Leo": "warmth, creativity and a wish to shine and be recognised",
+    "Virgo": "precision, helpfulness and an eye for what can be improved",
+    "Libra": "diplomacy, a sense of fairness and a need for partnership",
+    "Scorpio": "intensity, depth and a drive to get to the bottom of things",
+    "Sagittarius": "optimism, independence and a hunger for meaning and travel",
+    "Capricorn": "ambition, discipline and a long-term, practical view",
+    "Aquarius": "originality, ideals and a focus on the wider group",
+    "Pisces": "imagination, compassion and a fluid, intuitive nature",
+}
+PLACEMENT_THEMES = {
+    "Sun": "The Sun describes core identity and purpose",
+    "Moon": "The Moon describes emotional needs and instinctive reactions",
+    "Ascendant": "The Ascendant describes first impressions and the approach to new situations",
+}
+ASPECT_MEANINGS = {
+    "conjunction": "blend and intensify each other",
+    "opposition": "pull in opposite directions and ask for balance",
+    "trine": "support each other easily",
+    "square": "create friction that pushes for growth",
+    "sextile": "offer opportunities when acted upon",
+    "quintile": "combine in a creative, talent-like way",
+}
+ELEMENT_MEANINGS = {
+    "Fire": "enthusiasm and action", "Earth": "practicality and endurance",
+    "Air": "ideas and communication", "Water": "feeling and intuition",
+}
+
+
+def interpretation(chart_data: Dict[str, Any], max_aspects: int = 8) -> List[Tuple[str, str]]:
+    """(heading, paragraph) pairs interpreting the main placements, the element balance and the closest aspects."""
+    planets = chart_data.get("planets") or {}
+    sections: List[Tuple[str, str]] = []
+    for point, theme in PLACEMENT_THEMES.items():
+        sign = (planets.get(point) or {}).get("sign")
+        if sign in SIGN_KEYWORDS:
+            sections.append((f"{point} in {sign}", f"{theme}; in {sign} it is expressed through {SIGN_KEYWORDS[sign]}."))
+
+    elements = chart_data.get("element_counts") or {}
+    if elements and sum(elements.values()):
+        strongest = max(elements, key=elements.get)
+        weakest = min(elements, key=elements.get)
+        sections.append((
+            "Element balance",
+            f"{strongest} dominates ({elements[strongest]} placements), emphasising "
+            f"{ELEMENT_MEANINGS.get(strongest, strongest)}; {weakest} is the least represented "
+            f"({elements[weakest]}), so {ELEMENT_MEANINGS.get(weakest, weakest)} may take conscious effort.",
+        ))
+
+    aspects = sorted(chart_data.get("aspects") or [], key=lambda aspect: abs(aspect.get("orb") or 0))
+    for aspect in aspects[:max_aspects]:
+        meaning = ASPECT_MEANINGS.get(aspect.get("aspect_name"))
+        if meaning:
+            sections.append((
+                f"{aspect['p1_name']} {aspect['aspect_name']} {aspect['p2_name']}",
+                f"{aspect['p1_name']} and {aspect['p2_name']} {meaning} (orb {abs(aspect['orb']):.1f}°).",
+            ))
+    return sections
+
+
+# --- Storage ---
+
+def report_id(subject: WheelSubject) -> str:
+    """Content hash naming a report: same chart inputs, engine and layout -> same file."""
+    payload = f"report-{REPORT_VERSION}||{ENGINE_VERSION}||{wheel_cache_key('natal', [subject], REPORT_WHEEL_OPTIONS)}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def report_path(user_id: UUID, report_key: str) -> Optional[Path]:
+    """Where a user's report lives; None for a malformed id (never a path outside the storage dir)."""
+    if not _REPORT_ID.match(report_key):
+        return None
+    return Path(settings.REPORT_STORAGE_DIR) / str(user_id) / f"{report_key}.pdf"
+
+
+def _format_degrees(value: Optional[float]) -> str:
+    if value is None:
+        return "-"
+    degrees = int(value)
+    minutes = int(round((value - degrees) * 60))
+    if minutes == 60:
+        degrees, minutes = degrees + 1, 0
+    return f"{degrees}°{minutes:02d}'"
+
+
+def build_report_pdf(path: Path, chart_data: Dict[str, Any], wheel_svg: Optional[bytes]) -> int:
+    """
+    Lays out one report and writes it to `path`. Synchronous and CPU-bound:
+    run it on the calculation pool. Returns the file size in bytes.
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import PageBreak, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    info = chart_data.get("info") or {}
+    table_style = TableStyle([
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.grey),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f2f2f2")]),
+    ])
+
+    story: List[Any] = [
+        Paragraph(f"Natal Chart Report: {info.get('name', '')}", styles["Title"]),
+        Paragraph(f"Born {info.get('birth_datetime', '').replace('T', ' ')} in {info.get('location', '')}", styles["Normal"]),
+        Spacer(1, 6 * mm),
+    ]
+
+    drawing = _svg_to_drawing(wheel_svg) if wheel_svg else None
+    if drawing is not None:
+        scale = (150 * mm) / max(drawing.width, 1)
+        drawing.width, drawing.height = drawing.width * scale, drawing.height * scale
+        drawing.scale(scale, scale)
+        drawing.hAlign = "CENTER"
+        story += [drawing, Spacer(1, 6 * mm)]
+
+    planets = chart_data.get("planets") or {}
+    if planets:
+        rows = [["Point", "Sign", "Degree", "Retrograde", "Dignity"]]
+        for planet in planets.values():
+            rows.append([
+                planet.get("name"), planet.get("sign"), _format_degrees(planet.get("deg_within_sign")),
+                "R" if planet.get("is_retrograde") else "", planet.get("dignity", ""),
+            ])
+        story += [Paragraph("Planets and Points", styles["Heading2"]), Table(rows, style=table_style, hAlign="LEFT")]
+
+    houses = chart_data.get("houses") or []
+    if houses:
+        rows = [["House", "Sign", "Degree"]]
+        rows += [[house.get("cusp"), house.get("sign"), _format_degrees(house.get("position"))] for house in houses]
+        story += [Paragraph("House Cusps", styles["Heading2"]), Table(rows, style=table_style, hAlign="LEFT")]
+
+    aspects = chart_data.get("aspects") or []
+    if aspects:
+        rows = [["Point", "Aspect", "Point", "Orb"]]
+        rows += [
+            [aspect.get("p1_name"), aspect.get("aspect_name"), aspect.get("p2_name"), _format_degrees(abs(aspect.get("orb") or 0))]
+            for aspect in sorted(aspects, key=lambda aspect: abs(aspect.get("orb") or 0))
+        ]
+        story += [PageBreak(), Paragraph("Aspects", styles["Heading2"]), Table(rows, style=table_style, hAlign="LEFT")]
+
+    texts = interpretation(chart_data)
+    if texts:
+        story += [PageBreak(), Paragraph("Interpretation", styles["Heading1"])]
+        for heading, text in texts:
+            story += [Paragraph(heading, styles["Heading3"]), Paragraph(text, styles["BodyText"])]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # reportlab writes pages to the file as it goes; the rename publishes only complete reports
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".pdf.tmp")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            document = SimpleDocTemplate(
+                output, pagesize=A4, title=f"Natal Chart Report: {info.get('name', '')}",
+                author=settings.PROJECT_NAME, leftMargin=18 * mm, rightMargin=18 * mm,
+            )
+            document.build(story)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return path.stat().st_size
+
+
+def _calculator(subject: WheelSubject) -> astrology.NatalChartCalculator:
+    return astrology.NatalChartCalculator(
+        name=subject.name, birth_dt=subject.birth_dt, city=subject.city,
+        latitude=subject.latitude, longitude=subject.longitude,
+    )
+
+
+async def generate_chart_report(user_id: UUID, subject: WheelSubject) -> Dict[str, Any]:
+    """
+    Builds (or finds) the report for one chart. Returns {"report_id", "bytes",
+    "cached"}. Raises ValueError if the chart cannot be calculated.
+    """
+    key = report_id(subject)
+    path = report_path(user_id, key)
+    if path.exists():
+        return {"report_id": key, "bytes": path.stat().st_size, "cached": True}
+
+    # Subject construction is the expensive part; keep it off the worker's event loop
+    calculator = await run_calculation(_calculator, subject)
+    chart_data = await calculator.calculate_chart()
+    if chart_data.get("calculation_error"):
+        raise ValueError(chart_data["calculation_error"])
+    try:
+        _, wheel_svg = await get_or_render_wheel("natal", [subject], REPORT_WHEEL_OPTIONS)
+    except (ValueError, RuntimeError) as e:
+        logger.warning(f"Report for {subject.name} is built without its wheel: {e}")
+        wheel_svg = None
+    size = await run_calculation(build_report_pdf, path, chart_data, wheel_svg)
+    logger.info(f"Built report {key[:12]} for {subject.name} ({size / 1024:.0f} KiB).")
+    return {"report_id": key, "bytes": size, "cached": False}
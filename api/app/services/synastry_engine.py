@@ -0,0 +1,265 @@
+# /app/services/synastry_engine.py
+"""
+Vectorized synastry over position sets (see app/services/positions.py).
+
+Instead of building a SynastryAspects object per pair, longitudes for many
+charts are stacked into an (N, P) matrix and all cross-chart separations are
+matched against ASPECT_DEGREES_ORBS in one numpy pass.
+"""
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.astrology import ASPECT_DEGREES_ORBS
+
+logger = logging.getLogger(__name__)
+
+# Points compared between charts. South node, Descendant and IC are left out
+# because they only ever repeat the aspects of their opposite point.
+SYNASTRY_POINTS = [
+    "Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn",
+    "Uranus", "Neptune", "Pluto", "Mean_Node", "Chiron", "Ascendant", "Medium_Coeli",
+]
+
+ASPECT_NAMES = list(ASPECT_DEGREES_ORBS.keys())
+_ASPECT_ANGLES = np.array([ASPECT_DEGREES_ORBS[name][0] for name in ASPECT_NAMES], dtype=np.float64)
+_ASPECT_ORBS = np.array([ASPECT_DEGREES_ORBS[name][1] for name in ASPECT_NAMES], dtype=np.float64)
+
+# Default compatibility scoring model: points per exact aspect, scaled down
+# linearly to zero at the edge of the orb. Positive = harmonious.
+DEFAULT_ASPECT_WEIGHTS: Dict[str, float] = {
+    "Conjunction": 2.0, "Trine": 3.0, "Sextile": 2.0,
+    "Square": -2.0, "Opposition": -1.0, "Quincunx": -1.0,
+    "SemiSextile": 0.5, "SemiSquare": -0.5, "Sesquiquadrate": -0.5,
+}
+
+
+def aspect_weight_vector(weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """Turns an aspect-name -> weight mapping into a vector aligned with ASPECT_NAMES."""
+    merged = dict(DEFAULT_ASPECT_WEIGHTS)
+    if weights:
+        unknown = set(weights) - set(ASPECT_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown aspect name(s) in weights: {sorted(unknown)}")
+        merged.update(weights)
+    return np.array([merged[name] for name in ASPECT_NAMES], dtype=np.float64)
+
+
+def longitude_matrix(position_sets: Sequence[Dict[str, Any]], points: Sequence[str] = SYNASTRY_POINTS) -> np.ndarray:
+    """Stacks position sets into an (N, P) longitude matrix; missing points are NaN."""
+    matrix = np.full((len(position_sets), len(points)), np.nan, dtype=np.float64)
+    for row, position_set in enumerate(position_sets):
+        chart_points = position_set.get("points", {})
+        for col, point in enumerate(points):
+            value = chart_points.get(point)
+            if value is not None:
+                matrix[row, col] = value
+    return matrix
+
+
+def angular_separation(lons_a: np.ndarray, lons_b: np.ndarray) -> np.ndarray:
+    """Shortest arc between longitudes (0-180), broadcasting like numpy subtraction."""
+    diff = np.abs(lons_a - lons_b) % 360.0
+    return np.minimum(diff, 360.0 - diff)
+
+
+def cross_aspect_orbs(lons_a: np.ndarray, lons_b: np.ndarray) -> np.ndarray:
+    """
+    Orbs of every aspect between the points of chart A and chart B.
+
+    lons_a, lons_b: (..., P) longitude arrays.
+    Returns (..., P, P, K) where K indexes ASPECT_NAMES; entries outside the
+    aspect's orb (or involving a missing point) are +inf.
+    """
+    separation = angular_separation(lons_a[..., :, None], lons_b[..., None, :])
+    orbs = np.abs(separation[..., None] - _ASPECT_ANGLES)
+    with np.errstate(invalid="ignore"):
+        in_orb = orbs <= _ASPECT_ORBS
+    return np.where(in_orb, orbs, np.inf)
+
+
+def score_aspect_orbs(orbs: np.ndarray, weight_vector: np.ndarray) -> np.ndarray:
+    """Sums orb-scaled aspect weights over the trailing (P, P, K) axes."""
+    tightness = np.where(np.isfinite(orbs), 1.0 - orbs / _ASPECT_ORBS, 0.0)
+    return (tightness * weight_vector).sum(axis=(-3, -2, -1))
+
+
+def aspects_from_orbs(orbs: np.ndarray, points: Sequence[str] = SYNASTRY_POINTS) -> List[Dict[str, Any]]:
+    """Converts one (P, P, K) orb block into SynastryAspect-shaped dicts, tightest first."""
+    i_idx, j_idx, k_idx = np.nonzero(np.isfinite(orbs))
+    aspects = [
+        {
+            "planet1": points[i],
+            "planet2": points[j],
+            "aspect_name": ASPECT_NAMES[k],
+            "orb": round(float(orbs[i, j, k]), 2),
+            "aspect_degrees": float(_ASPECT_ANGLES[k]),
+        }
+        for i, j, k in zip(i_idx.tolist(), j_idx.tolist(), k_idx.tolist())
+    ]
+    aspects.sort(key=lambda aspect: aspect["orb"])
+    return aspects
+
+
+def group_synastry_matrix(
+    position_sets: Sequence[Dict[str, Any]],
+    weights: Optional[Dict[str, float]] = None,
+    points: Sequence[str] = SYNASTRY_POINTS,
+) -> List[Dict[str, Any]]:
+    """
+    All-pairs synastry for a group of charts.
+
+    Returns one entry per unordered pair (upper triangle, i < j) with the
+    cross aspects of chart i (planet1) to chart j (planet2) and a score.
+    """
+    if len(position_sets) < 2:
+        return []
+    lons = longitude_matrix(position_sets, points)
+    i_idx, j_idx = np.triu_indices(len(position_sets), k=1)
+    orbs = cross_aspect_orbs(lons[i_idx], lons[j_idx])
+    scores = score_aspect_orbs(orbs, aspect_weight_vector(weights))
+
+    return [
+        {
+            "index1": int(i),
+            "index2": int(j),
+            "aspects": aspects_from_orbs(orbs[pair], points),
+            "score": round(float(scores[pair]), 3),
+        }
+        for pair, (i, j) in enumerate(zip(i_idx.tolist(), j_idx.tolist()))
+    ]
+
+
+# --- Population ranking ---
+# Aspect orbs in ASPECT_DEGREES_ORBS do not overlap, so the orb-scaled score of
+# a separation can be tabulated once and looked up for millions of pairs.
+SCORE_TABLE_RESOLUTION = 0.01 # degrees per table slot
+
+# Optional prefilter: a row is a candidate when at least PREFILTER_MIN_CONTACTS
+# key-point pairs form a harmonious aspect within PREFILTER_ORB.
+KEY_POINTS = ["Sun", "Moon", "Venus", "Mars", "Ascendant"]
+PREFILTER_ASPECTS = ["Conjunction", "Sextile", "Trine"]
+PREFILTER_ORB = 3.0
+PREFILTER_MIN_CONTACTS = 3
+
+
+def compatibility_score_table(weights: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """
+    Score contribution for every raw longitude difference |a - b| in 0..360 at
+    SCORE_TABLE_RESOLUTION (the fold to the 0-180 separation is baked in).
+    The extra trailing slot scores 0; out-of-range slots are clipped onto it.
+    """
+    weight_vector = aspect_weight_vector(weights)
+    differences = np.arange(0, int(round(360 / SCORE_TABLE_RESOLUTION)) + 1) * SCORE_TABLE_RESOLUTION
+    separations = np.minimum(differences, 360.0 - differences)
+    orbs = np.abs(separations[:, None] - _ASPECT_ANGLES)
+    tightness = np.where(orbs <= _ASPECT_ORBS, 1.0 - orbs / _ASPECT_ORBS, 0.0)
+    table = (tightness * weight_vector).sum(axis=1)
+    return np.append(table, 0.0).astype(np.float32)
+
+
+# Stand-in longitude for missing points: far enough out that every difference
+# involving it lands past the end of the score table (scores 0).
+_MISSING_LONGITUDE = 1.0e4
+
+
+def score_population(
+    target_lons: np.ndarray,
+    population_lons: np.ndarray,
+    weights: Optional[Dict[str, float]] = None,
+    chunk_size: int = 8192,
+) -> np.ndarray:
+    """
+    Synastry compatibility of one chart against every row of an (N, P) matrix.
+
+    Equivalent to score_aspect_orbs(cross_aspect_orbs(...)) per row, up to the
+    table resolution, but without materialising the (N, P, P, K) orb tensor.
+    Longitudes must be normalised to 0-360.
+    """
+    table = compatibility_score_table(weights)
+    target = np.nan_to_num(np.asarray(target_lons, dtype=np.float32), nan=-_MISSING_LONGITUDE)
+    population = np.nan_to_num(np.asarray(population_lons, dtype=np.float32), nan=_MISSING_LONGITUDE)
+    scale = np.float32(1.0 / SCORE_TABLE_RESOLUTION)
+    scores = np.empty(len(population), dtype=np.float32)
+
+    for start in range(0, len(population), chunk_size):
+        block = population[start:start + chunk_size]
+        difference = np.abs(block[:, :, None] - target[None, None, :])
+        difference *= scale
+        difference += np.float32(0.5)
+        slots = difference.astype(np.int32)
+        scores[start:start + chunk_size] = np.take(table, slots, mode="clip").sum(axis=(1, 2))
+    return scores
+
+
+class KeyPointIndex:
+    """
+    Approximate prefilter for very large populations.
+
+    Keeps each key point's longitudes sorted so that, for a target chart, the
+    rows with a harmonious aspect between any pair of key points can be found
+    with binary searches instead of scoring the whole population.
+    """
+
+    def __init__(self, population_lons: np.ndarray, points: Sequence[str] = SYNASTRY_POINTS):
+        self.size = len(population_lons)
+        self._columns = [points.index(point) for point in KEY_POINTS if point in points]
+        self._sorted: List[np.ndarray] = []
+        self._order: List[np.ndarray] = []
+        for col in self._columns:
+            values = population_lons[:, col]
+            order = np.argsort(values, kind="stable")
+            order = order[~np.isnan(values[order])]
+            self._order.append(order)
+            self._sorted.append(values[order])
+
+    def _rows_within(self, slot: int, low: float, high: float) -> np.ndarray:
+        values, order = self._sorted[slot], self._order[slot]
+        low, high = low % 360.0, high % 360.0
+        if low <= high:
+            return order[np.searchsorted(values, low, "left"):np.searchsorted(values, high, "right")]
+        # Window wraps past 0° Aries
+        return np.concatenate((order[np.searchsorted(values, low, "left"):], order[:np.searchsorted(values, high, "right")]))
+
+    def candidates(self, target_lons: np.ndarray, min_contacts: int = PREFILTER_MIN_CONTACTS) -> np.ndarray:
+        """Row indices with at least `min_contacts` harmonious key-point aspects to the target."""
+        hits = []
+        for target_col in self._columns:
+            target_lon = target_lons[target_col]
+            if np.isnan(target_lon):
+                continue
+            for aspect_name in PREFILTER_ASPECTS:
+                angle = ASPECT_DEGREES_ORBS[aspect_name][0]
+                for center in {(target_lon + angle) % 360.0, (target_lon - angle) % 360.0}:
+                    for slot in range(len(self._columns)):
+                        hits.append(self._rows_within(slot, center - PREFILTER_ORB, center + PREFILTER_ORB))
+        if not hits:
+            return np.arange(0)
+        contacts = np.bincount(np.concatenate(hits), minlength=self.size)
+        return np.nonzero(contacts >= min_contacts)[0]
+
+
+def rank_population(
+    target_lons: np.ndarray,
+    population_lons: np.ndarray,
+    limit: int,
+    weights: Optional[Dict[str, float]] = None,
+    index: Optional[KeyPointIndex] = None,
+) -> Dict[str, Any]:
+    """
+    Returns the `limit` best-scoring rows as {"rows": [...], "scores": [...],
+    "candidates_scored": n}. With an index, only its candidates are scored.
+    """
+    rows = index.candidates(target_lons) if index is not None else np.arange(len(population_lons))
+    if len(rows) == 0:
+        return {"rows": [], "scores": [], "candidates_scored": 0}
+    scores = score_population(target_lons, population_lons[rows], weights)
+    limit = min(limit, len(rows))
+    top = np.argpartition(-scores, limit - 1)[:limit]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return {
+        "rows": rows[top].tolist(),
+        "scores": [round(float(score), 3) for score in scores[top]],
+        "candidates_scored": int(len(rows)),
+    }
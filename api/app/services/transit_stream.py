@@ -0,0 +1,134 @@
+# /app/services/transit_stream.py
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Longitude changes smaller than this (in degrees) are not worth a frame entry.
+LONGITUDE_DELTA_EPSILON = 0.001
+# Orb changes smaller than this are not re-sent (orbs are rounded to 2 decimals).
+ORB_DELTA_EPSILON = 0.01
+
+
+def _aspect_key(aspect: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (aspect.get("transiting_planet"), aspect.get("aspect_name"), aspect.get("natal_planet"))
+
+
+def _planet_changed(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> bool:
+    if previous is None:
+        return True
+    prev_lon = previous.get("longitude")
+    curr_lon = current.get("longitude")
+    if not isinstance(prev_lon, (int, float)) or not isinstance(curr_lon, (int, float)):
+        return previous != current
+    if abs(curr_lon - prev_lon) >= LONGITUDE_DELTA_EPSILON:
+        return True
+    # Sign ingress or station can happen without a large longitude change
+    return previous.get("sign") != current.get("sign") or previous.get("is_retrograde") != current.get("is_retrograde")
+
+
+class TransitFrameEncoder:
+    """
+    Turns successive calculate_transits() results into delta-encoded frames.
+    The first frame is always full; later frames only carry planets whose
+    position moved and aspects that appeared, disappeared or changed orb.
+    """
+
+    def __init__(self):
+        self.seq = 0
+        self._planets: Optional[Dict[str, Dict[str, Any]]] = None
+        self._aspects: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+
+    def reset(self) -> None:
+        """Forces the next frame to be a full frame (e.g. after a client resync request)."""
+        self._planets = None
+        self._aspects = {}
+
+    def encode(self, transit_data: Dict[str, Any], request_id: Optional[Any] = None) -> Dict[str, Any]:
+        planets: Dict[str, Dict[str, Any]] = transit_data.get("transiting_planets", {}) or {}
+        aspects = {_aspect_key(a): a for a in transit_data.get("aspects_to_natal", []) or []}
+        transit_dt = transit_data.get("transit_datetime")
+
+        self.seq += 1
+        frame: Dict[str, Any] = {
+            "type": "frame",
+            "seq": self.seq,
+            "request_id": request_id,
+            "transit_datetime": transit_dt.isoformat() if isinstance(transit_dt, datetime) else transit_dt,
+        }
+
+        if self._planets is None:
+            frame["full"] = True
+            frame["planets"] = planets
+            frame["aspects"] = list(aspects.values())
+        else:
+            frame["full"] = False
+            frame["planets"] = {
+                name: planet for name, planet in planets.items()
+                if _planet_changed(self._planets.get(name), planet)
+            }
+            frame["planets_removed"] = [name for name in self._planets if name not in planets]
+            frame["aspects_upserted"] = [
+                aspect for key, aspect in aspects.items()
+                if key not in self._aspects
+                or abs(float(self._aspects[key].get("orb", 0.0)) - float(aspect.get("orb", 0.0))) >= ORB_DELTA_EPSILON
+            ]
+            frame["aspects_removed"] = [list(key) for key in self._aspects if key not in aspects]
+
+        # Only remember what the client has actually been told about, so that
+        # slow drifts below the epsilon accumulate until they are worth sending.
+        if frame["full"]:
+            self._planets = dict(planets)
+            self._aspects = dict(aspects)
+        else:
+            self._planets.update(frame["planets"])
+            for name in frame["planets_removed"]:
+                self._planets.pop(name, None)
+            for aspect in frame["aspects_upserted"]:
+                self._aspects[_aspect_key(aspect)] = aspect
+            for key in frame["aspects_removed"]:
+                self._aspects.pop(tuple(key), None)
+        return frame
+
+
+class LatestRequestSlot:
+    """
+    Single-entry mailbox for slider positions. A newer request overwrites an
+    older one that has not been picked up yet, so superseded positions are
+    dropped instead of queued, and bursts are coalesced into one computation.
+    """
+
+    def __init__(self, coalesce_seconds: float = 0.0):
+        self.coalesce_seconds = coalesce_seconds
+        self._pending: Optional[Any] = None
+        self._event = asyncio.Event()
+        self._closed = False
+        self.superseded = 0
+
+    def put(self, item: Any) -> None:
+        if self._pending is not None:
+            self.superseded += 1
+        self._pending = item
+        self._event.set()
+
+    def close(self) -> None:
+        self._closed = True
+        self._event.set()
+
+    async def get(self) -> Optional[Any]:
+        """Waits for the newest pending request; returns None once closed."""
+        while True:
+            await self._event.wait()
+            if self._closed:
+                return None
+            if self.coalesce_seconds > 0:
+                # Give a dragging slider a moment to move on before we commit to a position
+                await asyncio.sleep(self.coalesce_seconds)
+                if self._closed:
+                    return None
+            self._event.clear()
+            pending, self._pending = self._pending, None
+            if pending is not None:
+                return pending
@@ -0,0 +1,172 @@
+# /app/services/warmup.py
+"""
+Warm-up run from the application lifespan before a worker reports ready.
+
+A fresh worker otherwise pays on its first requests for importing Kerykeion,
+loading the timezone index, opening the ephemeris files, starting the
+calculation pool threads and opening database connections. The warm-up does
+that work up front; /health/ready answers 503 until it has finished.
+
+Steps run in order and each is timed. A failing step is logged and recorded
+but only a failure of a required step (one without which no chart can be
+calculated) keeps the worker unready.
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import get_async_engine
+from app.services import astrology, ephemeris, geolocation
+from app.services.executor import get_calculation_executor, run_calculation
+from app.services.positions import build_position_set
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+WARMING_UP = "warming_up"
+READY = "ready"
+FAILED = "failed"
+
+# Fixed birth data spread over the globe (different timezones, both hemispheres)
+REFERENCE_CHARTS: List[Tuple[str, datetime, str, float, float]] = [
+    ("Reference London", datetime(1990, 1, 1, 12, 0), "London", 51.5074, -0.1278),
+    ("Reference New York", datetime(1985, 6, 15, 8, 30), "New York", 40.7128, -74.0060),
+    ("Reference Sydney", datetime(2000, 3, 21, 18, 45), "Sydney", -33.8688, 151.2093),
+    ("Reference Tokyo", datetime(1975, 11, 2, 4, 15), "Tokyo", 35.6762, 139.6503),
+    ("Reference Sao Paulo", datetime(1995, 9, 9, 22, 0), "Sao Paulo", -23.5505, -46.6333),
+    ("Reference Mumbai", datetime(2010, 12, 31, 23, 59), "Mumbai", 19.0760, 72.8777),
+]
+
+
+@dataclass
+class WarmupStep:
+    name: str
+    required: bool
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class WarmupState:
+    status: str = PENDING
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    steps: List[WarmupStep] = field(default_factory=list)
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def report(self) -> Dict[str, Any]:
+        duration = None
+        if self.started is not None:
+            duration = round(((self.finished or time.monotonic()) - self.started) * 1000, 1)
+        return {
+            "status": self.status,
+            "duration_ms": duration,
+            "steps": [
+                {"name": step.name, "required": step.required, "duration_ms": step.duration_ms, "error": step.error}
+                for step in self.steps
+            ],
+        }
+
+
+def _load_libraries() -> None:
+    if not astrology._ensure_kerykeion():
+        raise RuntimeError("Kerykeion is not available.")
+    geolocation._get_geolocator()
+
+
+def _open_ephemeris() -> None:
+    # One instant for every series body opens the planet, moon and asteroid files
+    if ephemeris.SWISSEPH_AVAILABLE:
+        now = datetime.utcnow()
+        ephemeris.ephemeris_series(now, now, timedelta(hours=1))
+
+
+def _reference_position_set(index: int) -> Dict[str, Any]:
+    name, birth_dt, city, latitude, longitude = REFERENCE_CHARTS[index % len(REFERENCE_CHARTS)]
+    return build_position_set(name, birth_dt, city, latitude, longitude)
+
+
+async def _reference_charts(count: int) -> None:
+    # Concurrently, so that every calculation pool thread takes its first-call hit here
+    from app.services.synastry_engine import group_synastry_matrix
+
+    get_calculation_executor()
+    position_sets = await asyncio.gather(*(run_calculation(_reference_position_set, i) for i in range(count)))
+    await run_calculation(group_synastry_matrix, position_sets)
+
+
+async def _open_database_connection() -> None:
+    async with get_async_engine().connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+
+async def _run_step(state: WarmupState, name: str, required: bool, step: Callable[[], Awaitable[Any]]) -> None:
+    record = WarmupStep(name=name, required=required)
+    state.steps.append(record)
+    started = time.perf_counter()
+    try:
+        await step()
+    except Exception as e:
+        record.error = f"{type(e).__name__}: {e}"
+        logger.warning(f"Warm-up step '{name}' failed: {record.error}", exc_info=True)
+    finally:
+        record.duration_ms = round((time.perf_counter() - started) * 1000, 1)
+
+
+async def run_warm_up(
+    state: WarmupState,
+    reference_charts: int = 2,
+    database: bool = True,
+) -> WarmupState:
+    """Runs every warm-up step and leaves `state` READY, or FAILED if a required step failed."""
+    state.status = WARMING_UP
+    state.started = time.monotonic()
+    state.steps = []
+    logger.info("Warm-up started.")
+
+    await _run_step(state, "libraries", True, lambda: run_calculation(_load_libraries))
+    await _run_step(state, "timezone", True, lambda: run_calculation(astrology.timezone_at, 51.5074, -0.1278))
+    await _run_step(state, "ephemeris", False, lambda: run_calculation(_open_ephemeris))
+    if reference_charts > 0:
+        await _run_step(state, "reference_charts", True, lambda: _reference_charts(reference_charts))
+    if database:
+        await _run_step(state, "database", False, _open_database_connection)
+
+    state.finished = time.monotonic()
+    failed = [step.name for step in state.steps if step.error and step.required]
+    state.status = FAILED if failed else READY
+    if failed:
+        logger.error(f"Warm-up failed in required steps {failed}; the worker stays unready.")
+    else:
+        logger.info(f"Warm-up finished in {(state.finished - state.started) * 1000:.0f} ms.")
+    return state
+
+
+async def warm_up_with_timeout(state: WarmupState) -> None:
+    """
+    Lifespan entry point. A warm-up that overruns WARMUP_TIMEOUT_SECONDS is
+    abandoned and the worker reports ready anyway: a slow first request is
+    better than a worker that never takes traffic.
+    """
+    try:
+        await asyncio.wait_for(
+            run_warm_up(state, reference_charts=settings.WARMUP_REFERENCE_CHARTS, database=settings.WARMUP_DATABASE),
+            timeout=settings.WARMUP_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        state.finished = time.monotonic()
+        state.status = READY
+        logger.warning(f"Warm-up did not finish within {settings.WARMUP_TIMEOUT_SECONDS}s; reporting ready anyway.")
+
+
+# Per worker process; read by /health/ready
+warmup_state = WarmupState()
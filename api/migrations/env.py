@@ -27,6 +27,8 @@ try:
     from app.models.user import User
     # Import other models here if they exist and inherit from Base
     from app.models.chart import Chart
+    from app.models.pair_result import PairResult
+    from app.models.job import Job
 except ImportError as e:
     print(f"Error importing models: {e}")
     sys.exit(1)
@@ -0,0 +1,41 @@
+"""Add pair result cache table
+
+Revision ID: 3e7a9d5c1f60
+Revises: 8c1f4e2a9b3d
+Create Date: 2025-06-12 09:41:07.518230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3e7a9d5c1f60'
+down_revision: Union[str, None] = '8c1f4e2a9b3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('pair_result',
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('hash_low', sa.String(length=64), nullable=False),
+    sa.Column('hash_high', sa.String(length=64), nullable=False),
+    sa.Column('kind', sa.String(length=32), nullable=False),
+    sa.Column('engine_version', sa.String(), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_pair_result_hash_low'), 'pair_result', ['hash_low'], unique=False)
+    op.create_index(op.f('ix_pair_result_hash_high'), 'pair_result', ['hash_high'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_pair_result_hash_high'), table_name='pair_result')
+    op.drop_index(op.f('ix_pair_result_hash_low'), table_name='pair_result')
+    op.drop_table('pair_result')
@@ -0,0 +1,36 @@
+"""Add chart position cache and compatibility opt-in
+
+Revision ID: 8c1f4e2a9b3d
+Revises: 5576eb54747d
+Create Date: 2025-06-10 10:12:41.204117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8c1f4e2a9b3d'
+down_revision: Union[str, None] = '5576eb54747d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('chart', sa.Column('compatibility_opt_in', sa.Boolean(), server_default='false', nullable=False))
+    op.add_column('chart', sa.Column('positions', sa.JSON(), nullable=True))
+    op.add_column('chart', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_chart_compatibility_opt_in'), 'chart', ['compatibility_opt_in'], unique=False)
+    op.create_index(op.f('ix_chart_content_hash'), 'chart', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_chart_content_hash'), table_name='chart')
+    op.drop_index(op.f('ix_chart_compatibility_opt_in'), table_name='chart')
+    op.drop_column('chart', 'content_hash')
+    op.drop_column('chart', 'positions')
+    op.drop_column('chart', 'compatibility_opt_in')
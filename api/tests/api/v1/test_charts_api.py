@@ -53,11 +53,9 @@ mock_natal_calc_result_success = {
         "Sun": {
             "name": "Sun",
             "sign": "Leo",
-            "sign_num": 4,
-            "position": 15.0,
-            "absolute_position": 125.0,
-            "house": "10",
-            "retrograde": False
+            "longitude": 125.0,
+            "deg_within_sign": 5.0,
+            "is_retrograde": False
         }
     },
     "houses": [
@@ -667,3 +665,44 @@ async def test_get_chart_transits_get_endpoint(
     passed_transit_dt = kwargs.get('transit_dt')
     assert passed_transit_dt == expected_transit_dt
 
+
+
+@pytest.mark.asyncio
+async def test_get_chart_transits_conditional_request(
+    client: AsyncClient,
+    mocker,
+    crud_chart_override
+):
+    """A repeat GET with the returned ETag gets a 304 without recalculating."""
+    test_chart_id = uuid4()
+    mock_returned_chart = Chart(
+        id=test_chart_id, name="ETag Chart", birth_datetime=datetime(1992, 6, 21, 15, 45),
+        city="Berlin", latitude=52.5200, longitude=13.4050, user_id=uuid4(),
+        created_at=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 1),
+    )
+    crud_chart_override.get = AsyncMock(return_value=mock_returned_chart)
+    mocker.patch(
+        "app.api.v1.endpoints.charts.NatalChartCalculator.calculate_chart",
+        new=AsyncMock(return_value={"planets": {}, "houses": [], "aspects": []})
+    )
+    mock_service_calculate_transits = mocker.patch(
+        "app.api.v1.endpoints.charts.calculate_transits",
+        return_value={"transit_datetime": "2020-01-01T12:00:00", "transiting_planets": {}, "aspects_to_natal": []}
+    )
+    url = f"/api/v1/charts/{test_chart_id}/transits?transit_datetime=2020-01-01T12:00:00"
+
+    first = await client.get(url)
+    assert first.status_code == 200, f"Response: {first.text}"
+    etag = first.headers["etag"]
+    assert "max-age" in first.headers["cache-control"] # Past instant
+
+    second = await client.get(url, headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+    assert mock_service_calculate_transits.call_count == 1
+
+    # Editing the chart changes the validator
+    mock_returned_chart.updated_at = datetime(2024, 2, 1)
+    third = await client.get(url, headers={"If-None-Match": etag})
+    assert third.status_code == 200
+    assert third.headers["etag"] != etag
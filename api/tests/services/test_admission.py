@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+from fastapi_users.jwt import generate_jwt
+from starlette.requests import HTTPConnection
+
+from app.core.admission import AUTH_COOKIE_NAME, AUTH_TOKEN_AUDIENCE, AdmissionController, AdmissionRejected, client_key
+from app.core.config import settings
+
+
+def make_controller(**overrides):
+    options = dict(global_capacity=4, user_capacity=2, max_queue=4, max_queue_per_user=2, queue_timeout=0.5)
+    options.update(overrides)
+    return AdmissionController(**options)
+
+
+@pytest.mark.asyncio
+async def test_per_user_limit_does_not_block_other_users():
+    controller = make_controller()
+    ticket_a = await controller.acquire("a", 2)
+
+    # "b" is admitted immediately while "a" is at its quota and has to queue
+    ticket_b = await asyncio.wait_for(controller.acquire("b", 2), timeout=0.1)
+    waiting_a = asyncio.create_task(controller.acquire("a", 1))
+    await asyncio.sleep(0)
+    assert not waiting_a.done()
+    assert controller.stats()["queued"] == 1
+
+    controller.release(ticket_a)
+    ticket_a2 = await asyncio.wait_for(waiting_a, timeout=0.1)
+    assert controller.stats()["in_flight"] == 3
+    controller.release(ticket_a2)
+    controller.release(ticket_b)
+    assert controller.stats()["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_is_served_round_robin_across_users():
+    controller = make_controller(global_capacity=1, user_capacity=1, max_queue_per_user=3)
+    first = await controller.acquire("flooder", 1)
+    order = []
+
+    async def request(client):
+        async with controller.admit(client, 1):
+            order.append(client)
+            await asyncio.sleep(0)
+
+    tasks = [asyncio.create_task(request(c)) for c in ("flooder", "flooder", "flooder", "other")]
+    await asyncio.sleep(0)
+    controller.release(first)
+    await asyncio.gather(*tasks)
+    assert order.index("other") <= 1
+
+
+@pytest.mark.asyncio
+async def test_rejects_with_retry_after_when_queue_full_or_timed_out():
+    controller = make_controller(global_capacity=1, user_capacity=1, max_queue=1, queue_timeout=0.05)
+    ticket = await controller.acquire("a", 1)
+    waiting = asyncio.create_task(controller.acquire("b", 1))
+    await asyncio.sleep(0)
+
+    with pytest.raises(AdmissionRejected) as exc_info:
+        await controller.acquire("c", 1)
+    assert exc_info.value.retry_after >= 1
+
+    with pytest.raises(AdmissionRejected):
+        await waiting
+    stats = controller.stats()
+    assert stats["rejected_total"] == 2 and stats["timed_out_total"] == 1 and stats["queued"] == 0
+    controller.release(ticket)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_no_capacity_behind():
+    controller = make_controller(global_capacity=1, user_capacity=1)
+    ticket = await controller.acquire("a", 1)
+    waiting = asyncio.create_task(controller.acquire("b", 1))
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    controller.release(ticket)
+    assert controller.stats()["in_flight"] == 0 and controller.stats()["queued"] == 0
+
+
+def _connection(headers=()):
+    return HTTPConnection({
+        "type": "http",
+        "headers": [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+        "client": ("203.0.113.7", 50000),
+    })
+
+
+def test_client_key_trusts_only_verified_tokens():
+    secret = settings.SECRET_KEY.get_secret_value()
+    token = generate_jwt({"sub": "user-1", "aud": AUTH_TOKEN_AUDIENCE}, secret, lifetime_seconds=60)
+    assert client_key(_connection([("authorization", f"Bearer {token}")])) == "user:user-1"
+    assert client_key(_connection([("cookie", f"{AUTH_COOKIE_NAME}={token}")])) == "user:user-1"
+
+    forged = generate_jwt({"sub": "user-1", "aud": AUTH_TOKEN_AUDIENCE}, "not-the-secret", lifetime_seconds=60)
+    expired = generate_jwt({"sub": "user-1", "aud": AUTH_TOKEN_AUDIENCE}, secret, lifetime_seconds=-1)
+    for bad in ("junk", forged, expired):
+        # Rotating made-up tokens does not buy a fresh quota: they all share the address's
+        assert client_key(_connection([("authorization", f"Bearer {bad}")])) == "ip:203.0.113.7"
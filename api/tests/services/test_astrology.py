@@ -7,6 +7,11 @@ from unittest.mock import patch, MagicMock, PropertyMock
 from app.services import astrology as astrology_service
 from app.services.astrology import calculate_transits, KERYKEION_AVAILABLE, AstrologicalSubject, KerykeionException, PLANET_MAP, SIGN_FULL_NAMES, SIGN_SYMBOLS
 
+@pytest.fixture(autouse=True)
+def kerykeion_loaded():
+    """Loading binds the real Kerykeion classes, so it has to happen before a test patches them."""
+    astrology_service._ensure_kerykeion()
+
 # Helper to create a mock Kerykeion planet object
 def _get_mock_planet_obj(abs_pos: float, sign_num: int, position: float, retrograde: bool = False):
     mock_planet = MagicMock()
@@ -0,0 +1,48 @@
+import os
+from datetime import datetime
+
+import pytest
+
+from app.services import astrology
+from app.services.chart_render import WheelImageCache, WheelOptions, WheelSubject, render_wheel, wheel_cache_key
+
+LONDON = WheelSubject("Ada", datetime(1990, 1, 1, 12, 0), "London", 51.5074, -0.1278)
+
+
+def test_cache_key_covers_everything_drawn_on_the_wheel():
+    key = wheel_cache_key("natal", [LONDON], WheelOptions())
+    assert key == wheel_cache_key("natal", [LONDON], WheelOptions())
+    renamed = WheelSubject("Grace", LONDON.birth_dt, LONDON.city, LONDON.latitude, LONDON.longitude)
+    assert wheel_cache_key("natal", [renamed], WheelOptions()) != key
+    assert wheel_cache_key("natal", [LONDON], WheelOptions(theme="dark")) != key
+    # The PNG width does not change an SVG
+    assert wheel_cache_key("natal", [LONDON], WheelOptions(width=800)) == key
+
+
+def test_unknown_options_are_rejected():
+    with pytest.raises(ValueError):
+        WheelOptions(format="gif")
+    with pytest.raises(ValueError):
+        wheel_cache_key("composite", [LONDON], WheelOptions())
+
+
+def test_disk_cache_round_trip_and_pruning(tmp_path):
+    cache = WheelImageCache(str(tmp_path), max_bytes=250)
+    assert cache.get("a" * 64, "svg") is None
+    for i, key in enumerate(("a" * 64, "b" * 64, "c" * 64)):
+        cache.put(key, "svg", b"x" * 100)
+        os.utime(cache.path(key, "svg"), (1000 + i, 1000 + i))
+    # Over budget after the third image: the least recently used one goes
+    assert cache.get("a" * 64, "svg") is None
+    assert cache.get("c" * 64, "svg") == b"x" * 100
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+@pytest.mark.skipif(not astrology.KERYKEION_AVAILABLE, reason="Kerykeion not installed")
+def test_renders_natal_and_bi_wheels():
+    natal = render_wheel("natal", [LONDON], WheelOptions())
+    assert natal.startswith(b"<?xml") and b"<svg" in natal
+    transit = WheelSubject("Transits", datetime(2024, 3, 20, 12, 0), "London", 51.5074, -0.1278)
+    assert b"<svg" in render_wheel("transit", [LONDON, transit], WheelOptions(wheel_only=True))
+    with pytest.raises(ValueError):
+        render_wheel("synastry", [LONDON], WheelOptions())
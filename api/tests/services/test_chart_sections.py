@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pytest
+
+from app.services import astrology
+from app.services.astrology import CHART_SECTIONS, NatalChartCalculator, normalize_sections
+
+
+def test_normalize_sections_defaults_to_all_and_rejects_unknown_names():
+    assert normalize_sections(None) == frozenset(CHART_SECTIONS)
+    assert normalize_sections([" planets", "info"]) == frozenset({"planets"})
+    with pytest.raises(ValueError, match="horoscope"):
+        normalize_sections(["planets", "horoscope"])
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not astrology.KERYKEION_AVAILABLE, reason="Kerykeion not installed")
+async def test_unrequested_sections_are_not_computed(monkeypatch):
+    calculator = NatalChartCalculator("Sections", datetime(1990, 1, 1, 12, 0), "London", 51.5074, -0.1278)
+
+    def no_aspects(*args, **kwargs):
+        raise AssertionError("aspects were computed")
+
+    monkeypatch.setattr(astrology, "NatalAspects", no_aspects)
+    chart = await calculator.calculate_chart(("planets", "element_counts"))
+    assert chart["calculation_error"] is None
+    assert set(chart) == {"info", "planets", "element_counts", "calculation_error"}
+    assert sum(chart["element_counts"].values()) > 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not astrology.KERYKEION_AVAILABLE, reason="Kerykeion not installed")
+async def test_dignities_are_added_to_the_planets():
+    calculator = NatalChartCalculator("Sections", datetime(1990, 1, 1, 12, 0), "London", 51.5074, -0.1278)
+    chart = await calculator.calculate_chart(("dignities",))
+    assert all("dignity" in planet for planet in chart["planets"].values())
@@ -0,0 +1,41 @@
+from datetime import datetime
+
+import pytest
+
+from app.services.composite_engine import house_of, houses_from_mc, mean_obliquity, midpoint, midpoint_composite
+
+
+def test_midpoint_takes_shorter_arc():
+    assert midpoint(10.0, 50.0) == pytest.approx(30.0)
+    assert midpoint(350.0, 20.0) == pytest.approx(5.0)
+    assert midpoint(20.0, 350.0) == pytest.approx(5.0)
+
+
+def test_houses_from_mc_are_consistent():
+    cusps, ascendant = houses_from_mc(100.0, 45.0, mean_obliquity(datetime(2000, 1, 1)))
+    assert cusps[9] == pytest.approx(100.0, abs=1e-6) # Tenth cusp is the MC
+    assert cusps[0] == pytest.approx(ascendant)
+    # Polar latitudes fall back to a house system that is always defined
+    assert len(houses_from_mc(10.0, 80.0, 23.44)[0]) == 12
+
+
+def test_house_of_handles_wrapping_cusps():
+    cusps = [350.0 + 30.0 * i for i in range(12)]
+    cusps = [cusp % 360.0 for cusp in cusps]
+    assert house_of(355.0, cusps) == 1
+    assert house_of(5.0, cusps) == 1
+    assert house_of(345.0, cusps) == 12
+
+
+def test_midpoint_composite_derives_angles_from_midpoint_mc():
+    positions1 = {"points": {"Sun": 10.0, "Moon": 200.0, "Medium_Coeli": 90.0, "Ascendant": 180.0}}
+    positions2 = {"points": {"Sun": 30.0, "Moon": 220.0, "Medium_Coeli": 110.0, "Ascendant": 200.0}}
+    chart = midpoint_composite("A & B", positions1, positions2, datetime(1990, 1, 1), datetime(1992, 1, 1), 50.0, 40.0)
+
+    assert chart["planets"]["Sun"]["absolute_position"] == pytest.approx(20.0)
+    assert chart["planets"]["Medium_Coeli"]["absolute_position"] == pytest.approx(100.0)
+    assert chart["planets"]["IC"]["absolute_position"] == pytest.approx(280.0)
+    assert chart["planets"]["Ascendant"]["absolute_position"] == pytest.approx(chart["houses"][0]["absolute_position"])
+    assert len(chart["houses"]) == 12
+    assert all(planet["house"] for planet in chart["planets"].values())
+    assert chart["info"]["birth_datetime"] == "1991-01-01T00:00:00"
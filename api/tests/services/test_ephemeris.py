@@ -0,0 +1,99 @@
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import ephemeris as ephemeris_endpoint
+from app.core.columnar import JSON_MEDIA_TYPE, MSGPACK_MEDIA_TYPE, encode_series, negotiate_media_type
+from app.services import astrology, ephemeris
+from app.services.ephemeris import EphemerisError, ephemeris_series
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 3)
+
+
+def test_series_shape_and_values():
+    series = ephemeris_series(START, END, timedelta(hours=6), ["Sun", "Moon"])
+
+    assert series["longitudes"].shape == (9, 2)
+    assert series["speeds"].shape == (9, 2)
+    assert series["instants"][0] == int(START.replace(tzinfo=timezone.utc).timestamp())
+    assert np.all(np.diff(series["instants"]) == 6 * 3600)
+    # The Sun moves about a degree a day and never retrogrades
+    assert np.all(series["speeds"][:, 0] > 0.9)
+    assert 279.0 < series["longitudes"][0, 0] < 281.0
+
+
+def test_series_rejects_bad_input():
+    with pytest.raises(ValueError):
+        ephemeris_series(START, END, timedelta(hours=1), ["Vulcan"])
+    with pytest.raises(ValueError):
+        ephemeris_series(END, START, timedelta(hours=1))
+
+
+def test_negotiation_defaults_to_json():
+    assert negotiate_media_type(None) == JSON_MEDIA_TYPE
+    assert negotiate_media_type("*/*") == JSON_MEDIA_TYPE
+    assert negotiate_media_type("text/html, application/json;q=0.5") == JSON_MEDIA_TYPE
+    with pytest.raises(HTTPException) as exc_info:
+        negotiate_media_type("text/html")
+    assert exc_info.value.status_code == 406
+
+
+def test_json_encoding_is_columnar():
+    series = ephemeris_series(START, END, timedelta(days=1), ["Sun", "Mars"])
+    payload = json.loads(encode_series(series, JSON_MEDIA_TYPE, {"step_seconds": 86400}))
+
+    assert payload["bodies"] == ["Sun", "Mars"]
+    assert payload["step_seconds"] == 86400
+    assert len(payload["longitudes"]) == 2 and len(payload["longitudes"][0]) == 3
+    assert payload["longitudes"][1] == series["longitudes"][:, 1].tolist()
+
+
+def test_msgpack_encoding_roundtrip():
+    msgpack = pytest.importorskip("msgpack")
+    series = ephemeris_series(START, END, timedelta(days=1), ["Sun", "Mars"])
+    payload = msgpack.unpackb(encode_series(series, MSGPACK_MEDIA_TYPE), raw=False)
+
+    longitudes = np.frombuffer(payload["longitudes"], dtype=payload["dtypes"]["longitudes"]).reshape(payload["shape"])
+    np.testing.assert_array_equal(longitudes, series["longitudes"].T)
+    np.testing.assert_array_equal(np.frombuffer(payload["instants"], dtype="<i8"), series["instants"])
+
+
+def test_missing_ephemeris_file_is_an_ephemeris_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(ephemeris, "_ephe_path", str(tmp_path)) # No seas_18.se1: Chiron cannot be computed
+    with pytest.raises(EphemerisError, match="Chiron"):
+        ephemeris_series(START, END, timedelta(days=1), ["Sun", "Chiron"])
+
+
+def test_series_and_subject_builds_share_the_swisseph_lock():
+    pytest.importorskip("kerykeion")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with ephemeris.swisseph_lock:
+            series = pool.submit(ephemeris_series, START, END, timedelta(days=1), ["Chiron"])
+            subject = pool.submit(astrology.NatalChartCalculator, "Lock", datetime(1990, 5, 15, 12, 0), "London", 51.5, -0.13)
+            time.sleep(0.2)
+            assert not series.done() and not subject.done()
+        assert series.result()["longitudes"].shape == (3, 1)
+        assert subject.result().subject is not None
+
+
+def test_series_endpoint_reports_ephemeris_errors(monkeypatch):
+    def fail(*args):
+        raise EphemerisError("swisseph could not compute Chiron: file not found")
+
+    monkeypatch.setattr(ephemeris_endpoint, "ephemeris_series", fail)
+    app = FastAPI()
+
+    @app.get("/series")
+    async def series(request: Request):
+        return await ephemeris_endpoint.series_response(request, "2024-01-01", "2024-01-02", 60, "Chiron")
+
+    response = TestClient(app, raise_server_exceptions=False).get("/series")
+    assert response.status_code == 500
+    assert "Chiron" in response.json()["detail"]
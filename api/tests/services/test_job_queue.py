@@ -0,0 +1,132 @@
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.services import job_queue, job_worker
+from app.services.job_queue import JobError, job_handler, retry_delay
+from app.services.job_worker import JobWorker
+
+
+class _RecordingSession:
+    def __init__(self):
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(str(statement.compile(dialect=postgresql.dialect())))
+        return SimpleNamespace(rowcount=1, scalars=lambda: SimpleNamespace(all=lambda: []))
+
+    async def commit(self):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_claim_uses_skip_locked_and_priority_order():
+    db = _RecordingSession()
+    await job_queue.claim(db, "worker-1", ["recompute_positions"], limit=3)
+    (sql,) = db.statements
+    assert sql.startswith("UPDATE job SET status=")
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "ORDER BY job.priority DESC, job.run_after" in sql
+    assert "RETURNING job.id" in sql
+
+
+def test_retry_delay_backs_off_exponentially_with_a_cap(monkeypatch):
+    monkeypatch.setattr(job_queue.settings, "JOB_RETRY_BASE_SECONDS", 10.0)
+    assert [retry_delay(n) for n in (1, 2, 3)] == [timedelta(seconds=10), timedelta(seconds=20), timedelta(seconds=40)]
+    assert retry_delay(30) == timedelta(seconds=job_queue.MAX_RETRY_DELAY_SECONDS)
+
+
+@pytest.fixture(autouse=True)
+def isolated_handlers(monkeypatch):
+    monkeypatch.setattr(job_queue, "_handlers", dict(job_queue._handlers))
+
+
+@pytest.fixture
+def recorded(monkeypatch):
+    """Replaces the queue's database writes with a record of the calls."""
+    calls = []
+
+    @asynccontextmanager
+    async def no_session():
+        yield None
+
+    async def complete(db, worker_id, job, result):
+        calls.append(("complete", result))
+        return True
+
+    async def fail(db, worker_id, job, error, retry=True):
+        calls.append(("fail", error, retry))
+        return job_queue.QUEUED if retry else job_queue.FAILED
+
+    monkeypatch.setattr(job_worker, "AsyncSessionLocal", no_session)
+    monkeypatch.setattr(job_queue, "complete", complete)
+    monkeypatch.setattr(job_queue, "fail", fail)
+    return calls
+
+
+def _job(kind):
+    return SimpleNamespace(id=uuid4(), kind=kind, payload={"n": 2}, user_id=None, attempts=1, max_attempts=3)
+
+
+@pytest.mark.asyncio
+async def test_worker_completes_retries_and_fails_permanently(recorded):
+    @job_handler("test_double")
+    async def double(ctx, payload):
+        return {"value": payload["n"] * 2}
+
+    @job_handler("test_flaky")
+    async def flaky(ctx, payload):
+        raise ConnectionError("upstream down")
+
+    @job_handler("test_invalid")
+    async def invalid(ctx, payload):
+        raise JobError("bad payload")
+
+    worker = JobWorker(concurrency=4)
+    for kind in ("test_double", "test_flaky", "test_invalid"):
+        worker._start(_job(kind))
+    await asyncio.gather(*worker._running.values())
+
+    assert ("complete", {"value": 4}) in recorded
+    assert ("fail", "ConnectionError: upstream down", True) in recorded
+    assert ("fail", "bad payload", False) in recorded
+    assert worker.completed == 1 and worker.failed == 1 and not worker._running
+
+
+def test_per_kind_concurrency_limits_claims():
+    job_handler("test_limited", concurrency=1)(lambda ctx, payload: None)
+    job_handler("test_unlimited")(lambda ctx, payload: None)
+    worker = JobWorker(concurrency=4)
+    assert worker._free_slots("test_limited", 4) == 1
+    worker._running_kinds[uuid4()] = "test_limited"
+    assert worker._free_slots("test_limited", 4) == 0
+    assert worker._free_slots("test_unlimited", 3) == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("is_superuser, requested, queued", [(False, 10, 0), (False, -5, -5), (True, 10, 10)])
+async def test_only_superusers_can_raise_job_priority(monkeypatch, is_superuser, requested, queued):
+    from app.api.v1.endpoints.jobs import submit_job
+    from app.schemas.job import JobCreate
+
+    enqueued = {}
+
+    async def enqueue(db, kind, payload, user_id=None, priority=0):
+        enqueued["priority"] = priority
+
+    async def count_pending(db, user_id):
+        return 0
+
+    job_handler("test_public", public=True)(lambda ctx, payload: None)
+    monkeypatch.setattr(job_queue, "enqueue", enqueue)
+    monkeypatch.setattr(job_queue, "count_pending", count_pending)
+    user = SimpleNamespace(id=uuid4(), is_superuser=is_superuser)
+    request = JobCreate(kind="test_public", priority=requested)
+
+    await submit_job(request, user=user, db=None)
+    assert enqueued["priority"] == queued
@@ -0,0 +1,41 @@
+import asyncio
+import time
+
+from app.core import metrics
+from app.core.loop_watchdog import LoopWatchdog
+
+
+def _block_loop(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+async def _run(watchdog: LoopWatchdog, blocking: float) -> None:
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.1)
+        if blocking:
+            _block_loop(blocking)
+        await asyncio.sleep(0.1)
+    finally:
+        watchdog.stop()
+
+
+def test_stall_names_the_blocking_function():
+    watchdog = LoopWatchdog(interval_ms=20, threshold_ms=50)
+    asyncio.run(_run(watchdog, 0.3))
+
+    [stall] = watchdog.recent_stalls()
+    assert stall["culprit"].endswith("test_loop_watchdog:_block_loop")
+    assert 150 <= stall["blocked_ms"] < 1000
+    assert "in _run" in stall["stack"][-2] and "in _block_loop" in stall["stack"][-1]
+    assert dict(metrics.loop_stalls._values)[(stall["culprit"],)] >= 1
+    assert not watchdog.running
+
+
+def test_awaiting_is_not_a_stall():
+    watchdog = LoopWatchdog(interval_ms=20, threshold_ms=50)
+    lags_before = metrics.loop_lag_histogram.snapshot().get(("event_loop", ""), {}).get("count", 0)
+    asyncio.run(_run(watchdog, 0))
+
+    assert watchdog.recent_stalls() == []
+    assert metrics.loop_lag_histogram.snapshot()[("event_loop", "")]["count"] > lags_before
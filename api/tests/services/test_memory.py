@@ -0,0 +1,63 @@
+import tracemalloc
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import memory
+from app.core.memory import MB, MemoryAccountingMiddleware, MemoryTracker, SnapshotStore
+from app.core.timing import PhaseTimingMiddleware, phase
+
+
+@pytest.fixture
+def tracing():
+    tracemalloc.start(5)
+    try:
+        yield
+    finally:
+        memory.stop_memory_tracking()
+
+
+def test_overlapping_scopes_keep_their_own_peak(tracing):
+    tracker = MemoryTracker()
+    outer = tracker.begin()
+    spike = bytearray(4 * MB)
+    del spike
+    inner = tracker.begin() # Resets tracemalloc's peak; the outer scope keeps the spike
+    kept = bytearray(1 * MB)
+    inner_retained, inner_peak = tracker.end(inner)
+    outer_retained, outer_peak = tracker.end(outer)
+    assert inner_peak < 2 * MB and inner_retained >= MB
+    assert outer_peak >= 4 * MB and MB <= outer_retained < 2 * MB
+    del kept
+
+
+def test_snapshot_diff_lists_the_growing_site(tracing):
+    store = SnapshotStore()
+    assert store.diff() is None
+    store.take()
+    leak = [bytearray(2 * MB)]
+    store.take()
+    report = store.diff("baseline", limit=5)
+    assert report["size_diff_bytes"] >= 2 * MB
+    assert "test_memory.py:" in report["top"][0]["site"]
+    with pytest.raises(ValueError):
+        store.diff(group_by="nope")
+    del leak
+
+
+def test_middleware_records_requests_and_phases(tracing):
+    memory.start_memory_tracking(5)
+    app = FastAPI()
+    app.add_middleware(MemoryAccountingMiddleware)
+    app.add_middleware(PhaseTimingMiddleware)
+
+    @app.get("/allocate")
+    async def allocate():
+        with phase("build"):
+            return {"size": len(bytearray(3 * MB))}
+
+    TestClient(app).get("/allocate")
+    peaks = memory.memory_peak_histograms.snapshot()
+    assert peaks[("build", "/allocate")]["sum"] >= 3
+    assert peaks[("total", "/allocate")]["count"] == 1
@@ -0,0 +1,72 @@
+import os
+
+from app.core import metrics
+from app.core.metrics import LabeledCounter, render
+
+
+def _snapshot(pid, hits, queue_depth, request_count):
+    return {
+        "pid": pid,
+        "histograms": {
+            "request_duration_seconds": ("Request latency by route", [{
+                "labels": {"route": "/api/v1/charts/{chart_id}"},
+                "buckets": [[0.01, request_count], [float("inf"), request_count]],
+                "sum": 0.005 * request_count,
+                "count": request_count,
+            }]),
+        },
+        "counters": {
+            "cache_requests_total": ("Cache lookups", [
+                [{"cache": "pair_result", "result": "hit"}, hits],
+                [{"cache": "pair_result", "result": "miss"}, 1.0],
+            ]),
+        },
+        "gauges": {"calculation_pool_queue_depth": ("Queue depth", {}, queue_depth)},
+    }
+
+
+def test_render_merges_workers():
+    text = render([_snapshot(1, 3.0, 2.0, 4), _snapshot(2, 5.0, 0.0, 6)])
+
+    assert '# TYPE astrotracker_request_duration_seconds histogram' in text
+    assert 'astrotracker_request_duration_seconds_bucket{route="/api/v1/charts/{chart_id}",le="+Inf"} 10' in text
+    assert 'astrotracker_request_duration_seconds_count{route="/api/v1/charts/{chart_id}"} 10' in text
+    assert 'astrotracker_cache_requests_total{cache="pair_result",result="hit"} 8' in text
+    # Gauges stay per worker
+    assert 'astrotracker_calculation_pool_queue_depth{pid="1"} 2' in text
+    assert 'astrotracker_calculation_pool_queue_depth{pid="2"} 0' in text
+    assert "astrotracker_pair_cache_hit_ratio 0.8" in text
+    assert "astrotracker_workers 2" in text
+
+
+def test_snapshot_files_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics.settings, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    metrics.write_snapshot()
+    assert (tmp_path / f"metrics-{os.getpid()}.json").exists()
+    # A snapshot left behind by a dead worker is dropped
+    (tmp_path / "metrics-999999999.json").write_text("{}")
+
+    snapshots = metrics.read_snapshots()
+    assert [snapshot["pid"] for snapshot in snapshots] == [os.getpid()]
+    assert not (tmp_path / "metrics-999999999.json").exists()
+    assert "astrotracker_calculation_pool_queue_depth" in render(snapshots)
+
+
+def test_labeled_counter():
+    counter = LabeledCounter(("outcome",))
+    counter.inc("ok")
+    counter.inc("ok")
+    counter.inc("timeout")
+    assert sorted(counter.samples(), key=lambda sample: sample[0]["outcome"]) == [
+        ({"outcome": "ok"}, 2.0), ({"outcome": "timeout"}, 1.0),
+    ]
+
+
+def test_pair_cache_hit_ratio_ignores_other_caches():
+    snapshot = _snapshot(1, 9.0, 0.0, 1)
+    snapshot["counters"]["cache_requests_total"][1].extend([
+        [{"cache": "wheel_image", "result": "hit"}, 0.0],
+        [{"cache": "wheel_image", "result": "miss"}, 5.0],
+    ])
+    text = render([snapshot])
+    assert "astrotracker_pair_cache_hit_ratio 0.9\n" in text
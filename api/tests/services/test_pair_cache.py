@@ -0,0 +1,75 @@
+from datetime import datetime
+
+import pytest
+
+from app.services.pair_cache import PairResultCache, swap_synastry_aspects
+
+HASH_A = "a" * 64
+HASH_B = "b" * 64
+HASH_C = "c" * 64
+
+
+@pytest.mark.asyncio
+async def test_reversed_pair_shares_entry():
+    cache = PairResultCache(max_entries=10)
+    await cache.put("synastry", HASH_A, HASH_B, {"aspects": []})
+
+    result, swapped = await cache.get("synastry", HASH_B, HASH_A)
+    assert result == {"aspects": []}
+    assert swapped is True
+    assert (await cache.get("synastry", HASH_A, HASH_B))[1] is False
+    # Kind and variant are part of the key
+    assert await cache.get("composite", HASH_A, HASH_B) is None
+    assert await cache.get("synastry", HASH_A, HASH_B, variant="davison") is None
+    assert cache.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_every_pair_of_a_chart():
+    cache = PairResultCache(max_entries=10)
+    await cache.put("synastry", HASH_A, HASH_B, {"aspects": []})
+    await cache.put("composite", HASH_C, HASH_A, {"planets": {}})
+    await cache.put("synastry", HASH_B, HASH_C, {"aspects": []})
+
+    assert await cache.invalidate(HASH_A) == 2
+    assert await cache.get("synastry", HASH_A, HASH_B) is None
+    assert await cache.get("composite", HASH_A, HASH_C) is None
+    assert await cache.get("synastry", HASH_C, HASH_B) is not None
+
+
+@pytest.mark.asyncio
+async def test_lru_eviction():
+    cache = PairResultCache(max_entries=2)
+    await cache.put("synastry", HASH_A, HASH_B, {"aspects": []})
+    await cache.put("synastry", HASH_A, HASH_C, {"aspects": []})
+    await cache.get("synastry", HASH_A, HASH_B) # Touch: A-C is now the oldest
+    await cache.put("synastry", HASH_B, HASH_C, {"aspects": []})
+
+    assert await cache.get("synastry", HASH_A, HASH_C) is None
+    assert await cache.get("synastry", HASH_A, HASH_B) is not None
+
+
+def test_swap_synastry_aspects():
+    aspects = [{"planet1": "Sun", "planet2": "Moon", "aspect_name": "Trine", "orb": 1.0}]
+    assert swap_synastry_aspects(aspects) == [{"planet1": "Moon", "planet2": "Sun", "aspect_name": "Trine", "orb": 1.0}]
+
+
+@pytest.mark.asyncio
+async def test_synastry_endpoint_caches_kerykeion_aspects(monkeypatch):
+    pytest.importorskip("kerykeion")
+    from app.api.v1.endpoints import charts
+
+    cache = PairResultCache(max_entries=10)
+    monkeypatch.setattr(charts, "pair_result_cache", cache)
+    ada = ("Ada", datetime(1990, 5, 15, 12, 0), "Los Angeles", 34.05, -118.24)
+    bob = ("Bob", datetime(1988, 8, 8, 18, 18), "London", 51.5, -0.13)
+
+    computed = await charts._pair_synastry([ada, bob], HASH_B, HASH_A, db=None)
+    assert computed["error"] is None and computed["aspects"]
+    sun_aspects = [a for a in computed["aspects"] if a["planet1"] == "Sun"]
+    assert sun_aspects # Chart 1's Sun, as Kerykeion's SynastryAspects reports it
+
+    # The reversed pair is a cache hit, re-oriented
+    reversed_pair = await charts._pair_synastry([bob, ada], HASH_A, HASH_B, db=None)
+    assert cache.hits == 1
+    assert reversed_pair["aspects"] == swap_synastry_aspects(computed["aspects"])
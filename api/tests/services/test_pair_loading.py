@@ -0,0 +1,212 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1.endpoints import charts as charts_endpoint
+from app.api.v1.endpoints.charts import _build_person_positions, _load_chart_pair, _load_person_pair
+from app.core.timing import PhaseRecorder, recording
+from app.schemas.chart import SynastryCompositePersonInput
+from app.services import composite_engine
+
+
+def _chart(name):
+    return SimpleNamespace(id=uuid4(), name=name, city=f"{name} City", latitude=None, longitude=None)
+
+
+class _FakeChartCRUD:
+    """Answers the pair pipeline's three calls; coordinates and positions are looked up by chart name."""
+
+    def __init__(self, charts, coordinates, positions, delays=None):
+        self.charts = charts
+        self.coordinates = coordinates
+        self.positions = positions
+        self.delays = delays or {}
+
+    async def get_multi_by_ids(self, *, ids):
+        # The IN (...) query does not keep the requested order
+        return [chart for chart in reversed(self.charts) if chart.id in ids]
+
+    async def get_coordinates(self, chart):
+        await asyncio.sleep(self.delays.get(chart.name, 0))
+        coordinates = self.coordinates[chart.name]
+        if isinstance(coordinates, Exception):
+            raise coordinates
+        return coordinates
+
+    async def get_position_sets(self, charts, coordinates=None):
+        return [self.positions.get(chart.name) for chart in charts]
+
+
+@pytest.mark.asyncio
+async def test_chart_pair_keeps_the_requested_order():
+    first, second = _chart("First"), _chart("Second")
+    crud = _FakeChartCRUD(
+        [first, second],
+        coordinates={"First": (10.0, 20.0), "Second": (30.0, 40.0)},
+        positions={"First": {"Sun": 1.0}, "Second": {"Sun": 2.0}},
+        delays={"First": 0.02}, # The first leg finishes last
+    )
+    with recording(PhaseRecorder()) as recorder:
+        charts, coordinates, positions = await _load_chart_pair(crud, first.id, second.id)
+    assert charts == [first, second]
+    assert coordinates == [(10.0, 20.0), (30.0, 40.0)]
+    assert positions == [{"Sun": 1.0}, {"Sun": 2.0}]
+    assert set(recorder.phases) == {"fetch", "geocode", "positions"}
+
+    charts, coordinates, positions = await _load_chart_pair(crud, second.id, first.id, with_positions=False)
+    assert charts == [second, first] and coordinates == [(30.0, 40.0), (10.0, 20.0)]
+    assert positions is None
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("failing_leg", ["First", "Second"])
+async def test_chart_pair_reports_a_failure_in_either_leg(failing_leg):
+    first, second = _chart("First"), _chart("Second")
+    good = {"coordinates": (10.0, 20.0), "positions": {"Sun": 1.0}}
+
+    def crud(coordinates=good["coordinates"], positions=good["positions"], charts=(first, second)):
+        return _FakeChartCRUD(
+            list(charts),
+            coordinates={chart.name: coordinates if chart.name == failing_leg else good["coordinates"] for chart in (first, second)},
+            positions={chart.name: positions if chart.name == failing_leg else good["positions"] for chart in (first, second)},
+        )
+
+    present = second if failing_leg == "First" else first
+    with pytest.raises(HTTPException) as not_found:
+        await _load_chart_pair(crud(charts=[present]), first.id, second.id)
+    assert not_found.value.status_code == 404 and "charts not found" in not_found.value.detail
+
+    with pytest.raises(HTTPException) as no_coordinates:
+        await _load_chart_pair(crud(coordinates=(None, None)), first.id, second.id)
+    assert no_coordinates.value.status_code == 404 and "Coordinates not found" in no_coordinates.value.detail
+
+    with pytest.raises(HTTPException) as no_positions:
+        await _load_chart_pair(crud(positions=None), first.id, second.id)
+    assert no_positions.value.status_code == 500
+
+    # Unexpected errors from one leg's geocoding are not swallowed
+    with pytest.raises(ConnectionError):
+        await _load_chart_pair(crud(coordinates=ConnectionError("geocoder down")), first.id, second.id)
+
+
+def _person(name, lat=None, lon=None):
+    return SynastryCompositePersonInput(
+        name=name, year=1990, month=1, day=1, hour=12, minute=0, city=f"{name} City", latitude=lat, longitude=lon
+    )
+
+
+@pytest.fixture
+def fake_builds(monkeypatch):
+    geocoded = {"First City": (10.0, 20.0), "Second City": (30.0, 40.0), "Nowhere City": (None, None)}
+    build_errors = {}
+
+    async def get_coordinates_for_city(city, db):
+        await asyncio.sleep(0.02 if city == "First City" else 0) # The first leg finishes last
+        return geocoded[city]
+
+    def build_position_set(name, birth, city, lat, lon):
+        if name in build_errors:
+            raise build_errors[name]
+        return {"name": name, "lat": lat, "lon": lon}
+
+    monkeypatch.setattr(charts_endpoint, "get_coordinates_for_city", get_coordinates_for_city)
+    monkeypatch.setattr(charts_endpoint, "build_position_set", build_position_set)
+    return build_errors
+
+
+@pytest.mark.asyncio
+async def test_person_pair_keeps_the_input_order(fake_builds):
+    people = [_person("First"), _person("Second", 50.0, 60.0)]
+    births, coordinates, hashes = await _load_person_pair(people, None)
+    positions = await _build_person_positions(people, births, coordinates)
+
+    assert coordinates == [(10.0, 20.0), (50.0, 60.0)] # Given coordinates are used as they are
+    assert [p["name"] for p in positions] == ["First", "Second"]
+    assert len(births) == len(hashes) == 2 and hashes[0] != hashes[1]
+
+
+@pytest.mark.asyncio
+async def test_person_pair_reports_a_failure_in_either_leg(fake_builds):
+    with pytest.raises(HTTPException) as not_found:
+        await _load_person_pair([_person("First"), _person("Nowhere")], None)
+    assert not_found.value.status_code == 404 and "Nowhere City" in not_found.value.detail
+
+    fake_builds["Second"] = ValueError("bad birth data")
+    people = [_person("First"), _person("Second")]
+    births, coordinates, _ = await _load_person_pair(people, None)
+    with pytest.raises(HTTPException) as bad_build:
+        await _build_person_positions(people, births, coordinates)
+    assert bad_build.value.status_code == 400 and "bad birth data" in bad_build.value.detail
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cached", [False, True])
+async def test_by_data_synastry_checks_the_pair_cache_before_building(monkeypatch, fake_builds, cached):
+    from app.schemas.chart import CalculateSynastryByDataRequest
+    from app.services.pair_cache import PairResultCache
+
+    built = []
+
+    async def kerykeion_synastry(people):
+        built.extend(name for name, *_ in people)
+        return {"aspects": [], "error": None}
+
+    def no_position_sets(*args):
+        raise AssertionError("synastry does not need position sets")
+
+    cache = PairResultCache(max_entries=10)
+    monkeypatch.setattr(charts_endpoint, "pair_result_cache", cache)
+    monkeypatch.setattr(charts_endpoint, "_kerykeion_synastry", kerykeion_synastry)
+    monkeypatch.setattr(charts_endpoint, "build_position_set", no_position_sets)
+    request = CalculateSynastryByDataRequest(person1_data=_person("First"), person2_data=_person("Second"))
+    if cached:
+        _, _, hashes = await _load_person_pair([request.person1_data, request.person2_data], None)
+        await cache.put("synastry", *hashes, {"aspects": [], "error": None}, variant=charts_endpoint.SYNASTRY_CACHE_VARIANT)
+
+    await charts_endpoint.calculate_synastry_by_data_endpoint(request, db=None)
+    assert built == ([] if cached else ["First", "Second"])
+
+
+@pytest.mark.asyncio
+async def test_by_data_midpoint_composite_builds_positions_only_on_a_miss(monkeypatch, fake_builds):
+    from app.schemas.chart import CalculateCompositeByDataRequest
+    from app.services.pair_cache import PairResultCache
+
+    built = []
+
+    def midpoint_composite(name, *args):
+        return {"info": {"name": name, "birth_datetime": "1990-01-01T12:00:00", "location": "Midpoint"}, "planets": {}, "houses": [], "aspects": []}
+
+    async def build_person_positions(people, births, coordinates):
+        built.append(len(people))
+        return [{}, {}]
+
+    monkeypatch.setattr(charts_endpoint, "pair_result_cache", PairResultCache(max_entries=10))
+    monkeypatch.setattr(composite_engine, "midpoint_composite", midpoint_composite)
+    monkeypatch.setattr(charts_endpoint, "_build_person_positions", build_person_positions)
+    request = CalculateCompositeByDataRequest(person1_data=_person("First"), person2_data=_person("Second"), method="midpoint")
+
+    for _ in range(2):
+        result = await charts_endpoint.calculate_composite_by_data_endpoint(request, db=None)
+    assert built == [2] # The second request is a cache hit
+    assert result.composite_chart_data.info.name == "First & Second"
+
+
+@pytest.mark.asyncio
+async def test_synastry_subjects_are_built_concurrently(monkeypatch):
+    both_building = threading.Barrier(2, timeout=2) # Sequential builds would break it
+
+    def kerykeion_subject(name, birth, city, lat, lon):
+        both_building.wait()
+        return name
+
+    monkeypatch.setattr(charts_endpoint, "_kerykeion_subject", kerykeion_subject)
+    monkeypatch.setattr(charts_endpoint, "calculate_synastry", lambda first, second: {"aspects": [first, second], "error": None})
+    people = [("First", None, "First City", 10.0, 20.0), ("Second", None, "Second City", 30.0, 40.0)]
+
+    result = await charts_endpoint._kerykeion_synastry(people)
+    assert result["aspects"] == ["First", "Second"]
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+from app.core.prefork import process_memory
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_process_memory_reports_rss_and_pss():
+    memory = process_memory(os.getpid())
+    assert memory["rss"] > 0
+    assert 0 < memory["pss"] <= memory["rss"]
+    assert memory["shared"] + memory["private"] == memory["rss"]
+
+
+def test_process_memory_of_missing_process_is_empty():
+    assert process_memory(2 ** 22 + 12345) == {}
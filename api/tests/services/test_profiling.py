@@ -0,0 +1,72 @@
+import json
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core import profiling
+from app.core.config import settings
+from app.core.profiling import ProfilingMiddleware, current_profile, issue_token, verify_token
+from app.core.timing import PhaseTimingMiddleware, phase
+from app.services.executor import run_calculation
+
+
+def _busy(seconds: float) -> str:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+    return "done"
+
+
+def _app():
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+    app.add_middleware(PhaseTimingMiddleware)
+
+    @app.get("/work")
+    async def work():
+        with phase("calculation"):
+            return {"result": await run_calculation(_busy, 0.05), "profiled": current_profile() is not None}
+    return app
+
+
+def test_tokens_are_signed_and_expire():
+    token, _ = issue_token("admin-1")
+    assert verify_token(token) == "admin-1"
+    payload, _, signature = token.partition(".")
+    assert verify_token(f"{payload}.{'0' * len(signature)}") is None
+    expired, _ = issue_token("admin-1", ttl_seconds=-1)
+    assert verify_token(expired) is None
+
+
+def test_requests_without_a_token_are_not_profiled(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_STORAGE_DIR", str(tmp_path))
+    client = TestClient(_app())
+    for headers in ({}, {settings.PROFILE_HEADER: "forged.token"}):
+        response = client.get("/work", headers=headers)
+        assert response.json()["profiled"] is False and "x-profile-id" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_profiled_request_stores_stacks_and_phases(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_STORAGE_DIR", str(tmp_path))
+    token, _ = issue_token("admin-1")
+    response = TestClient(_app()).get("/work", headers={settings.PROFILE_HEADER: token})
+    assert response.json() == {"result": "done", "profiled": True}
+
+    report_path, folded_path = profiling.profile_paths(response.headers["x-profile-id"])
+    report = json.loads(report_path.read_text())
+    assert report["status"] == 200 and report["admin_id"] == "admin-1" and report["samples"] > 0
+    assert report["phases"]["calculation"]["count"] == 1
+    # The calculation-pool thread working for the request is sampled
+    assert "test_profiling:_busy" in folded_path.read_text()
+    assert profiling.profile_paths("../etc/passwd") is None
+
+
+def test_old_profiles_are_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "PROFILE_STORAGE_DIR", str(tmp_path))
+    for i in range(3):
+        (tmp_path / f"{i:032x}.json").write_text(json.dumps({"id": f"{i:032x}"}))
+        (tmp_path / f"{i:032x}.folded").write_text("")
+    assert profiling.prune_profiles(keep=1) == 2
+    assert len(list(tmp_path.glob("*.json"))) == 1 and len(list(tmp_path.glob("*.folded"))) == 1
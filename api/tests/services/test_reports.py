@@ -0,0 +1,49 @@
+import uuid
+
+import pytest
+
+from app.services import reports
+from app.services.job_handlers import _chart_ids
+from app.services.job_queue import JobError
+
+CHART_DATA = {
+    "info": {"name": "Ada", "birth_datetime": "1990-01-01T12:00:00", "location": "London"},
+    "planets": {
+        "Sun": {"name": "Sun", "sign": "Capricorn", "deg_within_sign": 10.8, "is_retrograde": False, "dignity": "Peregrine"},
+        "Moon": {"name": "Moon", "sign": "Pisces", "deg_within_sign": 3.3, "is_retrograde": False, "dignity": "Peregrine"},
+    },
+    "houses": [{"cusp": 1, "sign": "Aries", "position": 24.95}],
+    "aspects": [
+        {"p1_name": "Sun", "p2_name": "Saturn", "aspect_name": "conjunction", "orb": 4.8},
+        {"p1_name": "Sun", "p2_name": "Jupiter", "aspect_name": "opposition", "orb": -0.4},
+    ],
+    "element_counts": {"Fire": 4, "Earth": 6, "Air": 4, "Water": 2},
+}
+
+
+def test_interpretation_covers_placements_balance_and_closest_aspects_first():
+    headings = [heading for heading, _ in reports.interpretation(CHART_DATA)]
+    assert headings == ["Sun in Capricorn", "Moon in Pisces", "Element balance", "Sun opposition Jupiter", "Sun conjunction Saturn"]
+
+
+def test_report_path_only_accepts_report_ids():
+    user_id = uuid.uuid4()
+    assert reports.report_path(user_id, "a" * 64).name == "a" * 64 + ".pdf"
+    assert reports.report_path(user_id, "../../etc/passwd") is None
+
+
+def test_batch_payload_validation():
+    chart_id = uuid.uuid4()
+    assert _chart_ids({"chart_ids": [str(chart_id), str(chart_id)]}, limit=5) == [chart_id]
+    with pytest.raises(JobError):
+        _chart_ids({"chart_ids": []}, limit=5)
+    with pytest.raises(JobError):
+        _chart_ids({"chart_ids": [str(uuid.uuid4()) for _ in range(6)]}, limit=5)
+
+
+def test_build_report_pdf_writes_the_file_atomically(tmp_path):
+    pytest.importorskip("reportlab")
+    path = tmp_path / "user" / ("b" * 64 + ".pdf")
+    size = reports.build_report_pdf(path, CHART_DATA, wheel_svg=None)
+    assert path.read_bytes().startswith(b"%PDF") and size == path.stat().st_size
+    assert [p.name for p in path.parent.iterdir()] == [path.name]
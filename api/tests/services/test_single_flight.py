@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from app.core.single_flight import SingleFlight
+from app.core.timing import PhaseRecorder, phase, recording
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_computation():
+    flights = SingleFlight()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"value": 42}
+
+    results = await asyncio.gather(*(flights.do("key", compute) for _ in range(10)))
+    assert calls == 1
+    assert all(result is results[0] for result in results)
+    assert flights.stats() == {"in_flight": 0, "started_total": 1, "coalesced_total": 9}
+
+    # Nothing is cached once the flight has landed
+    await flights.do("key", compute)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_joined_callers_record_their_wait_as_coalesced():
+    flights = SingleFlight()
+
+    async def compute():
+        with phase("subject"):
+            await asyncio.sleep(0.02)
+        return "done"
+
+    async def call(recorder):
+        with recording(recorder):
+            return await flights.do("key", compute)
+
+    leader, joined = PhaseRecorder(), PhaseRecorder()
+    assert await asyncio.gather(call(leader), call(joined)) == ["done", "done"]
+    assert set(leader.phases) == {"subject"}
+    assert set(joined.phases) == {"coalesced"}
+    assert joined.phases["coalesced"][0] >= 15
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_every_caller():
+    flights = SingleFlight()
+
+    async def compute():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad input")
+
+    results = await asyncio.gather(*(flights.do("key", compute) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flights.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+    started = asyncio.Event()
+
+    async def compute():
+        started.set()
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.create_task(flights.do("key", compute))
+    second = asyncio.create_task(flights.do("key", compute))
+    await started.wait()
+    first.cancel()
+
+    assert await second == "done"
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+@pytest.mark.asyncio
+async def test_computation_is_cancelled_when_every_caller_leaves():
+    flights = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def compute():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    callers = [asyncio.create_task(flights.do("key", compute)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
+    assert flights.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_caller_arriving_during_cancellation_starts_a_fresh_computation():
+    flights = SingleFlight()
+    unwinding = asyncio.Event()
+    release = asyncio.Event()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        if calls > 1:
+            return "fresh"
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            # Slow cleanup keeps the cancelled task alive for a while
+            unwinding.set()
+            await release.wait()
+            raise
+
+    leaving = asyncio.create_task(flights.do("key", compute))
+    await asyncio.sleep(0)
+    leaving.cancel()
+    await unwinding.wait()
+
+    assert await asyncio.wait_for(flights.do("key", compute), timeout=1) == "fresh"
+    release.set()
+    with pytest.raises(asyncio.CancelledError):
+        await leaving
+    assert calls == 2 and flights.in_flight() == 0
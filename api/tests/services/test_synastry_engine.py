@@ -0,0 +1,91 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.services.astrology import ASPECT_DEGREES_ORBS
+from app.services.synastry_engine import (
+    SYNASTRY_POINTS, KeyPointIndex, aspect_weight_vector, aspects_from_orbs, cross_aspect_orbs,
+    group_synastry_matrix, longitude_matrix, rank_population, score_aspect_orbs, score_population,
+)
+
+
+def _random_position_set(rng: random.Random):
+    return {"points": {point: rng.uniform(0, 360) for point in SYNASTRY_POINTS}, "houses": []}
+
+
+def _naive_aspects(points_a, points_b):
+    """Reference implementation: the same loop calculate_transits uses."""
+    found = set()
+    for p1, lon1 in points_a.items():
+        for p2, lon2 in points_b.items():
+            diff = abs(lon1 - lon2)
+            if diff > 180:
+                diff = 360 - diff
+            for name, (degrees, orb_limit) in ASPECT_DEGREES_ORBS.items():
+                if abs(diff - degrees) <= orb_limit:
+                    found.add((p1, p2, name))
+    return found
+
+
+def test_cross_aspects_match_naive_loop():
+    rng = random.Random(42)
+    for _ in range(20):
+        a, b = _random_position_set(rng), _random_position_set(rng)
+        lons = longitude_matrix([a, b])
+        aspects = aspects_from_orbs(cross_aspect_orbs(lons[0], lons[1]))
+        assert {(x["planet1"], x["planet2"], x["aspect_name"]) for x in aspects} == _naive_aspects(a["points"], b["points"])
+
+
+def test_wraparound_conjunction_and_missing_points():
+    a = {"points": {"Sun": 359.5}}
+    b = {"points": {"Moon": 0.5}}
+    lons = longitude_matrix([a, b])
+    aspects = aspects_from_orbs(cross_aspect_orbs(lons[0], lons[1]))
+    assert aspects == [{"planet1": "Sun", "planet2": "Moon", "aspect_name": "Conjunction", "orb": 1.0, "aspect_degrees": 0.0}]
+
+
+def test_group_matrix_is_upper_triangular_and_scored():
+    rng = random.Random(7)
+    position_sets = [_random_position_set(rng) for _ in range(5)]
+    pairs = group_synastry_matrix(position_sets)
+    assert [(p["index1"], p["index2"]) for p in pairs] == [(i, j) for i in range(5) for j in range(i + 1, 5)]
+
+    # Scores follow the weights: only trines -> positive, only squares -> negative
+    trine_pair = [{"points": {"Sun": 0.0}}, {"points": {"Moon": 120.0}}]
+    square_pair = [{"points": {"Sun": 0.0}}, {"points": {"Moon": 90.0}}]
+    assert group_synastry_matrix(trine_pair)[0]["score"] == pytest.approx(3.0)
+    assert group_synastry_matrix(square_pair)[0]["score"] == pytest.approx(-2.0)
+    assert group_synastry_matrix(square_pair, weights={"Square": 1.0})[0]["score"] == pytest.approx(1.0)
+
+
+def test_unknown_weight_name_rejected():
+    with pytest.raises(ValueError):
+        aspect_weight_vector({"Quintile": 1.0})
+    assert np.allclose(aspect_weight_vector(None), aspect_weight_vector({}))
+
+
+def test_population_scores_match_exact_scores():
+    rng = random.Random(11)
+    population = longitude_matrix([_random_position_set(rng) for _ in range(200)])
+    population[3, 5] = np.nan # A chart with a missing point still scores
+    target = longitude_matrix([_random_position_set(rng)])[0]
+
+    exact = score_aspect_orbs(cross_aspect_orbs(population, target[None, :]), aspect_weight_vector(None))
+    approx = score_population(target, population)
+    assert np.allclose(approx, exact, atol=0.05)
+
+    ranking = rank_population(target, population, limit=10)
+    assert ranking["rows"] == np.argsort(-approx, kind="stable")[:10].tolist()
+    assert ranking["candidates_scored"] == 200
+
+
+def test_key_point_index_candidates_have_contacts():
+    rng = random.Random(3)
+    population = longitude_matrix([_random_position_set(rng) for _ in range(500)])
+    target = longitude_matrix([_random_position_set(rng)])[0]
+    # Row 0 is the target's twin: every key point is conjunct its counterpart
+    population[0] = target
+    candidates = KeyPointIndex(population).candidates(target).tolist()
+    assert 0 in candidates
+    assert 0 < len(candidates) < 500
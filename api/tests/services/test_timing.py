@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.timing import (
+    PhaseHistograms, PhaseRecorder, PhaseTimingMiddleware, current_recorder, log_phases, phase, phase_histograms, recording,
+)
+from app.services.executor import run_calculation
+
+
+def test_phase_is_a_no_op_outside_a_request():
+    assert current_recorder() is None
+    with phase("db"):
+        pass
+    assert current_recorder() is None
+
+
+def test_log_phases_summarizes_the_current_request(caplog):
+    caplog.set_level("INFO", logger="app.core.timing")
+    log_phases("outside") # No recorder: nothing to log
+    with recording(PhaseRecorder()):
+        for _ in range(2):
+            with phase("geocode"):
+                pass
+        with phase("aspects"):
+            pass
+        log_phases("synastry")
+
+    [message] = [record.getMessage() for record in caplog.records]
+    assert message.startswith("synastry timings: geocode=")
+    assert " aspects=" in message and message.split()[-1].startswith("total=")
+
+
+def test_histogram_buckets_are_cumulative():
+    histograms = PhaseHistograms(buckets=[1, 10])
+    for elapsed_ms in (0.5, 5, 5, 50):
+        histograms.observe("db", "/x", elapsed_ms)
+    snapshot = histograms.snapshot()[("db", "/x")]
+    assert snapshot["buckets"] == [(1, 1), (10, 3), (float("inf"), 4)]
+    assert snapshot["count"] == 4 and snapshot["sum"] == pytest.approx(60.5)
+
+
+def test_middleware_emits_server_timing_and_records_histograms():
+    app = FastAPI()
+    app.add_middleware(PhaseTimingMiddleware)
+
+    def blocking_work():
+        with phase("subject"):
+            time.sleep(0.002)
+        return "done"
+
+    @app.get("/work/{item}")
+    async def work(item: str):
+        with phase("db"):
+            await asyncio.sleep(0.001)
+        # Phases recorded on the calculation pool land in the same request
+        return {"result": await run_calculation(blocking_work)}
+
+    phase_histograms.reset()
+    response = TestClient(app).get("/work/1")
+    header = response.headers["server-timing"]
+    assert header.startswith("db;dur=")
+    assert "subject;dur=" in header and "total;dur=" in header
+
+    snapshot = phase_histograms.snapshot()
+    assert snapshot[("subject", "/work/{item}")]["count"] == 1
+    assert snapshot[("total", "/work/{item}")]["count"] == 1
@@ -0,0 +1,62 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from app.services.transit_stream import TransitFrameEncoder, LatestRequestSlot
+
+
+def _transit_data(sun_lon: float, moon_lon: float, aspects):
+    return {
+        "transit_datetime": datetime(2024, 1, 1, 12, 0),
+        "transiting_planets": {
+            "Sun": {"name": "Sun", "sign": "Capricorn", "longitude": sun_lon, "is_retrograde": False},
+            "Moon": {"name": "Moon", "sign": "Libra", "longitude": moon_lon, "is_retrograde": False},
+        },
+        "aspects_to_natal": aspects,
+    }
+
+
+def test_first_frame_is_full_then_deltas():
+    encoder = TransitFrameEncoder()
+    square = {"transiting_planet": "Moon", "aspect_name": "Square", "natal_planet": "Sun", "orb": 1.5}
+    trine = {"transiting_planet": "Sun", "aspect_name": "Trine", "natal_planet": "Mars", "orb": 2.0}
+
+    first = encoder.encode(_transit_data(280.0, 190.0, [square]), request_id=1)
+    assert first["full"] is True
+    assert set(first["planets"]) == {"Sun", "Moon"}
+    assert first["aspects"] == [square]
+
+    # Sun barely moves, Moon moves; square goes away, trine appears
+    second = encoder.encode(_transit_data(280.0001, 195.0, [trine]), request_id=2)
+    assert second["full"] is False
+    assert second["seq"] == 2
+    assert second["request_id"] == 2
+    assert list(second["planets"]) == ["Moon"]
+    assert second["aspects_upserted"] == [trine]
+    assert second["aspects_removed"] == [["Moon", "Square", "Sun"]]
+
+    # Unchanged orb is not re-sent
+    third = encoder.encode(_transit_data(280.0002, 195.0, [trine]))
+    assert third["planets"] == {}
+    assert third["aspects_upserted"] == []
+    assert third["aspects_removed"] == []
+
+
+def test_reset_forces_full_frame():
+    encoder = TransitFrameEncoder()
+    encoder.encode(_transit_data(280.0, 190.0, []))
+    encoder.reset()
+    assert encoder.encode(_transit_data(281.0, 191.0, []))["full"] is True
+
+
+@pytest.mark.asyncio
+async def test_latest_request_slot_drops_superseded():
+    slot = LatestRequestSlot()
+    for i in range(5):
+        slot.put(i)
+    assert await slot.get() == 4
+    assert slot.superseded == 4
+
+    slot.close()
+    assert await asyncio.wait_for(slot.get(), timeout=1) is None
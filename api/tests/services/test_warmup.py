@@ -0,0 +1,41 @@
+import pytest
+
+from app.services import astrology, warmup
+from app.services.warmup import FAILED, PENDING, READY, WarmupState, run_warm_up
+
+
+def test_state_reports_unready_until_warm_up_runs():
+    state = WarmupState()
+    assert state.status == PENDING and not state.ready
+    assert state.report() == {"status": PENDING, "duration_ms": None, "steps": []}
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not astrology.KERYKEION_AVAILABLE, reason="Kerykeion not installed")
+async def test_warm_up_runs_every_step_and_becomes_ready():
+    state = await run_warm_up(WarmupState(), reference_charts=2, database=False)
+    assert state.status == READY
+    assert [step.name for step in state.steps] == ["libraries", "timezone", "ephemeris", "reference_charts"]
+    assert all(step.error is None and step.duration_ms is not None for step in state.steps)
+
+
+@pytest.mark.asyncio
+async def test_failed_required_step_keeps_worker_unready(monkeypatch):
+    def broken():
+        raise RuntimeError("no ephemeris files")
+
+    monkeypatch.setattr(warmup, "_load_libraries", broken)
+    state = await run_warm_up(WarmupState(), reference_charts=0, database=False)
+    assert state.status == FAILED
+    assert state.steps[0].error == "RuntimeError: no ephemeris files"
+
+
+@pytest.mark.asyncio
+async def test_failed_optional_step_is_recorded_but_not_fatal(monkeypatch):
+    async def no_database():
+        raise ConnectionRefusedError("database down")
+
+    monkeypatch.setattr(warmup, "_open_database_connection", no_database)
+    state = await run_warm_up(WarmupState(), reference_charts=0, database=True)
+    assert state.status == READY
+    assert state.steps[-1].name == "database" and "database down" in state.steps[-1].error
@@ -0,0 +1,34 @@
+import pytest
+
+from app.scripts.accuracy import aggregate, angular_error, evaluate, match_aspects, random_samples
+
+TABLE = [("conjunction", 0.0, 10.0), ("sextile", 60.0, 6.0), ("square", 90.0, 5.0), ("opposition", 180.0, 10.0)]
+
+
+def test_samples_are_reproducible_and_in_range():
+    samples = random_samples(7, 50, start_year=1900, end_year=1999, max_latitude=60.0)
+    assert samples == random_samples(7, 50, start_year=1900, end_year=1999, max_latitude=60.0)
+    assert all(1900 <= s.moment.year <= 1999 and abs(s.latitude) <= 60.0 for s in samples)
+
+
+def test_angular_error_wraps_around():
+    assert angular_error(359.5, 0.5) == pytest.approx(1.0)
+    assert angular_error(10.0, 190.0) == pytest.approx(180.0)
+
+
+def test_match_aspects_uses_exact_orbs():
+    aspects = match_aspects({"Sun": 0.0, "Moon": 65.9, "Mars": 355.0, "Venus": 84.0}, TABLE)
+    assert aspects[frozenset(("Sun", "Moon"))] == "sextile"
+    assert aspects[frozenset(("Sun", "Mars"))] == "conjunction"
+    assert frozenset(("Sun", "Venus")) not in aspects # 84 degrees: outside the square's 5
+    assert aspects[frozenset(("Mars", "Venus"))] == "square" # 89 degrees across 0
+
+
+def test_ephemeris_engine_matches_kerykeion_positions():
+    pytest.importorskip("kerykeion")
+    evaluations = [evaluate(sample, ["ephemeris"]) for sample in random_samples(3, 3)]
+    report = aggregate(evaluations, ["ephemeris"], max_disagreements=10)
+    result = report["engines"]["ephemeris"]
+    assert report["reference_failures"] == 0 and result["failures"] == 0
+    assert {"Sun", "Moon", "Chiron"} <= result["bodies"].keys()
+    assert result["max_error_arcsec"] < 0.01
@@ -0,0 +1,22 @@
+from app.scripts.benchmark import compare, percentile, seeded_inputs, summarize
+
+
+def test_seeded_inputs_are_reproducible():
+    assert seeded_inputs(7, 5) == seeded_inputs(7, 5)
+    assert seeded_inputs(7, 5) != seeded_inputs(8, 5)
+
+
+def test_percentiles_and_throughput():
+    assert percentile([1.0, 2.0, 3.0, 4.0], 50) == 2.5
+    assert percentile([1.0, 2.0, 3.0, 4.0], 100) == 4.0
+    stats = summarize([1_000_000] * 9 + [10_000_000])  # nanoseconds
+    assert stats["p50_ms"] == 1.0 and stats["max_ms"] == 10.0
+    assert round(stats["ops_per_second"]) == 526
+
+
+def test_regression_flagged_above_threshold_only():
+    baseline = {"results": {"fast": {"p50_ms": 1.0}, "slow": {"p50_ms": 1.0}, "gone": {"p50_ms": 1.0}}}
+    current = {"results": {"fast": {"p50_ms": 1.05}, "slow": {"p50_ms": 1.3}, "new": {"p50_ms": 2.0}}}
+    comparison = compare(current, baseline, threshold=0.10)
+    assert set(comparison) == {"fast", "slow"}
+    assert not comparison["fast"]["regression"] and comparison["slow"]["regression"]
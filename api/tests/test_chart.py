@@ -3,8 +3,12 @@ import pytest
 from fastapi.testclient import TestClient
 from unittest.mock import patch, AsyncMock, MagicMock, ANY
 from datetime import datetime, timezone
+from types import SimpleNamespace
+from uuid import uuid4
 
 from app.main import app
+from app.crud.chart import get_crud_chart
+from app.db.session import get_async_session
 from tests.utils.chart import (
     original_sample_calculate_data_valid,
     mock_natal_calc_result_success,
@@ -52,7 +56,9 @@ def test_calculate_natal_chart_success(mock_calculator_class, mock_get_coords):
     mock_calculator_class.assert_called_once_with(
         name=calculate_natal_request_valid["name"],
         birth_dt=datetime(1990, 5, 15, 12, 0),
-        city=calculate_natal_request_valid["city"]
+        city=calculate_natal_request_valid["city"],
+        latitude=34.0522,
+        longitude=-118.2437,
     )
     mock_instance.calculate_chart.assert_awaited_once()
 
@@ -66,6 +72,104 @@ def test_calculate_natal_chart_success(mock_calculator_class, mock_get_coords):
     assert len(response_data["aspects"]) == len(mock_natal_calc_result_success["aspects"])
     assert response_data["calculation_error"] == mock_natal_calc_result_success["calculation_error"]
 
+@patch('app.api.v1.endpoints.charts.get_coordinates_for_city', return_value=(34.0522, -118.2437))
+def test_calculate_natal_chart_real_calculation(mock_get_coords):
+    """The calculator's own output validates against the response model."""
+    pytest.importorskip("kerykeion")
+    response = client.post("/api/v1/charts/calculate/natal", json=calculate_natal_request_valid)
+
+    assert response.status_code == 200, f"Response: {response.text}"
+    sun = response.json()["planets"]["Sun"]
+    assert sun["sign"] == "Taurus" and 54.0 < sun["longitude"] < 55.0
+    assert sun["deg_within_sign"] == pytest.approx(sun["longitude"] - 30.0)
+
+@patch('app.api.v1.endpoints.charts.get_coordinates_for_city', return_value=(34.0522, -118.2437))
+def test_calculate_natal_chart_count_sections(mock_get_coords):
+    """?sections=element_counts,mode_counts returns those counts, not just info."""
+    pytest.importorskip("kerykeion")
+    response = client.post(
+        "/api/v1/charts/calculate/natal?sections=element_counts,mode_counts", json=calculate_natal_request_valid
+    )
+
+    assert response.status_code == 200, f"Response: {response.text}"
+    data = response.json()
+    assert set(data["element_counts"]) == {"Fire", "Earth", "Air", "Water"}
+    assert set(data["mode_counts"]) == {"Cardinal", "Fixed", "Mutable"}
+    assert sum(data["element_counts"].values()) == sum(data["mode_counts"].values()) > 0
+    assert data["planets"] is None and data["aspects"] is None
+
+# --- Test /api/v1/charts/{chart_id}/transits/stream WebSocket ---
+
+def test_transit_stream_answers_malformed_messages_and_keeps_streaming():
+    """A non-JSON frame gets an error frame; the next valid position is still answered."""
+    pytest.importorskip("kerykeion")
+    chart = SimpleNamespace(
+        name="Stream", birth_datetime=datetime(1990, 5, 15, 12, 0), city="Los Angeles",
+        latitude=34.0522, longitude=-118.2437,
+    )
+
+    async def no_session():
+        yield None
+
+    app.dependency_overrides[get_crud_chart] = lambda: SimpleNamespace(get=AsyncMock(return_value=chart))
+    app.dependency_overrides[get_async_session] = no_session
+    try:
+        with client.websocket_connect(f"/api/v1/charts/{uuid4()}/transits/stream") as websocket:
+            websocket.send_text("not json")
+            error = websocket.receive_json()
+            assert error["type"] == "error" and "Invalid JSON" in error["detail"]
+
+            websocket.send_json({"transit_datetime": "2024-01-01T12:00:00", "request_id": 1})
+            frame = websocket.receive_json()
+            assert frame["request_id"] == 1 and "Sun" in frame["planets"]
+    finally:
+        app.dependency_overrides.pop(get_crud_chart, None)
+        app.dependency_overrides.pop(get_async_session, None)
+
+# --- Test /api/v1/charts/{chart_id}/wheel/transit ---
+
+@pytest.mark.parametrize("transit_datetime", ["2024-03-01T14:30:00+02:00", "2024-03-01T12:30:00Z", "2024-03-01T12:30:00"])
+def test_transit_wheel_normalizes_offsets_to_utc(transit_datetime):
+    natal = SimpleNamespace(city="Los Angeles", latitude=34.0522, longitude=-118.2437)
+    app.dependency_overrides[get_crud_chart] = lambda: SimpleNamespace(get=AsyncMock(return_value=object()))
+    try:
+        with patch('app.api.v1.endpoints.charts._wheel_subject', AsyncMock(return_value=natal)), \
+             patch('app.api.v1.endpoints.charts._wheel_response', AsyncMock(return_value={})) as mock_response:
+            response = client.get(
+                f"/api/v1/charts/{uuid4()}/wheel/transit", params={"transit_datetime": transit_datetime}
+            )
+    finally:
+        app.dependency_overrides.pop(get_crud_chart, None)
+
+    assert response.status_code == 200, f"Response: {response.text}"
+    transit = mock_response.await_args.args[2][1]
+    assert transit.birth_dt == datetime(2024, 3, 1, 12, 30)
+
+# --- Test /api/v1/charts/{chart_id}/wheel/synastry/{other_chart_id} ---
+
+@pytest.mark.parametrize("missing", [None, "inner", "outer"])
+def test_synastry_wheel_fetches_both_charts_in_one_query(missing):
+    inner = SimpleNamespace(id=uuid4(), name="Inner")
+    outer = SimpleNamespace(id=uuid4(), name="Outer")
+    found = [chart for chart, role in ((outer, "outer"), (inner, "inner")) if role != missing]
+    crud = SimpleNamespace(get=AsyncMock(), get_multi_by_ids=AsyncMock(return_value=found))
+    app.dependency_overrides[get_crud_chart] = lambda: crud
+    try:
+        with patch('app.api.v1.endpoints.charts._wheel_subject', AsyncMock(side_effect=lambda chart, db: chart.name)), \
+             patch('app.api.v1.endpoints.charts._wheel_response', AsyncMock(return_value={})) as mock_response:
+            response = client.get(f"/api/v1/charts/{inner.id}/wheel/synastry/{outer.id}")
+    finally:
+        app.dependency_overrides.pop(get_crud_chart, None)
+
+    crud.get_multi_by_ids.assert_awaited_once_with(ids=[inner.id, outer.id])
+    crud.get.assert_not_awaited()
+    if missing:
+        assert response.status_code == 404
+        assert response.json()["detail"] == "One or both charts not found"
+    else:
+        assert response.status_code == 200, f"Response: {response.text}"
+        assert mock_response.await_args.args[2] == ["Inner", "Outer"] # Requested order, not query order
+
 # --- Test Input Validation (expecting 422 from Pydantic) ---
 
 @patch('app.api.v1.endpoints.charts.get_coordinates_for_city', return_value=(34.0522, -118.2437))
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import pytest
+
+COMPOSE_FILE = Path(__file__).resolve().parent.parent.parent / "docker-compose.yml"
+SHARED_SETTINGS = ("REPORT_STORAGE_DIR", "WHEEL_CACHE_DIR")
+
+
+def _service(compose, name):
+    service = compose["services"][name]
+    environment = dict(entry.split("=", 1) for entry in service.get("environment", []))
+    named_volumes = {}
+    for volume in service.get("volumes", []):
+        source, _, target = volume.strip().partition(":")
+        if source in compose.get("volumes", {}):
+            named_volumes[source] = target
+    return environment, named_volumes
+
+
+def test_worker_writes_reports_where_the_api_serves_them():
+    yaml = pytest.importorskip("yaml")
+    if not COMPOSE_FILE.is_file():
+        pytest.skip("docker-compose.yml is not part of this checkout")
+    compose = yaml.safe_load(COMPOSE_FILE.read_text())
+    api_env, api_volumes = _service(compose, "api")
+    worker_env, worker_volumes = _service(compose, "worker")
+
+    for name in SHARED_SETTINGS:
+        # Same path in both containers, on a named volume both of them mount there
+        assert api_env[name] == worker_env[name]
+        mounts = [volume for volume, target in api_volumes.items()
+                  if api_env[name].startswith(target.rstrip("/") + "/") and worker_volumes.get(volume) == target]
+        assert mounts, f"{name}={api_env[name]} is not on a volume shared by api and worker"
@@ -0,0 +1,34 @@
+import pytest
+
+from app.scripts.load_test import CITIES, DEFAULT_MIX, Recorder, StubGeocoder, _stats, parse_mix, stub_coordinates
+
+
+def test_stub_geocoder_answers_geopy_nominatim():
+    from geopy.geocoders import Nominatim
+
+    with StubGeocoder() as stub:
+        geolocator = Nominatim(user_agent="load-test", domain=stub.address, scheme="http")
+        london = geolocator.geocode("London", timeout=5)
+        elsewhere = geolocator.geocode("Atlantis", timeout=5)
+    assert (london.latitude, london.longitude) == CITIES["London"]
+    assert (elsewhere.latitude, elsewhere.longitude) == stub_coordinates("Atlantis")
+    assert stub.requests == 2
+
+
+def test_stats_per_endpoint():
+    recorder = Recorder()
+    recorder.add("GET /x", 1.0, "200", False) # Before recording starts: warmup, ignored
+    recorder.recording = True
+    for ms in range(1, 101):
+        recorder.add("GET /x", ms / 1000, "200" if ms <= 98 else "500", ms > 98)
+    stats = _stats(recorder.samples["GET /x"], recorder.errors["GET /x"], recorder.statuses["GET /x"], duration=10.0)
+    assert stats["requests"] == 100 and stats["throughput_rps"] == 10.0
+    assert stats["error_rate"] == 0.02 and stats["statuses"] == {"200": 98, "500": 2}
+    assert stats["p50_ms"] == pytest.approx(50.5) and stats["max_ms"] == pytest.approx(100.0)
+
+
+def test_parse_mix():
+    assert parse_mix(None) == DEFAULT_MIX
+    assert parse_mix("natal=2,synastry") == {"natal": 2.0, "synastry": DEFAULT_MIX["synastry"]}
+    with pytest.raises(ValueError):
+        parse_mix("nope=1")
@@ -31,8 +31,8 @@ mock_natal_calc_result_success = {
         "kerykeion_asc_sign": "Leo" # Example placeholder
     },
     "planets": {
-        "Sun": {"name": "Sun", "sign": "Taurus", "sign_num": 2, "position": 24.5, "absolute_position": 54.5, "house": "10"},
-        "Moon": {"name": "Moon", "sign": "Leo", "sign_num": 5, "position": 15.2, "absolute_position": 135.2, "house": "1"},
+        "Sun": {"name": "Sun", "sign": "Taurus", "sign_symbol": "♉", "longitude": 54.5, "deg_within_sign": 24.5, "is_retrograde": False},
+        "Moon": {"name": "Moon", "sign": "Leo", "sign_symbol": "♌", "longitude": 135.2, "deg_within_sign": 15.2, "is_retrograde": False},
         # Add other planets as needed...
     },
     "houses": [
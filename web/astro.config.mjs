@@ -20,7 +20,7 @@ export default defineConfig({
     },
     // Add proxy for API requests
     proxy: {
-      '/api': 'http://localhost:8000',
+      '/api': { target: 'http://localhost:8000', ws: true },
     },
   },
 
@@ -28,7 +28,7 @@ export default defineConfig({
     plugins: [tailwindcss()],
     server: {
       proxy: {
-        '/api': 'http://localhost:8000',
+        '/api': { target: 'http://localhost:8000', ws: true },
       },
     },
   }
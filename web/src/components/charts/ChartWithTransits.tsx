@@ -22,6 +22,40 @@ function formatDateKey(date: Date) {
   return date.toISOString().slice(0, 10); // YYYY-MM-DD
 }
 
+function formatLocalISO(date: Date) {
+  // Format date to ISO string YYYY-MM-DDTHH:mm:ss (local time, no offset) for the backend
+  return date.getFullYear() + '-' +
+         String(date.getMonth() + 1).padStart(2, '0') + '-' +
+         String(date.getDate()).padStart(2, '0') + 'T' +
+         String(date.getHours()).padStart(2, '0') + ':' +
+         String(date.getMinutes()).padStart(2, '0') + ':' +
+         String(date.getSeconds()).padStart(2, '0');
+}
+
+// Delta frame sent by /charts/{id}/transits/stream (see app/services/transit_stream.py)
+type TransitStreamFrame = {
+  type: "frame" | "error";
+  seq?: number;
+  request_id?: number | null;
+  transit_datetime?: string;
+  full?: boolean;
+  planets?: Record<string, any>;
+  planets_removed?: string[];
+  aspects?: any[];
+  aspects_upserted?: any[];
+  aspects_removed?: [string, string, string][];
+  detail?: any;
+};
+
+function aspectKey(aspect: any) {
+  return `${aspect.transiting_planet}|${aspect.aspect_name}|${aspect.natal_planet}`;
+}
+
+function getStreamUrl(chartId: string) {
+  const protocol = window.location.protocol === "https:" ? "wss:" : "ws:";
+  return `${protocol}//${window.location.host}/api/v1/charts/${chartId}/transits/stream`;
+}
+
 type FavoriteTransit = {
   date: string; // ISO string (YYYY-MM-DD)
   note?: string;
@@ -60,6 +94,15 @@ export const ChartWithTransits: React.FC<ChartWithTransitsProps> = ({ chartId, c
   // Debounce ref
   const debounceRef = useRef<NodeJS.Timeout | null>(null);
 
+  // --- Streaming (WebSocket) state ---
+  // The server keeps the natal chart loaded per connection and sends deltas,
+  // so we rebuild the full transit picture from the frames we receive.
+  const streamRef = useRef<WebSocket | null>(null);
+  const streamPlanetsRef = useRef<Record<string, any>>({});
+  const streamAspectsRef = useRef<Map<string, any>>(new Map());
+  const streamRequestIdRef = useRef(0);
+  const streamPendingKeysRef = useRef<Map<number, string>>(new Map());
+
   // Load favorites from localStorage on mount
   useEffect(() => {
     const key = getFavoritesKey(chartId);
@@ -121,6 +164,87 @@ export const ChartWithTransits: React.FC<ChartWithTransitsProps> = ({ chartId, c
     setEditNote("");
   };
 
+  // Open one transit stream per chart; fall back to HTTP if it fails
+  useEffect(() => {
+    let ws: WebSocket;
+    try {
+      ws = new WebSocket(getStreamUrl(chartId));
+    } catch {
+      return;
+    }
+    ws.onopen = () => {
+      streamRef.current = ws;
+    };
+    ws.onmessage = (event) => {
+      const frame: TransitStreamFrame = JSON.parse(event.data);
+      if (frame.type === "error") {
+        if (frame.request_id != null) streamPendingKeysRef.current.delete(frame.request_id);
+        setError(typeof frame.detail === "string" ? frame.detail : "Failed to stream transit data");
+        setLoading(false);
+        return;
+      }
+      if (frame.full) {
+        streamPlanetsRef.current = { ...(frame.planets || {}) };
+        streamAspectsRef.current = new Map((frame.aspects || []).map(a => [aspectKey(a), a]));
+      } else {
+        streamPlanetsRef.current = { ...streamPlanetsRef.current, ...(frame.planets || {}) };
+        (frame.planets_removed || []).forEach(name => delete streamPlanetsRef.current[name]);
+        (frame.aspects_upserted || []).forEach(a => streamAspectsRef.current.set(aspectKey(a), a));
+        (frame.aspects_removed || []).forEach(k => streamAspectsRef.current.delete(k.join("|")));
+      }
+      const data: TransitData = {
+        transiting_planets: { ...streamPlanetsRef.current },
+        aspects_to_natal: Array.from(streamAspectsRef.current.values()).sort((a, b) => a.orb - b.orb),
+        transit_datetime: frame.transit_datetime || "",
+      };
+      if (frame.request_id != null) {
+        const key = streamPendingKeysRef.current.get(frame.request_id);
+        // Every request up to the answered one has been superseded
+        streamPendingKeysRef.current.forEach((_, id) => {
+          if (id <= frame.request_id!) streamPendingKeysRef.current.delete(id);
+        });
+        if (key) {
+          cacheRef.current.set(key, data);
+          if (cacheRef.current.size > MAX_CACHE_SIZE) {
+            const oldest = cacheRef.current.keys().next().value;
+            cacheRef.current.delete(oldest);
+          }
+        }
+      }
+      setTransitData(data);
+      setError(null);
+      setLoading(streamPendingKeysRef.current.size > 0);
+    };
+    ws.onerror = () => {
+      streamRef.current = null;
+    };
+    ws.onclose = () => {
+      streamRef.current = null;
+    };
+    return () => {
+      streamRef.current = null;
+      ws.close();
+    };
+  }, [chartId]);
+
+  // Send a slider position over the stream; returns false if the stream is not usable
+  const streamTransitData = useCallback((date: Date) => {
+    const ws = streamRef.current;
+    if (!ws || ws.readyState !== WebSocket.OPEN) return false;
+    const key = formatDateKey(date);
+    if (cacheRef.current.has(key)) {
+      setTransitData(cacheRef.current.get(key)!);
+      setLoading(false);
+      setError(null);
+      return true;
+    }
+    const requestId = ++streamRequestIdRef.current;
+    streamPendingKeysRef.current.set(requestId, key);
+    setLoading(true);
+    ws.send(JSON.stringify({ transit_datetime: formatLocalISO(date), request_id: requestId }));
+    return true;
+  }, []);
+
   // Fetch transit data, using cache if available
   const fetchTransitData = useCallback(async (date: Date) => {
     const key = formatDateKey(date);
@@ -133,13 +257,7 @@ export const ChartWithTransits: React.FC<ChartWithTransitsProps> = ({ chartId, c
     setLoading(true);
     setError(null);
     try {
-      // Format date to ISO string YYYY-MM-DDTHH:mm:ss for the GET request
-      const transitDateTimeISO = date.getFullYear() + '-' +
-                               String(date.getMonth() + 1).padStart(2, '0') + '-' +
-                               String(date.getDate()).padStart(2, '0') + 'T' +
-                               String(date.getHours()).padStart(2, '0') + ':' +
-                               String(date.getMinutes()).padStart(2, '0') + ':' +
-                               String(date.getSeconds()).padStart(2, '0');
+      const transitDateTimeISO = formatLocalISO(date);
 
       const res = await axios.get(
         `/api/v1/charts/${chartId}/transits?transit_datetime=${transitDateTimeISO}`
@@ -168,13 +286,7 @@ export const ChartWithTransits: React.FC<ChartWithTransitsProps> = ({ chartId, c
       const key = formatDateKey(d);
       if (!cacheRef.current.has(key)) {
         // Fire and forget
-        // Format date to ISO string YYYY-MM-DDTHH:mm:ss for the GET request
-        const transitDateTimeISO = d.getFullYear() + '-' +
-                                 String(d.getMonth() + 1).padStart(2, '0') + '-' +
-                                 String(d.getDate()).padStart(2, '0') + 'T' +
-                                 String(d.getHours()).padStart(2, '0') + ':' +
-                                 String(d.getMinutes()).padStart(2, '0') + ':' +
-                                 String(d.getSeconds()).padStart(2, '0');
+        const transitDateTimeISO = formatLocalISO(d);
 
         axios.get(`/api/v1/charts/${chartId}/transits?transit_datetime=${transitDateTimeISO}`)
         .then(res => {
@@ -190,15 +302,19 @@ export const ChartWithTransits: React.FC<ChartWithTransitsProps> = ({ chartId, c
 
   // Debounced effect for transitDate changes
   useEffect(() => {
+    // The stream coalesces and drops superseded positions server-side,
+    // so it only needs a light debounce and no prefetching.
+    const streaming = streamRef.current?.readyState === WebSocket.OPEN;
     if (debounceRef.current) clearTimeout(debounceRef.current);
     debounceRef.current = setTimeout(() => {
+      if (streamTransitData(transitDate)) return;
       fetchTransitData(transitDate);
       prefetchTransitData(transitDate);
-    }, 300); // 300ms debounce
+    }, streaming ? 30 : 300); // 300ms debounce over HTTP
     return () => {
       if (debounceRef.current) clearTimeout(debounceRef.current);
     };
-  }, [transitDate, fetchTransitData, prefetchTransitData]);
+  }, [transitDate, fetchTransitData, prefetchTransitData, streamTransitData]);
 
   // --- Auto-Play/Animation Logic ---
   useEffect(() => {